@@ -1,11 +1,13 @@
 # agents/agent1/__init__.py
 
-from .state_machine import ConversationState, StateMachine
+from .state_machine import ConversationState, StateMachine, TransitionError, TransitionTable
 from .hypothesis_builder import HypothesisBuilder
 
 __all__ = [
     'ConversationState',
     'StateMachine',
+    'TransitionError',
+    'TransitionTable',
     'HypothesisBuilder'
 ]
 
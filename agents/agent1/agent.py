@@ -1,39 +1,228 @@
+import logging
 import uuid
+from agents.agent1.compaction import ConversationCompactor, user_turn_count
+from agents.agent1.conversation_engine import ConversationEngine
+from agents.agent1.dedup_index import DUPLICATE_OF_FIELD
+from agents.agent1.records import Draft, Message, draft_records, history_records, to_primitive
 from agents.agent1.session_manager import SessionManager
+from agents.agent1.async_session_manager import AsyncSessionManager
+from agents.common.structured_logging import log_event
+
+logger = logging.getLogger(__name__)
+
+# Agent 1's session conversation, interpreted by ConversationEngine (see conversation_engine.py).
+# Mock logic: each message moves the draft along, and the session is finalized on request
+# or after three messages.
+AGENT1_SPEC = {
+    "name": "agent1_session",
+    "initial_state": "START",
+    "final_state": "FINALIZED",
+    "default_reply": "Message processed.",
+    "states": {
+        "START": {"rules": [{
+            "action": "new_draft",
+            "reply": "Thanks for your message: '{message}'. I'm processing it.",
+            "goto": "PROCESSING_USER_INPUT",
+        }]},
+        "PROCESSING_USER_INPUT": {"rules": [{
+            "action": "elaborate_draft",
+            "reply": "I'm now generating a hypothesis draft.",
+            "goto": "GENERATING_HYPOTHESIS",
+        }]},
+        "GENERATING_HYPOTHESIS": {"rules": [{
+            "reply": "Here is a draft: {draft}. What are your thoughts?",
+            "goto": "AWAITING_FEEDBACK",
+        }]},
+        "AWAITING_FEEDBACK": {},
+        "FINALIZED": {},
+    },
+    "after_response": [{
+        "if": {"any": [{"answer": ["finalize please"]}, {"turns_at_least": 3}], "state_not": "FINALIZED"},
+        "reply": "Finalizing the hypothesis based on our conversation.",
+        "goto": "FINALIZED",
+    }],
+}
+
+AGENT1_ENGINE = ConversationEngine(AGENT1_SPEC)
+
 
 class Agent1:
     """
     Agent1 class that handles user interactions, manages session state,
     and saves hypotheses using SessionManager.
     """
-    def __init__(self, session_id: str = None):
+    def __init__(self, session_id: str = None, session_manager: SessionManager = None,
+                 async_session_manager: AsyncSessionManager = None, compactor: ConversationCompactor = None):
         """
         Initializes Agent1.
 
         Args:
             session_id (str, optional): An existing session ID to resume.
                                         If None, a new session ID is generated.
+            session_manager (SessionManager, optional): The SessionManager used for persistence,
+                                                        e.g. one configured with persistence_mode='append'.
+                                                        If None, a default SessionManager is created.
+            async_session_manager (AsyncSessionManager, optional): Used by handle_message_async.
+                                                                   If None, one is created on first use.
+            compactor (ConversationCompactor, optional): Bounds the conversation history and the
+                                                         final hypothesis' conversation_summary.
+                                                         If None, one with the default limits is used.
         """
-        self.session_manager = SessionManager() # Assumes SessionManager can be initialized
-                                                # without args or handles its own client setup.
+        # Assumes SessionManager can be initialized without args or handles its own client setup.
+        self.session_manager = session_manager if session_manager is not None else SessionManager()
+        self.async_session_manager = async_session_manager
+        self.compactor = compactor if compactor is not None else ConversationCompactor()
 
-        if not self.session_manager.db:
-            print("Warning: Agent1 initialized, but SessionManager has no Firestore client. "
-                  "Session operations will not be persisted.")
+        # The Firestore client is only created when the first message is persisted.
 
         self.session_id = session_id if session_id else str(uuid.uuid4())
         self.current_state = "START"
         self.conversation_history = []
         self.hypothesis_drafts = []
         self.message_count = 0 # To simulate state changes
+        self.final_hypothesis = None
+        self.final_hypothesis_id = None
+        self.duplicate_of = None  # ID of a stored hypothesis the final one nearly duplicates
+        self.persisted = False  # whether storage holds the current state
+        self._actions = {"new_draft": self._new_draft, "elaborate_draft": self._elaborate_draft}
+
+        log_event(logger, logging.DEBUG, "agent1.initialized", session_id=self.session_id)
+        if session_id:
+            self._load_session()
+
+    @classmethod
+    async def resume_async(cls, session_id: str, async_session_manager: AsyncSessionManager, session_manager: SessionManager = None,
+                           compactor: ConversationCompactor = None, session_data: dict = None):
+        """
+        Creates an Agent1 for an existing session, loading it through the AsyncSessionManager.
+
+        Use this instead of Agent1(session_id=...) inside an event loop, where the
+        blocking load in __init__ would stall every other conversation. Pass
+        session_data if the session was already loaded.
+        """
+        agent = cls(session_manager=session_manager, async_session_manager=async_session_manager, compactor=compactor)
+        agent.session_id = session_id
+        if session_data is None:
+            session_data = await async_session_manager.load_session(session_id)
+        if agent._apply_session_data(session_data) and agent.current_state == "FINALIZED" and async_session_manager.db:
+            agent._restore_final_hypothesis(
+                await async_session_manager.list_hypotheses_for_session(session_id, page_size=1))
+        return agent
+
+    def _load_session(self) -> bool:
+        """
+        Restores state, history and drafts of an existing session.
+
+        Sessions still held in the SessionManager's cache are restored without a
+        Firestore read. If the session is unknown, the agent starts from scratch.
+        A finalized session also gets back the final hypothesis it was saved with.
+
+        Returns:
+            bool: True if an existing session was restored.
+        """
+        if not self._apply_session_data(self.session_manager.load_session(self.session_id)):
+            return False
+        if self.current_state == "FINALIZED" and self.session_manager.db:
+            self._restore_final_hypothesis(self.session_manager.list_hypotheses_for_session(self.session_id, page_size=1))
+        return True
+
+    def _restore_final_hypothesis(self, page):
+        """
+        Takes back the stored final hypothesis of a finalized session, so later saves carry
+        the same content and ID instead of a summary rebuilt from the grown conversation.
+        """
+        if not page:
+            return
+        stored = page.items[0]
+        if stored.get(u'hypothesis_content'):
+            self.final_hypothesis = stored[u'hypothesis_content']
+            self.final_hypothesis_id = stored['id']
+            self.duplicate_of = stored.get(DUPLICATE_OF_FIELD)
+
+    def _apply_session_data(self, session_data) -> bool:
+        if not session_data:
+            log_event(logger, logging.INFO, "agent1.session_not_found", session_id=self.session_id)
+            return False
 
-        print(f"Agent1 initialized with session ID: {self.session_id}")
-        # Optionally, load existing session data if session_id was provided
-        # self._load_session() # Placeholder for potential future load logic
+        self.current_state = session_data.get("current_state") or "START"
+        self.conversation_history = self.compactor.compact(history_records(session_data.get("conversation_history")))
+        self.hypothesis_drafts = draft_records(session_data.get("hypothesis_drafts"))
+        # handle_message records exactly one user message per call.
+        self.message_count = user_turn_count(self.conversation_history)
+        self.persisted = True
+        log_event(logger, logging.INFO, "agent1.session_resumed", session_id=self.session_id,
+                  state=self.current_state, messages=len(self.conversation_history))
+        return True
 
     def _add_message_to_history(self, role: str, content: str):
         """Helper to add a message to the conversation history."""
-        self.conversation_history.append({"role": role, "content": content})
+        self.conversation_history.append(Message(role, content))
+
+    def _new_draft(self, checkpoint, message):
+        self.hypothesis_drafts.append(Draft(f"draft_{checkpoint['turns']}", f"Draft based on '{message[:20]}...'"))
+
+    def _elaborate_draft(self, checkpoint, message):
+        self.hypothesis_drafts[-1].append_text(" - further elaborated.")
+
+    def checkpoint(self) -> dict:
+        """The conversation engine's view of this session: JSON-serializable, no history or drafts."""
+        return {"spec": AGENT1_ENGINE.name, "state": self.current_state, "slots": {}, "turns": self.message_count}
+
+    def _process_message(self, user_message_content: str) -> str:
+        """
+        Applies a user message to the in-memory conversation: records it, advances
+        the state and drafts through AGENT1_ENGINE, and records the assistant's reply.
+        Does no I/O.
+
+        Returns:
+            str: The assistant's reply, before any persistence notes are appended.
+        """
+        self.persisted = False
+        self._add_message_to_history("user", user_message_content)
+        checkpoint = self.checkpoint()
+        context = {"draft": self.hypothesis_drafts[-1] if self.hypothesis_drafts else None}
+        turn = AGENT1_ENGINE.respond(checkpoint, user_message_content, actions=self._actions, context=context)
+        self.current_state = checkpoint["state"]
+        self.message_count = checkpoint["turns"]
+        assistant_response_content = turn.replies[-1] if turn.replies else AGENT1_ENGINE.default_reply
+        if turn.changed_state and AGENT1_ENGINE.is_final(checkpoint):
+            log_event(logger, logging.INFO, "agent1.finalized", session_id=self.session_id)
+
+        self._add_message_to_history("assistant", assistant_response_content)
+        self.conversation_history = self.compactor.compact(self.conversation_history)
+        return assistant_response_content
+
+    def _build_final_hypothesis(self) -> dict:
+        """
+        Returns the final hypothesis, built once when the session is first finalized.
+
+        Keeping it fixed means every later save carries the same content, and therefore
+        the same content-addressed ID, so it is a no-op instead of a new document.
+        """
+        if self.final_hypothesis is None:
+            self.final_hypothesis = self._summarize_conversation()
+        return self.final_hypothesis
+
+    def _summarize_conversation(self) -> dict:
+        return {
+            "title": f"Final Hypothesis for Session {self.session_id}",
+            "summary": f"Based on {self.message_count} interactions.",
+            "details": to_primitive(self.hypothesis_drafts[-1]) if self.hypothesis_drafts else "No drafts available.",
+            "conversation_summary": self.compactor.final_summary(self.conversation_history)
+        }
+
+    def _record_saved_hypothesis(self, manager, saved_id):
+        """Keeps the ID the final hypothesis was saved under and its near-duplicate link, if any."""
+        if saved_id:
+            self.final_hypothesis_id = saved_id
+            self.duplicate_of = manager.duplicate_of(saved_id)
+
+    def _saved_hypothesis_note(self, saved_id) -> str:
+        if not saved_id:
+            return " Failed to save hypothesis to Firestore."
+        if self.duplicate_of:
+            return f" Hypothesis saved with ID: {saved_id}. It closely matches hypothesis {self.duplicate_of}."
+        return f" Hypothesis saved with ID: {saved_id}."
 
     def handle_message(self, user_message_content: str) -> str:
         """
@@ -46,67 +235,104 @@ class Agent1:
         Returns:
             str: A response to the user.
         """
-        self._add_message_to_history("user", user_message_content)
-        self.message_count += 1
-        assistant_response_content = "Message processed."
-
-        # Mock logic for state and hypothesis draft updates
-        if self.current_state == "START":
-            self.current_state = "PROCESSING_USER_INPUT"
-            self.hypothesis_drafts.append({"id": f"draft_{self.message_count}", "text": f"Draft based on '{user_message_content[:20]}...'"})
-            assistant_response_content = f"Thanks for your message: '{user_message_content}'. I'm processing it."
-        elif self.current_state == "PROCESSING_USER_INPUT":
-            self.current_state = "GENERATING_HYPOTHESIS"
-            self.hypothesis_drafts[-1]["text"] += " - further elaborated."
-            assistant_response_content = "I'm now generating a hypothesis draft."
-        elif self.current_state == "GENERATING_HYPOTHESIS":
-            self.current_state = "AWAITING_FEEDBACK"
-            assistant_response_content = f"Here is a draft: {self.hypothesis_drafts[-1]}. What are your thoughts?"
-
-        # Mock condition to enter FINALIZED state (e.g., after 3 messages or specific keyword)
-        if user_message_content.lower() == "finalize please" or self.message_count >= 3:
-            if self.current_state != "FINALIZED": # Avoid multiple finalizations if already in state
-                self.current_state = "FINALIZED"
-                assistant_response_content = "Finalizing the hypothesis based on our conversation."
-                print(f"Agent state changed to FINALIZED for session {self.session_id}")
-
-
-        self._add_message_to_history("assistant", assistant_response_content)
+        assistant_response_content = self._process_message(user_message_content)
 
         # Persist session
-        if self.session_manager.db: # Only attempt if client is available
-            self.session_manager.update_session(
+        if self.session_manager.accepts_writes: # Client available, or writes are spooled
+            self.persisted = self.session_manager.update_session(
                 session_id=self.session_id,
                 conversation_history=self.conversation_history,
                 current_state=self.current_state,
                 hypothesis_drafts=self.hypothesis_drafts
             )
         else:
-            print("Skipping session update as Firestore client is not available.")
+            logger.warning("Skipping session update as Firestore client is not available.")
 
         # Handle finalized state
         if self.current_state == "FINALIZED":
-            mock_final_hypothesis = {
-                "title": f"Final Hypothesis for Session {self.session_id}",
-                "summary": f"Based on {self.message_count} interactions.",
-                "details": self.hypothesis_drafts[-1] if self.hypothesis_drafts else "No drafts available.",
-                "conversation_summary": [msg["content"] for msg in self.conversation_history]
-            }
-            if self.session_manager.db: # Only attempt if client is available
-                print(f"Attempting to save final hypothesis for session {self.session_id}...")
-                saved_id = self.session_manager.save_final_hypothesis(self.session_id, mock_final_hypothesis)
-                if saved_id:
-                    assistant_response_content += f" Hypothesis saved with ID: {saved_id}."
-                else:
-                    assistant_response_content += " Failed to save hypothesis to Firestore."
+            if self.session_manager.accepts_writes:
+                saved_id = self.session_manager.save_final_hypothesis(self.session_id, self._build_final_hypothesis())
+                self._record_saved_hypothesis(self.session_manager, saved_id)
+                assistant_response_content += self._saved_hypothesis_note(saved_id)
             else:
-                print("Skipping final hypothesis saving as Firestore client is not available.")
+                logger.warning("Skipping final hypothesis saving as Firestore client is not available.")
             # Potentially reset state or drafts after finalization if needed for the agent's lifecycle
             # self.current_state = "SESSION_ENDED"
             # self.hypothesis_drafts = []
 
         return assistant_response_content
 
+    async def handle_message_async(self, user_message_content: str) -> str:
+        """
+        Async variant of handle_message that persists through the AsyncSessionManager,
+        so awaiting Firestore never blocks the event loop.
+
+        Args:
+            user_message_content (str): The content of the user's message.
+
+        Returns:
+            str: A response to the user.
+        """
+        if self.async_session_manager is None:
+            self.async_session_manager = AsyncSessionManager(persistence_mode=self.session_manager.persistence_mode)
+        manager = self.async_session_manager
+
+        assistant_response_content = self._process_message(user_message_content)
+
+        if manager.db:
+            self.persisted = await manager.update_session(
+                session_id=self.session_id,
+                conversation_history=self.conversation_history,
+                current_state=self.current_state,
+                hypothesis_drafts=self.hypothesis_drafts
+            )
+        else:
+            logger.warning("Skipping session update as Firestore client is not available.")
+
+        if self.current_state == "FINALIZED":
+            if manager.db:
+                saved_id = await manager.save_final_hypothesis(self.session_id, self._build_final_hypothesis())
+                self._record_saved_hypothesis(manager, saved_id)
+                assistant_response_content += self._saved_hypothesis_note(saved_id)
+            else:
+                logger.warning("Skipping final hypothesis saving as Firestore client is not available.")
+
+        return assistant_response_content
+
+    async def finalize_async(self):
+        """
+        Finalizes the session on request instead of waiting for the conversation to trigger it,
+        persisting the session and saving the final hypothesis through the AsyncSessionManager.
+
+        A hypothesis already saved by this agent is not saved again.
+
+        Returns:
+            str or None: The ID of the saved final hypothesis, or None if it could not be saved.
+        """
+        if self.current_state == "FINALIZED" and self.final_hypothesis_id:
+            return self.final_hypothesis_id
+
+        if self.async_session_manager is None:
+            self.async_session_manager = AsyncSessionManager(persistence_mode=self.session_manager.persistence_mode)
+        manager = self.async_session_manager
+
+        self.current_state = "FINALIZED"
+        self.persisted = False
+        log_event(logger, logging.INFO, "agent1.finalized", session_id=self.session_id)
+        if not manager.db:
+            logger.warning("Skipping final hypothesis saving as Firestore client is not available.")
+            return None
+
+        self.persisted = await manager.update_session(
+            session_id=self.session_id,
+            conversation_history=self.conversation_history,
+            current_state=self.current_state,
+            hypothesis_drafts=self.hypothesis_drafts
+        )
+        saved_id = await manager.save_final_hypothesis(self.session_id, self._build_final_hypothesis())
+        self._record_saved_hypothesis(manager, saved_id)
+        return saved_id
+
 if __name__ == '__main__':
     print("Starting Agent1 example usage...")
     # Note: Firestore operations will likely fail if Google Cloud ADC are not set up.
@@ -136,11 +362,10 @@ if __name__ == '__main__':
     print(f"History: {agent.conversation_history[-2:]}")
     print(f"Drafts: {agent.hypothesis_drafts}")
 
-    # Example of starting agent with existing session_id (won't load data in this simple version)
-    # print("\n--- Starting agent with existing session ID (no load implemented) ---")
-    # existing_session_agent = Agent1(session_id=agent.session_id)
-    # print(f"Agent for existing session {existing_session_agent.session_id} created.")
-    # response4 = existing_session_agent.handle_message("Can you add more details about carbon sequestration?")
-    # print(f"Agent Response: {response4}")
+    print("\n--- Resuming the same session with a new Agent1 instance ---")
+    resumed_agent = Agent1(session_id=agent.session_id, session_manager=agent.session_manager)
+    print(f"Resumed State: {resumed_agent.current_state}")
+    print(f"Resumed History Length: {len(resumed_agent.conversation_history)}")
+    print(f"Session Cache: {agent.session_manager.cache_stats()}")
 
     print("\nExample usage finished.")
@@ -0,0 +1,172 @@
+# agents/agent1/api.py
+import asyncio
+import logging
+import weakref
+from collections import OrderedDict
+
+from fastapi import Depends, FastAPI, HTTPException
+
+from .agent import Agent1
+from .async_session_manager import AsyncSessionManager
+from .models import FinalizeResponse, MessageRequest, MessageResponse, SessionState
+from .session_manager import SessionManager
+from agents.common.wire_format_routes import WireFormatRoute
+
+DEFAULT_MAX_ACTIVE_SESSIONS = 10000
+
+logger = logging.getLogger(__name__)
+
+
+class SessionRegistry:
+    """
+    Holds the live Agent1 instances served by the API, one per session.
+
+    Each session has its own asyncio.Lock, so requests to the same session run one at
+    a time (keeping its history in order) while requests to different sessions never
+    wait on each other. At most max_active agents are kept in memory; the least
+    recently used ones are dropped and transparently resumed from storage through the
+    AsyncSessionManager when their session is used again. An agent is only dropped
+    once its state is stored (it is saved first if needed) and while no request is
+    using it, so the registry may briefly hold more than max_active agents.
+    """
+    def __init__(self, async_session_manager: AsyncSessionManager = None, session_manager: SessionManager = None,
+                 max_active: int = DEFAULT_MAX_ACTIVE_SESSIONS):
+        self.async_session_manager = async_session_manager if async_session_manager is not None else AsyncSessionManager()
+        self.session_manager = session_manager if session_manager is not None else SessionManager(
+            persistence_mode=self.async_session_manager.persistence_mode
+        )
+        self.max_active = max_active
+        self._agents = OrderedDict()  # session_id -> Agent1
+        self._locks = weakref.WeakValueDictionary()
+
+    def lock(self, session_id: str) -> asyncio.Lock:
+        """Returns the lock guarding the given session; hold it while using the session's agent."""
+        lock = self._locks.get(session_id)
+        if lock is None:
+            lock = asyncio.Lock()
+            self._locks[session_id] = lock
+        return lock
+
+    async def _remember(self, agent: Agent1):
+        self._agents[agent.session_id] = agent
+        self._agents.move_to_end(agent.session_id)
+        for session_id in list(self._agents):
+            if len(self._agents) <= self.max_active:
+                break
+            lock = self.lock(session_id)
+            if session_id == agent.session_id or lock.locked():
+                continue  # in use; evicted later
+            async with lock:
+                evicted = self._agents.get(session_id)
+                if evicted is not None and await self._persist(evicted):
+                    del self._agents[session_id]
+                    self.async_session_manager.forget(session_id)
+                    self.session_manager.forget(session_id)
+
+    async def _persist(self, agent: Agent1) -> bool:
+        """Stores an agent's state unless it is stored already; True if storage has it."""
+        if not agent.persisted:
+            agent.persisted = await self.async_session_manager.update_session(
+                agent.session_id, agent.conversation_history, agent.current_state, agent.hypothesis_drafts)
+            if not agent.persisted:
+                logger.warning(f"Keeping session '{agent.session_id}' in memory: its state could not be stored.")
+        return agent.persisted
+
+    async def create(self) -> Agent1:
+        agent = Agent1(session_manager=self.session_manager, async_session_manager=self.async_session_manager)
+        await self._remember(agent)
+        return agent
+
+    async def get(self, session_id: str):
+        """
+        Returns the agent for a session, resuming it from storage if it is not in memory.
+        Must be called with the session's lock held.
+
+        Returns:
+            Agent1 or None: None if the session does not exist.
+        """
+        agent = self._agents.get(session_id)
+        if agent is None:
+            session_data = await self.async_session_manager.load_session(session_id)
+            if session_data is None:
+                # The blocking manager may still hold it in its cache, write-behind buffer or spool.
+                session_data = await asyncio.to_thread(self.session_manager.load_session, session_id)
+            if session_data is None:
+                return None
+            agent = await Agent1.resume_async(session_id, self.async_session_manager, self.session_manager,
+                                              session_data=session_data)
+        await self._remember(agent)
+        return agent
+
+    def __len__(self):
+        return len(self._agents)
+
+
+app = FastAPI(title="Agent 1: Hypothesis Builder")
+app.router.route_class = WireFormatRoute
+
+_registry = None
+
+
+def get_registry() -> SessionRegistry:
+    """FastAPI dependency returning the process-wide SessionRegistry (override it in tests)."""
+    global _registry
+    if _registry is None:
+        _registry = SessionRegistry()
+    return _registry
+
+
+def _session_state(agent: Agent1) -> SessionState:
+    return SessionState(
+        session_id=agent.session_id,
+        current_state=agent.current_state,
+        conversation_history=agent.conversation_history,
+        hypothesis_drafts=agent.hypothesis_drafts,
+        message_count=agent.message_count,
+        final_hypothesis_id=agent.final_hypothesis_id,
+        duplicate_of=agent.duplicate_of,
+    )
+
+
+async def _get_agent_or_404(registry: SessionRegistry, session_id: str) -> Agent1:
+    agent = await registry.get(session_id)
+    if agent is None:
+        raise HTTPException(status_code=404, detail="Session not found")
+    return agent
+
+
+@app.post("/sessions", response_model=SessionState, status_code=201)
+async def start_session(registry: SessionRegistry = Depends(get_registry)):
+    agent = await registry.create()
+    return _session_state(agent)
+
+
+@app.post("/sessions/{session_id}/messages", response_model=MessageResponse)
+async def post_message(session_id: str, message: MessageRequest, registry: SessionRegistry = Depends(get_registry)):
+    async with registry.lock(session_id):
+        agent = await _get_agent_or_404(registry, session_id)
+        if agent.current_state == "FINALIZED":
+            raise HTTPException(status_code=409, detail="Session is already finalized")
+        response = await agent.handle_message_async(message.content)
+        return MessageResponse(session_id=session_id, response=response, current_state=agent.current_state)
+
+
+@app.get("/sessions/{session_id}", response_model=SessionState)
+async def get_session(session_id: str, registry: SessionRegistry = Depends(get_registry)):
+    async with registry.lock(session_id):
+        agent = await _get_agent_or_404(registry, session_id)
+        return _session_state(agent)
+
+
+@app.post("/sessions/{session_id}/finalize", response_model=FinalizeResponse)
+async def finalize_session(session_id: str, registry: SessionRegistry = Depends(get_registry)):
+    async with registry.lock(session_id):
+        agent = await _get_agent_or_404(registry, session_id)
+        final_hypothesis_id = await agent.finalize_async()
+        if final_hypothesis_id is None:
+            raise HTTPException(status_code=503, detail="Final hypothesis could not be saved.")
+        return FinalizeResponse(session_id=session_id, current_state=agent.current_state,
+                                final_hypothesis_id=final_hypothesis_id, duplicate_of=agent.duplicate_of)
+
+# To run this app (for local testing):
+# MARS_FIRESTORE_BACKEND=local uvicorn agents.agent1.api:app --port 8000
@@ -0,0 +1,281 @@
+import asyncio
+import logging
+import weakref
+
+from agents.agent1 import firestore_client as client_provider
+from agents.agent1.dedup_index import NearDuplicateIndex
+from agents.agent1.query_indexes import DEFAULT_PAGE_SIZE, IndexSpec, Page, check_page_size, decode_cursor
+from agents.agent1.session_cache import SessionCache
+from agents.agent1.session_manager import (
+    SESSIONS_COLLECTION,
+    MESSAGES_SUBCOLLECTION,
+    FINALIZED_HYPOTHESES_COLLECTION,
+    HYPOTHESES_BY_SESSION,
+    HYPOTHESES_BY_VARIABLE,
+    MAX_BATCH_WRITES,
+    SESSIONS_BY_STATE,
+    FinalHypothesisPlanner,
+    SessionWritePlanner,
+    normalize_variable,
+)
+from agents.common.structured_logging import log_event
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncSessionManager:
+    """
+    asyncio counterpart of SessionManager, backed by google.cloud.firestore.AsyncClient.
+
+    Every persistence call is awaited instead of blocking, so a single event loop can
+    serve many concurrent conversations. It writes and reads exactly the same document
+    layout as SessionManager (both share SessionWritePlanner), so sessions can be
+    written by one and resumed by the other, and decide what a finalized hypothesis
+    writes with the same FinalHypothesisPlanner. Updates to the same session are
+    serialized with a per-session lock to keep them in order. With the local and
+    sqlite backends, AsyncLocalFirestoreClient runs blocking storage calls on a
+    thread, so they do not stall the event loop either.
+    """
+    def __init__(self, project_id: str = None, firestore_client=None, persistence_mode: str = 'full',
+                 cache_size: int = 1024, cache_ttl: float = None, dedup_index: NearDuplicateIndex = None):
+        """
+        Initializes the AsyncSessionManager.
+
+        Args:
+            project_id (str, optional): The Google Cloud project ID.
+            firestore_client (firestore.AsyncClient, optional): An existing async client, e.g. an
+                                                                AsyncLocalFirestoreClient in tests.
+                                                                If None, the shared client from
+                                                                firestore_client.get_async_client()
+                                                                is used, created on first use.
+            persistence_mode (str, optional): 'full' or 'append', as for SessionManager.
+            cache_size (int, optional): Number of hot sessions kept in memory. 0 disables the cache.
+            cache_ttl (float, optional): Seconds a cached session stays valid after its last update.
+            dedup_index (NearDuplicateIndex, optional): Near-duplicate check at save time, as for SessionManager.
+        """
+        self._planner = SessionWritePlanner(persistence_mode)
+        self.persistence_mode = persistence_mode
+        self.cache = SessionCache(max_size=cache_size, ttl=cache_ttl)
+        self._hypotheses = FinalHypothesisPlanner(dedup_index)
+
+        self._project_id = project_id
+        self._db = firestore_client
+        self._db_resolved = firestore_client is not None
+        self._session_locks = weakref.WeakValueDictionary()
+
+    @property
+    def db(self):
+        """The async Firestore client, obtained from the shared provider on first access. None if unavailable."""
+        if not self._db_resolved:
+            self._db = client_provider.get_async_client(self._project_id)
+            self._db_resolved = True
+            if not self._db:
+                logger.error("AsyncSessionManager could not obtain a Firestore client. Operations will fail.")
+        return self._db
+
+    @db.setter
+    def db(self, client):
+        self._db = client
+        self._db_resolved = True
+
+    @property
+    def dedup_index(self):
+        """The NearDuplicateIndex checked by save_final_hypothesis, or None."""
+        return self._hypotheses.dedup_index
+
+    def _session_lock(self, session_id: str) -> asyncio.Lock:
+        lock = self._session_locks.get(session_id)
+        if lock is None:
+            lock = asyncio.Lock()
+            self._session_locks[session_id] = lock
+        return lock
+
+    async def _commit_writes(self, writes: list):
+        if len(writes) == 1:
+            doc_ref, data, merge = writes[0]
+            await doc_ref.set(data, merge=merge)
+            return
+        for chunk_start in range(0, len(writes), MAX_BATCH_WRITES):
+            batch = self.db.batch()
+            for doc_ref, data, merge in writes[chunk_start:chunk_start + MAX_BATCH_WRITES]:
+                if merge:
+                    batch.set(doc_ref, data, merge=True)
+                else:
+                    batch.set(doc_ref, data)
+            await batch.commit()
+
+    async def update_session(self, session_id: str, conversation_history: list, current_state: str, hypothesis_drafts: list):
+        """
+        Creates or updates a session document in the 'hypothesis_sessions' collection.
+
+        Args:
+            session_id (str): The unique identifier for the session.
+            conversation_history (list): A list of messages exchanged.
+            current_state (str): The current state of the state machine.
+            hypothesis_drafts (list): A list of hypothesis drafts.
+
+        Returns:
+            bool: True if the update was successful, False otherwise.
+        """
+        if not self.db:
+            logger.error("Firestore client not available in AsyncSessionManager. Cannot update session.")
+            return False
+
+        if not session_id:
+            logger.error("session_id must be provided for update_session.")
+            return False
+
+        self.cache.put(session_id, {
+            'current_state': current_state,
+            'conversation_history': conversation_history,
+            'hypothesis_drafts': hypothesis_drafts
+        })
+
+        async with self._session_lock(session_id):
+            try:
+                writes, persisted = self._planner.plan(
+                    self.db, session_id, conversation_history, current_state, hypothesis_drafts,
+                    client_provider.server_timestamp(self.db)
+                )
+                await self._commit_writes(writes)
+            except Exception as e:
+                logger.error(f"Error updating session '{session_id}' in Firestore: {e}")
+                return False
+            self._planner.mark_persisted(session_id, persisted)
+        log_event(logger, logging.DEBUG, "session.updated", session_id=session_id, writes=len(writes))
+        return True
+
+    def forget(self, session_id: str):
+        """Drops the append-mode bookkeeping of a session, as SessionManager.forget does."""
+        self._planner.forget(session_id)
+
+    async def load_session(self, session_id: str):
+        """
+        Loads the state of a session so that a conversation can be resumed.
+
+        Returns:
+            dict or None: {'current_state', 'conversation_history', 'hypothesis_drafts'},
+                          or None if the session does not exist or could not be read.
+        """
+        if not session_id:
+            logger.error("session_id must be provided for load_session.")
+            return None
+
+        cached = self.cache.get(session_id)
+        if cached is not None:
+            return cached
+
+        if not self.db:
+            logger.error("Firestore client not available in AsyncSessionManager. Cannot load session.")
+            return None
+
+        try:
+            session_doc_ref = self.db.collection(SESSIONS_COLLECTION).document(session_id)
+            snapshot = await session_doc_ref.get()
+            if not snapshot.exists:
+                return None
+            session_data = snapshot.to_dict() or {}
+            messages = None
+            if session_data.get(u'persistence_mode') == u'append':
+                messages_query = session_doc_ref.collection(MESSAGES_SUBCOLLECTION).order_by(u'seq')
+                messages = [message_doc.to_dict() async for message_doc in messages_query.stream()]
+            state = self._planner.state_from_documents(session_id, session_data, messages)
+        except Exception as e:
+            logger.error(f"Error loading session '{session_id}' from Firestore: {e}")
+            return None
+
+        self.cache.put(session_id, state)
+        return state
+
+    async def load_conversation_history(self, session_id: str):
+        """Rebuilds the conversation history of a session, or returns None if it could not be read."""
+        state = await self.load_session(session_id)
+        return state['conversation_history'] if state is not None else None
+
+    async def save_final_hypothesis(self, session_id: str, final_hypothesis: dict):
+        """
+        Saves a finalized hypothesis to the 'finalized_hypotheses' collection under its
+        content-addressed ID, creating the document only if it does not exist yet.
+
+        Args:
+            session_id (str): The identifier of the session this hypothesis belongs to.
+            final_hypothesis (dict): The finalized hypothesis data (JSON object).
+
+        Returns:
+            str or None: The ID of the hypothesis document if it is stored, None otherwise.
+        """
+        if not self.db:
+            logger.error("Firestore client not available in AsyncSessionManager. Cannot save hypothesis.")
+            return None
+
+        if not FinalHypothesisPlanner.check(session_id, final_hypothesis):
+            return None
+
+        if self.dedup_index is not None:
+            try:
+                await self.load_dedup_index()
+            except Exception as e:
+                logger.error(f"Error loading the near-duplicate index: {e}")
+        doc_id, record, signature = self._hypotheses.plan(session_id, final_hypothesis,
+                                                          client_provider.server_timestamp(self.db))
+        if record is None:
+            return doc_id
+        try:
+            await self.db.collection(FINALIZED_HYPOTHESES_COLLECTION).document(doc_id).create(record)
+        except Exception as e:
+            return doc_id if self._hypotheses.saved(session_id, doc_id, record, signature, e) else None
+        self._hypotheses.saved(session_id, doc_id, record, signature)
+        return doc_id
+
+    def duplicate_of(self, doc_id: str):
+        """The ID of the hypothesis that a hypothesis saved by this manager nearly duplicates, as for SessionManager."""
+        return self._hypotheses.duplicate_of(doc_id)
+
+    async def list_hypotheses_for_session(self, session_id: str, page_size: int = DEFAULT_PAGE_SIZE,
+                                          cursor: str = None):
+        """Finalized hypotheses of a session, newest first; see SessionManager.list_hypotheses_for_session."""
+        return await self._query_page(HYPOTHESES_BY_SESSION, session_id, page_size, cursor)
+
+    async def list_sessions_by_state(self, current_state: str, page_size: int = DEFAULT_PAGE_SIZE, cursor: str = None):
+        """Sessions in a given current_state, most recently updated first; see SessionManager.list_sessions_by_state."""
+        return await self._query_page(SESSIONS_BY_STATE, current_state, page_size, cursor)
+
+    async def list_hypotheses_by_variable(self, independent_variable: str, page_size: int = DEFAULT_PAGE_SIZE,
+                                          cursor: str = None):
+        """Finalized hypotheses with an independent variable; see SessionManager.list_hypotheses_by_variable."""
+        return await self._query_page(HYPOTHESES_BY_VARIABLE, normalize_variable(independent_variable),
+                                      page_size, cursor)
+
+    async def _query_page(self, spec: IndexSpec, value, page_size: int, cursor: str):
+        check_page_size(page_size)
+        position = decode_cursor(cursor)
+        if not self.db:
+            logger.error("Firestore client not available in AsyncSessionManager. Cannot run query.")
+            return None
+        try:
+            query = spec.query(self.db, value, cursor=position, limit=page_size + 1)
+            snapshots = [snapshot async for snapshot in query.stream()]
+        except Exception as e:
+            logger.error(f"Error querying '{spec.collection}' by {spec.field} in Firestore: {e}")
+            return None
+        return Page.from_snapshots(spec, snapshots, page_size)
+
+    async def load_dedup_index(self) -> int:
+        """
+        Fills the near-duplicate index from the 'finalized_hypotheses' collection, once.
+
+        Returns:
+            int: The number of hypotheses in the index.
+        """
+        index = self.dedup_index
+        if index is None:
+            return 0
+        if not index.loaded:
+            async for snapshot in self.db.collection(FINALIZED_HYPOTHESES_COLLECTION).stream():
+                index.add_document(snapshot.id, snapshot.to_dict() or {})
+            index.loaded = True
+        return len(index)
+
+    def cache_stats(self) -> dict:
+        """Returns the hit/miss/eviction counters of the session cache."""
+        return self.cache.stats()
@@ -0,0 +1,172 @@
+"""
+Batch structuring of pre-collected hypothesis components.
+
+Reads (topic, independent variable, dependent variable, mechanism) records from a
+JSONL or CSV file, skips the interactive conversation entirely and writes one
+structured hypothesis per line (JSONL), in input order. Records are read lazily
+and processed in fixed-size chunks, with at most a few chunks in flight, so memory
+stays bounded however large the input is.
+
+Run with:
+    python -m agents.agent1.main batch surveys.csv -o hypotheses.jsonl --workers 4
+"""
+import csv
+import itertools
+import json
+import logging
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from agents.common import wire_format
+
+from .hypothesis_builder import compose_statement, structure_components
+
+logger = logging.getLogger(__name__)
+
+FORMATS = ('jsonl', 'csv')
+DEFAULT_CHUNK_SIZE = 500
+
+# Accepted input column names for each hypothesis component.
+FIELD_ALIASES = {
+    "general_topic": ("general_topic", "topic"),
+    "independent_variable": ("independent_variable", "iv"),
+    "dependent_variable": ("dependent_variable", "dv"),
+    "mechanism": ("mechanism", "because"),
+}
+REQUIRED_FIELDS = ("independent_variable", "dependent_variable", "mechanism")
+
+
+def detect_format(path: str) -> str:
+    return 'csv' if path.lower().endswith('.csv') else 'jsonl'
+
+
+def read_records(stream, fmt: str = 'jsonl'):
+    """
+    Lazily yields (line_number, record) pairs from a JSONL or CSV text stream.
+
+    CSV rows are yielded as dicts. JSONL lines are yielded undecoded and parsed by
+    the worker that structures them, which keeps the reading process light and what
+    is shipped to worker processes small.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"fmt must be one of {FORMATS}, got '{fmt}'")
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        for record in reader:
+            yield reader.line_num, record
+        return
+    for line_number, line in enumerate(stream, start=1):
+        if line.strip():
+            yield line_number, line
+
+
+def structure_record(record: dict) -> dict:
+    """
+    Structures a single record of hypothesis components.
+
+    Raises:
+        ValueError: If the record is not an object or a required component is missing.
+    """
+    if not isinstance(record, dict):
+        raise ValueError("record is not a JSON object")
+    components = {}
+    for field, aliases in FIELD_ALIASES.items():
+        value = next((record[alias] for alias in aliases if record.get(alias) not in (None, "")), None)
+        components[field] = str(value).strip() if value is not None else None
+    missing = [field for field in REQUIRED_FIELDS if not components[field]]
+    if missing:
+        raise ValueError(f"missing {', '.join(missing)}")
+    components["full_statement"] = compose_statement(
+        components["independent_variable"], components["dependent_variable"], components["mechanism"]
+    )
+    return structure_components(components)
+
+
+def _structure_chunk(chunk):
+    # Runs in a worker process; returns (line_number, encoded hypothesis, error) triples.
+    results = []
+    for line_number, record in chunk:
+        if isinstance(record, str):
+            try:
+                record = json.loads(record)
+            except json.JSONDecodeError:
+                results.append((line_number, None, "invalid JSON"))
+                continue
+        try:
+            results.append((line_number, wire_format.dumps_json(structure_record(record)), None))
+        except ValueError as e:
+            results.append((line_number, None, str(e)))
+    return results
+
+
+def _chunks(records, chunk_size):
+    iterator = iter(records)
+    while True:
+        chunk = list(itertools.islice(iterator, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def structure_stream(records, workers: int = 1, chunk_size: int = DEFAULT_CHUNK_SIZE):
+    """
+    Structures (line_number, record) pairs, yielding (line_number, hypothesis_json, error) in input order.
+
+    Args:
+        records (iterable): (line_number, record) pairs, e.g. from read_records(). A record
+                            is a dict or an undecoded JSON line.
+        workers (int): Worker processes. 1 structures in the calling process.
+        chunk_size (int): Records handed to a worker at a time.
+    """
+    if workers < 1 or chunk_size < 1:
+        raise ValueError("workers and chunk_size must be >= 1")
+    chunks = _chunks(records, chunk_size)
+    if workers == 1:
+        for chunk in chunks:
+            yield from _structure_chunk(chunk)
+        return
+
+    max_in_flight = workers * 2
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        in_flight = deque()
+        for chunk in chunks:
+            in_flight.append(executor.submit(_structure_chunk, chunk))
+            if len(in_flight) >= max_in_flight:
+                yield from in_flight.popleft().result()
+        while in_flight:
+            yield from in_flight.popleft().result()
+
+
+def run_batch(input_stream, output_stream, fmt: str = 'jsonl', workers: int = 1,
+              chunk_size: int = DEFAULT_CHUNK_SIZE, error_stream=None) -> dict:
+    """
+    Structures every record of input_stream and writes the hypotheses to output_stream as JSONL.
+
+    Invalid records are skipped and reported on error_stream (stderr by default).
+
+    Returns:
+        dict: 'records', 'structured', 'errors', 'seconds' and 'records_per_second'.
+    """
+    error_stream = error_stream if error_stream is not None else sys.stderr
+    started = time.perf_counter()
+    structured = errors = 0
+    for line_number, hypothesis_json, error in structure_stream(read_records(input_stream, fmt), workers, chunk_size):
+        if error is not None:
+            errors += 1
+            error_stream.write(f"line {line_number}: skipped ({error})\n")
+            continue
+        output_stream.write(hypothesis_json + "\n")
+        structured += 1
+    seconds = time.perf_counter() - started
+    total = structured + errors
+    stats = {
+        'records': total,
+        'structured': structured,
+        'errors': errors,
+        'seconds': seconds,
+        'records_per_second': total / seconds if seconds else 0.0,
+    }
+    logger.info(f"Batch structuring finished: {stats}")
+    return stats
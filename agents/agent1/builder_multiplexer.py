@@ -0,0 +1,84 @@
+import asyncio
+import logging
+import uuid
+
+from .hypothesis_builder import HypothesisBuilder
+from .io_channels import AsyncQueueChannel
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class BuilderMultiplexer:
+    """
+    Serves many HypothesisBuilder conversations from a single worker.
+
+    Each conversation gets its own AsyncQueueChannel; the builder's messages and
+    questions appear on that channel's outbox. User responses from every
+    conversation are funneled into one event queue and applied by run(), one at a
+    time, through HypothesisBuilder.submit(), which never blocks. No thread or task
+    is tied to a conversation while it waits for its user.
+    """
+    def __init__(self, builder_factory=HypothesisBuilder):
+        self._builder_factory = builder_factory
+        self._builders = {}   # conversation_id -> HypothesisBuilder
+        self._events = asyncio.Queue()
+        self.events_processed = 0
+
+    def open(self, conversation_id: str = None) -> str:
+        """Starts a new conversation and returns its ID. Its first question is already on the outbox."""
+        conversation_id = conversation_id or str(uuid.uuid4())
+        if conversation_id in self._builders:
+            raise ValueError(f"Conversation '{conversation_id}' is already open.")
+        builder = self._builder_factory(channel=AsyncQueueChannel())
+        self._builders[conversation_id] = builder
+        builder.start()
+        return conversation_id
+
+    def channel(self, conversation_id: str) -> AsyncQueueChannel:
+        return self._builders[conversation_id].channel
+
+    def builder(self, conversation_id: str) -> HypothesisBuilder:
+        return self._builders[conversation_id]
+
+    def close(self, conversation_id: str):
+        """Forgets a conversation, returning its builder (or None if it was not open)."""
+        return self._builders.pop(conversation_id, None)
+
+    def __len__(self):
+        return len(self._builders)
+
+    def post(self, conversation_id: str, response: str):
+        """Queues a user response for the worker."""
+        self._events.put_nowait((conversation_id, response))
+
+    def dispatch(self, conversation_id: str, response: str):
+        """
+        Applies a user response to its conversation immediately.
+
+        Returns:
+            str or None: The conversation's next question, or None if it is finalized or unknown.
+        """
+        builder = self._builders.get(conversation_id)
+        if builder is None:
+            logger.warning(f"Response for unknown conversation '{conversation_id}' dropped.")
+            return None
+        return builder.submit(response)
+
+    async def run(self):
+        """Worker loop: applies queued responses until stop() is called."""
+        while True:
+            event = await self._events.get()
+            if event is _STOP:
+                return
+            conversation_id, response = event
+            try:
+                self.dispatch(conversation_id, response)
+            except Exception as e:
+                logger.error(f"Error handling response for conversation '{conversation_id}': {e}", exc_info=True)
+            self.events_processed += 1
+
+    def stop(self):
+        """Makes run() return once the responses queued before this call are handled."""
+        self._events.put_nowait(_STOP)
@@ -0,0 +1,175 @@
+"""
+Rolling compaction of Agent 1 conversation histories.
+
+A long-running session keeps its last N turns verbatim. Older turns are folded into
+a single summary record at the head of the history:
+
+    {"role": "summary", "content": "...", "folded_messages": 412, "folded_turns": 206}
+
+The record is an ordinary history entry, so the session cache, the write-behind
+buffer and 'full' persistence store it like any other message. In 'append' mode
+SessionWritePlanner keeps it in the session document and uses folded_messages as
+the sequence number of the first verbatim message. Either way, the memory held by
+an agent and the size of the session document stay bounded however long the
+conversation runs.
+"""
+import json
+import threading
+
+from agents.agent1.records import to_primitive
+
+SUMMARY_ROLE = "summary"
+
+
+def is_summary(message) -> bool:
+    """True if the history entry is a compaction summary record."""
+    return isinstance(message, dict) and message.get("role") == SUMMARY_ROLE
+
+
+def split_history(history: list):
+    """Splits a history into (summary record or None, verbatim messages)."""
+    if history and is_summary(history[0]):
+        return history[0], history[1:]
+    return None, history
+
+
+def history_bytes(history: list) -> int:
+    """Size of the history as compact JSON, i.e. roughly what persisting it costs."""
+    return len(json.dumps(to_primitive(history), separators=(',', ':'), default=str).encode('utf-8'))
+
+
+def user_turn_count(history: list) -> int:
+    """Number of user turns in the history, including those folded into its summary."""
+    summary, messages = split_history(history)
+    folded = summary.get("folded_turns", 0) if summary else 0
+    return folded + sum(1 for message in messages if message.get("role") == "user")
+
+
+class ConversationCompactor:
+    """
+    Keeps conversation histories and final-hypothesis summaries within configured limits.
+
+    A turn starts at a user message and includes the replies that follow it. When a
+    history holds more than keep_turns turns, the oldest ones are folded into the
+    summary record: each folded user message contributes one line, cut to
+    snippet_chars, and the oldest lines are dropped once the summary exceeds
+    max_summary_chars. Counters of the work done are kept so the limits can be tuned
+    from production traffic.
+    """
+    def __init__(self, keep_turns: int = 20, snippet_chars: int = 120, max_summary_chars: int = 2000,
+                 max_final_summary_chars: int = 8000):
+        """
+        Args:
+            keep_turns (int): Number of most recent turns kept verbatim. 0 disables compaction.
+            snippet_chars (int): Maximum length of the line a folded user message leaves in the summary.
+            max_summary_chars (int): Maximum length of the summary record's content.
+            max_final_summary_chars (int): Maximum total length of the conversation_summary
+                                           stored with a finalized hypothesis. 0 means unlimited.
+        """
+        if min(keep_turns, snippet_chars, max_summary_chars, max_final_summary_chars) < 0:
+            raise ValueError("compaction limits must be >= 0")
+        self.keep_turns = keep_turns
+        self.snippet_chars = snippet_chars
+        self.max_summary_chars = max_summary_chars
+        self.max_final_summary_chars = max_final_summary_chars
+        self._lock = threading.Lock()
+        self.compactions = 0
+        self.messages_folded = 0
+        self.bytes_before = 0
+        self.bytes_after = 0
+        self.final_summaries_capped = 0
+
+    def _cut_index(self, messages: list):
+        """Index of the first message to keep verbatim, or None if nothing needs folding."""
+        if not self.keep_turns:
+            return None
+        turns = 0
+        for index in range(len(messages) - 1, -1, -1):
+            if messages[index].get("role") == "user":
+                turns += 1
+                if turns == self.keep_turns:
+                    return index if index > 0 else None
+        return None
+
+    def _summary_content(self, previous: str, folded: list) -> str:
+        lines = previous.split("\n") if previous else []
+        for message in folded:
+            if message.get("role") != "user":
+                continue
+            content = str(message.get("content", ""))
+            if len(content) > self.snippet_chars:
+                content = content[:self.snippet_chars] + "..."
+            lines.append(content)
+        while lines and len("\n".join(lines)) > self.max_summary_chars:
+            lines.pop(0)
+        return "\n".join(lines)
+
+    def compact(self, history: list) -> list:
+        """
+        Folds the turns beyond keep_turns into the summary record.
+
+        Returns:
+            list: The history itself if it is within limits, otherwise a new, compacted list.
+        """
+        summary, messages = split_history(history)
+        cut = self._cut_index(messages)
+        if cut is None:
+            return history
+
+        folded = messages[:cut]
+        previous = summary or {}
+        record = {
+            "role": SUMMARY_ROLE,
+            "content": self._summary_content(previous.get("content", ""), folded),
+            "folded_messages": previous.get("folded_messages", 0) + len(folded),
+            "folded_turns": previous.get("folded_turns", 0) + sum(1 for message in folded if message.get("role") == "user"),
+        }
+        compacted = [record] + messages[cut:]
+
+        before, after = history_bytes(history), history_bytes(compacted)
+        with self._lock:
+            self.compactions += 1
+            self.messages_folded += len(folded)
+            self.bytes_before += before
+            self.bytes_after += after
+        return compacted
+
+    def final_summary(self, history: list) -> list:
+        """
+        The conversation_summary of a finalized hypothesis: one string per message, preceded
+        by the summary record's content if the history was compacted.
+
+        If the strings exceed max_final_summary_chars, the oldest are replaced by a single
+        "[N earlier entries omitted]" marker, and the newest is cut if it alone is too long.
+        """
+        summary, messages = split_history(history)
+        entries = ([summary.get("content", "")] if summary else []) + [str(message.get("content", "")) for message in messages]
+        limit = self.max_final_summary_chars
+        if not limit or sum(len(entry) for entry in entries) <= limit:
+            return entries
+
+        kept = []
+        used = 0
+        for entry in reversed(entries):
+            if used + len(entry) > limit:
+                break
+            kept.append(entry)
+            used += len(entry)
+        if not kept:
+            kept.append(entries[-1][:limit])
+        kept.reverse()
+        with self._lock:
+            self.final_summaries_capped += 1
+        return [f"[{len(entries) - len(kept)} earlier entries omitted]"] + kept
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'keep_turns': self.keep_turns,
+                'compactions': self.compactions,
+                'messages_folded': self.messages_folded,
+                'bytes_before': self.bytes_before,
+                'bytes_after': self.bytes_after,
+                'bytes_saved': self.bytes_before - self.bytes_after,
+                'final_summaries_capped': self.final_summaries_capped,
+            }
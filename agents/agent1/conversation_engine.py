@@ -0,0 +1,259 @@
+"""
+Declarative conversation engine shared by Agent1 and HypothesisBuilder.
+
+A conversation is described as data, a spec dict, and ConversationEngine interprets
+it. The spec lists the conversation's states, the slots it collects and the rules
+that choose replies and transitions:
+
+    {
+        "name": "hypothesis_builder",
+        "initial_state": "AWAITING_INPUT",
+        "final_state": "FINALIZED",
+        "default_reply": None,
+        "slots": {"general_topic": {"prompt": "What is ...?", "goto": "CLARIFYING"}, ...},
+        "states": {
+            "CLARIFYING": {"fill": ["general_topic", ...], "then": "REFINING"},
+            "REFINING": {"auto": True, "rules": [...]},
+            "AWAITING_CONFIRMATION": {"prompt": "Does this ...? (yes/no)", "rules": [...]},
+            ...
+        },
+        "after_response": [...],
+    }
+
+A state with "fill" asks for the first of its slots that is still empty, stores the
+response there and moves to that slot's "goto" state, if any; once every slot is
+filled it moves on to "then" without waiting for input. Any other state answers a
+response with the first of its "rules" whose condition holds; an "auto" state
+applies its rules without waiting for input. "after_response" rules are checked
+after every response, whatever the state.
+
+A rule is {"if": condition, "set": {slot: template}, "clear": [slot, ...],
+"action": name, "reply": template or [templates], "goto": state}, every key
+optional, applied in that order. Conditions are {"answer": [...]} (the lowercased
+response is one of these), {"turns_at_least": n}, {"filled": [slot, ...]} (all non-empty),
+{"missing": slot} (slot is None), {"state_not": state} and {"any": [condition, ...]};
+the keys of one condition must all hold. Templates are str.format strings over the
+slots, the response ("message") and the caller's context. Actions are named
+callbacks supplied by the caller; they may return a dict of extra template fields.
+
+The engine holds no per-conversation state. A conversation is a checkpoint, a
+plain JSON-serializable dict:
+
+    {"spec": "hypothesis_builder", "state": "CLARIFYING", "slots": {...}, "turns": 2}
+
+so one engine serves every session, and a session costs nothing between requests
+beyond its stored checkpoint.
+"""
+import copy
+
+RULE_KEYS = frozenset(('if', 'set', 'clear', 'action', 'reply', 'goto'))
+CONDITION_KEYS = frozenset(('answer', 'turns_at_least', 'filled', 'missing', 'state_not', 'any'))
+
+
+class ConversationSpecError(ValueError):
+    """Raised when a conversation spec is malformed."""
+
+
+class Turn:
+    """What one engine step did: the replies to show and the states before and after it."""
+    __slots__ = ('replies', 'from_state', 'to_state')
+
+    def __init__(self, from_state, to_state, replies):
+        self.replies = replies
+        self.from_state = from_state
+        self.to_state = to_state
+
+    @property
+    def changed_state(self) -> bool:
+        return self.from_state != self.to_state
+
+
+class ConversationEngine:
+    """
+    Interprets a conversation spec against checkpoints.
+
+    The spec is validated and compiled once, in the constructor; build one engine
+    per spec at import time and share it. respond() and advance() update the
+    checkpoint they are given in place and return a Turn.
+    """
+    def __init__(self, spec: dict):
+        self.spec = copy.deepcopy(spec)
+        self.name = self.spec.get('name', 'conversation')
+        self.states = self.spec.get('states') or {}
+        self.slots = self.spec.get('slots') or {}
+        self.initial_state = self.spec.get('initial_state')
+        self.final_state = self.spec.get('final_state')
+        self.default_reply = self.spec.get('default_reply')
+        self.after_response = self.spec.get('after_response') or []
+        self._validate()
+
+    def _validate(self):
+        known_states = set(self.states)
+        for name in (self.initial_state, self.final_state):
+            if name not in known_states:
+                raise ConversationSpecError(f"Spec '{self.name}' does not define state '{name}'.")
+
+        def check_state(name, where):
+            if name is not None and name not in known_states:
+                raise ConversationSpecError(f"{where} of spec '{self.name}' goes to unknown state '{name}'.")
+
+        def check_slots(names, where):
+            for slot in names:
+                if slot not in self.slots:
+                    raise ConversationSpecError(f"{where} of spec '{self.name}' uses unknown slot '{slot}'.")
+
+        def check_condition(condition, where):
+            unknown = set(condition) - CONDITION_KEYS
+            if unknown:
+                raise ConversationSpecError(f"{where} of spec '{self.name}' has unknown conditions {sorted(unknown)}.")
+            check_slots(condition.get('filled', []), where)
+            if 'missing' in condition:
+                check_slots([condition['missing']], where)
+            check_state(condition.get('state_not'), where)
+            for sub_condition in condition.get('any', []):
+                check_condition(sub_condition, where)
+
+        def check_rules(rules, where):
+            for rule in rules:
+                unknown = set(rule) - RULE_KEYS
+                if unknown:
+                    raise ConversationSpecError(f"{where} of spec '{self.name}' has unknown rule keys {sorted(unknown)}.")
+                check_condition(rule.get('if', {}), where)
+                check_slots(list(rule.get('set', {})) + list(rule.get('clear', [])), where)
+                check_state(rule.get('goto'), where)
+
+        for slot_name, slot in self.slots.items():
+            check_state(slot.get('goto'), f"Slot '{slot_name}'")
+        for state_name, state in self.states.items():
+            where = f"State '{state_name}'"
+            check_slots(state.get('fill', []), where)
+            check_state(state.get('then'), where)
+            check_rules(state.get('rules', []), where)
+        check_rules(self.after_response, "after_response")
+
+    def initial_checkpoint(self) -> dict:
+        """A checkpoint for a new conversation: the initial state, every slot empty and no turns."""
+        return {
+            'spec': self.name,
+            'state': self.initial_state,
+            'slots': {slot: None for slot in self.slots},
+            'turns': 0,
+        }
+
+    def is_final(self, checkpoint: dict) -> bool:
+        return checkpoint['state'] == self.final_state
+
+    def _state(self, name: str) -> dict:
+        try:
+            return self.states[name]
+        except KeyError:
+            raise ConversationSpecError(f"Checkpoint state '{name}' is not defined by spec '{self.name}'.") from None
+
+    def _missing_slot(self, state: dict, slots: dict):
+        for slot in state.get('fill', ()):
+            if slots.get(slot) is None:
+                return slot
+        return None
+
+    def prompt(self, checkpoint: dict):
+        """The question the conversation waits on in its current state, or None if it asks nothing."""
+        state = self._state(checkpoint['state'])
+        slot = self._missing_slot(state, checkpoint['slots'])
+        if slot is not None:
+            return self._format(self.slots[slot].get('prompt'), checkpoint, None, {})
+        return self._format(state.get('prompt'), checkpoint, None, {})
+
+    def is_auto(self, checkpoint: dict) -> bool:
+        """True if advance() can move the conversation on without a user response."""
+        state = self._state(checkpoint['state'])
+        if 'fill' in state:
+            return self._missing_slot(state, checkpoint['slots']) is None and state.get('then') is not None
+        return bool(state.get('auto'))
+
+    def respond(self, checkpoint: dict, message: str, actions: dict = None, context: dict = None) -> Turn:
+        """
+        Applies one user response.
+
+        Args:
+            checkpoint (dict): The conversation, updated in place.
+            message (str): The user's response.
+            actions (dict, optional): Maps the action names used in the spec to
+                                      callables(checkpoint, message).
+            context (dict, optional): Extra fields available to reply templates.
+        """
+        from_state = checkpoint['state']
+        checkpoint['turns'] = checkpoint.get('turns', 0) + 1
+        fields = dict(context or {})
+        replies = []
+        state = self._state(from_state)
+        slot = self._missing_slot(state, checkpoint['slots'])
+        if slot is not None:
+            checkpoint['slots'][slot] = message
+            goto = self.slots[slot].get('goto')
+            if goto is not None:
+                checkpoint['state'] = goto
+        else:
+            self._apply_first(state.get('rules', ()), checkpoint, message, actions, fields, replies)
+        for rule in self.after_response:
+            if self._holds(rule.get('if', {}), checkpoint, message):
+                self._apply(rule, checkpoint, message, actions, fields, replies)
+        return Turn(from_state, checkpoint['state'], replies)
+
+    def advance(self, checkpoint: dict, actions: dict = None, context: dict = None) -> Turn:
+        """Takes one step that needs no user response; does nothing unless is_auto(checkpoint)."""
+        from_state = checkpoint['state']
+        replies = []
+        if self.is_auto(checkpoint):
+            state = self._state(from_state)
+            if 'fill' in state:
+                checkpoint['state'] = state['then']
+            else:
+                self._apply_first(state.get('rules', ()), checkpoint, None, actions, dict(context or {}), replies)
+        return Turn(from_state, checkpoint['state'], replies)
+
+    def _apply_first(self, rules, checkpoint, message, actions, fields, replies):
+        for rule in rules:
+            if self._holds(rule.get('if', {}), checkpoint, message):
+                self._apply(rule, checkpoint, message, actions, fields, replies)
+                return
+
+    def _holds(self, condition: dict, checkpoint: dict, message) -> bool:
+        slots = checkpoint['slots']
+        if 'answer' in condition and (message is None or message.lower() not in condition['answer']):
+            return False
+        if 'turns_at_least' in condition and checkpoint.get('turns', 0) < condition['turns_at_least']:
+            return False
+        if 'filled' in condition and not all(slots.get(slot) for slot in condition['filled']):
+            return False
+        if 'missing' in condition and slots.get(condition['missing']) is not None:
+            return False
+        if 'state_not' in condition and checkpoint['state'] == condition['state_not']:
+            return False
+        if 'any' in condition and not any(self._holds(sub, checkpoint, message) for sub in condition['any']):
+            return False
+        return True
+
+    def _apply(self, rule: dict, checkpoint: dict, message, actions, fields: dict, replies: list):
+        slots = checkpoint['slots']
+        for slot, template in rule.get('set', {}).items():
+            slots[slot] = self._format(template, checkpoint, message, fields)
+        for slot in rule.get('clear', ()):
+            slots[slot] = None
+        if 'action' in rule:
+            handler = (actions or {}).get(rule['action'])
+            if handler is None:
+                raise KeyError(f"No handler for action '{rule['action']}' of spec '{self.name}'.")
+            extra_fields = handler(checkpoint, message)
+            if extra_fields:
+                fields.update(extra_fields)
+        reply = rule.get('reply')
+        for template in ([reply] if isinstance(reply, str) else reply or ()):
+            replies.append(self._format(template, checkpoint, message, fields))
+        if rule.get('goto') is not None:
+            checkpoint['state'] = rule['goto']
+
+    @staticmethod
+    def _format(template, checkpoint: dict, message, fields: dict):
+        if template is None:
+            return None
+        return template.format_map({**checkpoint['slots'], 'message': message, **fields})
@@ -0,0 +1,249 @@
+"""
+Near-duplicate detection for finalized hypotheses with MinHash and LSH.
+
+A hypothesis is reduced to its normalized statement plus its key variables, minus
+the words every statement shares (see hypothesis_text), split into overlapping
+character shingles and summarized by a MinHash signature: num_perm minimum hash
+values whose pairwise agreement estimates the Jaccard similarity of two shingle sets.
+
+Locality-sensitive hashing then splits each signature into `bands` bands of
+num_perm // bands rows. Two hypotheses become candidates when any band matches
+exactly, so a lookup touches only the index buckets of its own bands and costs the
+same with a hundred or a few hundred thousand stored hypotheses. Candidates are
+confirmed by comparing signatures against `threshold`.
+
+With the defaults (128 permutations, 16 bands of 8 rows) a pair with Jaccard
+similarity 0.8 is a candidate with probability 1 - (1 - 0.8**8)**16, about 0.94,
+and a pair at 0.5 with probability about 0.06.
+
+Signatures are deterministic across processes, so they can be stored with each
+hypothesis (the 'minhash' field written by SessionManager) and the index rebuilt
+from the collection without recomputing them. Hypotheses stored as near-duplicates
+(with a 'duplicate_of' link) are left out of the index, so later matches link to
+the original.
+"""
+import random
+import re
+import threading
+import zlib
+
+# Mersenne prime 2**61 - 1; hash values are reduced modulo it.
+_PRIME = (1 << 61) - 1
+_NON_ALPHANUMERIC = re.compile(r'[^0-9a-z]+')
+
+# Words of HypothesisBuilder's statement template ("If we change the X, then we will observe
+# a change in the Y, because Z.") and similar filler. Every statement shares them, so
+# keeping them would put unrelated hypotheses in the same LSH buckets.
+STOP_WORDS = frozenset((
+    'a', 'an', 'and', 'because', 'change', 'changes', 'if', 'in', 'of', 'observe', 'the', 'then', 'we', 'will',
+))
+
+SIGNATURE_FIELD = u'minhash'
+DUPLICATE_OF_FIELD = u'duplicate_of'
+
+
+def normalize_text(text: str) -> str:
+    """Lowercases text and collapses everything that is not a letter or digit to single spaces."""
+    return _NON_ALPHANUMERIC.sub(' ', str(text).lower()).strip()
+
+
+def _as_list(value) -> list:
+    if value is None:
+        return []
+    if isinstance(value, (list, tuple)):
+        return [item for item in value if item]
+    return [value]
+
+
+def hypothesis_text(final_hypothesis: dict) -> str:
+    """
+    The text a hypothesis is compared by: its statement followed by its key variables,
+    normalized and without STOP_WORDS.
+
+    Understands the structured hypothesis of HypothesisBuilder ('statement' and
+    'key_variables'), raw builder components ('full_statement', 'independent_variable',
+    'dependent_variable') and Agent1's final hypothesis, whose statement is the text of
+    its last draft ('details'). Session-specific fields such as IDs and titles are ignored.
+
+    Returns:
+        str: The normalized text, empty if the hypothesis has no statement or variables.
+    """
+    statement = final_hypothesis.get('statement') or final_hypothesis.get('full_statement')
+    details = final_hypothesis.get('details')
+    if not statement and isinstance(details, dict):
+        statement = details.get('text')
+    parts = _as_list(statement)
+
+    key_variables = final_hypothesis.get('key_variables')
+    if isinstance(key_variables, dict):
+        parts += _as_list(key_variables.get('independent')) + _as_list(key_variables.get('dependent'))
+    else:
+        parts += _as_list(final_hypothesis.get('independent_variable'))
+        parts += _as_list(final_hypothesis.get('dependent_variable'))
+    words = normalize_text(' '.join(str(part) for part in parts)).split()
+    return ' '.join(word for word in words if word not in STOP_WORDS)
+
+
+def shingles(text: str, size: int) -> set:
+    """The set of character `size`-grams of text, or {text} if it is shorter than that."""
+    if len(text) <= size:
+        return {text} if text else set()
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+
+class NearDuplicateIndex:
+    """
+    In-memory MinHash LSH index of finalized hypotheses.
+
+    Thread-safe; build one per process and share it between session managers.
+    """
+    def __init__(self, num_perm: int = 128, bands: int = 16, threshold: float = 0.8, shingle_size: int = 5,
+                 seed: int = 1):
+        """
+        Args:
+            num_perm (int): Hash functions per signature.
+            bands (int): LSH bands; must divide num_perm.
+            threshold (float): Estimated Jaccard similarity from which two hypotheses are near-duplicates.
+            shingle_size (int): Characters per shingle.
+            seed (int): Seed of the hash functions. Signatures are only comparable between
+                        indexes built with the same num_perm and seed.
+        """
+        if num_perm <= 0 or bands <= 0 or num_perm % bands:
+            raise ValueError(f"bands ({bands}) must divide num_perm ({num_perm})")
+        if not 0.0 < threshold <= 1.0:
+            raise ValueError("threshold must be in (0, 1]")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.threshold = threshold
+        self.shingle_size = shingle_size
+        generator = random.Random(seed)
+        self._permutations = [(generator.randrange(1, _PRIME), generator.randrange(0, _PRIME))
+                              for _ in range(num_perm)]
+        self._buckets = [{} for _ in range(bands)]  # per band: band values -> [doc_id, ...]
+        self._signatures = {}                       # doc_id -> signature
+        self._lock = threading.Lock()
+        self.loaded = False
+        self.queries = 0
+        self.candidates_checked = 0
+        self.duplicates_found = 0
+
+    def __len__(self):
+        return len(self._signatures)
+
+    def __contains__(self, doc_id):
+        return doc_id in self._signatures
+
+    def signature(self, final_hypothesis: dict):
+        """
+        The MinHash signature of a hypothesis.
+
+        Returns:
+            tuple or None: num_perm ints, or None if the hypothesis has no text to compare.
+        """
+        text = hypothesis_text(final_hypothesis)
+        if not text:
+            return None
+        hashes = [zlib.crc32(shingle.encode('utf-8')) for shingle in shingles(text, self.shingle_size)]
+        return tuple(min((a * h + b) % _PRIME for h in hashes) for a, b in self._permutations)
+
+    def _band_keys(self, signature):
+        rows = self.rows
+        return [tuple(signature[band * rows:(band + 1) * rows]) for band in range(self.bands)]
+
+    def similarity(self, signature, other) -> float:
+        """Estimated Jaccard similarity of two signatures."""
+        return sum(1 for x, y in zip(signature, other) if x == y) / self.num_perm
+
+    def add(self, doc_id: str, signature):
+        """Indexes a hypothesis under its document ID. Re-adding an ID replaces its signature."""
+        if signature is None:
+            return
+        signature = tuple(signature)
+        if len(signature) != self.num_perm:
+            raise ValueError(f"signature has {len(signature)} values, expected {self.num_perm}")
+        with self._lock:
+            if doc_id in self._signatures:
+                self._remove(doc_id)
+            self._signatures[doc_id] = signature
+            for buckets, key in zip(self._buckets, self._band_keys(signature)):
+                buckets.setdefault(key, []).append(doc_id)
+
+    def remove(self, doc_id: str):
+        with self._lock:
+            self._remove(doc_id)
+
+    def _remove(self, doc_id):
+        signature = self._signatures.pop(doc_id, None)
+        if signature is None:
+            return
+        for buckets, key in zip(self._buckets, self._band_keys(signature)):
+            bucket = buckets.get(key)
+            if bucket is not None:
+                bucket.remove(doc_id)
+                if not bucket:
+                    del buckets[key]
+
+    def query(self, signature, exclude: str = None) -> list:
+        """
+        Indexed hypotheses similar to a signature.
+
+        Args:
+            signature (tuple): A signature from signature().
+            exclude (str, optional): A document ID to leave out, e.g. the hypothesis itself.
+
+        Returns:
+            list: (doc_id, similarity) pairs at or above the threshold, most similar first.
+        """
+        if signature is None:
+            return []
+        with self._lock:
+            self.queries += 1
+            candidates = set()
+            for buckets, key in zip(self._buckets, self._band_keys(signature)):
+                candidates.update(buckets.get(key, ()))
+            candidates.discard(exclude)
+            self.candidates_checked += len(candidates)
+            matches = []
+            for doc_id in candidates:
+                similarity = self.similarity(signature, self._signatures[doc_id])
+                if similarity >= self.threshold:
+                    matches.append((doc_id, similarity))
+            if matches:
+                self.duplicates_found += 1
+        matches.sort(key=lambda match: (-match[1], match[0]))
+        return matches
+
+    def find_duplicate(self, final_hypothesis: dict, exclude: str = None):
+        """
+        The most similar indexed hypothesis, if it is a near-duplicate.
+
+        Returns:
+            tuple or None: (doc_id, similarity), or None if there is no near-duplicate.
+        """
+        matches = self.query(self.signature(final_hypothesis), exclude=exclude)
+        return matches[0] if matches else None
+
+    def add_document(self, doc_id: str, document: dict):
+        """
+        Indexes a stored 'finalized_hypotheses' document, using its stored signature when
+        it has one of the right length and computing it from 'hypothesis_content' otherwise.
+        Near-duplicates of an indexed hypothesis (documents with 'duplicate_of') are skipped.
+        """
+        if document.get(DUPLICATE_OF_FIELD):
+            return
+        stored = document.get(SIGNATURE_FIELD)
+        if stored and len(stored) == self.num_perm:
+            self.add(doc_id, stored)
+        else:
+            self.add(doc_id, self.signature(document.get(u'hypothesis_content') or {}))
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'hypotheses': len(self._signatures),
+                'buckets': sum(len(buckets) for buckets in self._buckets),
+                'queries': self.queries,
+                'candidates_checked': self.candidates_checked,
+                'duplicates_found': self.duplicates_found,
+            }
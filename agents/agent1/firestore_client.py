@@ -1,24 +1,164 @@
-# Imports the Google Cloud client library
-from google.cloud import firestore
-
-# TODO: Set the project ID.
-# project_id = "your-project-id"
-
-# Instantiates a client
-try:
-    db = firestore.Client()
-    # If you need to specify project_id:
-    # db = firestore.Client(project=project_id)
-    print("Firestore client initialized successfully.")
-
-    # Example: Add data
-    # doc_ref = db.collection(u'users').document(u'alovelace')
-    # doc_ref.set({
-    #     u'first': u'Ada',
-    #     u'last': u'Lovelace',
-    #     u'born': 1815
-    # })
-    # print("Data added to Firestore.")
-
-except Exception as e:
-    print(f"Error initializing Firestore client or interacting with Firestore: {e}")
+"""
+Lazily created, process-wide Firestore client.
+
+Nothing here talks to Google Cloud at import time. The first call to get_client()
+picks a backend, builds the client and caches it for the rest of the process, so
+processes that never persist anything (CLI runs, most tests) never pay for gRPC
+channel setup or credential discovery.
+
+Backends, selected with the MARS_FIRESTORE_BACKEND environment variable:
+    firestore  Real Firestore using Application Default Credentials (default).
+    emulator   The Firestore emulator at FIRESTORE_EMULATOR_HOST, with anonymous
+               credentials. Chosen automatically when FIRESTORE_EMULATOR_HOST is set.
+    local      In-process LocalFirestoreClient; no google-cloud import at all.
+    sqlite     Embedded SQLite database at MARS_SQLITE_PATH (see sqlite_store.py);
+               persistent, no cloud dependency.
+The project ID is taken from the argument to get_client() or from GCP_PROJECT_ID.
+The async client of the local and sqlite backends shares storage with the sync one.
+"""
+import logging
+import os
+import threading
+
+BACKEND_ENV_VAR = "MARS_FIRESTORE_BACKEND"
+PROJECT_ENV_VAR = "GCP_PROJECT_ID"
+EMULATOR_HOST_ENV_VAR = "FIRESTORE_EMULATOR_HOST"
+BACKENDS = ('firestore', 'emulator', 'local', 'sqlite')
+
+_clients = {}            # (backend, project, is_async) -> client, or None if creation failed
+_override = None         # client installed with set_client()
+_async_override = None   # client installed with set_async_client()
+_lock = threading.RLock()
+
+logger = logging.getLogger(__name__)
+
+
+def get_backend() -> str:
+    """Returns the configured backend name."""
+    backend = os.getenv(BACKEND_ENV_VAR)
+    if not backend:
+        backend = 'emulator' if os.getenv(EMULATOR_HOST_ENV_VAR) else 'firestore'
+    backend = backend.strip().lower()
+    if backend not in BACKENDS:
+        raise ValueError(f"{BACKEND_ENV_VAR} must be one of {BACKENDS}, got '{backend}'")
+    return backend
+
+
+def _create_client(backend: str, project: str, use_async: bool = False):
+    if backend in ('local', 'sqlite'):
+        from agents.agent1.local_firestore import LocalFirestoreClient, AsyncLocalFirestoreClient
+        if use_async:
+            # Share storage with the blocking client so both managers see the same data.
+            return AsyncLocalFirestoreClient(sync_client=get_client(project))
+        if backend == 'sqlite':
+            from agents.agent1.session_manager import SECONDARY_INDEXES
+            from agents.agent1.sqlite_store import SQLiteFirestoreClient
+            return SQLiteFirestoreClient(project=project or 'mars-local', indexes=SECONDARY_INDEXES)
+        return LocalFirestoreClient(project=project or 'mars-local')
+
+    from google.cloud import firestore
+    client_class = firestore.AsyncClient if use_async else firestore.Client
+    if backend == 'emulator':
+        if not os.getenv(EMULATOR_HOST_ENV_VAR):
+            raise RuntimeError(f"{EMULATOR_HOST_ENV_VAR} must be set to use the Firestore emulator.")
+        from google.auth.credentials import AnonymousCredentials
+        return client_class(project=project or 'mars-local', credentials=AnonymousCredentials())
+    return client_class(project=project) if project else client_class()
+
+
+def _get_or_create(project_id: str, use_async: bool):
+    backend = get_backend()
+    project = project_id or os.getenv(PROJECT_ENV_VAR)
+    key = (backend, project, use_async)
+    if key in _clients:
+        return _clients[key]
+
+    kind = "AsyncClient" if use_async else "Client"
+    with _lock:
+        if key not in _clients:
+            try:
+                _clients[key] = _create_client(backend, project, use_async)
+                logger.info(f"Firestore {kind} initialized successfully (backend: {backend}).")
+            except Exception as e:
+                _clients[key] = None
+                logger.error(f"Error initializing Firestore {kind} (backend: {backend}): {e}")
+        return _clients[key]
+
+
+def get_client(project_id: str = None):
+    """
+    Returns the shared client, creating it on first use.
+
+    A failed creation is remembered, so a process without credentials pays for the
+    attempt once instead of on every call. Use reset_client() to try again.
+
+    Args:
+        project_id (str, optional): Google Cloud project ID. Defaults to GCP_PROJECT_ID.
+
+    Returns:
+        The client, or None if it could not be created.
+    """
+    if _override is not None:
+        return _override
+    return _get_or_create(project_id, use_async=False)
+
+
+def get_async_client(project_id: str = None):
+    """
+    Returns the shared firestore.AsyncClient (or AsyncLocalFirestoreClient), creating it on first use.
+
+    The async client binds to the event loop it is first used on, so a process should
+    drive it from a single loop.
+    """
+    if _async_override is not None:
+        return _async_override
+    return _get_or_create(project_id, use_async=True)
+
+
+def set_client(client):
+    """Installs a client that get_client() returns from now on, e.g. a fake in tests. None removes it."""
+    global _override
+    _override = client
+
+
+def set_async_client(client):
+    """Installs a client that get_async_client() returns from now on. None removes it."""
+    global _async_override
+    _async_override = client
+
+
+def reset_client():
+    """Forgets every cached client (and failed attempt) and any client installed with set_client()."""
+    global _override, _async_override
+    with _lock:
+        _clients.clear()
+        _override = None
+        _async_override = None
+
+
+def server_timestamp(client):
+    """Returns the SERVER_TIMESTAMP sentinel understood by the given client."""
+    from agents.agent1 import local_firestore
+    if isinstance(client, (local_firestore.DocumentStoreClient, local_firestore.AsyncLocalFirestoreClient)):
+        return local_firestore.SERVER_TIMESTAMP
+    from google.cloud import firestore
+    return firestore.SERVER_TIMESTAMP
+
+
+def is_already_exists(error) -> bool:
+    """True if the error is a backend's 'document already exists' rejection of a create()."""
+    from agents.agent1.local_firestore import AlreadyExists as LocalAlreadyExists
+    if isinstance(error, LocalAlreadyExists):
+        return True
+    try:
+        from google.api_core.exceptions import AlreadyExists, Conflict
+    except ImportError:
+        return False
+    return isinstance(error, (AlreadyExists, Conflict))
+
+
+def __getattr__(name):
+    # Backwards compatibility for `from agents.agent1.firestore_client import db`.
+    if name == 'db':
+        return get_client()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,377 @@
+"""
+HTTP handoff of structured hypotheses from Agent 1 to Agent 2's /design_experiment/.
+
+HandoffClient owns one keep-alive connection pool per process, times every request
+out and retries transient failures (connection errors, timeouts, 429 and 5xx) with
+exponential backoff and full jitter. HandoffQueue puts a bounded in-memory queue and
+a few worker threads in front of it, so the conversation hands off and moves on while
+bursts are absorbed and drained over the shared pool. Both expose metrics.
+
+The Agent 2 base URL comes from the AGENT2_URL environment variable unless given
+explicitly; without it HypothesisBuilder keeps the simulated (logged) handoff.
+"""
+import asyncio
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+from collections import deque
+
+import httpx
+
+from agents.common import wire_format
+
+logger = logging.getLogger(__name__)
+
+AGENT2_URL_ENV_VAR = "AGENT2_URL"
+DESIGN_EXPERIMENT_PATH = "/design_experiment/"
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+
+class HandoffError(Exception):
+    """Raised when a hypothesis could not be delivered to Agent 2."""
+    def __init__(self, message: str, status_code: int = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def to_agent2_hypothesis(structured_hypothesis) -> dict:
+    """
+    Maps the structured hypothesis produced by HypothesisBuilder (dict or JSON string)
+    to the body expected by Agent 2's Hypothesis model.
+    """
+    if isinstance(structured_hypothesis, (str, bytes)):
+        structured_hypothesis = json.loads(structured_hypothesis)
+    return {
+        "hypothesis_id": structured_hypothesis["hypothesis_id"],
+        "statement": structured_hypothesis["statement"],
+        "core_assumptions": structured_hypothesis.get("core_assumptions", []),
+        "description": structured_hypothesis["statement"],
+        "status": structured_hypothesis.get("status", "pending"),
+        "metadata": {
+            "source": "agent1",
+            "key_variables": structured_hypothesis.get("key_variables", {}),
+        },
+    }
+
+
+class HandoffMetrics:
+    """Thread-safe counters plus a window of recent request latencies."""
+
+    def __init__(self, window: int = 1000):
+        self._lock = threading.Lock()
+        self._latencies_ms = deque(maxlen=window)
+        self.counters = {'attempts': 0, 'retries': 0, 'delivered': 0, 'failed': 0}
+
+    def increment(self, name: str, amount: int = 1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def record_latency(self, seconds: float):
+        with self._lock:
+            self._latencies_ms.append(seconds * 1000)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            latencies = sorted(self._latencies_ms)
+            stats = dict(self.counters)
+        stats['latency_ms'] = {
+            'count': len(latencies),
+            'avg': sum(latencies) / len(latencies) if latencies else 0.0,
+            'p50': _percentile(latencies, 0.50),
+            'p95': _percentile(latencies, 0.95),
+            'p99': _percentile(latencies, 0.99),
+            'max': latencies[-1] if latencies else 0.0,
+        }
+        return stats
+
+
+def _percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+class HandoffClient:
+    """
+    Posts structured hypotheses to Agent 2 over a shared, pooled HTTP connection.
+
+    The blocking and async paths each use one long-lived httpx client, created on
+    first use, so connections are reused across handoffs instead of being opened per
+    request. Pass `client` / `async_client` to inject your own, e.g. a
+    fastapi.testclient.TestClient or an httpx.AsyncClient over ASGITransport(app).
+    """
+    def __init__(self, base_url: str = None, timeout: float = 10.0, max_retries: int = 3,
+                 backoff: float = 0.25, max_backoff: float = 5.0, max_connections: int = 20,
+                 media_type: str = wire_format.JSON_MEDIA_TYPE, client: httpx.Client = None,
+                 async_client: httpx.AsyncClient = None, sleep=time.sleep):
+        """
+        Args:
+            base_url (str, optional): Agent 2 base URL. Defaults to $AGENT2_URL.
+            timeout (float): Seconds allowed for connecting, and for each read/write.
+            max_retries (int): Retries after the first attempt for transient failures.
+            backoff (float): Base delay in seconds; attempt n waits uniform(0, backoff * 2**n).
+            max_backoff (float): Upper bound of a single retry delay.
+            max_connections (int): Size of the keep-alive connection pool.
+            media_type (str): Request encoding, JSON or MessagePack (see agents.common.wire_format).
+            sleep (callable): Blocking sleep used between retries; injectable for tests.
+        """
+        self.base_url = (base_url or os.getenv(AGENT2_URL_ENV_VAR) or "").rstrip('/')
+        if not self.base_url and client is None and async_client is None:
+            raise ValueError(f"Agent 2 URL not configured; pass base_url or set {AGENT2_URL_ENV_VAR}.")
+        self.timeout = httpx.Timeout(timeout)
+        self.limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.media_type = wire_format.normalize_media_type(media_type)
+        self.metrics = HandoffMetrics()
+        self._client = client
+        self._async_client = async_client
+        self._sleep = sleep
+        self._lock = threading.Lock()
+
+    @property
+    def client(self) -> httpx.Client:
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = httpx.Client(base_url=self.base_url, timeout=self.timeout, limits=self.limits)
+        return self._client
+
+    @property
+    def async_client(self) -> httpx.AsyncClient:
+        if self._async_client is None:
+            self._async_client = httpx.AsyncClient(base_url=self.base_url, timeout=self.timeout, limits=self.limits)
+        return self._async_client
+
+    def _request_args(self, structured_hypothesis):
+        body = wire_format.encode(to_agent2_hypothesis(structured_hypothesis), self.media_type)
+        headers = {"Content-Type": self.media_type, "Accept": self.media_type}
+        return DESIGN_EXPERIMENT_PATH, body, headers
+
+    def _retry_delay(self, attempt: int) -> float:
+        return random.uniform(0, min(self.max_backoff, self.backoff * (2 ** attempt)))
+
+    def _handle_response(self, response: httpx.Response, attempt: int):
+        # Returns the decoded protocol, None to retry, or raises HandoffError.
+        if response.status_code < 400:
+            try:
+                return wire_format.decode(response.content, response.headers.get('content-type'))
+            except ValueError as e:
+                raise HandoffError(f"Agent 2 answered HTTP {response.status_code} with an undecodable body: {e}",
+                                   status_code=response.status_code) from e
+        if response.status_code in RETRY_STATUS_CODES and attempt < self.max_retries:
+            return None
+        raise HandoffError(f"Agent 2 rejected the hypothesis with HTTP {response.status_code}: {response.text[:200]}",
+                           status_code=response.status_code)
+
+    def _begin_attempt(self, attempt: int) -> float:
+        # Counts the attempt and returns how long to back off before making it.
+        self.metrics.increment('attempts')
+        if not attempt:
+            return 0.0
+        self.metrics.increment('retries')
+        return self._retry_delay(attempt - 1)
+
+    def _end_attempt(self, attempt: int, started: float, response: httpx.Response = None,
+                     error: httpx.TransportError = None):
+        # Shared by send() and send_async(): records the attempt and returns the
+        # decoded protocol, None to retry, or raises HandoffError.
+        self.metrics.record_latency(time.perf_counter() - started)
+        try:
+            if error is not None:
+                if attempt < self.max_retries:
+                    logger.warning(f"Handoff to Agent 2 failed ({error!r}); retrying.")
+                    return None
+                raise HandoffError(f"Agent 2 unreachable after {attempt + 1} attempts: {error!r}") from error
+            protocol = self._handle_response(response, attempt)
+        except HandoffError:
+            self.metrics.increment('failed')
+            raise
+        if protocol is None:
+            logger.warning(f"Agent 2 answered HTTP {response.status_code}; retrying.")
+        else:
+            self.metrics.increment('delivered')
+        return protocol
+
+    def send(self, structured_hypothesis) -> dict:
+        """
+        Delivers a hypothesis and returns Agent 2's protocol, retrying transient failures.
+
+        Raises:
+            HandoffError: If Agent 2 rejects the hypothesis or stays unreachable.
+        """
+        path, body, headers = self._request_args(structured_hypothesis)
+        for attempt in range(self.max_retries + 1):
+            delay = self._begin_attempt(attempt)
+            if attempt:
+                self._sleep(delay)
+            started = time.perf_counter()
+            try:
+                response = self.client.post(path, content=body, headers=headers)
+            except httpx.TransportError as e:
+                protocol = self._end_attempt(attempt, started, error=e)
+            else:
+                protocol = self._end_attempt(attempt, started, response=response)
+            if protocol is not None:
+                return protocol
+
+    async def send_async(self, structured_hypothesis) -> dict:
+        """Async variant of send(), using the shared httpx.AsyncClient."""
+        path, body, headers = self._request_args(structured_hypothesis)
+        for attempt in range(self.max_retries + 1):
+            delay = self._begin_attempt(attempt)
+            if attempt:
+                await asyncio.sleep(delay)
+            started = time.perf_counter()
+            try:
+                response = await self.async_client.post(path, content=body, headers=headers)
+            except httpx.TransportError as e:
+                protocol = self._end_attempt(attempt, started, error=e)
+            else:
+                protocol = self._end_attempt(attempt, started, response=response)
+            if protocol is not None:
+                return protocol
+
+    def close(self):
+        if self._client is not None:
+            self._client.close()
+
+    async def aclose(self):
+        if self._async_client is not None:
+            await self._async_client.aclose()
+
+
+class HandoffQueue:
+    """
+    Fire-and-forget handoffs: submit() only enqueues, worker threads deliver.
+
+    The queue is bounded (max_queue) so a stalled Agent 2 cannot exhaust memory;
+    submissions beyond that are rejected and counted rather than blocking the caller.
+    """
+    # How often idle workers check whether the queue was closed, in case close()
+    # found no room to queue their stop markers.
+    poll_interval = 0.5
+
+    def __init__(self, client: HandoffClient, workers: int = 4, max_queue: int = 10000, on_result=None):
+        """
+        Args:
+            client (HandoffClient): Client used by the workers.
+            workers (int): Concurrent deliveries (should not exceed the client's pool size).
+            max_queue (int): Handoffs that may wait for delivery.
+            on_result (callable, optional): Called from a worker as on_result(hypothesis, protocol, error).
+        """
+        self.client = client
+        self.on_result = on_result
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self._counters = {'submitted': 0, 'rejected': 0, 'in_flight': 0, 'max_queue_depth': 0}
+        self._end_to_end = HandoffMetrics()  # queue wait plus delivery
+        self._closed = False
+        self._threads = [
+            threading.Thread(target=self._worker, name=f"agent2-handoff-{i}", daemon=True) for i in range(workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, structured_hypothesis) -> bool:
+        """Queues a hypothesis for delivery. Returns False if the queue is full or closed."""
+        if self._closed:
+            return False
+        try:
+            self._queue.put_nowait((time.perf_counter(), structured_hypothesis))
+        except queue.Full:
+            with self._lock:
+                self._counters['rejected'] += 1
+            logger.error("Handoff queue is full; hypothesis was not queued for Agent 2.")
+            return False
+        with self._lock:
+            self._counters['submitted'] += 1
+            self._counters['max_queue_depth'] = max(self._counters['max_queue_depth'], self._queue.qsize())
+        return True
+
+    def _worker(self):
+        while True:
+            try:
+                item = self._queue.get(timeout=self.poll_interval)
+            except queue.Empty:
+                if self._closed:
+                    return
+                continue
+            if item is None:
+                self._queue.task_done()
+                return
+            queued_at, structured_hypothesis = item
+            with self._lock:
+                self._counters['in_flight'] += 1
+            protocol, error = None, None
+            try:
+                protocol = self.client.send(structured_hypothesis)
+            except Exception as e:
+                error = e
+                logger.error(f"Handoff to Agent 2 failed: {e}")
+            self._end_to_end.record_latency(time.perf_counter() - queued_at)
+            with self._lock:
+                self._counters['in_flight'] -= 1
+            if self.on_result is not None:
+                try:
+                    self.on_result(structured_hypothesis, protocol, error)
+                except Exception as e:
+                    logger.error(f"Handoff result callback failed: {e}")
+            self._queue.task_done()
+
+    def join(self):
+        """Blocks until every queued handoff has been attempted."""
+        self._queue.join()
+
+    def close(self, wait: bool = True):
+        """
+        Stops accepting handoffs; the workers exit once the queue is drained.
+
+        With wait=True this blocks until every queued handoff has been attempted and
+        the workers have exited; with wait=False it returns immediately.
+        """
+        if self._closed:
+            return
+        self._closed = True
+        if wait:
+            self._queue.join()
+        for _ in self._threads:
+            try:
+                self._queue.put_nowait(None)
+            except queue.Full:
+                break  # the workers notice _closed once the queue drains
+        if wait:
+            for thread in self._threads:
+                thread.join()
+
+    def metrics(self) -> dict:
+        """Queue depth, submission counters and the client's delivery/latency metrics."""
+        with self._lock:
+            stats = dict(self._counters)
+        stats['queue_depth'] = self._queue.qsize()
+        stats.update(self.client.metrics.snapshot())
+        stats['end_to_end_ms'] = self._end_to_end.snapshot()['latency_ms']
+        return stats
+
+
+_default_queue = None
+_default_lock = threading.Lock()
+
+
+def default_handoff():
+    """
+    Returns the process-wide HandoffQueue for $AGENT2_URL, creating it on first use,
+    or None if AGENT2_URL is not set (the handoff is then only simulated).
+    """
+    global _default_queue
+    if not os.getenv(AGENT2_URL_ENV_VAR):
+        return None
+    with _default_lock:
+        if _default_queue is None:
+            _default_queue = HandoffQueue(HandoffClient())
+        return _default_queue
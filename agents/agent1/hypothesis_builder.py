@@ -1,134 +1,294 @@
 from .state_machine import StateMachine, ConversationState
+from .conversation_engine import ConversationEngine
+from .io_channels import ConsoleChannel
+from agents.common import wire_format
+from .handoff import HandoffError, default_handoff
 import uuid
-import json
 import logging # Add logging import
 
-# Configure basic logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+# Logging is configured by the entry point (see agents.common.structured_logging), not on import.
 logger = logging.getLogger(__name__)
 
+CONFIRMATION_PROMPT = "Does this accurately capture your intended hypothesis? (yes/no)"
+EMPTY_RESPONSE_MESSAGE = "Agent: It looks like you didn't enter anything. Could you please provide a response?"
+STATEMENT_TEMPLATE = "If we change the {independent_variable}, then we will observe a change in the {dependent_variable}, because {mechanism}."
+MISSING_COMPONENTS_MESSAGE = "Agent: It seems we are missing some key components of the hypothesis. Let's go back to clarifying."
+CLARIFYING_SLOTS = ["general_topic", "independent_variable", "dependent_variable", "mechanism"]
+
+# The hypothesis-building conversation, interpreted by ConversationEngine (see conversation_engine.py).
+# Its states are the values of ConversationState.
+HYPOTHESIS_BUILDER_SPEC = {
+    "name": "hypothesis_builder",
+    "initial_state": ConversationState.AWAITING_INPUT.value,
+    "final_state": ConversationState.FINALIZED.value,
+    "slots": {
+        "general_topic": {
+            "prompt": "What is the general research area or topic you are interested in exploring?",
+            "goto": ConversationState.CLARIFYING.value,
+        },
+        "independent_variable": {
+            "prompt": "Okay, regarding '{general_topic}', what specific factor or variable are you thinking of changing or manipulating? This will be your independent variable. (Separate multiple with ';')",
+        },
+        "dependent_variable": {
+            "prompt": "And what measurable outcome or effect do you expect to observe when you change '{independent_variable}'? This will be your dependent variable. (Separate multiple with ';')",
+        },
+        "mechanism": {
+            "prompt": "Why do you expect that changing '{independent_variable}' will lead to an observable change in '{dependent_variable}'? What is the underlying reason or assumption (because of Z)? (Separate multiple assumptions with ';')",
+            "goto": ConversationState.REFINING.value,
+        },
+        "full_statement": {},
+    },
+    "states": {
+        ConversationState.AWAITING_INPUT.value: {"fill": CLARIFYING_SLOTS, "then": ConversationState.REFINING.value},
+        ConversationState.CLARIFYING.value: {"fill": CLARIFYING_SLOTS, "then": ConversationState.REFINING.value},
+        ConversationState.REFINING.value: {
+            "auto": True,
+            "rules": [
+                {
+                    "if": {"filled": ["independent_variable", "dependent_variable", "mechanism"]},
+                    "set": {"full_statement": STATEMENT_TEMPLATE},
+                    "action": "statement_composed",
+                    "reply": ["Agent: Here's a potential hypothesis statement based on our discussion:", "'{full_statement}'"],
+                    "goto": ConversationState.AWAITING_CONFIRMATION.value,
+                },
+                # Go back to clarifying from the first missing component.
+                {
+                    "if": {"missing": "independent_variable"},
+                    "action": "components_missing", "reply": MISSING_COMPONENTS_MESSAGE,
+                    "clear": ["general_topic"], "goto": ConversationState.CLARIFYING.value,
+                },
+                {
+                    "if": {"missing": "dependent_variable"},
+                    "action": "components_missing", "reply": MISSING_COMPONENTS_MESSAGE,
+                    "clear": ["independent_variable"], "goto": ConversationState.CLARIFYING.value,
+                },
+                {
+                    "action": "components_missing", "reply": MISSING_COMPONENTS_MESSAGE,
+                    "clear": ["dependent_variable"], "goto": ConversationState.CLARIFYING.value,
+                },
+            ],
+        },
+        ConversationState.AWAITING_CONFIRMATION.value: {
+            "prompt": CONFIRMATION_PROMPT,
+            "rules": [
+                {
+                    "if": {"answer": ["yes"]},
+                    "action": "confirmed", "reply": "Agent: Great! Hypothesis confirmed.",
+                    "goto": ConversationState.FINALIZED.value,
+                },
+                {
+                    # Reset components to force re-asking
+                    "action": "rejected", "reply": "Agent: Okay, let's get the new details for the hypothesis.",
+                    "clear": ["independent_variable", "dependent_variable", "mechanism", "full_statement"],
+                    "goto": ConversationState.CLARIFYING.value,
+                },
+            ],
+        },
+        ConversationState.FINALIZED.value: {},
+    },
+}
+
+HYPOTHESIS_BUILDER_ENGINE = ConversationEngine(HYPOTHESIS_BUILDER_SPEC)
+
+
+def _log_transition(machine, from_state, to_state):
+    logger.debug(f"State transition: {from_state.value} -> {to_state.value}")
+
+
+def compose_statement(independent_variable, dependent_variable, mechanism):
+    """Builds the 'If ..., then ..., because ...' statement from the hypothesis components."""
+    return STATEMENT_TEMPLATE.format(independent_variable=independent_variable, dependent_variable=dependent_variable,
+                                     mechanism=mechanism)
+
+
+def structure_components(components):
+    """
+    Turns hypothesis components into the structured hypothesis dict handed to Agent 2.
+
+    Args:
+        components (dict): 'independent_variable', 'dependent_variable', 'mechanism' and
+                           'full_statement', as collected by HypothesisBuilder.
+
+    Returns:
+        dict: The structured hypothesis, with a fresh hypothesis_id.
+    """
+    # For key_variables, we'll assume single strings for now, convert to list of one.
+    # For core_assumptions, we'll use the 'mechanism' component.
+    # If multiple assumptions were provided (e.g. semicolon separated), split them.
+
+    iv_list = [var.strip() for var in components["independent_variable"].split(';') if var.strip()]
+    dv_list = [var.strip() for var in components["dependent_variable"].split(';') if var.strip()]
+    assumptions_list = [asm.strip() for asm in components["mechanism"].split(';') if asm.strip()]
+
+    return {
+        "hypothesis_id": str(uuid.uuid4()),
+        "statement": components["full_statement"],
+        "key_variables": {
+            "independent": iv_list if iv_list else [components["independent_variable"]], # Fallback if no semicolon
+            "dependent": dv_list if dv_list else [components["dependent_variable"]]    # Fallback if no semicolon
+        },
+        "core_assumptions": assumptions_list if assumptions_list else [components["mechanism"]], # Fallback if no semicolon
+        "status": "unverified"
+    }
+
 
 class HypothesisBuilder:
-    def __init__(self):
+    """
+    Guides a user from a research topic to a confirmed, structured hypothesis.
+
+    The builder can be driven in two ways:
+      * run_interaction_loop() asks and blocks on the channel until the hypothesis
+        is finalized (the original console flow).
+      * start() / submit(response) advance the conversation one user response at a
+        time without ever blocking, so a single worker can serve many builders
+        (see BuilderMultiplexer). run_async() does the same on an async channel.
+    All user-facing output goes through the I/O channel (ConsoleChannel by default).
+    The finalized hypothesis is handed to Agent 2 through `handoff` (see handoff.py).
+
+    The questions, slots and transitions are defined by HYPOTHESIS_BUILDER_SPEC and run
+    by the shared HYPOTHESIS_BUILDER_ENGINE. checkpoint() captures a conversation as a
+    JSON-serializable dict and from_checkpoint() resumes it, so a server can keep
+    checkpoints instead of builder objects between a user's responses.
+    """
+    def __init__(self, channel=None, handoff=None):
+        """
+        Args:
+            channel (IOChannel, optional): How the builder talks to its user. Defaults to ConsoleChannel.
+            handoff (HandoffQueue or HandoffClient, optional): Delivers the final hypothesis to Agent 2.
+                Defaults to the shared queue for $AGENT2_URL; if that is not set either,
+                the handoff is only logged.
+        """
+        self.channel = channel if channel is not None else ConsoleChannel()
+        self.handoff = handoff if handoff is not None else default_handoff()
+        self.engine = HYPOTHESIS_BUILDER_ENGINE
         self.state_machine = StateMachine()
-        self.hypothesis_components = {
-            "general_topic": None,
-            "independent_variable": None,
-            "dependent_variable": None,
-            "mechanism": None,
-            "full_statement": None
-        }
+        self.state_machine.add_post_hook(_log_transition)
+        self.hypothesis_components = self.engine.initial_checkpoint()["slots"]
         self.user_confirmed_hypothesis = False
         self.final_hypothesis_json = None
+        self._turns = 0
+        self._actions = {
+            "statement_composed": self._on_statement_composed,
+            "components_missing": self._on_components_missing,
+            "confirmed": self._on_confirmed,
+            "rejected": self._on_rejected,
+        }
+
+    def checkpoint(self) -> dict:
+        """Returns the conversation as a JSON-serializable dict, see from_checkpoint()."""
+        return {
+            "spec": self.engine.name,
+            "state": self.state_machine.current_state.value,
+            "slots": dict(self.hypothesis_components),
+            "turns": self._turns,
+            "confirmed": self.user_confirmed_hypothesis,
+            "final_hypothesis_json": self.final_hypothesis_json,
+        }
+
+    @classmethod
+    def from_checkpoint(cls, checkpoint: dict, channel=None, handoff=None):
+        """
+        Recreates a builder from checkpoint() output, ready to submit() the next response.
+
+        Args:
+            checkpoint (dict): A checkpoint of this builder's conversation spec.
+            channel, handoff: As for the constructor.
+        """
+        if checkpoint.get("spec") != HYPOTHESIS_BUILDER_ENGINE.name:
+            raise ValueError(f"Not a {HYPOTHESIS_BUILDER_ENGINE.name} checkpoint: spec '{checkpoint.get('spec')}'")
+        builder = cls(channel=channel, handoff=handoff)
+        builder.state_machine = StateMachine(ConversationState(checkpoint["state"]))
+        builder.state_machine.add_post_hook(_log_transition)
+        builder.hypothesis_components.update(checkpoint.get("slots") or {})
+        builder._turns = checkpoint.get("turns", 0)
+        builder.user_confirmed_hypothesis = bool(checkpoint.get("confirmed"))
+        builder.final_hypothesis_json = checkpoint.get("final_hypothesis_json")
+        return builder
+
+    def _engine_checkpoint(self, state=None):
+        # A view of this builder's state for the engine; slots are shared, not copied.
+        return {
+            "spec": self.engine.name,
+            "state": state or self.state_machine.current_state.value,
+            "slots": self.hypothesis_components,
+            "turns": self._turns,
+        }
+
+    def _apply_turn(self, checkpoint, turn):
+        self._turns = checkpoint["turns"]
+        for reply in turn.replies:
+            self._say(reply)
+        if turn.changed_state:
+            self.state_machine.transition_to(ConversationState(turn.to_state))
+
+    def _respond(self, response):
+        """Applies a user response to the pending question through the conversation engine."""
+        checkpoint = self._engine_checkpoint()
+        self._apply_turn(checkpoint, self.engine.respond(checkpoint, response, actions=self._actions))
+
+    def _step(self):
+        """Takes one conversation step that needs no user input."""
+        checkpoint = self._engine_checkpoint()
+        self._apply_turn(checkpoint, self.engine.advance(checkpoint, actions=self._actions))
+
+    def _on_statement_composed(self, checkpoint, message):
+        logger.info(f"Constructed hypothesis statement: {checkpoint['slots']['full_statement']}")
+
+    def _on_components_missing(self, checkpoint, message):
+        logger.warning("Attempted to refine hypothesis with missing components.")
+
+    def _on_confirmed(self, checkpoint, message):
+        self.user_confirmed_hypothesis = True
+        logger.info("User confirmed hypothesis.")
+
+    def _on_rejected(self, checkpoint, message):
+        logger.info("User rejected hypothesis statement. Returning to CLARIFYING to re-input components.")
+
+    def _say(self, message):
+        self.channel.send(message)
+
+    def _ask(self, prompt_message):
+        self.channel.prompt(prompt_message)
 
     def _get_user_input(self, prompt_message):
         while True:
-            logger.info(f"Agent: {prompt_message}")
-            user_response = input("User: ").strip() # Add .strip() to remove leading/trailing whitespace
+            self._ask(prompt_message)
+            user_response = self.channel.receive().strip() # Add .strip() to remove leading/trailing whitespace
             if user_response:
                 logger.info(f"User response: {user_response}")
                 return user_response
             else:
                 # Log the empty response and inform the user.
                 logger.warning("User provided an empty response.")
-                print("Agent: It looks like you didn't enter anything. Could you please provide a response?")
+                self._say(EMPTY_RESPONSE_MESSAGE)
                 # The loop will then re-iterate, asking the same prompt_message.
 
-    def _ask_clarifying_questions(self):
-        if self.hypothesis_components["general_topic"] is None:
-            response = self._get_user_input("What is the general research area or topic you are interested in exploring?")
-            self.hypothesis_components["general_topic"] = response
-            self.state_machine.transition_to(ConversationState.CLARIFYING)
-            return
-
-        if self.hypothesis_components["independent_variable"] is None:
-            response = self._get_user_input(f"Okay, regarding '{self.hypothesis_components['general_topic']}', what specific factor or variable are you thinking of changing or manipulating? This will be your independent variable. (Separate multiple with ';')")
-            self.hypothesis_components["independent_variable"] = response
-            return
-
-        if self.hypothesis_components["dependent_variable"] is None:
-            response = self._get_user_input(f"And what measurable outcome or effect do you expect to observe when you change '{self.hypothesis_components['independent_variable']}'? This will be your dependent variable. (Separate multiple with ';')")
-            self.hypothesis_components["dependent_variable"] = response
-            return
+    def _clarifying_prompt(self):
+        """Returns the next clarifying question, or None if every component has been provided."""
+        return self.engine.prompt(self._engine_checkpoint(ConversationState.CLARIFYING.value))
 
-        if self.hypothesis_components["mechanism"] is None:
-            response = self._get_user_input(f"Why do you expect that changing '{self.hypothesis_components['independent_variable']}' will lead to an observable change in '{self.hypothesis_components['dependent_variable']}'? What is the underlying reason or assumption (because of Z)? (Separate multiple assumptions with ';')")
-            self.hypothesis_components["mechanism"] = response
-            self.state_machine.transition_to(ConversationState.REFINING)
+    def _ask_clarifying_questions(self):
+        prompt_message = self._clarifying_prompt()
+        if prompt_message is None:
             return
+        self._respond(self._get_user_input(prompt_message))
 
     def _refine_hypothesis(self):
-        # Construct the hypothesis statement
-        iv = self.hypothesis_components['independent_variable']
-        dv = self.hypothesis_components['dependent_variable']
-        m = self.hypothesis_components['mechanism']
-
-        if not all([iv, dv, m]):
-            logger.warning("Attempted to refine hypothesis with missing components.") # Using logger
-            print("Agent: It seems we are missing some key components of the hypothesis. Let's go back to clarifying.")
-            # Find the first missing component and transition back to CLARIFYING
-            # This logic can be more sophisticated
-            if self.hypothesis_components["independent_variable"] is None:
-                 self.hypothesis_components["general_topic"] = None
-            elif self.hypothesis_components["dependent_variable"] is None:
-                 self.hypothesis_components["independent_variable"] = None
-            else:
-                 self.hypothesis_components["dependent_variable"] = None
-            self.state_machine.transition_to(ConversationState.CLARIFYING)
-            return
-
-        constructed_statement = f"If we change the {iv}, then we will observe a change in the {dv}, because {m}."
-        self.hypothesis_components["full_statement"] = constructed_statement
-
-        logger.info(f"Constructed hypothesis statement: {constructed_statement}") # Using logger
-        print(f"Agent: Here's a potential hypothesis statement based on our discussion:")
-        print(f"'{constructed_statement}'")
-        self.state_machine.transition_to(ConversationState.AWAITING_CONFIRMATION)
+        self._step()
 
     def _await_confirmation(self):
-        response = self._get_user_input("Does this accurately capture your intended hypothesis? (yes/no)")
-        if response.lower() == 'yes':
-            self.user_confirmed_hypothesis = True
-            logger.info("User confirmed hypothesis.") # Using logger
-            print("Agent: Great! Hypothesis confirmed.")
-            self.state_machine.transition_to(ConversationState.FINALIZED)
-        else:
-            logger.info("User rejected hypothesis statement. Returning to CLARIFYING to re-input components.")
-            print("Agent: Okay, let's get the new details for the hypothesis.")
-            # Reset components to force re-asking
-            self.hypothesis_components["independent_variable"] = None
-            self.hypothesis_components["dependent_variable"] = None
-            self.hypothesis_components["mechanism"] = None
-            self.hypothesis_components["full_statement"] = None
-            self.state_machine.transition_to(ConversationState.CLARIFYING) # Go to CLARIFYING
+        self._respond(self._get_user_input(CONFIRMATION_PROMPT))
 
 
     def structure_hypothesis(self):
         if not self.user_confirmed_hypothesis or not self.hypothesis_components["full_statement"]:
             logger.warning("Structure hypothesis called but hypothesis not confirmed or statement missing.") # Using logger
-            print("Agent: Cannot structure hypothesis. It has not been finalized or is incomplete.")
+            self._say("Agent: Cannot structure hypothesis. It has not been finalized or is incomplete.")
             return None
 
-        # For key_variables, we'll assume single strings for now, convert to list of one.
-        # For core_assumptions, we'll use the 'mechanism' component.
-        # If multiple assumptions were provided (e.g. semicolon separated), split them.
-
-        iv_list = [var.strip() for var in self.hypothesis_components["independent_variable"].split(';') if var.strip()]
-        dv_list = [var.strip() for var in self.hypothesis_components["dependent_variable"].split(';') if var.strip()]
-        assumptions_list = [asm.strip() for asm in self.hypothesis_components["mechanism"].split(';') if asm.strip()]
-
-
-        hypothesis_data = {
-            "hypothesis_id": str(uuid.uuid4()),
-            "statement": self.hypothesis_components["full_statement"],
-            "key_variables": {
-                "independent": iv_list if iv_list else [self.hypothesis_components["independent_variable"]], # Fallback if no semicolon
-                "dependent": dv_list if dv_list else [self.hypothesis_components["dependent_variable"]]    # Fallback if no semicolon
-            },
-            "core_assumptions": assumptions_list if assumptions_list else [self.hypothesis_components["mechanism"]], # Fallback if no semicolon
-            "status": "unverified"
-        }
-        self.final_hypothesis_json = json.dumps(hypothesis_data, indent=4)
+        hypothesis_data = structure_components(self.hypothesis_components)
+        # Compact JSON: this is the payload handed to Agent 2, not something people read.
+        self.final_hypothesis_json = wire_format.dumps_json(hypothesis_data)
         logger.info("Hypothesis structured into JSON format.") # Using logger
         # print("Agent: Hypothesis structured into JSON format.") # Replaced by logger
         return self.final_hypothesis_json
@@ -138,50 +298,138 @@ class HypothesisBuilder:
             logger.error("initiate_experiment_design called with no payload.")
             return
 
-        logger.info("Placeholder: initiate_experiment_design called.")
-        logger.info(f"Payload to be sent to Agent 2 (Experiment Designer):\n{hypothesis_json_payload}")
-        # In a real scenario, this would make an API call to Agent 2.
-        # For now, it just logs the payload.
-        print("Agent: Handing off to Agent 2 (simulated - logged payload).")
+        if self.handoff is None:
+            logger.info("Placeholder: initiate_experiment_design called.")
+            logger.info(f"Payload to be sent to Agent 2 (Experiment Designer):\n{hypothesis_json_payload}")
+            self._say("Agent: Handing off to Agent 2 (simulated - logged payload).")
+            return
 
+        if hasattr(self.handoff, 'submit'):
+            # Fire-and-forget: the queue's workers deliver it while the conversation moves on.
+            if self.handoff.submit(hypothesis_json_payload):
+                logger.info("Hypothesis queued for handoff to Agent 2.")
+                self._say("Agent: Handing off to Agent 2.")
+            else:
+                self._say("Agent: Agent 2 is busy right now; the hypothesis could not be handed off.")
+            return
 
-    def run_interaction_loop(self):
-        logger.info("Starting Hypothesis Builder interaction loop.") # Using logger
-        print("Agent: Hello! I'm Agent 1: Hypothesis Builder. I'll help you create a falsifiable hypothesis.")
+        try:
+            protocol = self.handoff.send(hypothesis_json_payload)
+        except HandoffError as e:
+            logger.error(f"Handoff to Agent 2 failed: {e}")
+            self._say("Agent: I couldn't reach Agent 2 to design the experiment.")
+            return
+        logger.info(f"Agent 2 returned protocol {protocol.get('protocol_id')}.")
+        self._say(f"Agent: Agent 2 drafted experiment protocol {protocol.get('protocol_id')}.")
+        return protocol
 
-        while self.state_machine.current_state != ConversationState.FINALIZED:
-            current_state_value = self.state_machine.current_state
-            # Using logger for state transitions (already in state_machine.py, but good for context here too)
-            logger.debug(f"Interaction loop: Current State: {current_state_value.value}")
-            print(f"--- Current State: {current_state_value.value} ---")
-
-
-            if current_state_value == ConversationState.AWAITING_INPUT:
-                # In this version, AWAITING_INPUT implicitly transitions to CLARIFYING
-                # by calling _ask_clarifying_questions which will ask the first question.
-                self._ask_clarifying_questions()
-            elif current_state_value == ConversationState.CLARIFYING:
-                self._ask_clarifying_questions()
-            elif current_state_value == ConversationState.REFINING:
-                self._refine_hypothesis()
-            elif current_state_value == ConversationState.AWAITING_CONFIRMATION:
-                self._await_confirmation()
+    @property
+    def is_finished(self):
+        return self.state_machine.current_state == ConversationState.FINALIZED
+
+    def start(self):
+        """
+        Greets the user and asks the first question without waiting for an answer.
+
+        Returns:
+            str: The question the builder now waits on.
+        """
+        logger.info("Starting Hypothesis Builder conversation.")
+        self._say("Agent: Hello! I'm Agent 1: Hypothesis Builder. I'll help you create a falsifiable hypothesis.")
+        return self._advance()
+
+    def submit(self, response):
+        """
+        Applies one user response and runs the conversation up to the next question.
+
+        Never blocks: this is the entry point for event-driven drivers.
+
+        Args:
+            response (str): The user's answer to the pending question.
+
+        Returns:
+            str or None: The next question, or None once the hypothesis is finalized.
+        """
+        if self.is_finished:
+            logger.warning("Response submitted after the hypothesis was finalized; ignoring it.")
+            return None
+
+        pending_prompt = self.pending_prompt()
+        response = response.strip()
+        if not response:
+            logger.warning("User provided an empty response.")
+            self._say(EMPTY_RESPONSE_MESSAGE)
+            self._ask(pending_prompt)
+            return pending_prompt
+
+        logger.info(f"User response: {response}")
+        self._respond(response)
+        return self._advance()
+
+    def pending_prompt(self):
+        """Returns the question the builder is waiting on, or None if it needs no input."""
+        return self.engine.prompt(self._engine_checkpoint())
+
+    def _advance(self):
+        # Runs the steps that need no user input until a question is pending or the
+        # conversation is finalized.
+        while not self.is_finished:
+            prompt_message = self.pending_prompt()
+            if prompt_message is not None:
+                self._ask(prompt_message)
+                return prompt_message
+            if self.engine.is_auto(self._engine_checkpoint()):
+                self._step()
             else:
-                logger.error(f"Unhandled state in interaction loop: {current_state_value.value}") # Using logger
-                print(f"Agent: Error - Unhandled state: {current_state_value.value}")
-                break
+                logger.error(f"Unhandled state: {self.state_machine.current_state.value}")
+                self._say(f"Agent: Error - Unhandled state: {self.state_machine.current_state.value}")
+                return None
+        self._complete()
+        return None
 
+    def _complete(self):
         if self.user_confirmed_hypothesis and self.hypothesis_components["full_statement"]:
             logger.info("Hypothesis formulation complete.") # Using logger
-            # print("Agent: Hypothesis formulation complete.") # Replaced by logger
             self.structure_hypothesis()
             if self.final_hypothesis_json:
                 logger.info("Preparing for handoff to Agent 2.") # Using logger
-                # print("Agent: Preparing for handoff to Agent 2...") # Replaced by logger
                 self.initiate_experiment_design(self.final_hypothesis_json) # Call the new method
         else:
             logger.info("Exiting hypothesis formulation. No hypothesis was finalized.") # Using logger
-            # print("Agent: Exiting hypothesis formulation. No hypothesis was finalized.") # Replaced by logger
+
+    async def run_async(self):
+        """
+        Runs the conversation on a channel with receive_async(), e.g. AsyncQueueChannel,
+        suspending instead of blocking while waiting for the user.
+        """
+        self.start()
+        while not self.is_finished:
+            self.submit(await self.channel.receive_async())
+        return self.final_hypothesis_json
+
+
+    def run_interaction_loop(self):
+        logger.info("Starting Hypothesis Builder interaction loop.") # Using logger
+        self._say("Agent: Hello! I'm Agent 1: Hypothesis Builder. I'll help you create a falsifiable hypothesis.")
+
+        while self.state_machine.current_state != ConversationState.FINALIZED:
+            current_state_value = self.state_machine.current_state
+            # Using logger for state transitions (already in state_machine.py, but good for context here too)
+            logger.debug(f"Interaction loop: Current State: {current_state_value.value}")
+            self._say(f"--- Current State: {current_state_value.value} ---")
+
+
+            prompt_message = self.pending_prompt()
+            if prompt_message is not None:
+                self._respond(self._get_user_input(prompt_message))
+            elif self.engine.is_auto(self._engine_checkpoint()):
+                self._step()
+            else:
+                logger.error(f"Unhandled state in interaction loop: {current_state_value.value}") # Using logger
+                self._say(f"Agent: Error - Unhandled state: {current_state_value.value}")
+                break
+
+        self._complete()
 
 # Example usage (will be moved to main.py later)
 if __name__ == '__main__':
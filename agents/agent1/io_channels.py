@@ -0,0 +1,108 @@
+"""
+I/O channels that connect a HypothesisBuilder to its user.
+
+The builder never calls input() or print() itself; it talks through a channel:
+    send(message)     deliver an agent message to the user
+    prompt(question)  deliver a question the builder is now waiting on
+    receive()         block until the user's next response (blocking loop only)
+    receive_async()   await the user's next response
+Event-driven drivers (HypothesisBuilder.start/submit, BuilderMultiplexer) never
+call receive at all; they push responses into the builder as they arrive.
+"""
+import asyncio
+
+
+class IOChannel:
+    """Base class for builder I/O channels."""
+
+    def send(self, message: str):
+        raise NotImplementedError
+
+    def prompt(self, question: str):
+        self.send(question)
+
+    def receive(self) -> str:
+        raise NotImplementedError
+
+    async def receive_async(self) -> str:
+        return self.receive()
+
+
+class ConsoleChannel(IOChannel):
+    """Terminal I/O with input() and print(), as used by the interactive CLI."""
+
+    def send(self, message: str):
+        print(message)
+
+    def prompt(self, question: str):
+        # Flushed so the question is on screen before input() blocks, whatever
+        # the log configuration.
+        print(question, flush=True)
+
+    def receive(self) -> str:
+        return input("User: ")
+
+
+class AsyncQueueChannel(IOChannel):
+    """
+    Channel backed by asyncio queues, for builders served from an event loop.
+
+    User responses are fed into `inbox` (see feed()); everything the builder says,
+    questions included, is put on `outbox` for the transport (websocket, HTTP
+    long-poll, ...) to deliver.
+    """
+    def __init__(self, inbox: asyncio.Queue = None, outbox: asyncio.Queue = None):
+        self.inbox = inbox if inbox is not None else asyncio.Queue()
+        self.outbox = outbox if outbox is not None else asyncio.Queue()
+
+    def send(self, message: str):
+        self.outbox.put_nowait(message)
+
+    def feed(self, response: str):
+        """Queues a user response for receive_async()."""
+        self.inbox.put_nowait(response)
+
+    def receive(self) -> str:
+        raise RuntimeError("AsyncQueueChannel cannot block for input; use receive_async() or HypothesisBuilder.submit().")
+
+    async def receive_async(self) -> str:
+        return await self.inbox.get()
+
+    def drain(self) -> list:
+        """Returns and removes every message currently waiting on the outbox."""
+        messages = []
+        while not self.outbox.empty():
+            messages.append(self.outbox.get_nowait())
+        return messages
+
+
+class ScriptedChannel(IOChannel):
+    """
+    Replays a fixed list of user responses and records the whole exchange.
+
+    Useful for tests, demos and replaying recorded conversations. The transcript is a
+    list of (speaker, text) tuples with speaker 'agent', 'prompt' or 'user'. When the
+    script runs out, receive() raises EOFError, just as input() does at end of file.
+    """
+    def __init__(self, responses):
+        self._responses = list(responses)
+        self._position = 0
+        self.transcript = []
+
+    def send(self, message: str):
+        self.transcript.append(('agent', message))
+
+    def prompt(self, question: str):
+        self.transcript.append(('prompt', question))
+
+    def receive(self) -> str:
+        if self._position >= len(self._responses):
+            raise EOFError("Scripted conversation has no more responses.")
+        response = self._responses[self._position]
+        self._position += 1
+        self.transcript.append(('user', response))
+        return response
+
+    @property
+    def remaining(self) -> int:
+        return len(self._responses) - self._position
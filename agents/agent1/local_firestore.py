@@ -0,0 +1,458 @@
+"""
+Local stand-ins for the subset of the google.cloud.firestore client API used by Agent 1.
+
+DocumentStoreClient implements that API (collections, documents, queries, batches)
+on top of five storage primitives: _read, _write, _delete, _children and _commit.
+A storage backend only has to provide those. LocalFirestoreClient keeps documents
+in a dict that disappears with the process; sqlite_store.SQLiteFirestoreClient keeps
+them in an embedded SQLite database.
+
+Selected with MARS_FIRESTORE_BACKEND=local or =sqlite (see firestore_client.py).
+They let the agent, its tests and local load runs persist sessions without Google
+credentials, a network connection or even the google-cloud-firestore package being
+importable.
+"""
+import asyncio
+import copy
+import threading
+import uuid
+from datetime import datetime, timezone
+
+
+class _ServerTimestamp:
+    """Sentinel replaced by the current UTC time when a document is written."""
+    def __repr__(self):
+        return "SERVER_TIMESTAMP"
+
+
+SERVER_TIMESTAMP = _ServerTimestamp()
+
+
+class AlreadyExists(Exception):
+    """Raised by DocumentReference.create when the document already exists."""
+
+
+def _resolve(value, now):
+    if value is SERVER_TIMESTAMP:
+        return now
+    if isinstance(value, dict):
+        return {key: _resolve(item, now) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_resolve(item, now) for item in value]
+    return copy.deepcopy(value)
+
+
+def _deep_merge(target: dict, updates: dict):
+    for key, value in updates.items():
+        if isinstance(value, dict) and isinstance(target.get(key), dict):
+            _deep_merge(target[key], value)
+        else:
+            target[key] = value
+
+
+class DocumentSnapshot:
+    def __init__(self, reference, data):
+        self.reference = reference
+        self.id = reference.id
+        self._data = data
+
+    @property
+    def exists(self):
+        return self._data is not None
+
+    def to_dict(self):
+        return copy.deepcopy(self._data) if self._data is not None else None
+
+    def get(self, field):
+        return (self._data or {}).get(field)
+
+
+class DocumentReference:
+    def __init__(self, client, path: str):
+        self._client = client
+        self.path = path
+        self.id = path.rsplit('/', 1)[-1]
+
+    def collection(self, name: str):
+        return CollectionReference(self._client, f"{self.path}/{name}")
+
+    def get(self):
+        return DocumentSnapshot(self, self._client._read(self.path))
+
+    def set(self, data: dict, merge: bool = False):
+        self._client._write(self.path, data, merge=merge)
+
+    def create(self, data: dict):
+        self._client._write(self.path, data, create=True)
+
+    def update(self, data: dict):
+        if self._client._read(self.path) is None:
+            raise KeyError(f"No document to update: {self.path}")
+        self._client._write(self.path, data, merge=True)
+
+    def delete(self):
+        self._client._delete(self.path)
+
+
+# Comparison operators supported by Query.where.
+FILTER_OPERATORS = ('==', '<', '<=', '>', '>=', 'array_contains')
+DOCUMENT_ID_FIELD = '__name__'
+
+
+def _field_value(path: str, data: dict, field: str):
+    """The value of a (dotted) field of a document, its ID for '__name__', or None if it is missing."""
+    if field == DOCUMENT_ID_FIELD:
+        return path.rsplit('/', 1)[-1]
+    value = data
+    for part in field.split('.'):
+        if not isinstance(value, dict) or part not in value:
+            return None
+        value = value[part]
+    return value
+
+
+def _matches(path: str, data: dict, field: str, op: str, value) -> bool:
+    actual = _field_value(path, data, field)
+    if op == 'array_contains':
+        return isinstance(actual, list) and value in actual
+    if actual is None:
+        return False
+    if op == '==':
+        return actual == value
+    try:
+        if op == '<':
+            return actual < value
+        if op == '<=':
+            return actual <= value
+        if op == '>':
+            return actual > value
+        return actual >= value
+    except TypeError:
+        return False
+
+
+def _cursor_value(value):
+    # Cursors on '__name__' may be given as document references.
+    return getattr(value, 'id', value)
+
+
+def _is_after(key: tuple, cursor: tuple, orders: tuple) -> bool:
+    for value, after, (_, descending) in zip(key, cursor, orders):
+        if value != after:
+            return value < after if descending else value > after
+    return False
+
+
+def query_documents(rows: list, filters: tuple, orders: tuple, cursor, limit):
+    """
+    Evaluates a query over [(path, data), ...] of one collection by scanning it, the
+    way DocumentStoreClient answers queries a backend has no index for.
+
+    As in Firestore, documents without one of the ordered fields are left out, and a
+    cursor holds the values of the ordered fields of the last document already seen.
+    """
+    rows = [row for row in rows if all(_matches(row[0], row[1], *condition) for condition in filters)]
+    if orders:
+        rows = [row for row in rows if all(_field_value(row[0], row[1], field) is not None for field, _ in orders)]
+        for field, descending in reversed(orders):
+            rows.sort(key=lambda row: _field_value(row[0], row[1], field), reverse=descending)
+        if cursor is not None:
+            after = tuple(_cursor_value(value) for value in cursor)
+            rows = [row for row in rows
+                    if _is_after(tuple(_field_value(row[0], row[1], field) for field, _ in orders[:len(after)]),
+                                 after, orders)]
+    if limit is not None:
+        rows = rows[:limit]
+    return rows
+
+
+class Query:
+    def __init__(self, collection, filters=(), orders=(), cursor=None, limit_count=None):
+        self._collection = collection
+        self._filters = filters
+        self._orders = orders
+        self._cursor = cursor
+        self._limit = limit_count
+
+    def _copy(self, **changes):
+        state = dict(filters=self._filters, orders=self._orders, cursor=self._cursor, limit_count=self._limit)
+        state.update(changes)
+        return Query(self._collection, **state)
+
+    def where(self, field: str, op: str, value):
+        if op not in FILTER_OPERATORS:
+            raise ValueError(f"op must be one of {FILTER_OPERATORS}, got '{op}'")
+        return self._copy(filters=self._filters + ((field, op, value),))
+
+    def order_by(self, field: str, direction: str = 'ASCENDING'):
+        return self._copy(orders=self._orders + ((field, direction == 'DESCENDING'),))
+
+    def start_after(self, values):
+        """Starts after the document whose ordered fields have these values (a list), or after a snapshot."""
+        if isinstance(values, DocumentSnapshot):
+            data = values.to_dict() or {}
+            values = [_field_value(values.reference.path, data, field) for field, _ in self._orders]
+        return self._copy(cursor=tuple(values))
+
+    def limit(self, count: int):
+        return self._copy(limit_count=count)
+
+    def stream(self):
+        collection = self._collection
+        rows = collection._client._query(collection.path, self._filters, self._orders, self._cursor, self._limit)
+        return iter([DocumentSnapshot(DocumentReference(collection._client, path), data) for path, data in rows])
+
+    def get(self):
+        return list(self.stream())
+
+
+class CollectionReference(Query):
+    def __init__(self, client, path: str):
+        super().__init__(self)
+        self._client = client
+        self.path = path
+        self.id = path.rsplit('/', 1)[-1]
+
+    def document(self, document_id: str = None):
+        return DocumentReference(self._client, f"{self.path}/{document_id or uuid.uuid4().hex}")
+
+    def add(self, data: dict, document_id: str = None):
+        doc_ref = self.document(document_id)
+        doc_ref.create(data)
+        return datetime.now(timezone.utc), doc_ref
+
+
+class WriteBatch:
+    def __init__(self, client):
+        self._client = client
+        self._writes = []
+
+    def set(self, reference, data: dict, merge: bool = False):
+        self._writes.append((reference.path, data, merge))
+
+    def commit(self):
+        self._client._commit(self._writes)
+        self._writes = []
+
+
+class DocumentStoreClient:
+    """
+    Firestore-compatible client over abstract storage primitives.
+
+    Subclasses implement:
+        _read(path) -> dict or None
+        _write(path, data, merge=False, create=False)   (raises AlreadyExists for create)
+        _delete(path)
+        _children(collection_path) -> [(path, data), ...] for direct children only
+    and may override _commit(writes) to apply a batch more efficiently; by default
+    the writes are applied one by one under the client's lock. Likewise
+    _query(collection_path, filters, orders, cursor, limit) scans _children unless a
+    backend answers it from an index. write_count and read_count count document
+    writes and read operations. Backends whose operations block on disk set blocking.
+    """
+    blocking = False
+
+    def __init__(self, project: str = 'mars-local'):
+        self.project = project
+        self._lock = threading.RLock()
+        self.write_count = 0
+        self.read_count = 0
+
+    def collection(self, name: str):
+        return CollectionReference(self, name)
+
+    def document(self, path: str):
+        return DocumentReference(self, path)
+
+    def batch(self):
+        return WriteBatch(self)
+
+    def _read(self, path: str):
+        raise NotImplementedError
+
+    def _write(self, path: str, data: dict, merge: bool = False, create: bool = False):
+        raise NotImplementedError
+
+    def _delete(self, path: str):
+        raise NotImplementedError
+
+    def _children(self, collection_path: str):
+        raise NotImplementedError
+
+    def _commit(self, writes: list):
+        """Applies [(path, data, merge), ...] atomically with respect to other callers of this client."""
+        with self._lock:
+            for path, data, merge in writes:
+                self._write(path, data, merge=merge)
+
+    def _query(self, collection_path: str, filters: tuple, orders: tuple, cursor, limit):
+        """
+        Answers a query on the direct children of a collection with [(path, data), ...].
+
+        filters are (field, op, value) triples, orders (field, descending) pairs and
+        cursor the ordered field values of the document to start after, or None. This
+        default scans the collection; backends with secondary indexes override it.
+        """
+        return query_documents(self._children(collection_path), filters, orders, cursor, limit)
+
+
+class LocalFirestoreClient(DocumentStoreClient):
+    """Thread-safe, in-memory Firestore look-alike. Counts writes so tests and benchmarks can assert on them."""
+
+    def __init__(self, project: str = 'mars-local'):
+        super().__init__(project)
+        self._documents = {}
+
+    def _read(self, path: str):
+        with self._lock:
+            self.read_count += 1
+            data = self._documents.get(path)
+            return copy.deepcopy(data) if data is not None else None
+
+    def _write(self, path: str, data: dict, merge: bool = False, create: bool = False):
+        resolved = _resolve(data, datetime.now(timezone.utc))
+        with self._lock:
+            if create and path in self._documents:
+                raise AlreadyExists(f"Document already exists: {path}")
+            if merge and path in self._documents:
+                _deep_merge(self._documents[path], resolved)
+            else:
+                self._documents[path] = resolved
+            self.write_count += 1
+
+    def _delete(self, path: str):
+        with self._lock:
+            self._documents.pop(path, None)
+
+    def _children(self, collection_path: str):
+        prefix = collection_path + '/'
+        with self._lock:
+            self.read_count += 1
+            return [
+                (path, copy.deepcopy(data))
+                for path, data in self._documents.items()
+                if path.startswith(prefix) and '/' not in path[len(prefix):]
+            ]
+
+
+class AsyncDocumentReference:
+    def __init__(self, client, reference: DocumentReference):
+        self._client = client
+        self._ref = reference
+        self.path = reference.path
+        self.id = reference.id
+
+    def collection(self, name: str):
+        return AsyncCollectionReference(self._client, self._ref.collection(name))
+
+    async def get(self):
+        return await self._client._run(self._ref.get)
+
+    async def set(self, data: dict, merge: bool = False):
+        await self._client._run(self._ref.set, data, merge=merge)
+
+    async def create(self, data: dict):
+        await self._client._run(self._ref.create, data)
+
+    async def update(self, data: dict):
+        await self._client._run(self._ref.update, data)
+
+    async def delete(self):
+        await self._client._run(self._ref.delete)
+
+
+class AsyncQuery:
+    def __init__(self, client, query: Query):
+        self._client = client
+        self._query = query
+
+    def where(self, field: str, op: str, value):
+        return AsyncQuery(self._client, self._query.where(field, op, value))
+
+    def order_by(self, field: str, direction: str = 'ASCENDING'):
+        return AsyncQuery(self._client, self._query.order_by(field, direction))
+
+    def start_after(self, values):
+        return AsyncQuery(self._client, self._query.start_after(values))
+
+    def limit(self, count: int):
+        return AsyncQuery(self._client, self._query.limit(count))
+
+    async def stream(self):
+        for snapshot in await self._client._run(lambda: list(self._query.stream())):
+            yield snapshot
+
+    async def get(self):
+        return [snapshot async for snapshot in self.stream()]
+
+
+class AsyncCollectionReference(AsyncQuery):
+    def __init__(self, client, reference: CollectionReference):
+        super().__init__(client, reference)
+        self._ref = reference
+        self.path = reference.path
+        self.id = reference.id
+
+    def document(self, document_id: str = None):
+        return AsyncDocumentReference(self._client, self._ref.document(document_id))
+
+    async def add(self, data: dict, document_id: str = None):
+        doc_ref = self.document(document_id)
+        await doc_ref.create(data)
+        return datetime.now(timezone.utc), doc_ref
+
+
+class AsyncWriteBatch:
+    def __init__(self, client):
+        self._client = client
+        self._batch = WriteBatch(client._sync)
+
+    def set(self, reference, data: dict, merge: bool = False):
+        self._batch.set(reference._ref, data, merge=merge)
+
+    async def commit(self):
+        await self._client._run(self._batch.commit)
+
+
+class AsyncLocalFirestoreClient:
+    """
+    Async counterpart of LocalFirestoreClient, mirroring google.cloud.firestore.AsyncClient.
+
+    It wraps any DocumentStoreClient and can share its storage with the one used by
+    the blocking SessionManager (pass it as sync_client), so
+    data written by the async and blocking SessionManagers is visible to both. An
+    optional latency (seconds) is awaited on every operation to mimic network round
+    trips when load-testing event-loop concurrency. Operations of a blocking store
+    (see DocumentStoreClient.blocking, e.g. SQLite) run on a worker thread so they do
+    not stall the event loop; in-memory ones run inline.
+    """
+    def __init__(self, project: str = 'mars-local', sync_client: DocumentStoreClient = None, latency: float = 0.0,
+                 offload: bool = None):
+        self._sync = sync_client if sync_client is not None else LocalFirestoreClient(project=project)
+        self.project = self._sync.project
+        self.latency = latency
+        self.offload = self._sync.blocking if offload is None else offload
+
+    @property
+    def write_count(self):
+        return self._sync.write_count
+
+    @property
+    def read_count(self):
+        return self._sync.read_count
+
+    async def _run(self, fn, *args, **kwargs):
+        # Always yield to the event loop, as a real network call would.
+        await asyncio.sleep(self.latency)
+        if self.offload:
+            return await asyncio.to_thread(fn, *args, **kwargs)
+        return fn(*args, **kwargs)
+
+    def collection(self, name: str):
+        return AsyncCollectionReference(self, self._sync.collection(name))
+
+    def document(self, path: str):
+        return AsyncDocumentReference(self, self._sync.document(path))
+
+    def batch(self):
+        return AsyncWriteBatch(self)
@@ -1,23 +1,82 @@
+import argparse
+import json
 import logging
+import os
+import sys
 from .hypothesis_builder import HypothesisBuilder
+from . import batch
+from .handoff import HandoffClient, HandoffQueue
+from agents.common.structured_logging import FORMATS, LOG_FORMAT_ENV_VAR, configure_logging, shutdown_logging
 
-def main():
-    # Configure basic logging for the application
-    # This will cover logs from hypothesis_builder and state_machine if they use the standard logging setup
-    logging.basicConfig(
-        level=logging.INFO,  # Set to INFO for general run, DEBUG for detailed run
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        handlers=[
-            logging.StreamHandler() # Outputs logs to stderr by default
-        ]
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m agents.agent1.main",
+                                     description="Agent 1: Hypothesis Builder.")
+    parser.add_argument("--agent2-url", help="Agent 2 base URL for the hypothesis handoff "
+                                             "(default: $AGENT2_URL; without it the handoff is only logged).")
+    parser.add_argument("--log-level", default=None, help="Log level (default: $MARS_LOG_LEVEL, else INFO).")
+    parser.add_argument("--log-format", choices=FORMATS, default=os.getenv(LOG_FORMAT_ENV_VAR, "text"),
+                        help="Log record format (default: $MARS_LOG_FORMAT, else text).")
+    subparsers = parser.add_subparsers(dest="command")
+    subparsers.add_parser("interactive", help="Build a hypothesis in a console conversation (default).")
+
+    batch_parser = subparsers.add_parser(
+        "batch", help="Structure pre-collected hypothesis components from a JSONL or CSV file."
     )
+    batch_parser.add_argument("input", help="Input file with topic/independent_variable/dependent_variable/mechanism "
+                                            "records, or '-' for stdin.")
+    batch_parser.add_argument("-o", "--output", default="-", help="Output JSONL file (default: stdout).")
+    batch_parser.add_argument("--format", choices=batch.FORMATS,
+                              help="Input format (default: from the file extension, else jsonl).")
+    batch_parser.add_argument("--workers", type=int, default=1, help="Worker processes (default: 1).")
+    batch_parser.add_argument("--chunk-size", type=int, default=batch.DEFAULT_CHUNK_SIZE,
+                              help=f"Records per work chunk (default: {batch.DEFAULT_CHUNK_SIZE}).")
+    return parser
+
+
+def run_batch_command(args):
+    logger = logging.getLogger(__name__)
+    fmt = args.format or batch.detect_format(args.input)
+    input_stream = sys.stdin if args.input == "-" else open(args.input, newline="", encoding="utf-8")
+    output_stream = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    try:
+        stats = batch.run_batch(input_stream, output_stream, fmt=fmt, workers=args.workers, chunk_size=args.chunk_size)
+    finally:
+        if input_stream is not sys.stdin:
+            input_stream.close()
+        if output_stream is not sys.stdout:
+            output_stream.close()
+    logger.info(f"Structured {stats['structured']} of {stats['records']} records "
+                f"({stats['records_per_second']:.0f} records/sec, {stats['errors']} skipped).")
+    return 1 if stats['errors'] and not stats['structured'] else 0
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    # Records are written to stderr by a background thread, so stdout stays clean for the
+    # batch JSONL stream and the console conversation.
+    configure_logging(level=args.log_level, fmt=args.log_format)
+    try:
+        if args.command == "batch":
+            return run_batch_command(args)
+        run_interactive(args)
+    finally:
+        shutdown_logging()
+
 
+def run_interactive(args):
     logger = logging.getLogger(__name__)
     logger.info("Initializing Agent 1: Hypothesis Builder...")
 
     try:
-        agent = HypothesisBuilder()
+        # A single console conversation can simply wait for Agent 2's protocol.
+        handoff = HandoffClient(base_url=args.agent2_url) if args.agent2_url else None
+        agent = HypothesisBuilder(handoff=handoff)
         agent.run_interaction_loop()
+        if isinstance(agent.handoff, HandoffQueue):
+            # Let the queued handoff reach Agent 2 before the process exits.
+            agent.handoff.close(wait=True)
+            logger.info(f"Agent 2 handoff metrics: {agent.handoff.metrics()}")
 
         if agent.final_hypothesis_json:
             logger.info("Agent 1 finished successfully. Final hypothesis:")
@@ -25,7 +84,8 @@ def main():
             # and optionally by the __main__ block of hypothesis_builder if run directly.
             # For main.py, we can just log that it's done or print it again if desired.
             print("\n--- Final Structured Hypothesis (from main.py) ---")
-            print(agent.final_hypothesis_json)
+            # The payload itself is compact JSON; indent it for people reading the console.
+            print(json.dumps(json.loads(agent.final_hypothesis_json), indent=4))
         else:
             logger.info("Agent 1 finished, but no hypothesis was finalized.")
 
@@ -37,4 +97,4 @@ def main():
         print(f"An unexpected error occurred: {e}")
 
 if __name__ == '__main__':
-    main()
+    sys.exit(main())
@@ -0,0 +1,25 @@
+from pydantic import BaseModel, Field
+from typing import List, Dict, Any, Optional
+
+class MessageRequest(BaseModel):
+    content: str = Field(..., min_length=1)
+
+class SessionState(BaseModel):
+    session_id: str
+    current_state: str
+    conversation_history: List[Dict[str, Any]] = Field(default_factory=list)
+    hypothesis_drafts: List[Dict[str, Any]] = Field(default_factory=list)
+    message_count: int = 0
+    final_hypothesis_id: Optional[str] = None
+    duplicate_of: Optional[str] = None
+
+class MessageResponse(BaseModel):
+    session_id: str
+    response: str
+    current_state: str
+
+class FinalizeResponse(BaseModel):
+    session_id: str
+    current_state: str
+    final_hypothesis_id: Optional[str] = None
+    duplicate_of: Optional[str] = None
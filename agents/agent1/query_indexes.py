@@ -0,0 +1,171 @@
+"""
+Secondary indexes and cursor pagination for reading sessions and hypotheses back.
+
+Every read query of the query API (see SessionManager.list_sessions_by_state and
+friends) is one IndexSpec: a filter on one field, equality or array membership,
+ordered by a second field. Each spec corresponds to
+
+- a composite index in Firestore, declared in firestore.indexes.json at the
+  repository root (regenerate it with `python -m agents.agent1.query_indexes`);
+- an index range scan in the SQLite backend, which keeps an entry per indexed
+  document in its index_entries table (see sqlite_store.py).
+
+Results are returned a Page at a time. A Page's next_cursor is an opaque string
+holding the ordered field value and document ID of the last item, so the next
+page starts right after it instead of skipping over everything read before.
+"""
+import base64
+import binascii
+import json
+from datetime import datetime
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+class IndexSpec:
+    """A query shape backed by a composite index: filter on `field`, ordered by `order_field`, then document ID."""
+    __slots__ = ('collection', 'field', 'order_field', 'array', 'descending')
+
+    def __init__(self, collection: str, field: str, order_field: str, array: bool = False, descending: bool = True):
+        """
+        Args:
+            collection (str): Top-level collection the index covers.
+            field (str): Filtered field, compared with '==' or, if array is True, 'array_contains'.
+            order_field (str): Field the results are ordered by.
+            array (bool): Whether `field` holds a list.
+            descending (bool): Newest (largest) first.
+        """
+        self.collection = collection
+        self.field = field
+        self.order_field = order_field
+        self.array = array
+        self.descending = descending
+
+    @property
+    def name(self) -> str:
+        return f"{self.collection}.{self.field}.{self.order_field}"
+
+    @property
+    def operator(self) -> str:
+        return 'array_contains' if self.array else '=='
+
+    @property
+    def direction(self) -> str:
+        return 'DESCENDING' if self.descending else 'ASCENDING'
+
+    def query(self, db, value, cursor=None, limit: int = None):
+        """
+        Builds the query for one page on a sync or async client.
+
+        Args:
+            value: The value `field` must equal (or contain).
+            cursor (tuple, optional): (order value, document ID) of the last item already returned.
+            limit (int, optional): Maximum number of documents.
+        """
+        collection = db.collection(self.collection)
+        query = collection.where(self.field, self.operator, value)
+        query = query.order_by(self.order_field, direction=self.direction).order_by('__name__', direction=self.direction)
+        if cursor is not None:
+            order_value, doc_id = cursor
+            query = query.start_after([order_value, collection.document(doc_id)])
+        if limit is not None:
+            query = query.limit(limit)
+        return query
+
+    def firestore_config(self) -> dict:
+        first = {'fieldPath': self.field}
+        first.update({'arrayConfig': 'CONTAINS'} if self.array else {'order': 'ASCENDING'})
+        return {
+            'collectionGroup': self.collection,
+            'queryScope': 'COLLECTION',
+            'fields': [first, {'fieldPath': self.order_field, 'order': self.direction}],
+        }
+
+
+def firestore_index_config(specs) -> dict:
+    """The firestore.indexes.json document declaring a composite index for every spec."""
+    return {'indexes': [spec.firestore_config() for spec in specs], 'fieldOverrides': []}
+
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return {'__datetime__': value.isoformat()}
+    raise TypeError(f"Cannot encode {type(value).__name__} in a cursor")
+
+
+def _decode_object(obj):
+    if len(obj) == 1 and '__datetime__' in obj:
+        return datetime.fromisoformat(obj['__datetime__'])
+    return obj
+
+
+def encode_cursor(order_value, doc_id: str) -> str:
+    """An opaque, URL-safe cursor for the position after one document."""
+    payload = json.dumps([order_value, doc_id], separators=(',', ':'), default=_encode_value)
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str):
+    """
+    Reverses encode_cursor.
+
+    Returns:
+        tuple or None: (order value, document ID), or None for no cursor.
+
+    Raises:
+        ValueError: If the cursor is malformed.
+    """
+    if not cursor:
+        return None
+    try:
+        payload = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        order_value, doc_id = json.loads(payload, object_hook=_decode_object)
+    except (binascii.Error, UnicodeDecodeError, ValueError, TypeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from e
+    if not isinstance(doc_id, str):
+        raise ValueError(f"Invalid cursor: {cursor!r}")
+    return order_value, doc_id
+
+
+def check_page_size(page_size: int) -> int:
+    if not 1 <= page_size <= MAX_PAGE_SIZE:
+        raise ValueError(f"page_size must be between 1 and {MAX_PAGE_SIZE}, got {page_size}")
+    return page_size
+
+
+class Page:
+    """One page of query results: documents as dicts with their 'id', and the cursor of the next page."""
+    __slots__ = ('items', 'next_cursor')
+
+    def __init__(self, items: list, next_cursor: str = None):
+        self.items = items
+        self.next_cursor = next_cursor
+
+    @classmethod
+    def from_snapshots(cls, spec: IndexSpec, snapshots: list, page_size: int):
+        """
+        Builds a page from up to page_size + 1 snapshots; the extra one only tells
+        whether there is a next page.
+        """
+        items = []
+        for snapshot in snapshots[:page_size]:
+            item = snapshot.to_dict() or {}
+            item['id'] = snapshot.id
+            items.append(item)
+        next_cursor = None
+        if len(snapshots) > page_size:
+            last = items[-1]
+            next_cursor = encode_cursor(last.get(spec.order_field), last['id'])
+        return cls(items, next_cursor)
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+
+if __name__ == '__main__':
+    from agents.agent1.session_manager import SECONDARY_INDEXES
+    print(json.dumps(firestore_index_config(SECONDARY_INDEXES), indent=2))
@@ -0,0 +1,198 @@
+"""
+Compact in-memory records for conversation messages and hypothesis drafts.
+
+A session's conversation history used to be a list of {"role", "content"} dicts
+and its drafts {"id", "text"} dicts. A two-key dict costs about 180 bytes before
+its values; with thousands of live sessions per process (agents, session cache,
+registry) that overhead dominates. Message and Draft keep the same fields in
+__slots__ instead (no per-instance dict), roles are interned so every message of
+a role shares one string, and a draft's appended elaborations are kept as a list
+of fragments that is joined once when the text is read, instead of re-copying
+the whole text on every `+=`.
+
+Both are read-only (Message) or mutable (Draft) Mappings that compare equal to the
+dicts they replace, so code reading message["role"] or draft.get("text") is
+unaffected, and str() of a record is str() of that dict, so text formatted from
+one (such as Agent1's draft reply) reads as before. Anything that leaves the
+process, Firestore documents, spool records and JSON, goes through to_primitive()
+(or dict(record)), which yields the original dict shape. Records with other keys, such as compaction summaries, stay
+plain dicts.
+"""
+import sys
+from collections.abc import Mapping, MutableMapping
+
+MESSAGE_KEYS = ('role', 'content')
+DRAFT_KEYS = ('id', 'text')
+
+
+class Message(Mapping):
+    """An immutable conversation message; behaves like {"role": ..., "content": ...}."""
+    __slots__ = ('role', 'content')
+
+    def __init__(self, role: str, content: str):
+        object.__setattr__(self, 'role', sys.intern(role))
+        object.__setattr__(self, 'content', content)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Message is immutable")
+
+    def __getitem__(self, key):
+        if key == 'role':
+            return self.role
+        if key == 'content':
+            return self.content
+        raise KeyError(key)
+
+    def __iter__(self):
+        return iter(MESSAGE_KEYS)
+
+    def __len__(self):
+        return 2
+
+    def __eq__(self, other):
+        if isinstance(other, Message):
+            return self.role == other.role and self.content == other.content
+        return Mapping.__eq__(self, other)
+
+    def __hash__(self):
+        return hash((self.role, self.content))
+
+    def __reduce__(self):
+        return Message, (self.role, self.content)
+
+    def __repr__(self):
+        return f"Message(role={self.role!r}, content={self.content!r})"
+
+    def __str__(self):
+        return str(self.to_dict())
+
+    def to_dict(self) -> dict:
+        return {'role': self.role, 'content': self.content}
+
+
+class Draft(MutableMapping):
+    """
+    A hypothesis draft; behaves like {"id": ..., "text": ...} plus any other stored keys.
+
+    append_text() adds to the text without copying it; the fragments are joined the
+    next time the text is read.
+    """
+    __slots__ = ('id', '_text', '_tail', '_extra')
+
+    def __init__(self, id: str, text: str = '', extra: dict = None):
+        self.id = id
+        self._text = text
+        self._tail = None   # fragments appended since the text was last read
+        self._extra = extra or None
+
+    @property
+    def text(self) -> str:
+        if self._tail:
+            self._text = ''.join([self._text] + self._tail)
+            self._tail = None
+        return self._text
+
+    @text.setter
+    def text(self, value: str):
+        self._text = value
+        self._tail = None
+
+    def append_text(self, fragment: str):
+        if self._tail is None:
+            self._tail = [fragment]
+        else:
+            self._tail.append(fragment)
+
+    def __getitem__(self, key):
+        if key == 'id':
+            return self.id
+        if key == 'text':
+            return self.text
+        if self._extra is not None and key in self._extra:
+            return self._extra[key]
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        if key == 'id':
+            self.id = value
+        elif key == 'text':
+            self.text = value
+        else:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[key] = value
+
+    def __delitem__(self, key):
+        if key in DRAFT_KEYS or self._extra is None or key not in self._extra:
+            raise KeyError(key)
+        del self._extra[key]
+
+    def __iter__(self):
+        yield from DRAFT_KEYS
+        if self._extra:
+            yield from self._extra
+
+    def __len__(self):
+        return 2 + (len(self._extra) if self._extra else 0)
+
+    def __reduce__(self):
+        return Draft, (self.id, self.text, dict(self._extra) if self._extra else None)
+
+    def __repr__(self):
+        return f"Draft({self.to_dict()!r})"
+
+    def __str__(self):
+        return str(self.to_dict())
+
+    def copy(self):
+        return Draft(self.id, self.text, dict(self._extra) if self._extra else None)
+
+    def to_dict(self) -> dict:
+        data = {'id': self.id, 'text': self.text}
+        if self._extra:
+            data.update(self._extra)
+        return data
+
+
+def to_message(message):
+    """A Message for a plain {"role", "content"} dict of strings; anything else is returned unchanged."""
+    if (type(message) is dict and len(message) == 2 and isinstance(message.get('role'), str)
+            and isinstance(message.get('content'), str)):
+        return Message(message['role'], message['content'])
+    return message
+
+
+def to_draft(draft):
+    """A Draft for a dict with string 'id' and 'text'; anything else is returned unchanged."""
+    if isinstance(draft, Draft):
+        return draft
+    if isinstance(draft, dict) and isinstance(draft.get('id'), str) and isinstance(draft.get('text'), str):
+        extra = {key: value for key, value in draft.items() if key not in DRAFT_KEYS}
+        return Draft(draft['id'], draft['text'], extra)
+    return draft
+
+
+def history_records(history) -> list:
+    """Converts a conversation history (as stored) into compact records."""
+    return [to_message(message) for message in history or []]
+
+
+def draft_records(drafts) -> list:
+    """Converts hypothesis drafts (as stored) into compact records."""
+    return [to_draft(draft) for draft in drafts or []]
+
+
+def copy_drafts(drafts) -> list:
+    """Independent copies of drafts, which unlike messages are mutable."""
+    return [draft.copy() if isinstance(draft, Draft) else dict(draft) for draft in drafts or []]
+
+
+def to_primitive(value):
+    """Recursively turns records back into the plain dicts and lists they stand for."""
+    if isinstance(value, (Message, Draft)):
+        return value.to_dict()
+    if isinstance(value, dict):
+        return {key: to_primitive(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_primitive(item) for item in value]
+    return value
@@ -0,0 +1,104 @@
+import threading
+import time
+from collections import OrderedDict
+
+from agents.agent1.records import copy_drafts
+
+
+def copy_session_state(state: dict) -> dict:
+    """Copies a session state dict deeply enough that the copy can be mutated independently."""
+    return {
+        'current_state': state.get('current_state'),
+        'conversation_history': list(state.get('conversation_history') or []),
+        'hypothesis_drafts': copy_drafts(state.get('hypothesis_drafts')),
+    }
+
+
+class SessionCache:
+    """
+    Bounded in-process LRU cache of hot sessions with an optional time-to-live.
+
+    Entries are the session state dicts produced by SessionManager.load_session
+    ('current_state', 'conversation_history', 'hypothesis_drafts'). Values are copied
+    on the way in and out so callers can keep mutating their own lists without
+    corrupting the cached copy. Hit, miss, eviction and expiration counters are kept
+    so the cache can be sized from production traffic.
+    """
+    def __init__(self, max_size: int = 1024, ttl: float = None, clock=time.monotonic):
+        """
+        Args:
+            max_size (int): Maximum number of sessions kept. 0 disables the cache.
+            ttl (float, optional): Seconds an entry stays valid after it was last written.
+                                   None means entries never expire.
+            clock (callable, optional): Monotonic time source, injectable for tests.
+        """
+        if max_size < 0:
+            raise ValueError("max_size must be >= 0")
+        self.max_size = max_size
+        self.ttl = ttl
+        self._clock = clock
+        self._entries = OrderedDict()  # session_id -> (expires_at, state)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, session_id: str):
+        """Returns a copy of the cached session state, or None on a miss or expired entry."""
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, state = entry
+            if expires_at is not None and self._clock() >= expires_at:
+                del self._entries[session_id]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(session_id)
+            self.hits += 1
+        return copy_session_state(state)
+
+    def put(self, session_id: str, state: dict):
+        """Stores a copy of the session state, evicting the least recently used entries if full."""
+        if self.max_size == 0:
+            return
+        state = copy_session_state(state)
+        expires_at = self._clock() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            self._entries[session_id] = (expires_at, state)
+            self._entries.move_to_end(session_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, session_id: str):
+        with self._lock:
+            self._entries.pop(session_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def __contains__(self, session_id):
+        with self._lock:
+            return session_id in self._entries
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+            }
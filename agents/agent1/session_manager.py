@@ -1,27 +1,568 @@
-from google.cloud import firestore
+import hashlib
+import json
+import logging
+import threading
+from collections import OrderedDict
 import uuid # For generating unique IDs if needed, though Firestore can auto-generate
 
-# Attempt to import the pre-initialized db client from firestore_client.py
-# This assumes firestore_client.py handles initialization and credential setup.
-# In a production scenario, credential management would be more robust.
-try:
-    from agents.agent1.firestore_client import db
-except ImportError:
-    print("Warning: Could not import 'db' from agents.agent1.firestore_client. Initializing a new client.")
-    # Fallback to initialize a new client if 'db' is not available.
-    # This will likely fail without proper ADC setup, as seen in the previous subtask.
-    try:
-        db = firestore.Client()
-        print("Fallback Firestore client initialized.")
-    except Exception as e:
-        db = None
-        print(f"Error initializing fallback Firestore client: {e}")
+# The Firestore client is created lazily by client_provider.get_client() the first time a
+# SessionManager needs it, so importing this module never touches Google credentials.
+from agents.agent1 import firestore_client as client_provider
+from agents.agent1.compaction import split_history
+from agents.agent1.dedup_index import DUPLICATE_OF_FIELD, SIGNATURE_FIELD, NearDuplicateIndex
+from agents.agent1.query_indexes import DEFAULT_PAGE_SIZE, IndexSpec, Page, check_page_size, decode_cursor
+from agents.agent1.records import copy_drafts, draft_records, history_records, to_message, to_primitive
+from agents.agent1.session_cache import SessionCache, copy_session_state
+from agents.agent1.session_spool import SessionSpool, SpoolReplayer
+from agents.common.structured_logging import log_event
+
+logger = logging.getLogger(__name__)
+
+SESSIONS_COLLECTION = u'hypothesis_sessions'
+MESSAGES_SUBCOLLECTION = u'messages'
+FINALIZED_HYPOTHESES_COLLECTION = u'finalized_hypotheses'
+
+# 'full' rewrites the whole history on every update (original behaviour).
+# 'append' writes only messages that have not been persisted yet.
+PERSISTENCE_MODES = ('full', 'append')
+
+# 'sync' commits every update before update_session returns (original behaviour).
+# 'interval' buffers updates and flushes them from a background thread every
+#            flush_interval seconds, or earlier once max_pending sessions are buffered.
+# 'batch' buffers updates and only flushes once max_pending sessions are buffered,
+#         when a hypothesis is finalized, or when flush() is called.
+# 'spool' appends updates and finalized hypotheses to a durable local log (see
+#         session_spool.py) that a background thread replays to Firestore, so they
+#         survive store outages and process restarts.
+DURABILITY_MODES = ('sync', 'interval', 'batch', 'spool')
+
+# Firestore rejects batched writes with more than 500 operations.
+MAX_BATCH_WRITES = 500
+
+# Secondary indexes behind the query API (see query_indexes.py). Keep firestore.indexes.json
+# in sync with them: python -m agents.agent1.query_indexes > firestore.indexes.json
+HYPOTHESES_BY_SESSION = IndexSpec(FINALIZED_HYPOTHESES_COLLECTION, u'session_id', u'saved_at')
+HYPOTHESES_BY_VARIABLE = IndexSpec(FINALIZED_HYPOTHESES_COLLECTION, u'independent_variables', u'saved_at', array=True)
+SESSIONS_BY_STATE = IndexSpec(SESSIONS_COLLECTION, u'current_state', u'last_updated')
+SECONDARY_INDEXES = (HYPOTHESES_BY_SESSION, HYPOTHESES_BY_VARIABLE, SESSIONS_BY_STATE)
+
+
+def message_doc_id(seq: int) -> str:
+    """Zero-padded document ID so that message documents sort by sequence number."""
+    return f"{seq:010d}"
+
+
+def final_hypothesis_doc_id(session_id: str, final_hypothesis: dict) -> str:
+    """
+    Content-addressed document ID for a finalized hypothesis.
+
+    The same session saving the same hypothesis always maps to the same document, so
+    repeated saves can use create-if-absent instead of adding duplicates.
+    """
+    canonical = json.dumps(final_hypothesis, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(f"{session_id}\n{canonical}".encode('utf-8')).hexdigest()[:32]
+
+
+class SavedHypothesisIds:
+    """
+    Bounded, thread-safe record of final-hypothesis IDs this process already stored,
+    each with the ID of the hypothesis it nearly duplicates, if any.
+    """
+
+    def __init__(self, max_size: int = 10000):
+        self.max_size = max_size
+        self._ids = OrderedDict()  # doc_id -> duplicate_of
+        self._lock = threading.Lock()
+
+    def __contains__(self, doc_id):
+        with self._lock:
+            if doc_id in self._ids:
+                self._ids.move_to_end(doc_id)
+                return True
+            return False
+
+    def duplicate_of(self, doc_id):
+        """The ID a stored hypothesis nearly duplicates, or None (also if doc_id is unknown)."""
+        with self._lock:
+            return self._ids.get(doc_id)
+
+    def add(self, doc_id, duplicate_of: str = None):
+        with self._lock:
+            self._ids[doc_id] = duplicate_of
+            self._ids.move_to_end(doc_id)
+            while len(self._ids) > self.max_size:
+                self._ids.popitem(last=False)
+
+
+def draft_digest(draft) -> str:
+    """Short digest of a draft's content, which append mode compares to find the drafts that changed."""
+    canonical = json.dumps(to_primitive(draft), sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.blake2b(canonical.encode('utf-8'), digest_size=16).hexdigest()
+
+
+def normalize_variable(name) -> str:
+    """Lowercases a variable name and collapses its whitespace, so lookups ignore case and spacing."""
+    return ' '.join(str(name).lower().split())
+
+
+def independent_variables(final_hypothesis: dict) -> list:
+    """
+    The normalized independent variables of a hypothesis, from its 'key_variables' (structured
+    hypotheses) or its 'independent_variable' component (';'-separated), without duplicates.
+    """
+    key_variables = final_hypothesis.get('key_variables')
+    names = key_variables.get('independent') if isinstance(key_variables, dict) else final_hypothesis.get('independent_variable')
+    if isinstance(names, str):
+        names = names.split(';')
+    variables = []
+    for name in names if isinstance(names, list) else []:
+        variable = normalize_variable(name)
+        if variable and variable not in variables:
+            variables.append(variable)
+    return variables
+
+
+def final_hypothesis_record(session_id: str, final_hypothesis: dict, saved_at, signature=None,
+                            duplicate_of: str = None) -> dict:
+    """
+    The document stored in the 'finalized_hypotheses' collection, with its MinHash signature
+    if given, the ID of the hypothesis it nearly duplicates if any, and its independent
+    variables, indexed for list_hypotheses_by_variable, if any.
+    """
+    record = {
+        u'session_id': session_id,
+        u'hypothesis_content': final_hypothesis,
+        u'saved_at': saved_at
+    }
+    variables = independent_variables(final_hypothesis)
+    if variables:
+        record[u'independent_variables'] = variables
+    if signature is not None:
+        record[SIGNATURE_FIELD] = list(signature)
+    if duplicate_of is not None:
+        record[DUPLICATE_OF_FIELD] = duplicate_of
+    return record
+
+
+class SessionWritePlanner:
+    """
+    Turns session updates into Firestore document writes, and stored documents back
+    into session state, for one persistence mode.
+
+    It holds the append-mode bookkeeping (how many messages of each session are already
+    stored, and a digest of each draft as last written) but performs no I/O itself, so
+    the blocking SessionManager and the AsyncSessionManager share it.
+
+    The bookkeeping is kept for at most max_sessions sessions, least recently used
+    first out. A session without bookkeeping is simply rewritten from its first message
+    on its next update, which is idempotent.
+    """
+    def __init__(self, persistence_mode: str = 'full', max_sessions: int = 10000):
+        if persistence_mode not in PERSISTENCE_MODES:
+            raise ValueError(f"persistence_mode must be one of {PERSISTENCE_MODES}, got '{persistence_mode}'")
+        self.persistence_mode = persistence_mode
+        self.max_sessions = max_sessions
+        self._persisted = OrderedDict()  # session_id -> (message_count, draft digests)
+        self._lock = threading.Lock()
+
+    def plan(self, db, session_id: str, conversation_history: list, current_state: str, hypothesis_drafts: list, timestamp):
+        """
+        Builds the document writes for one session update.
+
+        In 'full' mode this is a single merge of the whole session into the session
+        document. In 'append' mode, new messages are written as individual documents in
+        'hypothesis_sessions/{session_id}/messages', keyed by their sequence number, and
+        the session document only receives the current state, the message count and the
+        drafts that changed, stored as a map keyed by draft index so that Firestore
+        merges them into the existing drafts. The bytes written per turn therefore no
+        longer depend on the length of the conversation.
+
+        A compacted history (see compaction.py) starts with a summary record. In
+        'append' mode that record goes to the session document and the messages after
+        it are numbered from its folded_messages count, so compaction never rewrites or
+        renumbers stored messages.
+
+        Args:
+            db: A sync or async Firestore client; only its (synchronous) reference builders are used.
+            timestamp: The SERVER_TIMESTAMP sentinel of that client.
+
+        Returns:
+            tuple: (writes, persisted) where writes is a list of (doc_ref, data, merge)
+                   tuples and persisted is the append-mode bookkeeping to record with
+                   mark_persisted once the writes are committed (None in 'full' mode).
+        """
+        session_doc_ref = db.collection(SESSIONS_COLLECTION).document(session_id)
+
+        if self.persistence_mode == 'full':
+            session_data = {
+                u'conversation_history': to_primitive(conversation_history),
+                u'current_state': current_state,
+                u'hypothesis_drafts': to_primitive(hypothesis_drafts),
+                u'last_updated': timestamp
+            }
+            return [(session_doc_ref, session_data, True)], None
+
+        delta, persisted = self.append_delta(session_id, conversation_history, current_state, hypothesis_drafts)
+        return self.delta_writes(db, session_id, delta, timestamp), persisted
+
+    def append_delta(self, session_id: str, conversation_history: list, current_state: str, hypothesis_drafts: list):
+        """
+        What an 'append' mode update adds to the stored session, as plain data.
+
+        Returns:
+            tuple: (delta, persisted) where delta is {'messages': [...], 'session': {...}}:
+                   the new messages, each with its 'seq', and the session document fields
+                   to merge, without 'last_updated'. persisted is as for plan().
+        """
+        summary, messages = split_history(conversation_history)
+        offset = summary.get(u'folded_messages', 0) if summary else 0
+        with self._lock:
+            start, previous_digests = self._persisted.get(session_id, (0, ()))
+        if start > offset + len(messages):
+            # History is shorter than what we stored (e.g. caller reset it); rewrite from the start.
+            start = 0
+        # Messages folded before they were ever written only survive in the summary.
+        start = max(start, offset)
+        new_messages = messages[start - offset:]
+
+        digests = tuple(draft_digest(draft) for draft in hypothesis_drafts)
+        changed_drafts = {
+            str(index): to_primitive(draft)
+            for index, draft in enumerate(hypothesis_drafts)
+            if index >= len(previous_digests) or previous_digests[index] != digests[index]
+        }
+
+        session_data = {
+            u'current_state': current_state,
+            u'message_count': start + len(new_messages),
+            u'draft_count': len(hypothesis_drafts),
+            u'persistence_mode': u'append'
+        }
+        if changed_drafts:
+            session_data[u'hypothesis_drafts'] = changed_drafts
+        if summary:
+            session_data[u'conversation_summary'] = summary
+        delta = {
+            'messages': [dict(message, seq=start + index) for index, message in enumerate(new_messages)],
+            'session': session_data
+        }
+        return delta, (start + len(new_messages), digests)
+
+    @staticmethod
+    def delta_writes(db, session_id: str, delta: dict, timestamp) -> list:
+        """The (doc_ref, data, merge) writes that store a delta from append_delta()."""
+        session_doc_ref = db.collection(SESSIONS_COLLECTION).document(session_id)
+        messages_ref = session_doc_ref.collection(MESSAGES_SUBCOLLECTION)
+        writes = [(messages_ref.document(message_doc_id(message[u'seq'])), message, False)
+                  for message in delta['messages']]
+        writes.append((session_doc_ref, dict(delta['session'], last_updated=timestamp), True))
+        return writes
+
+    @staticmethod
+    def merge_delta(delta: dict, newer: dict) -> dict:
+        """
+        Combines two append-mode deltas (or stored documents and a delta) the way the
+        store would after writing both: messages by 'seq', drafts by index, and the
+        newer session fields over the older ones.
+        """
+        session = dict(delta['session'])
+        for key, value in newer['session'].items():
+            if key == u'hypothesis_drafts' and isinstance(session.get(key), dict):
+                value = dict(session[key], **value)
+            session[key] = value
+        messages = {message[u'seq']: message for message in delta['messages']}
+        messages.update((message[u'seq'], message) for message in newer['messages'])
+        return {'messages': [messages[seq] for seq in sorted(messages)], 'session': session}
+
+    @staticmethod
+    def delta_is_complete(delta: dict) -> bool:
+        """True if a (merged) delta holds every message and draft of the session, so it needs no stored base."""
+        session = delta['session']
+        if u'message_count' not in session:
+            return False
+        summary = session.get(u'conversation_summary')
+        offset = summary.get(u'folded_messages', 0) if summary else 0
+        seqs = {message[u'seq'] for message in delta['messages']}
+        drafts = session.get(u'hypothesis_drafts') or {}
+        return (all(seq in seqs for seq in range(offset, session[u'message_count']))
+                and all(str(index) in drafts for index in range(session.get(u'draft_count', 0))))
+
+    def mark_persisted(self, session_id: str, persisted):
+        """Records append-mode bookkeeping after the writes from plan() were committed."""
+        if persisted is None:
+            return
+        with self._lock:
+            self._persisted[session_id] = persisted
+            self._persisted.move_to_end(session_id)
+            while len(self._persisted) > self.max_sessions:
+                self._persisted.popitem(last=False)
+
+    def forget(self, session_id: str):
+        """Drops the append-mode bookkeeping of a session; its next update rewrites it from the first message."""
+        with self._lock:
+            self._persisted.pop(session_id, None)
+
+    def state_from_documents(self, session_id: str, session_data: dict, messages: list = None) -> dict:
+        """
+        Rebuilds session state from a stored session document.
+
+        Args:
+            session_data (dict): The session document.
+            messages (list, optional): The 'messages' subcollection documents in sequence
+                                       order, for sessions written in 'append' mode.
+        """
+        if session_data.get(u'persistence_mode') != u'append':
+            return {
+                'current_state': session_data.get(u'current_state'),
+                'conversation_history': history_records(session_data.get(u'conversation_history')),
+                'hypothesis_drafts': draft_records(session_data.get(u'hypothesis_drafts'))
+            }
+
+        summary = session_data.get(u'conversation_summary')
+        offset = summary.get(u'folded_messages', 0) if summary else 0
+        history = [dict(summary)] if summary else []
+        # Like draft_count for drafts, message_count trims documents left over from a longer,
+        # since rewritten history.
+        message_count = session_data.get(u'message_count')
+        for message in messages or []:
+            message = dict(message)
+            seq = message.pop(u'seq', offset)
+            if seq < offset or (message_count is not None and seq >= message_count):
+                continue
+            history.append(to_message(message))
+
+        # Drafts are stored as a map keyed by index; draft_count trims entries beyond the current list.
+        drafts_map = session_data.get(u'hypothesis_drafts', {}) or {}
+        draft_count = session_data.get(u'draft_count', len(drafts_map))
+        drafts = [drafts_map[key] for key in sorted(drafts_map, key=int) if int(key) < draft_count]
+
+        # Seed the append bookkeeping so the next update only writes new messages.
+        stored_messages = offset + len(history) - (1 if summary else 0)
+        self.mark_persisted(session_id, (stored_messages, tuple(draft_digest(draft) for draft in drafts)))
+        return {
+            'current_state': session_data.get(u'current_state'),
+            'conversation_history': history,
+            'hypothesis_drafts': draft_records(drafts)
+        }
+
+
+class FinalHypothesisPlanner:
+    """
+    Decides what saving a finalized hypothesis writes, for SessionManager and
+    AsyncSessionManager alike.
+
+    Like SessionWritePlanner it performs no I/O: it checks the arguments, derives the
+    content-addressed document ID, runs the near-duplicate check and remembers the IDs
+    this process already stored. The managers only create the document and, if a
+    dedup index is used, fill it (load_dedup_index) before calling plan().
+    """
+    def __init__(self, dedup_index: NearDuplicateIndex = None):
+        self.dedup_index = dedup_index
+        self._saved_ids = SavedHypothesisIds()
+
+    @staticmethod
+    def check(session_id: str, final_hypothesis: dict) -> bool:
+        """Logs and returns False if the arguments of save_final_hypothesis are invalid."""
+        if not session_id:
+            logger.error("session_id must be provided for save_final_hypothesis.")
+            return False
+        if not final_hypothesis or not isinstance(final_hypothesis, dict):
+            logger.error("final_hypothesis must be a non-empty dictionary.")
+            return False
+        return True
+
+    def plan(self, session_id: str, final_hypothesis: dict, timestamp):
+        """
+        Builds the document for one save.
+
+        A near-duplicate of a stored hypothesis is still stored under its own ID, with a
+        'duplicate_of' link to that hypothesis, but is not added to the dedup index. Once
+        saved(), the link is also available from duplicate_of(doc_id).
+
+        Args:
+            timestamp: The SERVER_TIMESTAMP sentinel of the client that will write it.
+
+        Returns:
+            tuple: (doc_id, record, signature). record is the document to create under
+                   doc_id, or None if doc_id is stored already; signature is what saved()
+                   adds to the dedup index.
+        """
+        doc_id = final_hypothesis_doc_id(session_id, final_hypothesis)
+        if doc_id in self._saved_ids:
+            return doc_id, None, None
+
+        signature = None
+        if self.dedup_index is not None:
+            try:
+                signature = self.dedup_index.signature(final_hypothesis)
+                matches = self.dedup_index.query(signature, exclude=doc_id)
+            except Exception as e:
+                logger.error(f"Error checking near-duplicates of the hypothesis for session '{session_id}': {e}")
+                matches = []
+            if matches:
+                duplicate_id, similarity = matches[0]
+                log_event(logger, logging.INFO, "hypothesis.near_duplicate", session_id=session_id,
+                          doc_id=doc_id, duplicate_of=duplicate_id, similarity=similarity)
+                return doc_id, final_hypothesis_record(session_id, final_hypothesis, timestamp, signature,
+                                                       duplicate_of=duplicate_id), None
+
+        return doc_id, final_hypothesis_record(session_id, final_hypothesis, timestamp, signature), signature
+
+    def duplicate_of(self, doc_id: str):
+        """The ID of the hypothesis that a hypothesis saved by this process nearly duplicates, or None."""
+        return self._saved_ids.duplicate_of(doc_id)
+
+    def saved(self, session_id: str, doc_id: str, record: dict, signature, error: Exception = None) -> bool:
+        """
+        Records the outcome of creating the document from plan().
+
+        Args:
+            record (dict): The document from plan().
+            error (Exception, optional): What the create raised, if anything.
+
+        Returns:
+            bool: True if the hypothesis is stored, by this save or an earlier one.
+        """
+        if error is not None:
+            if not client_provider.is_already_exists(error):
+                logger.error(f"Error saving finalized hypothesis for session '{session_id}': {error}")
+                return False
+            log_event(logger, logging.INFO, "hypothesis.already_saved", session_id=session_id, doc_id=doc_id)
+        else:
+            log_event(logger, logging.INFO, "hypothesis.saved", session_id=session_id, doc_id=doc_id)
+        self._saved_ids.add(doc_id, record.get(DUPLICATE_OF_FIELD))
+        if self.dedup_index is not None:
+            self.dedup_index.add(doc_id, signature)
+        return True
+
+
+class WriteBehindBuffer:
+    """
+    Buffers session updates in memory and group-commits them off the request path.
+
+    Updates are coalesced per session: only the latest snapshot of each session is
+    kept, so a session that changes ten times between flushes costs one write. A
+    daemon thread performs the flushes, so callers of put() never wait on the network;
+    only an explicit flush() is synchronous. Snapshots whose commit fails are put back
+    into the buffer unless a newer snapshot of the same session has arrived meanwhile.
+    """
+    def __init__(self, commit_fn, durability: str = 'interval', max_pending: int = 100, flush_interval: float = 1.0):
+        """
+        Args:
+            commit_fn (callable): Called with an ordered dict {session_id: snapshot};
+                                  returns the list of session IDs that failed to commit.
+            durability (str): 'interval' or 'batch', see DURABILITY_MODES.
+            max_pending (int): Number of buffered sessions that triggers a background flush.
+            flush_interval (float): Seconds between background flushes in 'interval' mode.
+        """
+        if durability not in ('interval', 'batch'):
+            raise ValueError(f"Write-behind durability must be 'interval' or 'batch', got '{durability}'")
+        self._commit_fn = commit_fn
+        self.durability = durability
+        self.max_pending = max(1, max_pending)
+        self.flush_interval = flush_interval
+
+        self._pending = OrderedDict()
+        self._lock = threading.Lock()        # guards _pending and the counters
+        self._flush_lock = threading.Lock()  # serializes commits so per-session order is kept
+        self._wakeup = threading.Event()
+        self._closed = False
+        self._counters = {'updates': 0, 'coalesced': 0, 'flushes': 0, 'sessions_flushed': 0, 'failures': 0}
+
+        self._thread = threading.Thread(target=self._run, name='session-write-behind', daemon=True)
+        self._thread.start()
+
+    def put(self, session_id: str, snapshot):
+        """Buffers the latest snapshot of a session. Never blocks on I/O."""
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("WriteBehindBuffer is closed.")
+            self._counters['updates'] += 1
+            if session_id in self._pending:
+                self._counters['coalesced'] += 1
+                self._pending.move_to_end(session_id)
+            self._pending[session_id] = snapshot
+            if len(self._pending) >= self.max_pending:
+                self._wakeup.set()
+
+    def flush(self, session_ids: list = None) -> bool:
+        """
+        Commits buffered snapshots on the calling thread.
+
+        Args:
+            session_ids (list, optional): Only flush these sessions. If None, flush everything.
+
+        Returns:
+            bool: True if every flushed session was committed.
+        """
+        with self._flush_lock:
+            with self._lock:
+                if session_ids is None:
+                    snapshots, self._pending = self._pending, OrderedDict()
+                else:
+                    snapshots = OrderedDict(
+                        (session_id, self._pending.pop(session_id))
+                        for session_id in session_ids if session_id in self._pending
+                    )
+            if not snapshots:
+                return True
+
+            failed = self._commit_fn(snapshots)
+
+            with self._lock:
+                self._counters['flushes'] += 1
+                self._counters['sessions_flushed'] += len(snapshots) - len(failed)
+                self._counters['failures'] += len(failed)
+                for session_id in failed:
+                    # Keep a newer snapshot if one was buffered while we were committing.
+                    if session_id not in self._pending:
+                        self._pending[session_id] = snapshots[session_id]
+            return not failed
+
+    def peek(self, session_id: str):
+        """Returns the buffered snapshot of a session without removing it, or None."""
+        with self._lock:
+            return self._pending.get(session_id)
+
+    def pending_count(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self._counters, pending=len(self._pending))
+
+    def close(self):
+        """Stops the flusher thread and commits whatever is still buffered."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        self._wakeup.set()
+        self._thread.join()
+        self.flush()
+
+    def _run(self):
+        timeout = self.flush_interval if self.durability == 'interval' else None
+        while True:
+            self._wakeup.wait(timeout)
+            self._wakeup.clear()
+            if self._closed:
+                return
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Error in session write-behind flusher: {e}", exc_info=True)
+
 
 class SessionManager:
     """
     Manages user sessions, conversation history, and finalized hypotheses using Firestore.
     """
-    def __init__(self, project_id: str = None, firestore_client=None):
+    def __init__(self, project_id: str = None, firestore_client=None, persistence_mode: str = 'full',
+                 durability: str = 'sync', max_pending: int = 100, flush_interval: float = 1.0,
+                 cache_size: int = 1024, cache_ttl: float = None, dedup_index: NearDuplicateIndex = None,
+                 spool_path: str = None):
         """
         Initializes the SessionManager.
 
@@ -29,27 +570,96 @@ class SessionManager:
             project_id (str, optional): The Google Cloud project ID.
                                          If not provided, the client will try to infer it.
             firestore_client (firestore.Client, optional): An existing Firestore client instance.
-                                                           If None, a new client is initialized.
+                                                           If None, the shared client from
+                                                           firestore_client.get_client() is used,
+                                                           created on first use.
+            persistence_mode (str, optional): 'full' writes the complete conversation history
+                                              on every update. 'append' stores each message once
+                                              in a per-session 'messages' subcollection and only
+                                              writes what changed since the last update.
+            durability (str, optional): 'sync' commits every update before returning. 'interval'
+                                        and 'batch' enable the write-behind buffer: updates are
+                                        coalesced per session and group-committed from a background
+                                        thread (see DURABILITY_MODES for when each one flushes).
+                                        Buffered updates are lost if the process dies before a
+                                        flush, so call flush() or close() on shutdown. 'spool'
+                                        appends updates to a durable local log replayed to Firestore
+                                        in the background; nothing is lost, even when Firestore is
+                                        unavailable or the process restarts. With 'append'
+                                        persistence only the changes of each update are spooled.
+            max_pending (int, optional): Write-behind: buffered sessions that trigger a flush.
+                                         Spool: records replayed per batch.
+            flush_interval (float, optional): Write-behind: seconds between flushes in 'interval' mode.
+                                              Spool: longest wait between retries of a failed replay.
+            cache_size (int, optional): Number of hot sessions kept in the in-process LRU cache used
+                                        by load_session. 0 disables the cache.
+            cache_ttl (float, optional): Seconds a cached session stays valid after its last update.
+                                         None keeps entries until they are evicted.
+            dedup_index (NearDuplicateIndex, optional): When given, save_final_hypothesis checks it for a
+                                                        near-duplicate of the hypothesis and stores the
+                                                        hypothesis with a 'duplicate_of' link to it.
+                                                        It is filled from the collection on first use.
+                                                        With durability='spool' the check runs at replay.
+            spool_path (str, optional): Spool only. The log file, see session_spool.SessionSpool.
         """
-        if firestore_client:
-            self.db = firestore_client
-        elif db: # Use the imported db if available and no specific client is passed
-            self.db = db
-        else:
-            try:
-                # If no client was passed and the global 'db' is not available or failed
-                self.db = firestore.Client(project=project_id) if project_id else firestore.Client()
-                print("SessionManager initialized a new Firestore client.")
-            except Exception as e:
-                self.db = None
-                print(f"Error initializing Firestore client in SessionManager: {e}")
-                # Potentially raise the exception or handle it as per application requirements
-                # raise
+        if persistence_mode not in PERSISTENCE_MODES:
+            raise ValueError(f"persistence_mode must be one of {PERSISTENCE_MODES}, got '{persistence_mode}'")
+        if durability not in DURABILITY_MODES:
+            raise ValueError(f"durability must be one of {DURABILITY_MODES}, got '{durability}'")
+        self.persistence_mode = persistence_mode
+        self.durability = durability
 
-        if not self.db:
-            print("Error: SessionManager could not obtain a Firestore client. Operations will fail.")
-            # Depending on requirements, this could raise an exception.
-            # For now, it will allow object creation but operations will fail.
+        self._planner = SessionWritePlanner(persistence_mode)
+
+        self._hypotheses = FinalHypothesisPlanner(dedup_index)
+
+        self.cache = SessionCache(max_size=cache_size, ttl=cache_ttl)
+
+        self._project_id = project_id
+        self._db = firestore_client
+        self._db_resolved = firestore_client is not None
+
+        self._write_behind = None
+        if durability in ('interval', 'batch'):
+            self._write_behind = WriteBehindBuffer(
+                self._commit_snapshots, durability=durability,
+                max_pending=max_pending, flush_interval=flush_interval
+            )
+
+        self._spool = None
+        self._replayer = None
+        if durability == 'spool':
+            self._spool = SessionSpool(spool_path, merge_fn=SessionWritePlanner.merge_delta)
+            self._replayer = SpoolReplayer(self._spool, self._replay_spooled, batch_size=max_pending,
+                                           max_backoff=flush_interval)
+
+    @property
+    def db(self):
+        """The Firestore client, obtained from the shared provider on first access. None if unavailable."""
+        if not self._db_resolved:
+            self._db = client_provider.get_client(self._project_id)
+            self._db_resolved = True
+            if not self._db:
+                logger.error("SessionManager could not obtain a Firestore client. Operations will fail.")
+        return self._db
+
+    @db.setter
+    def db(self, client):
+        self._db = client
+        self._db_resolved = True
+
+    @property
+    def dedup_index(self):
+        """The NearDuplicateIndex checked by save_final_hypothesis, or None."""
+        return self._hypotheses.dedup_index
+
+    @property
+    def accepts_writes(self) -> bool:
+        """True if updates can be taken now: a spool is configured or a Firestore client is available."""
+        return self._spool is not None or bool(self.db)
+
+    def _server_timestamp(self):
+        return client_provider.server_timestamp(self.db)
 
     def update_session(self, session_id: str, conversation_history: list, current_state: str, hypothesis_drafts: list):
         """
@@ -64,66 +674,485 @@ class SessionManager:
         Returns:
             bool: True if the update was successful, False otherwise.
         """
-        if not self.db:
-            print("Error: Firestore client not available in SessionManager. Cannot update session.")
+        if self._spool is None and not self.db:
+            logger.error("Firestore client not available in SessionManager. Cannot update session.")
             return False
 
         if not session_id:
-            print("Error: session_id must be provided for update_session.")
+            logger.error("session_id must be provided for update_session.")
             return False
 
-        try:
-            session_doc_ref = self.db.collection(u'hypothesis_sessions').document(session_id)
-            session_data = {
-                u'conversation_history': conversation_history,
-                u'current_state': current_state,
-                u'hypothesis_drafts': hypothesis_drafts,
-                u'last_updated': firestore.SERVER_TIMESTAMP
-            }
-            session_doc_ref.set(session_data, merge=True)
-            print(f"Session '{session_id}' updated successfully in Firestore.")
+        self.cache.put(session_id, {
+            'current_state': current_state,
+            'conversation_history': conversation_history,
+            'hypothesis_drafts': hypothesis_drafts
+        })
+
+        if self._spool is not None:
+            if self.persistence_mode == 'append':
+                # Only what changed since the session's previous record; the replayer
+                # writes it as is, on top of the records before it.
+                delta, persisted = self._planner.append_delta(session_id, conversation_history, current_state,
+                                                              hypothesis_drafts)
+                if not self._spool_record(dict(delta, op='append', session_id=session_id)):
+                    return False
+                self._mark_persisted(session_id, persisted)
+                return True
+            # Snapshot the lists: the record is also kept in memory until it is replayed.
+            return self._spool_record({
+                'op': 'update',
+                'session_id': session_id,
+                'conversation_history': list(conversation_history),
+                'current_state': current_state,
+                'hypothesis_drafts': copy_drafts(hypothesis_drafts)
+            })
+
+        if self._write_behind is not None:
+            # Snapshot the mutable lists so later in-place edits by the caller do not leak into the buffer.
+            try:
+                self._write_behind.put(session_id, (
+                    list(conversation_history),
+                    current_state,
+                    copy_drafts(hypothesis_drafts)
+                ))
+            except RuntimeError as e:
+                logger.error(f"Error buffering update for session '{session_id}': {e}")
+                return False
             return True
+
+        try:
+            writes, persisted = self._session_writes(session_id, conversation_history, current_state, hypothesis_drafts)
+            if len(writes) == 1:
+                doc_ref, data, merge = writes[0]
+                doc_ref.set(data, merge=merge)
+            else:
+                self._commit_writes(writes)
+        except Exception as e:
+            logger.error(f"Error updating session '{session_id}' in Firestore: {e}")
+            return False
+
+        self._mark_persisted(session_id, persisted)
+        log_event(logger, logging.DEBUG, "session.updated", session_id=session_id, writes=len(writes))
+        return True
+
+    def _session_writes(self, session_id: str, conversation_history: list, current_state: str, hypothesis_drafts: list):
+        """Builds the document writes for one session update, see SessionWritePlanner.plan."""
+        return self._planner.plan(self.db, session_id, conversation_history, current_state,
+                                  hypothesis_drafts, self._server_timestamp())
+
+    def _mark_persisted(self, session_id: str, persisted):
+        """Records append-mode bookkeeping after the writes from _session_writes were committed."""
+        self._planner.mark_persisted(session_id, persisted)
+
+    def forget(self, session_id: str):
+        """
+        Drops the append-mode bookkeeping of a session that is no longer served from this
+        process. Its next update, if any, rewrites it from the first message.
+        """
+        self._planner.forget(session_id)
+
+    def _commit_writes(self, writes: list):
+        """Commits (doc_ref, data, merge) writes as batches of at most MAX_BATCH_WRITES."""
+        for chunk_start in range(0, len(writes), MAX_BATCH_WRITES):
+            batch = self.db.batch()
+            for doc_ref, data, merge in writes[chunk_start:chunk_start + MAX_BATCH_WRITES]:
+                if merge:
+                    batch.set(doc_ref, data, merge=True)
+                else:
+                    batch.set(doc_ref, data)
+            batch.commit()
+
+    def _commit_snapshots(self, snapshots: dict):
+        """
+        Group-commits buffered session snapshots from the write-behind buffer.
+
+        Sessions are packed into batches of at most MAX_BATCH_WRITES writes. A session
+        is never split across batches unless its own writes exceed the limit.
+
+        Returns:
+            list: The session IDs whose batch failed to commit.
+        """
+        failed = []
+        batch_writes, batch_sessions = [], []
+
+        def commit_batch():
+            try:
+                self._commit_writes(batch_writes)
+            except Exception as e:
+                logger.error(f"Error committing batched session updates to Firestore: {e}")
+                failed.extend(session_id for session_id, _ in batch_sessions)
+                return
+            for session_id, persisted in batch_sessions:
+                self._mark_persisted(session_id, persisted)
+
+        for session_id, (conversation_history, current_state, hypothesis_drafts) in snapshots.items():
+            try:
+                writes, persisted = self._session_writes(session_id, conversation_history, current_state, hypothesis_drafts)
+            except Exception as e:
+                logger.error(f"Error preparing batched update for session '{session_id}': {e}")
+                failed.append(session_id)
+                continue
+            if batch_writes and len(batch_writes) + len(writes) > MAX_BATCH_WRITES:
+                commit_batch()
+                batch_writes, batch_sessions = [], []
+            batch_writes.extend(writes)
+            batch_sessions.append((session_id, persisted))
+
+        if batch_writes:
+            commit_batch()
+        return failed
+
+    def _spool_record(self, record: dict) -> bool:
+        try:
+            self._spool.append(record)
         except Exception as e:
-            print(f"Error updating session '{session_id}' in Firestore: {e}")
+            logger.error(f"Error spooling {record['op']} for session '{record['session_id']}': {e}")
             return False
+        self._replayer.notify()
+        return True
+
+    def _replay_spooled(self, records: list) -> bool:
+        """
+        Stores a batch of spooled records for the SpoolReplayer, in order per session.
+
+        Consecutive updates of a session are coalesced: snapshots into the last one,
+        committed with _commit_snapshots, and append-mode deltas into one delta; a
+        finalized hypothesis is saved after the updates that preceded it.
+
+        Returns:
+            bool: True if every record was stored.
+        """
+        if not self.db:
+            return False
+        snapshots, deltas = OrderedDict(), OrderedDict()
+        for record in records:
+            session_id = record['session_id']
+            if record['op'] == 'update':
+                if session_id in deltas and not self._replay_updates(OrderedDict(), deltas, [session_id]):
+                    return False
+                snapshots.pop(session_id, None)
+                snapshots[session_id] = (record['conversation_history'], record['current_state'],
+                                         record['hypothesis_drafts'])
+                continue
+            if record['op'] == 'append':
+                if session_id in snapshots and not self._replay_updates(snapshots, OrderedDict(), [session_id]):
+                    return False
+                previous = deltas.get(session_id)
+                deltas[session_id] = record if previous is None else SessionWritePlanner.merge_delta(previous, record)
+                continue
+            if not self._replay_updates(snapshots, deltas, [session_id]):
+                return False
+            if self._store_final_hypothesis(session_id, record['final_hypothesis']) is None:
+                return False
+        return self._replay_updates(snapshots, deltas)
+
+    def _replay_updates(self, snapshots: OrderedDict, deltas: OrderedDict, session_ids: list = None) -> bool:
+        """Commits (and removes) the coalesced spooled updates of the given sessions, or of all of them."""
+        if session_ids is not None:
+            snapshots = OrderedDict((session_id, snapshots.pop(session_id))
+                                    for session_id in session_ids if session_id in snapshots)
+            deltas = OrderedDict((session_id, deltas.pop(session_id))
+                                 for session_id in session_ids if session_id in deltas)
+        if snapshots and self._commit_snapshots(snapshots):
+            return False
+        if deltas:
+            timestamp = self._server_timestamp()
+            writes = [write for session_id, delta in deltas.items()
+                      for write in SessionWritePlanner.delta_writes(self.db, session_id, delta, timestamp)]
+            try:
+                self._commit_writes(writes)
+            except Exception as e:
+                logger.error(f"Error replaying spooled session deltas to Firestore: {e}")
+                return False
+        return True
+
+    def flush(self, session_ids: list = None) -> bool:
+        """
+        Synchronously commits buffered write-behind updates, or replays the spool.
+
+        Args:
+            session_ids (list, optional): Only flush these sessions. If None, flush everything.
+                                          The spool is always replayed in full, in order.
+
+        Returns:
+            bool: True if nothing failed (or write-behind is disabled), False otherwise.
+        """
+        if self._replayer is not None:
+            return self._replayer.drain()
+        if self._write_behind is None:
+            return True
+        return self._write_behind.flush(session_ids)
+
+    def close(self):
+        """
+        Flushes any buffered updates and stops the write-behind flusher thread. With a spool,
+        makes a last attempt to replay it; whatever is left is replayed by the next process.
+        """
+        if self._write_behind is not None:
+            self._write_behind.close()
+        if self._replayer is not None:
+            self._replayer.close()
+            self._spool.close()
+
+    def write_behind_stats(self) -> dict:
+        """Returns the write-behind (or spool and replayer) counters, or an empty dict if neither is enabled."""
+        if self._spool is not None:
+            return dict(self._spool.stats(), **self._replayer.stats())
+        if self._write_behind is None:
+            return {}
+        return self._write_behind.stats()
+
+    def load_session(self, session_id: str):
+        """
+        Loads the state of a session so that a conversation can be resumed.
+
+        Hot sessions are served from the in-process SessionCache without a Firestore
+        read; updates still sitting in the write-behind buffer or the spool take
+        precedence over what is stored. On a cache miss the session is read from Firestore (the
+        'messages' subcollection for sessions written in 'append' mode) and cached.
+
+        Args:
+            session_id (str): The unique identifier for the session.
+
+        Returns:
+            dict or None: {'current_state', 'conversation_history', 'hypothesis_drafts'},
+                          or None if the session does not exist or could not be read.
+        """
+        if not session_id:
+            logger.error("session_id must be provided for load_session.")
+            return None
+
+        cached = self.cache.get(session_id)
+        if cached is not None:
+            return cached
+
+        state = None
+        if self._write_behind is not None:
+            pending = self._write_behind.peek(session_id)
+            if pending is not None:
+                conversation_history, current_state, hypothesis_drafts = pending
+                state = {
+                    'current_state': current_state,
+                    'conversation_history': conversation_history,
+                    'hypothesis_drafts': hypothesis_drafts
+                }
+        elif self._spool is not None:
+            record = self._spool.peek(session_id)
+            if record is not None:
+                try:
+                    state = self._spooled_state(session_id, record)
+                except Exception as e:
+                    logger.error(f"Error loading session '{session_id}' with its spooled updates: {e}")
+                    return None
+        if state is not None:
+            self.cache.put(session_id, state)
+            return copy_session_state(state)
+
+        if not self.db:
+            logger.error("Firestore client not available in SessionManager. Cannot load session.")
+            return None
+
+        try:
+            state = self._read_session(session_id)
+        except Exception as e:
+            logger.error(f"Error loading session '{session_id}' from Firestore: {e}")
+            return None
+        if state is None:
+            return None
+        self.cache.put(session_id, state)
+        return state
+
+    def _read_session(self, session_id: str):
+        """Reads a session from Firestore, rebuilding history and drafts for either persistence mode."""
+        documents = self._read_documents(session_id)
+        if documents is None:
+            return None
+        return self._planner.state_from_documents(session_id, *documents)
+
+    def _read_documents(self, session_id: str):
+        """The stored session document and, in 'append' mode, its messages; None if the session does not exist."""
+        session_doc_ref = self.db.collection(SESSIONS_COLLECTION).document(session_id)
+        snapshot = session_doc_ref.get()
+        if not snapshot.exists:
+            return None
+        session_data = snapshot.to_dict() or {}
+
+        messages = None
+        if session_data.get(u'persistence_mode') == u'append':
+            messages_query = session_doc_ref.collection(MESSAGES_SUBCOLLECTION).order_by(u'seq')
+            messages = [message_doc.to_dict() for message_doc in messages_query.stream()]
+        return session_data, messages
+
+    def _spooled_state(self, session_id: str, record: dict) -> dict:
+        """
+        The state of a session with its spooled, not yet replayed records applied.
+
+        Args:
+            record (dict): The session's pending records as merged by the spool (see SessionSpool.peek).
+
+        An append-mode delta that does not reach back to the start of the session is
+        applied on top of the stored documents, as the replayer will.
+        """
+        if record['op'] == 'update':
+            return {
+                'current_state': record['current_state'],
+                'conversation_history': history_records(record['conversation_history']),
+                'hypothesis_drafts': draft_records(record['hypothesis_drafts'])
+            }
+        delta = record
+        if not SessionWritePlanner.delta_is_complete(delta):
+            if not self.db:
+                raise RuntimeError("Firestore client not available to read the session the spooled updates apply to.")
+            documents = self._read_documents(session_id)
+            if documents is not None:
+                session_data, messages = documents
+                delta = SessionWritePlanner.merge_delta({'messages': messages or [], 'session': session_data}, delta)
+        return self._planner.state_from_documents(session_id, delta['session'], delta['messages'])
+
+    def load_conversation_history(self, session_id: str):
+        """
+        Rebuilds the conversation history of a session.
+
+        Works for both persistence modes: sessions written in 'append' mode are
+        read back from the 'messages' subcollection in sequence order, sessions
+        written in 'full' mode from the 'conversation_history' field.
+
+        Args:
+            session_id (str): The unique identifier for the session.
+
+        Returns:
+            list or None: The list of messages, or None if the session could not be read.
+        """
+        state = self.load_session(session_id)
+        return state['conversation_history'] if state is not None else None
+
+    def cache_stats(self) -> dict:
+        """Returns the hit/miss/eviction counters of the session cache."""
+        return self.cache.stats()
 
     def save_final_hypothesis(self, session_id: str, final_hypothesis: dict):
         """
         Saves a finalized hypothesis to the 'finalized_hypotheses' collection in Firestore.
-        A new document with an auto-generated ID is created for each hypothesis.
+
+        The document ID is derived from the session and the hypothesis content (see
+        final_hypothesis_doc_id) and the document is only created if absent, so saving
+        the same hypothesis again is a no-op: free if this manager saved it before,
+        a single rejected create otherwise.
 
         Args:
             session_id (str): The identifier of the session this hypothesis belongs to.
             final_hypothesis (dict): The finalized hypothesis data (JSON object).
 
         Returns:
-            str or None: The ID of the newly created document if successful, None otherwise.
+            str or None: The ID of the hypothesis document if it is stored, None otherwise.
+                         With durability='spool', the ID it is stored under once replayed.
         """
-        if not self.db:
-            print("Error: Firestore client not available in SessionManager. Cannot save hypothesis.")
+        if self._spool is None and not self.db:
+            logger.error("Firestore client not available in SessionManager. Cannot save hypothesis.")
             return None
 
-        if not session_id:
-            print("Error: session_id must be provided for save_final_hypothesis.")
+        if not FinalHypothesisPlanner.check(session_id, final_hypothesis):
             return None
 
-        if not final_hypothesis or not isinstance(final_hypothesis, dict):
-            print("Error: final_hypothesis must be a non-empty dictionary.")
-            return None
+        if self._spool is not None:
+            # The spool replays it after the session updates that precede it.
+            record = {'op': 'final', 'session_id': session_id, 'final_hypothesis': final_hypothesis}
+            return final_hypothesis_doc_id(session_id, final_hypothesis) if self._spool_record(record) else None
 
+        # Make sure the session document reflects the conversation that led to this hypothesis.
+        if not self.flush([session_id]):
+            logger.warning(f"Buffered updates for session '{session_id}' could not be flushed before finalization.")
+        return self._store_final_hypothesis(session_id, final_hypothesis)
+
+    def _store_final_hypothesis(self, session_id: str, final_hypothesis: dict):
+        """Writes a finalized hypothesis to Firestore unless it is stored already."""
+        if self.dedup_index is not None:
+            try:
+                self.load_dedup_index()
+            except Exception as e:
+                logger.error(f"Error loading the near-duplicate index: {e}")
+        doc_id, record, signature = self._hypotheses.plan(session_id, final_hypothesis, self._server_timestamp())
+        if record is None:
+            return doc_id
         try:
-            hypothesis_data = {
-                u'session_id': session_id,
-                u'hypothesis_content': final_hypothesis,
-                u'saved_at': firestore.SERVER_TIMESTAMP
-            }
-            # Add a new document with an auto-generated ID.
-            update_time, doc_ref = self.db.collection(u'finalized_hypotheses').add(hypothesis_data)
-            print(f"Finalized hypothesis for session '{session_id}' saved with ID '{doc_ref.id}'.")
-            return doc_ref.id
+            self.db.collection(FINALIZED_HYPOTHESES_COLLECTION).document(doc_id).create(record)
+        except Exception as e:
+            return doc_id if self._hypotheses.saved(session_id, doc_id, record, signature, e) else None
+        self._hypotheses.saved(session_id, doc_id, record, signature)
+        return doc_id
+
+    def duplicate_of(self, doc_id: str):
+        """
+        The ID of the stored hypothesis that the hypothesis saved as doc_id nearly duplicates,
+        as recorded in its 'duplicate_of' field, or None if it is an original.
+
+        Only known for hypotheses this manager saved; with durability='spool' the check
+        runs at replay, so it is None until then.
+        """
+        return self._hypotheses.duplicate_of(doc_id)
+
+    def list_hypotheses_for_session(self, session_id: str, page_size: int = DEFAULT_PAGE_SIZE, cursor: str = None):
+        """
+        Finalized hypotheses of a session, newest first.
+
+        Args:
+            session_id (str): The session.
+            page_size (int, optional): Hypotheses per page, at most query_indexes.MAX_PAGE_SIZE.
+            cursor (str, optional): next_cursor of the previous page.
+
+        Returns:
+            Page or None: The hypothesis documents with their 'id', or None if they could not be read.
+
+        Raises:
+            ValueError: If page_size is out of range or the cursor is malformed.
+        """
+        return self._query_page(HYPOTHESES_BY_SESSION, session_id, page_size, cursor)
+
+    def list_sessions_by_state(self, current_state: str, page_size: int = DEFAULT_PAGE_SIZE, cursor: str = None):
+        """
+        Sessions in a given current_state, most recently updated first.
+
+        Only committed updates are visible; with write-behind durability, call flush() first
+        to include buffered ones. Arguments, return value and errors as for list_hypotheses_for_session.
+        """
+        return self._query_page(SESSIONS_BY_STATE, current_state, page_size, cursor)
+
+    def list_hypotheses_by_variable(self, independent_variable: str, page_size: int = DEFAULT_PAGE_SIZE,
+                                    cursor: str = None):
+        """
+        Finalized hypotheses with this independent variable (case and spacing are ignored), newest
+        first. Arguments, return value and errors as for list_hypotheses_for_session.
+        """
+        return self._query_page(HYPOTHESES_BY_VARIABLE, normalize_variable(independent_variable), page_size, cursor)
+
+    def _query_page(self, spec: IndexSpec, value, page_size: int, cursor: str):
+        check_page_size(page_size)
+        position = decode_cursor(cursor)
+        if not self.db:
+            logger.error("Firestore client not available in SessionManager. Cannot run query.")
+            return None
+        try:
+            snapshots = list(spec.query(self.db, value, cursor=position, limit=page_size + 1).stream())
         except Exception as e:
-            print(f"Error saving finalized hypothesis for session '{session_id}': {e}")
+            logger.error(f"Error querying '{spec.collection}' by {spec.field} in Firestore: {e}")
             return None
+        return Page.from_snapshots(spec, snapshots, page_size)
+
+    def load_dedup_index(self) -> int:
+        """
+        Fills the near-duplicate index from the 'finalized_hypotheses' collection, once.
+
+        Returns:
+            int: The number of hypotheses in the index.
+        """
+        index = self.dedup_index
+        if index is None:
+            return 0
+        if not index.loaded:
+            for snapshot in self.db.collection(FINALIZED_HYPOTHESES_COLLECTION).stream():
+                index.add_document(snapshot.id, snapshot.to_dict() or {})
+            index.loaded = True
+        return len(index)
 
 if __name__ == '__main__':
     # This is example usage and will likely fail without Google Cloud authentication
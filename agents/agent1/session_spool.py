@@ -0,0 +1,367 @@
+"""
+Durable local spool for session writes, replayed to the store in the background.
+
+SessionManager(durability='spool') appends every session update and finalized
+hypothesis to a SessionSpool instead of writing to Firestore on the request path.
+With persistence_mode='append' an update record only carries what changed since
+the session's previous record (new messages, changed drafts), so the log grows
+with the conversation rather than with its square.
+The spool is an append-only log file with one record per line:
+
+    <crc32 of the JSON, 8 hex digits> <JSON record>\\n
+
+Appending is a buffered write plus an fsync shared by every appender that arrives
+while the previous fsync is running (group commit), so a turn costs one local fsync
+at most, however slow or unreachable the store is. A SpoolReplayer thread reads the
+log in order, hands the records to the manager a batch at a time and, once a batch
+is stored, records how far it got in a checkpoint file next to the log (<path>.ack).
+A batch that fails is retried with exponential backoff.
+
+After a crash or restart the log is replayed from the checkpoint. The checkpoint is
+only ever behind the log, never ahead of it, so records can be applied twice but
+never skipped; session updates carry the full session state or messages and drafts
+keyed by position, and hypotheses are created under content-addressed IDs, so
+applying a record twice is harmless. A torn
+last line from a crash mid-append fails its checksum and is cut off on open. The log
+is truncated once the replayer has caught up with it, or compacted once more than
+compact_bytes of it have been replayed.
+"""
+import json
+import logging
+import os
+import threading
+import zlib
+from collections.abc import Mapping
+from datetime import datetime
+
+PATH_ENV_VAR = "MARS_SPOOL_PATH"
+DEFAULT_PATH = "mars_sessions.spool"
+
+logger = logging.getLogger(__name__)
+
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return {"__datetime__": value.isoformat()}
+    if isinstance(value, Mapping):  # records.Message and records.Draft
+        return dict(value)
+    raise TypeError(f"Cannot spool {type(value).__name__}")
+
+
+def _decode_object(obj):
+    if len(obj) == 1 and "__datetime__" in obj:
+        return datetime.fromisoformat(obj["__datetime__"])
+    return obj
+
+
+def _frame(record: dict) -> bytes:
+    payload = json.dumps(record, separators=(',', ':'), default=_encode_value).encode('utf-8')
+    return b'%08x %s\n' % (zlib.crc32(payload), payload)
+
+
+def _unframe(line: bytes):
+    # Returns the record of one complete line, or None if it is torn or corrupt.
+    if len(line) < 10 or not line.endswith(b'\n') or line[8:9] != b' ':
+        return None
+    payload = line[9:-1]
+    try:
+        if int(line[:8], 16) != zlib.crc32(payload):
+            return None
+        return json.loads(payload, object_hook=_decode_object)
+    except ValueError:
+        return None
+
+
+class SessionSpool:
+    """
+    Append-only, fsync-batched log of session writes.
+
+    Thread-safe. Records are dicts with an 'op' key. The session records not replayed
+    yet (op 'update', a full snapshot, or 'append', a delta) are also mirrored in
+    memory as one record per session, so peek() can serve a session whose latest state
+    has not reached the store yet: a snapshot replaces whatever came before it, and a
+    delta is merged into the delta before it with merge_fn. The mirror therefore grows
+    with the number of sessions and their unreplayed messages, not with the log.
+    """
+    def __init__(self, path: str = None, fsync: bool = True, compact_bytes: int = 4 * 1024 * 1024,
+                 merge_fn=None):
+        """
+        Args:
+            path (str, optional): Log file. Defaults to $MARS_SPOOL_PATH or mars_sessions.spool.
+            fsync (bool): fsync appends before returning. Without it records survive a crash
+                          of the process but not of the machine.
+            compact_bytes (int): Replayed bytes after which the log is rewritten without them.
+            merge_fn (callable, optional): Combines an 'append' record with the newer one of the
+                                           same session into a single delta, e.g.
+                                           SessionWritePlanner.merge_delta. Without it a newer
+                                           record replaces the older one, which only suits snapshots.
+        """
+        self.path = path or os.getenv(PATH_ENV_VAR) or DEFAULT_PATH
+        self.fsync = fsync
+        self.compact_bytes = compact_bytes
+        self._merge_fn = merge_fn
+        self._ack_path = self.path + '.ack'
+        self._lock = threading.Lock()       # guards the file, offsets, _pending and the counters
+        self._sync_lock = threading.Lock()  # one fsync at a time; waiters ride along with it
+        self._closed = False
+        self._pending = {}                  # session_id -> (end offset, merged session record)
+        self._counters = {'appends': 0, 'fsyncs': 0, 'replayed': 0, 'compactions': 0}
+
+        self._file = open(self.path, 'a+b')
+        self._acked = self._read_checkpoint()
+        self._written = self._recover()
+        self._synced = self._written
+
+    def _read_checkpoint(self) -> int:
+        try:
+            with open(self._ack_path, 'rb') as f:
+                acked = int(f.read() or 0)
+        except FileNotFoundError:
+            return 0
+        except ValueError:
+            logger.warning(f"Ignoring corrupt spool checkpoint '{self._ack_path}'; replaying the whole spool.")
+            return 0
+        return acked if acked <= os.path.getsize(self.path) else 0
+
+    def _write_checkpoint(self, offset: int):
+        temporary = self._ack_path + '.tmp'
+        with open(temporary, 'wb') as f:
+            f.write(str(offset).encode('ascii'))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary, self._ack_path)
+
+    def _recover(self) -> int:
+        # Rebuilds _pending from the records not replayed yet and cuts off a torn tail.
+        offset = self._acked
+        with open(self.path, 'rb') as f:
+            f.seek(offset)
+            for line in iter(f.readline, b''):
+                record = _unframe(line)
+                if record is None:
+                    logger.warning(f"Truncating spool '{self.path}' at offset {offset}: incomplete or corrupt record.")
+                    self._file.truncate(offset)
+                    break
+                offset += len(line)
+                self._track(offset, record)
+        return offset
+
+    def _track(self, end: int, record: dict):
+        op = record.get('op')
+        if op not in ('update', 'append'):
+            return
+        session_id = record['session_id']
+        previous = self._pending.get(session_id)
+        # A full snapshot supersedes everything spooled for the session before it. So does
+        # a delta after a snapshot: deltas apply to the stored session, not to snapshots.
+        if op == 'append' and previous is not None and previous[1]['op'] == 'append' and self._merge_fn is not None:
+            record = dict(self._merge_fn(previous[1], record), op='append', session_id=session_id)
+        self._pending[session_id] = (end, record)
+
+    def append(self, record: dict) -> int:
+        """
+        Appends a record and, with fsync enabled, waits until it is on disk.
+
+        Returns:
+            int: The log offset just after the record.
+
+        Raises:
+            RuntimeError: If the spool is closed.
+        """
+        data = _frame(record)
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("SessionSpool is closed.")
+            self._file.write(data)
+            self._file.flush()
+            self._written += len(data)
+            end = self._written
+            self._track(end, record)
+            self._counters['appends'] += 1
+        if self.fsync:
+            self._sync(end)
+        return end
+
+    def _sync(self, end: int):
+        with self._sync_lock:
+            if self._synced >= end:
+                return  # Covered by an fsync that started after our write.
+            with self._lock:
+                target = self._written
+                fileno = self._file.fileno()
+            os.fsync(fileno)
+            self._synced = target
+            with self._lock:
+                self._counters['fsyncs'] += 1
+
+    def read(self, max_records: int) -> list:
+        """
+        The oldest records not acknowledged yet.
+
+        Returns:
+            list: Up to max_records (end offset, record) pairs, in log order.
+        """
+        with self._lock:
+            start, stop = self._acked, self._written
+        records = []
+        with open(self.path, 'rb') as f:
+            f.seek(start)
+            offset = start
+            while offset < stop and len(records) < max_records:
+                line = f.readline()
+                record = _unframe(line)
+                if record is None:
+                    break
+                offset += len(line)
+                records.append((offset, record))
+        return records
+
+    def acknowledge(self, offset: int):
+        """Marks everything up to offset (an end offset returned by read()) as stored."""
+        # Compaction replaces the file, so no fsync may be running on the old one.
+        with self._sync_lock, self._lock:
+            self._counters['replayed'] += 1
+            # A merged record is kept until its newest part is replayed; re-applying the
+            # parts already stored is harmless.
+            self._pending = {session_id: entry for session_id, entry in self._pending.items() if entry[0] > offset}
+            if offset >= self._written or offset >= self.compact_bytes:
+                self._compact(offset)
+            else:
+                self._write_checkpoint(offset)
+                self._acked = offset
+
+    def _compact(self, offset: int):
+        # Caller holds the lock. Reset the checkpoint first: if we crash before the log is
+        # rewritten, the old log is replayed from the start, which is safe.
+        with open(self.path, 'rb') as f:
+            f.seek(offset)
+            tail = f.read(self._written - offset)
+        self._write_checkpoint(0)
+        if tail:
+            temporary = self.path + '.tmp'
+            with open(temporary, 'wb') as f:
+                f.write(tail)
+                f.flush()
+                os.fsync(f.fileno())
+            self._file.close()
+            os.replace(temporary, self.path)
+            self._file = open(self.path, 'a+b')
+        else:
+            self._file.truncate(0)
+            os.fsync(self._file.fileno())
+        self._pending = {session_id: (end - offset, record) for session_id, (end, record) in self._pending.items()}
+        self._acked = 0
+        self._written = self._synced = len(tail)
+        self._counters['compactions'] += 1
+
+    def peek(self, session_id: str):
+        """
+        The session records of a session that have not been replayed yet, merged into one
+        (see the class docstring), or None.
+        """
+        with self._lock:
+            entry = self._pending.get(session_id)
+            return entry[1] if entry else None
+
+    def pending_bytes(self) -> int:
+        with self._lock:
+            return self._written - self._acked
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self._counters, pending_bytes=self._written - self._acked, pending_sessions=len(self._pending))
+
+    def close(self):
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._file.close()
+
+
+class SpoolReplayer:
+    """
+    Background thread that drains a SessionSpool into the store, in log order.
+
+    Records are handed to apply_fn a batch at a time; the batch is acknowledged only
+    if apply_fn returns True, otherwise it is retried after a backoff that doubles
+    from min_backoff up to max_backoff. New appends wake the thread unless it is
+    backing off, so a store outage does not turn into a retry per turn.
+    """
+    def __init__(self, spool: SessionSpool, apply_fn, batch_size: int = 100, min_backoff: float = 0.05,
+                 max_backoff: float = 5.0):
+        """
+        Args:
+            spool (SessionSpool): The spool to drain.
+            apply_fn (callable): Called with a list of records; returns True once all are stored.
+            batch_size (int): Maximum records per call of apply_fn.
+            min_backoff (float): Seconds before the first retry of a failed batch.
+            max_backoff (float): Longest wait between retries.
+        """
+        self.spool = spool
+        self._apply_fn = apply_fn
+        self.batch_size = max(1, batch_size)
+        self.min_backoff = min_backoff
+        self.max_backoff = max(min_backoff, max_backoff)
+        self._backoff = None
+        self._wakeup = threading.Event()
+        self._drain_lock = threading.Lock()
+        self._closed = False
+        self._counters = {'batches': 0, 'records': 0, 'failures': 0}
+
+        self._wakeup.set()  # Replay whatever a previous process left behind.
+        self._thread = threading.Thread(target=self._run, name='session-spool-replayer', daemon=True)
+        self._thread.start()
+
+    def notify(self):
+        """Tells the replayer a record was appended."""
+        if self._backoff is None:
+            self._wakeup.set()
+
+    def drain(self) -> bool:
+        """
+        Replays batches on the calling thread until the spool is empty or a batch fails.
+
+        Returns:
+            bool: True if the spool was drained.
+        """
+        with self._drain_lock:
+            while True:
+                records = self.spool.read(self.batch_size)
+                if not records:
+                    return True
+                try:
+                    stored = self._apply_fn([record for _, record in records])
+                except Exception as e:
+                    logger.error(f"Error replaying spooled session writes: {e}", exc_info=True)
+                    stored = False
+                if not stored:
+                    self._counters['failures'] += 1
+                    return False
+                self.spool.acknowledge(records[-1][0])
+                self._counters['batches'] += 1
+                self._counters['records'] += len(records)
+
+    def stats(self) -> dict:
+        return dict(self._counters, backing_off=self._backoff is not None)
+
+    def close(self, drain: bool = True):
+        """Stops the thread and, if drain is True, makes one last attempt to empty the spool."""
+        if self._closed:
+            return
+        self._closed = True
+        self._wakeup.set()
+        self._thread.join()
+        if drain:
+            self.drain()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self._backoff)
+            self._wakeup.clear()
+            if self._closed:
+                return
+            if self.drain():
+                self._backoff = None
+            else:
+                self._backoff = self.min_backoff if self._backoff is None else min(self._backoff * 2, self.max_backoff)
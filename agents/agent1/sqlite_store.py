@@ -0,0 +1,298 @@
+"""
+Embedded SQLite storage backend for the Firestore-compatible local client.
+
+Selected with MARS_FIRESTORE_BACKEND=sqlite; the database file is taken from
+MARS_SQLITE_PATH (default: mars_sessions.db in the working directory). Documents
+are stored as JSON in a single table keyed by their path, with an index on the
+parent collection so listing a session's messages is a single index range scan.
+
+The database runs in WAL mode, so readers never block the writer. All SQL is
+constant and parameterized, so sqlite3 reuses its prepared statements. A
+WriteBatch commit (for example, one conversation turn in append mode) becomes a
+single transaction with one executemany insert.
+
+Secondary indexes (query_indexes.IndexSpec) are kept in an index_entries table,
+one row per indexed document and filtered value, written in the same transaction
+as the document. Queries matching a spec are answered by a range scan of that
+table's primary key, starting after the cursor; other queries scan the collection.
+Indexes added to an existing database are built from its documents on open.
+"""
+import json
+import os
+import sqlite3
+from datetime import datetime, timezone
+
+from .local_firestore import AlreadyExists, DocumentStoreClient, _cursor_value, _deep_merge, _field_value, _resolve
+
+PATH_ENV_VAR = "MARS_SQLITE_PATH"
+DEFAULT_PATH = "mars_sessions.db"
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS documents ("
+    " path TEXT PRIMARY KEY,"
+    " parent TEXT NOT NULL,"
+    " data TEXT NOT NULL"
+    ") WITHOUT ROWID",
+    "CREATE INDEX IF NOT EXISTS documents_parent ON documents (parent)",
+    "CREATE TABLE IF NOT EXISTS index_entries ("
+    " index_name TEXT NOT NULL,"
+    " key TEXT NOT NULL,"
+    " sort_key NOT NULL,"
+    " path TEXT NOT NULL,"
+    " PRIMARY KEY (index_name, key, sort_key, path)"
+    ") WITHOUT ROWID",
+    "CREATE INDEX IF NOT EXISTS index_entries_path ON index_entries (path)",
+    "CREATE TABLE IF NOT EXISTS built_indexes (name TEXT PRIMARY KEY) WITHOUT ROWID",
+)
+_SELECT = "SELECT data FROM documents WHERE path = ?"
+_SELECT_CHILDREN = "SELECT path, data FROM documents WHERE parent = ?"
+_UPSERT = "INSERT OR REPLACE INTO documents (path, parent, data) VALUES (?, ?, ?)"
+_INSERT = "INSERT INTO documents (path, parent, data) VALUES (?, ?, ?)"
+_DELETE = "DELETE FROM documents WHERE path = ?"
+_DELETE_ENTRIES = "DELETE FROM index_entries WHERE path = ?"
+_INSERT_ENTRY = "INSERT OR IGNORE INTO index_entries (index_name, key, sort_key, path) VALUES (?, ?, ?, ?)"
+_SELECT_BUILT = "SELECT 1 FROM built_indexes WHERE name = ?"
+_INSERT_BUILT = "INSERT INTO built_indexes (name) VALUES (?)"
+# Index range scans, newest first or oldest first, from the start or after a cursor.
+_SCAN = {
+    (True, False): "SELECT d.path, d.data FROM index_entries e JOIN documents d ON d.path = e.path"
+                   " WHERE e.index_name = ? AND e.key = ? ORDER BY e.sort_key DESC, e.path DESC LIMIT ?",
+    (True, True): "SELECT d.path, d.data FROM index_entries e JOIN documents d ON d.path = e.path"
+                  " WHERE e.index_name = ? AND e.key = ? AND (e.sort_key, e.path) < (?, ?)"
+                  " ORDER BY e.sort_key DESC, e.path DESC LIMIT ?",
+    (False, False): "SELECT d.path, d.data FROM index_entries e JOIN documents d ON d.path = e.path"
+                    " WHERE e.index_name = ? AND e.key = ? ORDER BY e.sort_key, e.path LIMIT ?",
+    (False, True): "SELECT d.path, d.data FROM index_entries e JOIN documents d ON d.path = e.path"
+                   " WHERE e.index_name = ? AND e.key = ? AND (e.sort_key, e.path) > (?, ?)"
+                   " ORDER BY e.sort_key, e.path LIMIT ?",
+}
+
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return {"__datetime__": value.isoformat()}
+    raise TypeError(f"Cannot store {type(value).__name__} in SQLite backend")
+
+
+def _decode_object(obj):
+    if len(obj) == 1 and "__datetime__" in obj:
+        return datetime.fromisoformat(obj["__datetime__"])
+    return obj
+
+
+def _dumps(data: dict) -> str:
+    return json.dumps(data, separators=(',', ':'), default=_encode_value)
+
+
+def _loads(text: str) -> dict:
+    return json.loads(text, object_hook=_decode_object)
+
+
+def _parent(path: str) -> str:
+    return path.rsplit('/', 1)[0]
+
+
+def _index_key(value) -> str:
+    # Filter values are compared for equality only; JSON keeps 1 and "1" apart.
+    return json.dumps(value, separators=(',', ':'), sort_keys=True, default=_encode_value)
+
+
+def _sort_key(value):
+    # Values of one ordered field share a type; datetimes are stored as ISO 8601 UTC, which sorts by time.
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, (str, int, float)):
+        return value
+    return _index_key(value)
+
+
+class SQLiteFirestoreClient(DocumentStoreClient):
+    """Firestore look-alike persisted in an SQLite database file (or ':memory:')."""
+    blocking = True
+
+    def __init__(self, path: str = None, project: str = 'mars-local', synchronous: str = 'NORMAL',
+                 indexes=()):
+        """
+        Args:
+            path (str, optional): Database file. Defaults to $MARS_SQLITE_PATH or mars_sessions.db.
+            project (str, optional): Reported project name, for parity with firestore.Client.
+            synchronous (str, optional): SQLite synchronous pragma. NORMAL is durable across
+                                         application crashes in WAL mode; use FULL to also
+                                         survive power loss.
+            indexes (iterable, optional): query_indexes.IndexSpec secondary indexes to maintain.
+                                          An index missing from the database is built on open;
+                                          every client writing to the file must pass the same ones.
+        """
+        super().__init__(project)
+        self.path = path or os.getenv(PATH_ENV_VAR) or DEFAULT_PATH
+        # One connection shared by all threads; the client's lock serializes access.
+        self._connection = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None,
+                                           cached_statements=64)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(f"PRAGMA synchronous={synchronous}")
+        for statement in _SCHEMA:
+            self._connection.execute(statement)
+        self.indexes = {}  # collection -> [IndexSpec, ...]
+        for spec in indexes:
+            self.indexes.setdefault(spec.collection, []).append(spec)
+        self.index_scans = 0
+        self._build_indexes()
+
+    @property
+    def journal_mode(self) -> str:
+        with self._lock:
+            return self._connection.execute("PRAGMA journal_mode").fetchone()[0]
+
+    def _fetch(self, path: str):
+        row = self._connection.execute(_SELECT, (path,)).fetchone()
+        return _loads(row[0]) if row is not None else None
+
+    def _read(self, path: str):
+        with self._lock:
+            self.read_count += 1
+            return self._fetch(path)
+
+    def _prepare(self, path: str, data: dict, merge: bool, now, pending=None):
+        # Returns the full document to store for a (possibly merging) write.
+        resolved = _resolve(data, now)
+        if not merge:
+            return resolved
+        existing = pending.get(path) if pending and path in pending else self._fetch(path)
+        if existing is None:
+            return resolved
+        _deep_merge(existing, resolved)
+        return existing
+
+    def _write(self, path: str, data: dict, merge: bool = False, create: bool = False):
+        now = datetime.now(timezone.utc)
+        indexed = _parent(path) in self.indexes
+        with self._lock:
+            connection = self._connection
+            if indexed:
+                connection.execute("BEGIN IMMEDIATE")
+            try:
+                if create:
+                    document = _resolve(data, now)
+                    try:
+                        connection.execute(_INSERT, (path, _parent(path), _dumps(document)))
+                    except sqlite3.IntegrityError:
+                        raise AlreadyExists(f"Document already exists: {path}")
+                else:
+                    document = self._prepare(path, data, merge, now)
+                    connection.execute(_UPSERT, (path, _parent(path), _dumps(document)))
+                if indexed:
+                    self._reindex(path, document)
+            except BaseException:
+                if indexed:
+                    connection.execute("ROLLBACK")
+                raise
+            if indexed:
+                connection.execute("COMMIT")
+            self.write_count += 1
+
+    def _commit(self, writes: list):
+        now = datetime.now(timezone.utc)
+        with self._lock:
+            pending = {}
+            for path, data, merge in writes:
+                pending[path] = self._prepare(path, data, merge, now, pending)
+            rows = [(path, _parent(path), _dumps(document)) for path, document in pending.items()]
+            connection = self._connection
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                connection.executemany(_UPSERT, rows)
+                for path, document in pending.items():
+                    if _parent(path) in self.indexes:
+                        self._reindex(path, document)
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+            connection.execute("COMMIT")
+            self.write_count += len(writes)
+
+    def _delete(self, path: str):
+        indexed = _parent(path) in self.indexes
+        with self._lock:
+            connection = self._connection
+            if not indexed:
+                connection.execute(_DELETE, (path,))
+                return
+            # The document and its index entries go together, or stale entries would show up in queries.
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                connection.execute(_DELETE, (path,))
+                connection.execute(_DELETE_ENTRIES, (path,))
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+            connection.execute("COMMIT")
+
+    def _children(self, collection_path: str):
+        with self._lock:
+            self.read_count += 1
+            rows = self._connection.execute(_SELECT_CHILDREN, (collection_path,)).fetchall()
+        return [(path, _loads(data)) for path, data in rows]
+
+    @staticmethod
+    def _entries(spec, path: str, document: dict) -> list:
+        order_value = _field_value(path, document, spec.order_field)
+        value = _field_value(path, document, spec.field)
+        if order_value is None or value is None:
+            return []
+        if spec.array and not isinstance(value, list):
+            return []
+        keys = {_index_key(item) for item in (value if spec.array else [value])}
+        sort_key = _sort_key(order_value)
+        return [(spec.name, key, sort_key, path) for key in keys]
+
+    def _reindex(self, path: str, document: dict):
+        # Caller holds the lock and an open transaction.
+        self._connection.execute(_DELETE_ENTRIES, (path,))
+        entries = [entry for spec in self.indexes[_parent(path)] for entry in self._entries(spec, path, document)]
+        if entries:
+            self._connection.executemany(_INSERT_ENTRY, entries)
+
+    def _build_indexes(self):
+        connection = self._connection
+        for collection, specs in self.indexes.items():
+            for spec in specs:
+                if connection.execute(_SELECT_BUILT, (spec.name,)).fetchone():
+                    continue
+                connection.execute("BEGIN IMMEDIATE")
+                try:
+                    for path, data in connection.execute(_SELECT_CHILDREN, (collection,)).fetchall():
+                        connection.executemany(_INSERT_ENTRY, self._entries(spec, path, _loads(data)))
+                    connection.execute(_INSERT_BUILT, (spec.name,))
+                except BaseException:
+                    connection.execute("ROLLBACK")
+                    raise
+                connection.execute("COMMIT")
+
+    def _index_for(self, collection_path: str, filters: tuple, orders: tuple):
+        if len(filters) != 1 or not orders or len(orders) > 2:
+            return None
+        field, op, _ = filters[0]
+        for spec in self.indexes.get(collection_path, ()):
+            expected = ((spec.order_field, spec.descending), ('__name__', spec.descending))
+            if field == spec.field and op == spec.operator and orders == expected[:len(orders)]:
+                return spec
+        return None
+
+    def _query(self, collection_path: str, filters: tuple, orders: tuple, cursor, limit):
+        spec = self._index_for(collection_path, filters, orders)
+        if spec is None or (cursor is not None and len(cursor) != 2):
+            return super()._query(collection_path, filters, orders, cursor, limit)
+        parameters = [spec.name, _index_key(filters[0][2])]
+        if cursor is not None:
+            order_value, doc_id = cursor
+            parameters += [_sort_key(order_value), f"{collection_path}/{_cursor_value(doc_id)}"]
+        parameters.append(limit if limit is not None else -1)
+        with self._lock:
+            self.read_count += 1
+            self.index_scans += 1
+            rows = self._connection.execute(_SCAN[(spec.descending, cursor is not None)], parameters).fetchall()
+        return [(path, _loads(data)) for path, data in rows]
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
@@ -1,4 +1,5 @@
 import enum
+import time
 
 class ConversationState(enum.Enum):
     AWAITING_INPUT = "AWAITING_INPUT"
@@ -7,46 +8,170 @@ class ConversationState(enum.Enum):
     AWAITING_CONFIRMATION = "AWAITING_CONFIRMATION"
     FINALIZED = "FINALIZED"
 
+# Transitions a conversation is expected to take. FINALIZED has no way out by default.
+DEFAULT_TRANSITIONS = {
+    ConversationState.AWAITING_INPUT: [ConversationState.CLARIFYING],
+    ConversationState.CLARIFYING: [ConversationState.REFINING, ConversationState.AWAITING_INPUT],
+    ConversationState.REFINING: [ConversationState.AWAITING_CONFIRMATION, ConversationState.CLARIFYING],
+    ConversationState.AWAITING_CONFIRMATION: [ConversationState.FINALIZED, ConversationState.REFINING],
+    ConversationState.FINALIZED: [],
+}
+
+# 'permissive' performs transitions missing from the table (and counts them);
+# 'strict' rejects them with TransitionError.
+MODES = ('permissive', 'strict')
+
+
+class TransitionError(ValueError):
+    """Raised by a strict StateMachine for a transition its table does not define."""
+    def __init__(self, from_state, to_state):
+        super().__init__(f"Transition from {from_state.value} to {to_state.value} is not defined.")
+        self.from_state = from_state
+        self.to_state = to_state
+
+
+class TransitionTable:
+    """
+    A machine definition compiled once into per-state frozensets of allowed targets.
+
+    Build one per definition and share it between machines; StateMachine never
+    rebuilds it, so checking a transition is a single set lookup.
+    """
+    def __init__(self, definition: dict, states=ConversationState):
+        """
+        Args:
+            definition (dict): Maps each state to the states it may move to.
+            states (iterable, optional): Every state of the machine. States missing from
+                                         the definition have no outgoing transitions.
+        """
+        for source, targets in definition.items():
+            for state in [source, *targets]:
+                if not isinstance(state, ConversationState):
+                    raise TypeError("transition table entries must be ConversationState members")
+        self.states = tuple(states)
+        self.allowed = {state: frozenset(definition.get(state, ())) for state in self.states}
+
+    def __contains__(self, transition):
+        from_state, to_state = transition
+        return to_state in self.allowed.get(from_state, ())
+
+
+DEFAULT_TABLE = TransitionTable(DEFAULT_TRANSITIONS)
+
+
 class StateMachine:
-    def __init__(self, initial_state=ConversationState.AWAITING_INPUT):
+    """
+    Conversation state machine driven by a compiled TransitionTable.
+
+    Pre-transition hooks are called as hook(machine, from_state, to_state) before the
+    state changes and may raise to veto the transition; post-transition hooks are
+    called the same way after it. The machine counts transitions and records how
+    often each state was entered and how long was spent in it. transition_to builds
+    no containers and writes nothing to stdout, so it can sit on a hot path.
+    """
+    def __init__(self, initial_state=ConversationState.AWAITING_INPUT, table: TransitionTable = DEFAULT_TABLE,
+                 mode: str = 'permissive', clock=time.perf_counter):
+        """
+        Args:
+            initial_state (ConversationState, optional): The state the machine starts in.
+            table (TransitionTable, optional): The compiled definition. Defaults to DEFAULT_TRANSITIONS.
+            mode (str, optional): 'permissive' or 'strict', see MODES.
+            clock (callable, optional): Time source for per-state timings, injectable for tests.
+        """
         if not isinstance(initial_state, ConversationState):
             raise TypeError("initial_state must be an instance of ConversationState")
+        if mode not in MODES:
+            raise ValueError(f"mode must be one of {MODES}, got '{mode}'")
+        self.table = table
+        self.mode = mode
+        self.strict = mode == 'strict'
+        self._clock = clock
+        self._pre_hooks = ()
+        self._post_hooks = ()
+
         self._current_state = initial_state
-        print(f"State machine initialized. Current state: {self._current_state.value}")
+        self._allowed = table.allowed.get(initial_state, frozenset())
+        self._entered_at = clock()
+        self.transitions = 0
+        self.undefined_transitions = 0
+        self.rejected_transitions = 0
+        self.self_transitions = 0
+        self._entries = dict.fromkeys(table.states, 0)
+        self._seconds = dict.fromkeys(table.states, 0.0)
+        self._entries[initial_state] = 1
 
     @property
     def current_state(self):
         return self._current_state
 
+    def add_pre_hook(self, hook):
+        """Registers hook(machine, from_state, to_state), called before every state change."""
+        self._pre_hooks += (hook,)
+
+    def add_post_hook(self, hook):
+        """Registers hook(machine, from_state, to_state), called after every state change."""
+        self._post_hooks += (hook,)
+
+    def can_transition(self, new_state) -> bool:
+        """True if the table defines the transition from the current state to new_state."""
+        return new_state in self._allowed
+
     def transition_to(self, new_state):
-        if not isinstance(new_state, ConversationState):
+        """
+        Moves to new_state. Transitioning to the current state is a no-op.
+
+        Returns:
+            ConversationState: The state after the call.
+
+        Raises:
+            TypeError: If new_state is not a ConversationState.
+            TransitionError: In strict mode, if the table does not define the transition.
+        """
+        if new_state.__class__ is not ConversationState:
             raise TypeError("new_state must be an instance of ConversationState")
 
-        print(f"Attempting transition from {self._current_state.value} to {new_state.value}")
+        old_state = self._current_state
+        if new_state is old_state:
+            self.self_transitions += 1
+            return old_state
+        defined = new_state in self._allowed
+        if not defined and self.strict:
+            self.rejected_transitions += 1
+            raise TransitionError(old_state, new_state)
 
-        # Define allowed transitions (optional, but good practice)
-        allowed_transitions = {
-            ConversationState.AWAITING_INPUT: [ConversationState.CLARIFYING],
-            ConversationState.CLARIFYING: [ConversationState.REFINING, ConversationState.AWAITING_INPUT],
-            ConversationState.REFINING: [ConversationState.AWAITING_CONFIRMATION, ConversationState.CLARIFYING],
-            ConversationState.AWAITING_CONFIRMATION: [ConversationState.FINALIZED, ConversationState.REFINING],
-            ConversationState.FINALIZED: [] # No transitions out of FINALIZED by default
-        }
+        for hook in self._pre_hooks:
+            hook(self, old_state, new_state)
 
-        if new_state in allowed_transitions.get(self._current_state, []):
-            self._current_state = new_state
-            print(f"Transition successful. New state: {self._current_state.value}")
-        elif self._current_state == new_state:
-            print(f"Already in state {self._current_state.value}. No transition needed.")
-        else:
-            # Fallback or error for disallowed transitions. For now, allow any transition if not specified.
-            # This makes the state machine more flexible for initial development.
-            # In a stricter implementation, you might raise an error here.
-            print(f"Transition from {self._current_state.value} to {new_state.value} is not explicitly defined, but allowing it.")
-            self._current_state = new_state
-            print(f"Transition successful. New state: {self._current_state.value}")
+        now = self._clock()
+        self._seconds[old_state] += now - self._entered_at
+        self._entered_at = now
+        self._entries[new_state] += 1
+        self._current_state = new_state
+        self._allowed = self.table.allowed[new_state]
+        self.transitions += 1
+        if not defined:
+            self.undefined_transitions += 1
 
-        return self._current_state
+        for hook in self._post_hooks:
+            hook(self, old_state, new_state)
+        return new_state
+
+    def stats(self) -> dict:
+        """Transition counters plus, per state value, how often it was entered and the seconds spent in it."""
+        seconds = dict(self._seconds)
+        seconds[self._current_state] += self._clock() - self._entered_at
+        return {
+            'current_state': self._current_state.value,
+            'mode': self.mode,
+            'transitions': self.transitions,
+            'undefined_transitions': self.undefined_transitions,
+            'rejected_transitions': self.rejected_transitions,
+            'self_transitions': self.self_transitions,
+            'states': {
+                state.value: {'entries': self._entries[state], 'seconds': seconds[state]}
+                for state in self.table.states
+            },
+        }
 
 if __name__ == '__main__':
     # Example Usage
@@ -57,15 +182,24 @@ if __name__ == '__main__':
     sm.transition_to(ConversationState.REFINING)
     sm.transition_to(ConversationState.AWAITING_CONFIRMATION)
     sm.transition_to(ConversationState.FINALIZED)
+    print(f"Final state: {sm.current_state.value}, stats: {sm.stats()}")
 
-    # Example of a transition that might be considered disallowed if strict rules were enforced
-    # but is allowed by the current flexible design
+    # A permissive machine performs transitions the table does not define, and counts them
     sm_flexible = StateMachine(ConversationState.AWAITING_INPUT)
     sm_flexible.transition_to(ConversationState.FINALIZED)
+    print(f"Undefined transitions allowed: {sm_flexible.undefined_transitions}")
+
+    # A strict machine rejects them
+    sm_strict = StateMachine(ConversationState.AWAITING_INPUT, mode='strict')
+    try:
+        sm_strict.transition_to(ConversationState.FINALIZED)
+    except TransitionError as e:
+        print(f"Strict machine rejected transition: {e}")
 
-    # Example of trying to transition to the same state
-    sm_same_state = StateMachine(ConversationState.CLARIFYING)
-    sm_same_state.transition_to(ConversationState.CLARIFYING)
+    # Logging every transition with a post-transition hook
+    sm_logged = StateMachine()
+    sm_logged.add_post_hook(lambda machine, old, new: print(f"Transition {old.value} -> {new.value}"))
+    sm_logged.transition_to(ConversationState.CLARIFYING)
 
     # Example of invalid state type
     try:
@@ -0,0 +1,195 @@
+"""
+Batch experiment design for POST /design_experiments/batch.
+
+Hypotheses arrive as a JSON (or MessagePack) list or as an NDJSON stream, one
+hypothesis per line. Each is designed by experiment_designer.design_protocol_async
+on the design executor under the stage timeouts (see stage_executor.py), with at
+most `max_concurrency` in flight; an NDJSON body is read
+only as fast as designs finish, so a large upload never sits in memory. Results
+are yielded as they complete, not in input order, each tagged with the item's
+index:
+
+    {"index": 0, "hypothesis_id": "h1", "status": "ok", "protocol": {...}}
+    {"index": 1, "hypothesis_id": "h2", "status": "error", "status_code": 422, "detail": ...}
+
+An item that fails validation or design (a stage timing out is a 504) is reported
+that way and the rest of the
+batch carries on. Feasibility searches go through one SharedSearch per batch, so a
+query asked by several protocols is fetched once; a protocol asking for a query
+that another one is fetching waits for that fetch instead of repeating it.
+"""
+import asyncio
+import json
+import logging
+import threading
+from concurrent.futures import Future
+
+from pydantic import ValidationError
+
+from . import collaboration
+from .experiment_designer import DesignError, design_protocol_async
+from .models import Hypothesis
+from .search_fetcher import SearchResults
+from .stage_executor import get_design_executor
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_CONCURRENCY = 8
+_DONE = object()
+
+
+class SharedSearch:
+    """
+    A batch-wide memo in front of collaboration.fetch_external_data.
+
+    fetch() is called from the design threads. Queries nobody has asked yet are
+    fetched by the calling thread in one fetch_external_data call; queries another
+    thread is already fetching are waited for instead of fetched again.
+    """
+    def __init__(self):
+        self._futures = {}  # query -> Future of (result, failure reason)
+        self._lock = threading.Lock()
+        self.requested = 0
+        self.fetched = 0
+
+    def fetch(self, queries) -> SearchResults:
+        unique = list(dict.fromkeys(queries))
+        with self._lock:
+            self.requested += len(unique)
+            mine = [q for q in unique if q not in self._futures]
+            for query in mine:
+                self._futures[query] = Future()
+            self.fetched += len(mine)
+            futures = {query: self._futures[query] for query in unique}
+
+        if mine:
+            try:
+                fetched = collaboration.fetch_external_data(mine)
+                failed = getattr(fetched, 'failed', {})
+                for query in mine:
+                    futures[query].set_result((fetched.get(query), failed.get(query)))
+            except Exception as e:
+                for query in mine:
+                    if not futures[query].done():
+                        futures[query].set_result((None, repr(e)))
+
+        results = SearchResults()
+        for query, future in futures.items():
+            result, reason = future.result()
+            if result is not None:
+                results[query] = result
+            elif reason is not None:
+                results.failed[query] = reason
+        return results
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {'requested': self.requested, 'fetched': self.fetched}
+
+
+def _error(index: int, hypothesis_id, status_code: int, detail) -> dict:
+    return {"index": index, "hypothesis_id": hypothesis_id, "status": "error",
+            "status_code": status_code, "detail": detail}
+
+
+def parse_hypothesis(index: int, item):
+    """Returns (Hypothesis, None) for a valid item, or (None, error record)."""
+    hypothesis_id = item.get("hypothesis_id") if isinstance(item, dict) else None
+    try:
+        return Hypothesis.model_validate(item), None
+    except ValidationError as e:
+        return None, _error(index, hypothesis_id, 422, e.errors(include_url=False, include_context=False))
+
+
+async def iter_list(items):
+    """Items of a decoded JSON/MessagePack list as (index, item, None) triples."""
+    for index, item in enumerate(items):
+        yield index, item, None
+
+
+async def iter_ndjson(chunks):
+    """
+    (index, item, error) triples from an NDJSON byte stream, decoded line by line as
+    the chunks arrive. A line that is not valid JSON has an error record instead of
+    an item. Blank lines are skipped and not counted.
+    """
+    buffer = b""
+    index = 0
+
+    def decode(line):
+        try:
+            return index, json.loads(line), None
+        except ValueError as e:
+            return index, None, _error(index, None, 400, f"Invalid JSON: {e}")
+
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if line.strip():
+                yield decode(line)
+                index += 1
+    if buffer.strip():
+        yield decode(buffer)
+
+
+async def _design(index: int, hypothesis: Hypothesis, search: SharedSearch, executor, timeouts) -> dict:
+    try:
+        protocol = await design_protocol_async(hypothesis, executor=executor, timeouts=timeouts, fetch=search.fetch)
+    except DesignError as e:
+        return _error(index, hypothesis.hypothesis_id, e.status_code, e.detail)
+    except Exception as e:
+        logger.error(f"Designing hypothesis {hypothesis.hypothesis_id} failed: {e}", exc_info=True)
+        return _error(index, hypothesis.hypothesis_id, 500, f"Internal server error: {e}")
+    return {"index": index, "hypothesis_id": hypothesis.hypothesis_id, "status": "ok",
+            "protocol": protocol.model_dump(mode='json')}
+
+
+async def design_batch(items, max_concurrency: int = DEFAULT_MAX_CONCURRENCY, search: SharedSearch = None,
+                       executor=None, timeouts: dict = None):
+    """
+    Designs protocols for an async iterable of (index, item, error) triples (see
+    iter_list and iter_ndjson) and yields one result record per item as soon as it
+    is ready. Items are validated as Hypothesis; error records are passed through.
+
+    `executor` defaults to stage_executor.get_design_executor() and `timeouts` to
+    the configured stage timeouts, as for a single design.
+    """
+    if max_concurrency < 1:
+        raise ValueError("max_concurrency must be at least 1")
+    search = search or SharedSearch()
+    executor = executor if executor is not None else get_design_executor()
+    results = asyncio.Queue()
+    slots = asyncio.Semaphore(max_concurrency)
+
+    async def run(index, hypothesis):
+        try:
+            await results.put(await _design(index, hypothesis, search, executor, timeouts))
+        finally:
+            slots.release()
+
+    async def produce():
+        tasks = []
+        try:
+            async for index, item, error in items:
+                if error is None:
+                    hypothesis, error = parse_hypothesis(index, item)
+                if error is not None:
+                    await results.put(error)
+                    continue
+                await slots.acquire()  # backpressure: read on only when a slot is free
+                tasks.append(asyncio.ensure_future(run(index, hypothesis)))
+            await asyncio.gather(*tasks)
+        finally:
+            await results.put(_DONE)
+
+    producer = asyncio.ensure_future(produce())
+    try:
+        while True:
+            record = await results.get()
+            if record is _DONE:
+                break
+            yield record
+        await producer  # re-raises a failure reading the input
+    finally:
+        producer.cancel()
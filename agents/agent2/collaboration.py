@@ -1,30 +1,34 @@
+import logging
+
 from .models import Protocol, FeasibilityAssessment # Importing Protocol and FeasibilityAssessment models
+from .search_cache import get_search_cache
+from .search_fetcher import get_search_fetcher
+
+logger = logging.getLogger(__name__)
 
 def confirm_protocol_with_hypothesizer(protocol_json: Protocol) -> bool:
     """
     Simulates confirming the generated protocol with Agent 1 (Hypothesizer).
     Placeholder implementation.
     """
-    print(f"CONFIRMING PROTOCOL WITH HYPOTHESIZER (Agent 1): {protocol_json.protocol_id}")
+    logger.debug(f"Confirming protocol with Hypothesizer (Agent 1): {protocol_json.protocol_id}")
     # In a real scenario, this would involve an API call or message queue
     return True # Assume confirmed for now
 
-def check_build_feasibility(validation_steps: list[dict], linked_hypothesis_id: str) -> FeasibilityAssessment:
+def check_build_feasibility(validation_steps: list[dict], linked_hypothesis_id: str,
+                            fetch=None) -> FeasibilityAssessment:
     """
     Checks the build feasibility of the protocol by querying for external data
     and synthesizing it into a FeasibilityAssessment.
+
+    `fetch` replaces fetch_external_data for the queries, e.g. to share searches
+    across a batch of protocols.
     """
-    print(f"CHECKING BUILD FEASIBILITY for Hypothesis ID: {linked_hypothesis_id} with {len(validation_steps)} steps.")
+    logger.debug(f"Checking build feasibility for Hypothesis ID: {linked_hypothesis_id} with {len(validation_steps)} steps.")
 
     all_queries = []
     for i, step in enumerate(validation_steps):
-        step_description = step.get('description', f'step_{i}_unnamed')
-        queries = [
-            f"Public datasets for {step_description}",
-            f"Python libraries for {step_description}",
-            f"Availability of computational model for {step_description}"
-        ]
-        all_queries.extend(queries)
+        all_queries.extend(feasibility_queries(step, i))
 
     if not all_queries:
         return FeasibilityAssessment(
@@ -34,8 +38,24 @@ def check_build_feasibility(validation_steps: list[dict], linked_hypothesis_id:
             summary="No validation steps provided to assess feasibility."
         )
 
-    search_results = fetch_external_data(all_queries)
+    search_results = (fetch or fetch_external_data)(all_queries)
+    return assess_feasibility(search_results, linked_hypothesis_id, validation_steps)
+
+def feasibility_queries(step: dict, index: int) -> list[str]:
+    """The external searches that check the feasibility of one validation step."""
+    step_description = step.get('description', f'step_{index}_unnamed')
+    return [
+        f"Public datasets for {step_description}",
+        f"Python libraries for {step_description}",
+        f"Availability of computational model for {step_description}"
+    ]
 
+def assess_feasibility(search_results: dict[str, str], linked_hypothesis_id: str,
+                       validation_steps: list[dict]) -> FeasibilityAssessment:
+    """
+    Synthesizes the results of feasibility_queries() for validation_steps into a
+    FeasibilityAssessment.
+    """
     # Placeholder logic to synthesize FeasibilityAssessment
     data_obtainability_found = False
     tools_availability_found = False
@@ -48,6 +68,9 @@ def check_build_feasibility(validation_steps: list[dict], linked_hypothesis_id:
             data_obtainability_found = True
         if "Python libraries for" in query and "mocked_result" in result:
             tools_availability_found = True
+    # Searches that failed or timed out are reported rather than failing the assessment.
+    for query, reason in getattr(search_results, 'failed', {}).items():
+        summary_parts.append(f"- Query '{query}': unavailable ({reason})")
 
     data_obtainability_status = 'PUBLIC' if data_obtainability_found else 'UNAVAILABLE'
     tools_availability_status = 'OPEN_SOURCE' if tools_availability_found else 'REQUIRES_DEVELOPMENT'
@@ -73,9 +96,21 @@ def check_build_feasibility(validation_steps: list[dict], linked_hypothesis_id:
 
 def fetch_external_data(search_queries: list[str]) -> dict[str, str]:
     """
-    Simulates calling the Google Search API to fetch external data.
-    Returns a dictionary of mocked data.
+    Fetches external data for the search queries.
+
+    When a search endpoint is configured (MARS_SEARCH_URL, see search_fetcher.py) the
+    queries are answered from the search cache (search_cache.py) where possible and the
+    rest are deduplicated and searched concurrently; queries that fail or time out
+    are left out of the result and listed in its `failed` attribute. Otherwise the
+    Google Search API call is simulated and a dictionary of mocked data is returned.
     """
+    fetcher = get_search_fetcher()
+    if fetcher is not None:
+        cache = get_search_cache()
+        if cache is not None:
+            return cache.fetch(search_queries, fetcher.fetch)
+        return fetcher.fetch(search_queries)
+
     mocked_results = {}
     for query in search_queries:
         mocked_results[query] = f"mocked_result_for_{query.replace(' ', '_')}"
@@ -1,6 +1,20 @@
+import logging
 import uuid
 # Removed pydantic BaseModel import, as models are now dataclasses
 from .models import Hypothesis, Protocol # Importing models from .models
+from .collaboration import confirm_protocol_with_hypothesizer, check_build_feasibility
+from .stage_executor import StageTimeoutError, get_stage_timeouts, local_executor, run_stage
+from agents.common.structured_logging import log_event
+
+logger = logging.getLogger(__name__)
+
+
+class DesignError(Exception):
+    """Raised when no protocol can be designed for a hypothesis; carries the HTTP status to report."""
+    def __init__(self, detail: str, status_code: int = 400):
+        super().__init__(detail)
+        self.detail = detail
+        self.status_code = status_code
 
 # Removed commented-out local model definitions
 
@@ -39,3 +53,106 @@ def generate_protocol(hypothesis_id: str, premises: list[str]) -> Protocol:
         validation_steps=steps,
         feasibility_assessment={"status": "pending_check"} # Initial status
     )
+
+
+def _require_premises(hypothesis: Hypothesis, key_premises: list[str]) -> list[str]:
+    if not key_premises:
+        raise DesignError("Could not extract key premises from hypothesis.", status_code=400)
+    log_event(logger, logging.DEBUG, "design.decomposed", hypothesis_id=hypothesis.hypothesis_id,
+              key_premises=key_premises)
+    return key_premises
+
+
+def _require_confirmation(protocol: Protocol, confirmed: bool):
+    if not confirmed:
+        # In a real system, might wait, retry, or escalate
+        raise DesignError("Protocol confirmation failed with Agent 1.", status_code=503)
+    log_event(logger, logging.DEBUG, "design.protocol_confirmed", protocol_id=protocol.protocol_id)
+
+
+def _attach_assessment(protocol: Protocol, feasibility_assessment) -> Protocol:
+    protocol.feasibility_assessment = feasibility_assessment
+    log_event(logger, logging.INFO, "design.feasibility_assessed", hypothesis_id=protocol.linked_hypothesis_id,
+              protocol_id=protocol.protocol_id,
+              data_obtainability=feasibility_assessment.data_obtainability,
+              tools_availability=feasibility_assessment.tools_availability,
+              confidence_score=feasibility_assessment.confidence_score)
+    log_event(logger, logging.DEBUG, "design.feasibility_summary", protocol_id=protocol.protocol_id,
+              summary=feasibility_assessment.summary)
+
+    # Example: Check confidence score
+    if feasibility_assessment.confidence_score < 0.5:
+        logger.warning(f"Confidence score for experiment feasibility is low ({feasibility_assessment.confidence_score}).")
+    # For now, we proceed regardless of the score, but this is where one might halt or adapt.
+    return protocol
+
+
+def design_protocol(hypothesis: Hypothesis, fetch=None) -> Protocol:
+    """
+    Runs the whole design pipeline for one hypothesis: decomposition, protocol
+    generation, confirmation with Agent 1 and the build-feasibility check.
+
+    Args:
+        hypothesis (Hypothesis): The hypothesis to design an experiment for.
+        fetch (callable, optional): Search function for the feasibility check
+                                    (see check_build_feasibility).
+
+    Raises:
+        DesignError: If the hypothesis has no key premises (400) or Agent 1 does not
+                     confirm the protocol (503).
+    """
+    # 1. Decompose Hypothesis
+    key_premises = _require_premises(hypothesis, decompose_hypothesis(hypothesis))
+
+    # 2. Generate Protocol
+    protocol = generate_protocol(hypothesis.hypothesis_id, key_premises)
+    log_event(logger, logging.DEBUG, "design.protocol_generated", hypothesis_id=hypothesis.hypothesis_id,
+              protocol_id=protocol.protocol_id)
+
+    # 3. Confirm Protocol with Hypothesizer (Agent 1) - Placeholder
+    _require_confirmation(protocol, confirm_protocol_with_hypothesizer(protocol))
+
+    # 4. Check Build Feasibility (Agent 3)
+    return _attach_assessment(protocol, check_build_feasibility(
+        validation_steps=protocol.validation_steps,
+        linked_hypothesis_id=protocol.linked_hypothesis_id,
+        fetch=fetch,
+    ))
+
+
+async def design_protocol_async(hypothesis: Hypothesis, executor=None, timeouts: dict = None,
+                                fetch=None) -> Protocol:
+    """
+    design_protocol() for async callers: every stage runs on `executor` (see
+    stage_executor.py) under its timeout, so the event loop is never blocked.
+
+    Args:
+        hypothesis (Hypothesis): The hypothesis to design an experiment for.
+        executor (Executor, optional): Where the stages run; None runs them on the event loop.
+        timeouts (dict, optional): Stage -> seconds. Defaults to stage_executor.get_stage_timeouts().
+        fetch (callable, optional): Passed on to check_build_feasibility(). As it may hold
+            state of this process, the feasibility stage then runs on
+            stage_executor.local_executor(executor).
+
+    Raises:
+        DesignError: As design_protocol(), or 504 if a stage times out.
+    """
+    timeouts = timeouts if timeouts is not None else get_stage_timeouts()
+
+    async def stage(name, fn, *args, on=executor, **kwargs):
+        return await run_stage(name, fn, *args, executor=on, timeout=timeouts.get(name), **kwargs)
+
+    try:
+        key_premises = _require_premises(hypothesis, await stage('decompose', decompose_hypothesis, hypothesis))
+        protocol = await stage('generate', generate_protocol, hypothesis.hypothesis_id, key_premises)
+        log_event(logger, logging.DEBUG, "design.protocol_generated", hypothesis_id=hypothesis.hypothesis_id,
+                  protocol_id=protocol.protocol_id)
+        _require_confirmation(protocol, await stage('confirm', confirm_protocol_with_hypothesizer, protocol))
+        return _attach_assessment(protocol, await stage(
+            'feasibility', check_build_feasibility, on=executor if fetch is None else local_executor(executor),
+            validation_steps=protocol.validation_steps, linked_hypothesis_id=protocol.linked_hypothesis_id,
+            fetch=fetch))
+    except StageTimeoutError as e:
+        log_event(logger, logging.WARNING, "design.stage_timed_out", hypothesis_id=hypothesis.hypothesis_id,
+                  stage=e.stage, timeout=e.timeout)
+        raise DesignError(str(e), status_code=504) from e
@@ -1,15 +1,27 @@
-from fastapi import FastAPI, HTTPException
+import logging
+import time
+
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
 # Removed pydantic import as models will handle it
-import uuid
 from .models import Hypothesis, Protocol # Added import
 
 # Actual imports for models and functions
-from .experiment_designer import decompose_hypothesis, generate_protocol
-from .collaboration import confirm_protocol_with_hypothesizer, check_build_feasibility
+from . import batch
+from .experiment_designer import DesignError, design_protocol_async
+from .stage_executor import get_design_executor
+from .streaming import SSE_MEDIA_TYPE, DesignStream, format_ndjson, format_sse, wants_sse
+from agents.common import wire_format
+from agents.common.structured_logging import log_event
+from agents.common.wire_format_routes import NDJSONStreamingResponse, WireFormatRoute
+
+logger = logging.getLogger(__name__)
 
 # Removed local Pydantic model definitions
 
 app = FastAPI()
+# Accept and return MessagePack as well as JSON, negotiated per request.
+app.router.route_class = WireFormatRoute
 
 # Functions are now imported from other modules.
 
@@ -19,56 +31,87 @@ async def design_experiment_endpoint(hypothesis: Hypothesis):
     Accepts a hypothesis from Agent 1, decomposes it, generates an experiment protocol,
     and (simulates) communication with other agents.
     '''
-    print(f"Received hypothesis: {hypothesis.hypothesis_id}")
+    log_event(logger, logging.INFO, "design.received", hypothesis_id=hypothesis.hypothesis_id)
 
     try:
-        # 1. Decompose Hypothesis
-        key_premises = decompose_hypothesis(hypothesis)
-        if not key_premises:
-            raise HTTPException(status_code=400, detail="Could not extract key premises from hypothesis.")
-        print(f"Key premises: {key_premises}")
-
-        # 2. Generate Protocol
-        protocol = generate_protocol(hypothesis.hypothesis_id, key_premises)
-        print(f"Generated protocol: {protocol.protocol_id}")
-
-        # 3. Confirm Protocol with Hypothesizer (Agent 1) - Placeholder
-        confirmation_status = confirm_protocol_with_hypothesizer(protocol)
-        if not confirmation_status:
-            # In a real system, might wait, retry, or escalate
-            raise HTTPException(status_code=503, detail="Protocol confirmation failed with Agent 1.")
-        print(f"Protocol confirmed with Agent 1: {confirmation_status}")
-
-        # 4. Check Build Feasibility (Agent 3)
-        # The check_build_feasibility function now takes validation_steps and linked_hypothesis_id
-        # and returns a FeasibilityAssessment object.
-
-        feasibility_assessment_obj = check_build_feasibility(
-            validation_steps=protocol.validation_steps,
-            linked_hypothesis_id=protocol.linked_hypothesis_id
-        )
-        protocol.feasibility_assessment = feasibility_assessment_obj # Assign the object directly
-
-        print(f"Feasibility assessment for Hypothesis {protocol.linked_hypothesis_id}:")
-        print(f"  Data Obtainability: {protocol.feasibility_assessment.data_obtainability}")
-        print(f"  Tools Availability: {protocol.feasibility_assessment.tools_availability}")
-        print(f"  Confidence Score: {protocol.feasibility_assessment.confidence_score}")
-        print(f"  Summary: {protocol.feasibility_assessment.summary}")
-
-        # Example: Check confidence score
-        if protocol.feasibility_assessment.confidence_score < 0.5:
-            print(f"Warning: Confidence score for experiment feasibility is low ({protocol.feasibility_assessment.confidence_score}).")
-        # For now, we proceed regardless of the score, but this is where one might halt or adapt.
-
-        return protocol
-
-    except HTTPException as http_exc:
-        # Re-raise HTTPExceptions to let FastAPI handle them
-        raise http_exc
+        # Stages run on the design executor, so a slow feasibility check does not hold up other requests.
+        return await design_protocol_async(hypothesis, executor=get_design_executor())
+    except DesignError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
     except Exception as e:
         # Catch any other unexpected errors
-        print(f"An unexpected error occurred: {e}")
+        logger.error(f"An unexpected error occurred: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
+
+@app.post("/design_experiment/stream")
+async def design_experiment_stream_endpoint(hypothesis: Hypothesis, request: Request):
+    '''
+    Designs a protocol like /design_experiment/, streaming each stage's output as it
+    is ready: the premises, each validation step, each step's feasibility result and
+    a final summary with the complete protocol (see agents.agent2.streaming).
+
+    Answers with Server-Sent Events if the Accept header asks for text/event-stream,
+    NDJSON otherwise. A hypothesis without key premises is still refused with a 400;
+    later failures end the stream with an error event.
+    '''
+    log_event(logger, logging.INFO, "design.stream_received", hypothesis_id=hypothesis.hypothesis_id)
+    try:
+        design = await DesignStream(hypothesis, executor=get_design_executor()).start()
+    except DesignError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+
+    sse = wants_sse(request.headers.get('accept'))
+    encode = format_sse if sse else format_ndjson
+
+    async def stream():
+        last = None
+        async for event in design.events():
+            last = event
+            yield encode(event)
+        log_event(logger, logging.INFO, "design.stream_completed", hypothesis_id=hypothesis.hypothesis_id,
+                  events=last["sequence"] + 1, outcome=last["event"])
+
+    if sse:
+        return StreamingResponse(stream(), media_type=SSE_MEDIA_TYPE, headers={"Cache-Control": "no-cache"})
+    return StreamingResponse(stream(), media_type=wire_format.NDJSON_MEDIA_TYPE)
+
+
+@app.post("/design_experiments/batch")
+async def design_experiments_batch_endpoint(
+        request: Request, max_concurrency: int = Query(batch.DEFAULT_MAX_CONCURRENCY, ge=1, le=64)):
+    '''
+    Designs protocols for many hypotheses in one request.
+
+    The body is a JSON (or MessagePack) list of hypotheses, or an NDJSON stream
+    (Content-Type: application/x-ndjson) with one hypothesis per line. The response
+    is an NDJSON stream with one result line per hypothesis, written as each design
+    completes (see agents.agent2.batch for the record format). Invalid or failing
+    hypotheses are reported in their own line without failing the batch.
+    '''
+    if wire_format.is_ndjson(request.headers.get('content-type')):
+        items = batch.iter_ndjson(request.stream())
+    else:
+        body = await request.json()
+        if not isinstance(body, list):
+            raise HTTPException(status_code=422, detail="Expected a list of hypotheses or an NDJSON stream.")
+        items = batch.iter_list(body)
+
+    search = batch.SharedSearch()
+
+    async def stream():
+        started = time.perf_counter()
+        designed = failed = 0
+        async for record in batch.design_batch(items, max_concurrency=max_concurrency, search=search):
+            if record["status"] == "ok":
+                designed += 1
+            else:
+                failed += 1
+            yield wire_format.dumps_json(record).encode('utf-8') + b"\n"
+        log_event(logger, logging.INFO, "design.batch_completed", designed=designed, failed=failed,
+                  elapsed_ms=round((time.perf_counter() - started) * 1e3, 1), **search.stats())
+
+    return NDJSONStreamingResponse(stream())
+
 # To run this app (for local testing):
 # uvicorn agents.agent2.main:app --reload --port 8001
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import List, Dict, Any, Literal
+from typing import List, Dict, Any, Literal, Union
 
 class Hypothesis(BaseModel):
     hypothesis_id: str
@@ -15,7 +15,9 @@ class Protocol(BaseModel):
     protocol_id: str
     linked_hypothesis_id: str
     validation_steps: List[Dict[str, Any]] # Each dict could represent a step with details
-    feasibility_assessment: "FeasibilityAssessment" # Use forward reference
+    # A FeasibilityAssessment once Agent 3 has been consulted; a status dict such as
+    # {"status": "pending_check"} before that.
+    feasibility_assessment: Union["FeasibilityAssessment", Dict[str, Any]] # Use forward reference
     status: str = "draft" # e.g., draft, active, completed, aborted
     estimated_cost: float = 0.0
     estimated_duration: str = "N/A" # e.g., "2 weeks"
@@ -0,0 +1,278 @@
+"""
+Two-tier cache of external search results for build-feasibility checks.
+
+The same "Public datasets for ..." and "Python libraries for ..." questions recur
+across hypotheses and protocols. SearchCache keeps their answers in a bounded
+in-process LRU in front of an SQLite file, so a repeated topic is answered without
+a network call, in this process or the next one.
+
+- Queries are normalized (Unicode NFKC, case-folded, whitespace collapsed), so
+  "Python libraries for  Soil" and "python libraries for soil" share an entry.
+- Every entry carries its own expiry: `ttl` for results, `negative_ttl` for
+  "no results found" answers, which are worth re-asking sooner.
+- For `stale_ttl` seconds after it expires an entry is still served, and the query
+  is re-searched in a background thread (stale-while-revalidate).
+- Hits of each tier, stale hits and misses are counted; see stats().
+
+Enabled by collaboration.fetch_external_data whenever a search endpoint is
+configured. The file comes from MARS_SEARCH_CACHE_PATH (default
+mars_search_cache.db in the working directory); MARS_SEARCH_CACHE_TTL sets the
+result TTL in seconds, and 0 turns the cache off.
+"""
+import logging
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+from agents.common.structured_logging import log_event
+
+from .search_fetcher import NO_RESULTS, SearchResults
+
+logger = logging.getLogger(__name__)
+
+PATH_ENV_VAR = "MARS_SEARCH_CACHE_PATH"
+TTL_ENV_VAR = "MARS_SEARCH_CACHE_TTL"
+DEFAULT_PATH = "mars_search_cache.db"
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS search_results ("
+    " key TEXT PRIMARY KEY,"
+    " result TEXT NOT NULL,"
+    " expires_at REAL NOT NULL,"
+    " stale_until REAL NOT NULL"
+    ") WITHOUT ROWID",
+)
+_SELECT = "SELECT result, expires_at, stale_until FROM search_results WHERE key = ?"
+_UPSERT = "INSERT OR REPLACE INTO search_results (key, result, expires_at, stale_until) VALUES (?, ?, ?, ?)"
+_PRUNE = "DELETE FROM search_results WHERE stale_until <= ?"
+
+
+def normalize_query(query: str) -> str:
+    """The cache key of a query: NFKC-normalized, case-folded, whitespace collapsed."""
+    return " ".join(unicodedata.normalize('NFKC', query).casefold().split())
+
+
+class SearchCache:
+    """
+    In-process LRU tier over a persistent SQLite tier, with per-entry TTLs and
+    stale-while-revalidate. fetch() is the read-through entry point.
+    """
+    def __init__(self, path: str = None, max_size: int = 4096, ttl: float = 86400.0,
+                 negative_ttl: float = 3600.0, stale_ttl: float = 7 * 86400.0, clock=time.time):
+        """
+        Args:
+            path (str, optional): SQLite file of the disk tier. Defaults to $MARS_SEARCH_CACHE_PATH
+                                  or mars_search_cache.db; ':memory:' keeps it in memory.
+            max_size (int): Entries kept in the in-process tier.
+            ttl (float): Seconds a search result stays fresh.
+            negative_ttl (float): Seconds a "no results found" answer stays fresh.
+            stale_ttl (float): Seconds after expiry during which an entry is served while it is
+                               re-searched in the background. 0 disables serving stale entries.
+            clock (callable, optional): Wall-clock time source (entries outlive the process),
+                                        injectable for tests.
+        """
+        if max_size < 1:
+            raise ValueError("max_size must be >= 1")
+        self.path = path or os.getenv(PATH_ENV_VAR) or DEFAULT_PATH
+        self.max_size = max_size
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.stale_ttl = stale_ttl
+        self._clock = clock
+        self._memory = OrderedDict()  # key -> (result, expires_at, stale_until)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        for statement in _SCHEMA:
+            self._connection.execute(statement)
+        self._connection.execute(_PRUNE, (self._clock(),))
+        self._revalidating = set()   # keys being re-searched in the background
+        self._threads = []
+        self.counters = {'memory_hits': 0, 'disk_hits': 0, 'stale_hits': 0, 'misses': 0,
+                         'revalidations': 0, 'revalidation_failures': 0, 'writes': 0}
+
+    def _remember(self, key: str, entry: tuple):
+        # Caller holds self._lock.
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_size:
+            self._memory.popitem(last=False)
+
+    def _entry(self, key: str):
+        # Caller holds self._lock. Returns (entry, tier) or (None, None).
+        entry = self._memory.get(key)
+        if entry is not None:
+            self._memory.move_to_end(key)
+            return entry, 'memory'
+        row = self._connection.execute(_SELECT, (key,)).fetchone()
+        if row is None:
+            return None, None
+        entry = tuple(row)
+        self._remember(key, entry)
+        return entry, 'disk'
+
+    def get(self, query: str):
+        """
+        Returns (result, fresh) for a cached query, or (None, False) if it is missing
+        or past its stale window.
+        """
+        key = normalize_query(query)
+        now = self._clock()
+        with self._lock:
+            entry, tier = self._entry(key)
+            if entry is None or now >= entry[2]:
+                self.counters['misses'] += 1
+                return None, False
+            if now >= entry[1]:
+                self.counters['stale_hits'] += 1
+                return entry[0], False
+            self.counters[f'{tier}_hits'] += 1
+            return entry[0], True
+
+    def put(self, query: str, result: str, ttl: float = None):
+        """Stores a result in both tiers; `ttl` overrides the default for this entry."""
+        self.put_many({query: result}, ttl)
+
+    def put_many(self, results: dict, ttl: float = None):
+        """Stores query -> result pairs in both tiers, in one disk transaction."""
+        if not results:
+            return
+        now = self._clock()
+        rows = []
+        for query, result in results.items():
+            entry_ttl = ttl if ttl is not None else self.negative_ttl if result == NO_RESULTS else self.ttl
+            rows.append((normalize_query(query), result, now + entry_ttl, now + entry_ttl + self.stale_ttl))
+        with self._lock:
+            for row in rows:
+                self._remember(row[0], row[1:])
+            self._connection.execute("BEGIN")
+            try:
+                self._connection.executemany(_UPSERT, rows)
+                self._connection.execute("COMMIT")
+            except BaseException:
+                self._connection.execute("ROLLBACK")
+                raise
+            self.counters['writes'] += len(rows)
+
+    def fetch(self, queries, fetch) -> SearchResults:
+        """
+        Answers `queries` from the cache, calling fetch(list_of_queries) -> SearchResults
+        once for the missing ones and in the background for stale ones.
+
+        Every query that was answered appears in the result under its original text;
+        queries the fetch could not answer are in its `failed` attribute.
+        """
+        by_key = OrderedDict()  # key -> original queries, in first-seen order
+        for query in queries:
+            by_key.setdefault(normalize_query(query), []).append(query)
+
+        answers, missing, stale = {}, [], []
+        for key, originals in by_key.items():
+            result, fresh = self.get(originals[0])
+            if result is None:
+                missing.append(originals[0])
+                continue
+            answers[key] = result
+            if not fresh:
+                stale.append(originals[0])
+
+        failed = {}
+        if missing:
+            fetched = fetch(missing)
+            self.put_many(fetched)
+            for query, result in fetched.items():
+                answers[normalize_query(query)] = result
+            for query, reason in getattr(fetched, 'failed', {}).items():
+                for original in by_key[normalize_query(query)]:
+                    failed[original] = reason
+        if stale:
+            self._revalidate(stale, fetch)
+
+        results = SearchResults(failed=failed)
+        for key, originals in by_key.items():
+            if key in answers:
+                for original in originals:
+                    results[original] = answers[key]
+        return results
+
+    def _revalidate(self, queries: list, fetch):
+        with self._lock:
+            queries = [q for q in queries if normalize_query(q) not in self._revalidating]
+            self._revalidating.update(normalize_query(q) for q in queries)
+            self._threads = [thread for thread in self._threads if thread.is_alive()]
+        if not queries:
+            return
+        thread = threading.Thread(target=self._run_revalidation, args=(queries, fetch),
+                                  name="search-cache-revalidate", daemon=True)
+        with self._lock:
+            self._threads.append(thread)
+        thread.start()
+
+    def _run_revalidation(self, queries: list, fetch):
+        try:
+            fetched = fetch(queries)
+            self.put_many(fetched)
+            with self._lock:
+                self.counters['revalidations'] += len(fetched)
+                self.counters['revalidation_failures'] += len(getattr(fetched, 'failed', {}))
+        except Exception as e:
+            # The stale entries keep being served; the next lookup tries again.
+            with self._lock:
+                self.counters['revalidation_failures'] += len(queries)
+            log_event(logger, logging.WARNING, "search_cache.revalidation_failed", queries=len(queries), error=repr(e))
+        finally:
+            with self._lock:
+                self._revalidating.difference_update(normalize_query(q) for q in queries)
+
+    def wait_for_revalidation(self, timeout: float = None):
+        """Blocks until background revalidations started so far have finished."""
+        with self._lock:
+            threads = list(self._threads)
+        for thread in threads:
+            thread.join(timeout)
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self.counters)
+            stats['memory_size'] = len(self._memory)
+        hits = stats['memory_hits'] + stats['disk_hits'] + stats['stale_hits']
+        lookups = hits + stats['misses']
+        stats['hit_ratio'] = hits / lookups if lookups else 0.0
+        stats['memory_hit_ratio'] = stats['memory_hits'] / lookups if lookups else 0.0
+        return stats
+
+    def close(self):
+        self.wait_for_revalidation()
+        with self._lock:
+            self._connection.close()
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_search_cache():
+    """
+    The process-wide SearchCache configured from the environment, or None when
+    MARS_SEARCH_CACHE_TTL is 0.
+    """
+    global _cache
+    if _cache is None:
+        ttl = float(os.getenv(TTL_ENV_VAR, "86400"))
+        if ttl <= 0:
+            return None
+        with _cache_lock:
+            if _cache is None:
+                _cache = SearchCache(ttl=ttl)
+    return _cache
+
+
+def set_search_cache(cache):
+    """Installs `cache` as the process-wide cache (None to reset to the environment)."""
+    global _cache
+    with _cache_lock:
+        _cache = cache
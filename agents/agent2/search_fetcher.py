@@ -0,0 +1,234 @@
+"""
+Concurrent external search for build-feasibility checks.
+
+check_build_feasibility asks three questions per validation step, so a 30-step
+protocol means 90 searches; issued one after another they cost 90 round trips.
+SearchFetcher runs them on an asyncio event loop instead:
+
+- identical queries (steps with the same description) are searched once;
+- at most `max_concurrency` requests are in flight at a time, and a token bucket
+  keeps the request rate at or below `rate` per second (bursts up to `burst`);
+- every request is bounded by `timeout` seconds;
+- a query that fails or times out is reported in SearchResults.failed instead of
+  failing the whole assessment.
+
+The search endpoint comes from MARS_SEARCH_URL and is called as
+GET <url>?q=<query>[&key=<MARS_SEARCH_API_KEY>], answering with a Custom Search
+style {"items": [{"title": ..., "snippet": ...}]} document. Without it
+collaboration.fetch_external_data keeps its simulated results.
+"""
+import asyncio
+import concurrent.futures
+import logging
+import os
+import threading
+import time
+
+import httpx
+
+from agents.common.structured_logging import log_event
+
+logger = logging.getLogger(__name__)
+
+SEARCH_URL_ENV_VAR = "MARS_SEARCH_URL"
+SEARCH_API_KEY_ENV_VAR = "MARS_SEARCH_API_KEY"
+CONCURRENCY_ENV_VAR = "MARS_SEARCH_CONCURRENCY"
+RATE_ENV_VAR = "MARS_SEARCH_RATE"
+TIMEOUT_ENV_VAR = "MARS_SEARCH_TIMEOUT"
+NO_RESULTS = "no results found"
+
+
+class SearchResults(dict):
+    """Query -> result text for the searches that succeeded; `failed` maps the others to the reason."""
+
+    def __init__(self, results=None, failed=None):
+        super().__init__(results or {})
+        self.failed = failed or {}
+
+
+class TokenBucket:
+    """
+    Token bucket shared by every caller of a fetcher, across threads and event loops.
+
+    reserve() takes a token and returns how long the caller has to wait before using
+    it, so waiting happens outside the lock (and, for async callers, without blocking
+    the loop).
+    """
+    __slots__ = ('rate', 'burst', '_tokens', '_updated', '_lock')
+
+    def __init__(self, rate: float, burst: int = 1):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = None
+        self._lock = threading.Lock()
+
+    def reserve(self, now: float = None) -> float:
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            if self._updated is not None:
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    async def acquire(self):
+        delay = self.reserve()
+        if delay:
+            await asyncio.sleep(delay)
+
+
+def summarize_search_response(payload) -> str:
+    """Turns a Custom Search style response into the one-line text used in assessments."""
+    items = payload.get("items") if isinstance(payload, dict) else None
+    if not items:
+        return NO_RESULTS
+    parts = []
+    for item in items[:3]:
+        text = (item.get("snippet") or item.get("title")) if isinstance(item, dict) else str(item)
+        if text:
+            parts.append(" ".join(str(text).split()))
+    return "; ".join(parts) or NO_RESULTS
+
+
+class SearchFetcher:
+    """
+    Runs a batch of search queries concurrently under a concurrency cap, a rate limit
+    and a per-query timeout, and returns whatever succeeded.
+
+    By default each query is a GET against `base_url` (see the module docstring).
+    Pass `search` (an async callable taking a query and returning its result text)
+    to use another backend, or `async_client` to supply the httpx client, e.g. one
+    over a mock transport.
+    """
+    def __init__(self, base_url: str = None, api_key: str = None, max_concurrency: int = 10,
+                 rate: float = 20.0, burst: int = None, timeout: float = 5.0, search=None,
+                 async_client: httpx.AsyncClient = None):
+        """
+        Args:
+            base_url (str, optional): Search endpoint. Defaults to $MARS_SEARCH_URL.
+            api_key (str, optional): Sent as the `key` parameter. Defaults to $MARS_SEARCH_API_KEY.
+            max_concurrency (int): Requests in flight at once.
+            rate (float): Sustained requests per second; 0 disables rate limiting.
+            burst (int, optional): Requests allowed back to back. Defaults to max_concurrency.
+            timeout (float): Seconds allowed for each query, including its HTTP round trip.
+            search (callable, optional): async search(query) -> str replacing the HTTP call.
+            async_client (httpx.AsyncClient, optional): Client for the HTTP call.
+        """
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1")
+        self.base_url = base_url or os.getenv(SEARCH_URL_ENV_VAR) or ""
+        if not self.base_url and search is None:
+            raise ValueError(f"Search URL not configured; pass base_url or set {SEARCH_URL_ENV_VAR}.")
+        self.api_key = api_key or os.getenv(SEARCH_API_KEY_ENV_VAR)
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.bucket = TokenBucket(rate, burst or max_concurrency) if rate else None
+        self._search = search
+        self._async_client = async_client
+        self._lock = threading.Lock()
+        self.counters = {'queries': 0, 'deduplicated': 0, 'succeeded': 0, 'failed': 0, 'timed_out': 0}
+
+    def _count(self, name: str, amount: int = 1):
+        with self._lock:
+            self.counters[name] += amount
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self.counters)
+
+    async def _http_search(self, client: httpx.AsyncClient, query: str) -> str:
+        params = {"q": query}
+        if self.api_key:
+            params["key"] = self.api_key
+        response = await client.get(self.base_url, params=params)
+        response.raise_for_status()
+        return summarize_search_response(response.json())
+
+    async def _fetch_one(self, query: str, search, semaphore: asyncio.Semaphore, results: dict, failed: dict):
+        async with semaphore:
+            if self.bucket is not None:
+                await self.bucket.acquire()
+            try:
+                results[query] = await asyncio.wait_for(search(query), self.timeout)
+                self._count('succeeded')
+            except asyncio.TimeoutError:
+                failed[query] = f"timed out after {self.timeout}s"
+                self._count('timed_out')
+            except Exception as e:
+                failed[query] = repr(e)
+                self._count('failed')
+
+    async def fetch_async(self, queries) -> SearchResults:
+        """Searches every distinct query once and returns the results that came back in time."""
+        unique = list(dict.fromkeys(queries))
+        self._count('queries', len(unique))
+        self._count('deduplicated', len(queries) - len(unique))
+        if not unique:
+            return SearchResults()
+
+        results, failed = {}, {}
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        started = time.perf_counter()
+        if self._search is not None:
+            await asyncio.gather(*(self._fetch_one(q, self._search, semaphore, results, failed) for q in unique))
+        else:
+            # A client per event loop: httpx pools cannot be shared between loops.
+            client = self._async_client or httpx.AsyncClient(
+                limits=httpx.Limits(max_connections=self.max_concurrency,
+                                    max_keepalive_connections=self.max_concurrency))
+            try:
+                search = lambda query: self._http_search(client, query)
+                await asyncio.gather(*(self._fetch_one(q, search, semaphore, results, failed) for q in unique))
+            finally:
+                if self._async_client is None:
+                    await client.aclose()
+
+        log_event(logger, logging.WARNING if failed else logging.DEBUG, "search.fetched",
+                  queries=len(unique), duplicates=len(queries) - len(unique), failed=len(failed),
+                  elapsed_ms=round((time.perf_counter() - started) * 1e3, 1))
+        # Keep the callers' query order rather than completion order.
+        return SearchResults({q: results[q] for q in unique if q in results},
+                             {q: failed[q] for q in unique if q in failed})
+
+    def fetch(self, queries) -> SearchResults:
+        """
+        Blocking fetch_async(). Safe to call from code already running on an event
+        loop (e.g. a FastAPI endpoint): the batch then runs on a private loop in a
+        worker thread.
+        """
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(self.fetch_async(queries))
+        with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
+            return executor.submit(asyncio.run, self.fetch_async(queries)).result()
+
+
+_fetcher = None
+_fetcher_lock = threading.Lock()
+
+
+def get_search_fetcher():
+    """
+    The process-wide SearchFetcher configured from the environment, or None when
+    MARS_SEARCH_URL is not set.
+    """
+    global _fetcher
+    if _fetcher is None and os.getenv(SEARCH_URL_ENV_VAR):
+        with _fetcher_lock:
+            if _fetcher is None:
+                _fetcher = SearchFetcher(
+                    max_concurrency=int(os.getenv(CONCURRENCY_ENV_VAR, "10")),
+                    rate=float(os.getenv(RATE_ENV_VAR, "20")),
+                    timeout=float(os.getenv(TIMEOUT_ENV_VAR, "5")))
+    return _fetcher
+
+
+def set_search_fetcher(fetcher):
+    """Installs `fetcher` as the process-wide fetcher (None to reset to the environment)."""
+    global _fetcher
+    with _fetcher_lock:
+        _fetcher = fetcher
@@ -0,0 +1,164 @@
+"""
+Executor and per-stage timeouts for Agent 2's design pipeline.
+
+The design endpoint is async, but its stages (decomposition, protocol generation,
+confirmation with Agent 1 and the feasibility check, which waits on external
+searches) are blocking functions. run_stage() runs one of them on a pool executor
+so the event loop keeps serving other requests, and bounds it with the stage's
+timeout. A stage that times out is abandoned, not interrupted: its worker finishes
+in the background and the result is dropped.
+
+Configured from the environment:
+    MARS_DESIGN_EXECUTOR        thread (default), process, or inline (run on the
+                                event loop, the original behavior; no timeouts).
+    MARS_DESIGN_WORKERS         Pool size. Defaults to 32 threads, or one process per CPU.
+    MARS_DESIGN_STAGE_TIMEOUTS  Overrides of DEFAULT_STAGE_TIMEOUTS in seconds, e.g.
+                                "feasibility=10,decompose=1"; 0 means no timeout.
+With the process executor every stage function and argument must be picklable,
+and searches run with the search fetcher and cache of the worker process. Stages
+that call back into state of this process (such as a batch's SharedSearch) run on
+local_executor() instead.
+"""
+import asyncio
+import functools
+import logging
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+EXECUTOR_ENV_VAR = "MARS_DESIGN_EXECUTOR"
+WORKERS_ENV_VAR = "MARS_DESIGN_WORKERS"
+STAGE_TIMEOUTS_ENV_VAR = "MARS_DESIGN_STAGE_TIMEOUTS"
+EXECUTOR_KINDS = ('thread', 'process', 'inline')
+STAGES = ('decompose', 'generate', 'confirm', 'feasibility')
+DEFAULT_STAGE_TIMEOUTS = {'decompose': 5.0, 'generate': 5.0, 'confirm': 10.0, 'feasibility': 30.0}
+DEFAULT_THREAD_WORKERS = 32
+
+
+class StageTimeoutError(Exception):
+    """Raised by run_stage() when a stage does not finish within its timeout."""
+    def __init__(self, stage: str, timeout: float):
+        super().__init__(f"Design stage '{stage}' timed out after {timeout:g}s.")
+        self.stage = stage
+        self.timeout = timeout
+
+
+def parse_stage_timeouts(text: str) -> dict:
+    """
+    Parses "stage=seconds,..." into a complete stage -> timeout mapping (None for no
+    timeout), starting from DEFAULT_STAGE_TIMEOUTS.
+
+    Raises:
+        ValueError: On an unknown stage or a malformed entry.
+    """
+    timeouts = dict(DEFAULT_STAGE_TIMEOUTS)
+    for entry in (text or "").split(','):
+        if not entry.strip():
+            continue
+        stage, _, seconds = entry.partition('=')
+        stage = stage.strip().lower()
+        if stage not in STAGES:
+            raise ValueError(f"Unknown design stage '{stage}'; expected one of {STAGES}")
+        seconds = float(seconds)
+        timeouts[stage] = seconds if seconds > 0 else None
+    return timeouts
+
+
+def create_executor(kind: str = 'thread', workers: int = None):
+    """Builds the executor for `kind` (see EXECUTOR_KINDS); None for inline."""
+    if kind not in EXECUTOR_KINDS:
+        raise ValueError(f"executor must be one of {EXECUTOR_KINDS}, got '{kind}'")
+    if kind == 'inline':
+        return None
+    if kind == 'process':
+        return ProcessPoolExecutor(max_workers=workers or os.cpu_count())
+    return ThreadPoolExecutor(max_workers=workers or DEFAULT_THREAD_WORKERS, thread_name_prefix="design-stage")
+
+
+async def run_stage(stage: str, fn, *args, executor=None, timeout: float = None, **kwargs):
+    """
+    Runs fn(*args, **kwargs) on `executor` (on the event loop if None) and returns
+    its result.
+
+    Raises:
+        StageTimeoutError: If it takes longer than `timeout` seconds.
+    """
+    if executor is None:
+        return fn(*args, **kwargs)
+    future = asyncio.get_running_loop().run_in_executor(executor, functools.partial(fn, *args, **kwargs))
+    try:
+        return await asyncio.wait_for(future, timeout)
+    except asyncio.TimeoutError:
+        raise StageTimeoutError(stage, timeout) from None
+
+
+_executor = None
+_executor_configured = False
+_local_executor = None
+_stage_timeouts = None
+_lock = threading.Lock()
+
+
+def local_executor(executor):
+    """
+    `executor` for a stage whose function or arguments live in this process and
+    cannot be pickled: unchanged unless it is a process pool, in which case a
+    shared thread pool of this process (sized like the default thread executor).
+    """
+    global _local_executor
+    if not isinstance(executor, ProcessPoolExecutor):
+        return executor
+    with _lock:
+        if _local_executor is None:
+            _local_executor = ThreadPoolExecutor(max_workers=DEFAULT_THREAD_WORKERS, thread_name_prefix="design-local")
+        return _local_executor
+
+
+def get_design_executor():
+    """The process-wide stage executor configured from the environment (None for inline)."""
+    global _executor, _executor_configured
+    if not _executor_configured:
+        with _lock:
+            if not _executor_configured:
+                kind = (os.getenv(EXECUTOR_ENV_VAR) or 'thread').strip().lower()
+                workers = os.getenv(WORKERS_ENV_VAR)
+                _executor = create_executor(kind, int(workers) if workers else None)
+                _executor_configured = True
+    return _executor
+
+
+def set_design_executor(executor):
+    """Installs `executor` (None for inline) as the process-wide stage executor."""
+    global _executor, _executor_configured
+    with _lock:
+        _executor, _executor_configured = executor, True
+
+
+def get_stage_timeouts() -> dict:
+    """Stage -> timeout in seconds (None for no timeout), from MARS_DESIGN_STAGE_TIMEOUTS."""
+    global _stage_timeouts
+    if _stage_timeouts is None:
+        _stage_timeouts = parse_stage_timeouts(os.getenv(STAGE_TIMEOUTS_ENV_VAR))
+    return _stage_timeouts
+
+
+def set_stage_timeouts(timeouts: dict = None):
+    """Overrides stage timeouts (merged over the defaults); None re-reads the environment."""
+    global _stage_timeouts
+    _stage_timeouts = dict(DEFAULT_STAGE_TIMEOUTS, **timeouts) if timeouts is not None else None
+
+
+def shutdown_design_executor(wait: bool = True):
+    """
+    Shuts the process-wide executor (and the local_executor() pool) down; the next
+    get_design_executor() builds a new one.
+    """
+    global _executor, _executor_configured, _local_executor
+    with _lock:
+        executor, _executor, _executor_configured = _executor, None, False
+        local, _local_executor = _local_executor, None
+    for pool in (executor, local):
+        if pool is not None:
+            pool.shutdown(wait=wait)
@@ -0,0 +1,166 @@
+"""
+Streaming experiment design for POST /design_experiment/stream.
+
+Instead of one Protocol at the end, the client receives events as the pipeline
+produces them, so it can start planning builds while feasibility searches are
+still running:
+
+    premises      The decomposed key premises, once decomposition is done.
+    step          One per validation step, once the protocol is generated and confirmed.
+    feasibility   One per step as soon as its searches finish (in completion order):
+                  the step's results, failed queries and its own FeasibilityAssessment.
+    summary       Last: the complete Protocol, with the overall FeasibilityAssessment
+                  that /design_experiment/ would have returned.
+    error         Replaces the remaining events if a later stage fails.
+
+Events are dicts with an "event" key and a "sequence" number, written as NDJSON
+lines or as Server-Sent Events (event: <type>, id: <sequence>, data: <JSON>).
+Stages run on the design executor under their timeouts (see stage_executor.py);
+each step's searches count against the feasibility timeout on their own, and a
+step whose searches time out is reported with failed queries instead of ending
+the stream.
+"""
+import asyncio
+import logging
+import time
+
+from agents.common import wire_format
+from agents.common.structured_logging import log_event
+
+from .batch import SharedSearch
+from .collaboration import assess_feasibility, confirm_protocol_with_hypothesizer, feasibility_queries
+from .experiment_designer import (DesignError, _attach_assessment, _require_confirmation, _require_premises,
+                                  decompose_hypothesis, generate_protocol)
+from .models import FeasibilityAssessment, Hypothesis
+from .search_fetcher import SearchResults
+from .stage_executor import StageTimeoutError, get_stage_timeouts, local_executor, run_stage
+
+logger = logging.getLogger(__name__)
+
+SSE_MEDIA_TYPE = "text/event-stream"
+EVENT_TYPES = ('premises', 'step', 'feasibility', 'summary', 'error')
+
+
+def wants_sse(accept: str) -> bool:
+    """True if an Accept header asks for Server-Sent Events."""
+    return any(entry.split(';', 1)[0].strip().lower() == SSE_MEDIA_TYPE for entry in (accept or "").split(','))
+
+
+def format_ndjson(event: dict) -> bytes:
+    return wire_format.dumps_json(event).encode('utf-8') + b"\n"
+
+
+def format_sse(event: dict) -> bytes:
+    return (f"event: {event['event']}\nid: {event['sequence']}\n"
+            f"data: {wire_format.dumps_json(event)}\n\n").encode('utf-8')
+
+
+class DesignStream:
+    """
+    One streamed design. start() runs decomposition, so a hypothesis without
+    premises can still be refused with an HTTP error; events() then yields the
+    rest of the pipeline.
+    """
+    def __init__(self, hypothesis: Hypothesis, executor=None, timeouts: dict = None):
+        self.hypothesis = hypothesis
+        self.executor = executor
+        self.timeouts = timeouts if timeouts is not None else get_stage_timeouts()
+        self.key_premises = None
+        self._sequence = 0
+        self._started = time.perf_counter()
+
+    async def _stage(self, name, fn, *args, on=None, **kwargs):
+        executor = self.executor if on is None else on
+        return await run_stage(name, fn, *args, executor=executor, timeout=self.timeouts.get(name), **kwargs)
+
+    def _event(self, event_type: str, **fields) -> dict:
+        event = {"event": event_type, "sequence": self._sequence, "hypothesis_id": self.hypothesis.hypothesis_id}
+        event.update(fields)
+        self._sequence += 1
+        return event
+
+    async def start(self):
+        """
+        Decomposes the hypothesis.
+
+        Raises:
+            DesignError: If it has no key premises (400) or decomposition times out (504).
+        """
+        try:
+            premises = await self._stage('decompose', decompose_hypothesis, self.hypothesis)
+        except StageTimeoutError as e:
+            raise DesignError(str(e), status_code=504) from e
+        self.key_premises = _require_premises(self.hypothesis, premises)
+        return self
+
+    async def _step_feasibility(self, index: int, step: dict, search: SharedSearch):
+        queries = feasibility_queries(step, index)
+        try:
+            # The shared search lives in this process, so it is not sent to a process pool.
+            results = await self._stage('feasibility', search.fetch, queries, on=local_executor(self.executor))
+        except StageTimeoutError as e:
+            results = SearchResults(failed={query: str(e) for query in queries})
+        if not isinstance(results, SearchResults):
+            results = SearchResults(results)
+        return index, queries, results
+
+    async def events(self):
+        """Yields the remaining events; ends with a summary or an error event."""
+        if self.key_premises is None:
+            await self.start()
+        yield self._event("premises", premises=self.key_premises)
+        try:
+            async for event in self._design():
+                yield event
+        except DesignError as e:
+            yield self._event("error", status_code=e.status_code, detail=e.detail)
+        except StageTimeoutError as e:
+            yield self._event("error", status_code=504, detail=str(e))
+        except Exception as e:
+            logger.error(f"Streaming design of {self.hypothesis.hypothesis_id} failed: {e}", exc_info=True)
+            yield self._event("error", status_code=500, detail=f"Internal server error: {e}")
+
+    async def _design(self):
+        protocol = await self._stage('generate', generate_protocol, self.hypothesis.hypothesis_id, self.key_premises)
+        log_event(logger, logging.DEBUG, "design.protocol_generated", hypothesis_id=self.hypothesis.hypothesis_id,
+                  protocol_id=protocol.protocol_id)
+        _require_confirmation(protocol, await self._stage('confirm', confirm_protocol_with_hypothesizer, protocol))
+        for step in protocol.validation_steps:
+            yield self._event("step", protocol_id=protocol.protocol_id, step=step)
+
+        search = SharedSearch()  # steps with the same description search once
+        step_results = {}
+        pending = [asyncio.ensure_future(self._step_feasibility(i, step, search))
+                   for i, step in enumerate(protocol.validation_steps)]
+        try:
+            for next_done in asyncio.as_completed(pending):
+                index, queries, results = await next_done
+                step_results[index] = (queries, results)
+                step = protocol.validation_steps[index]
+                yield self._event("feasibility", protocol_id=protocol.protocol_id, step_id=step.get("step_id"),
+                                  results=dict(results), failed=results.failed,
+                                  assessment=assess_feasibility(results, protocol.linked_hypothesis_id,
+                                                                [step]).model_dump(mode='json'))
+        finally:
+            for task in pending:
+                task.cancel()
+
+        # The overall assessment sees the results in step order, as check_build_feasibility would.
+        merged = SearchResults()
+        for index in sorted(step_results):
+            queries, results = step_results[index]
+            for query in queries:
+                if query in results:
+                    merged[query] = results[query]
+                elif query in results.failed:
+                    merged.failed[query] = results.failed[query]
+        if protocol.validation_steps:
+            assessment = assess_feasibility(merged, protocol.linked_hypothesis_id, protocol.validation_steps)
+        else:
+            assessment = FeasibilityAssessment(data_obtainability='UNAVAILABLE', tools_availability='REQUIRES_DEVELOPMENT',
+                                               confidence_score=0.25,
+                                               summary="No validation steps provided to assess feasibility.")
+        _attach_assessment(protocol, assessment)
+        yield self._event("summary", protocol=protocol.model_dump(mode='json'), steps=len(protocol.validation_steps),
+                          failed_queries=len(merged.failed),
+                          elapsed_ms=round((time.perf_counter() - self._started) * 1e3, 1))
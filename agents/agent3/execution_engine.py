@@ -4,8 +4,6 @@ from google.cloud import bigquery, storage
 from google.cloud import aiplatform_v1beta1 as aiplatform  # Use v1beta1 for Notebooks
 from .models import BuildStep # Adjusted relative import based on instruction
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 def execute_build_step(step: BuildStep, project_id: str, location: str) -> bool:
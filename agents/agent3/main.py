@@ -8,8 +8,11 @@ from .models import AbstractProtocol, BuildPlan, FeasibilityResponse, Confirmati
 from .plan_translator import translate_protocol_to_build_plan
 from .state_manager import global_state_manager
 from .execution_engine import execute_build_step # Import the new function
+from agents.common.wire_format_routes import WireFormatRoute
 
 app = FastAPI(title="Agent 3: Experiment Builder")
+# Accept and return MessagePack as well as JSON, negotiated per request.
+app.router.route_class = WireFormatRoute
 
 # Retrieve GCP Project ID and Location from environment variables
 # These would need to be set in the environment where Agent 3 runs.
@@ -0,0 +1,269 @@
+"""
+Structured, non-blocking logging shared by the MARS agents.
+
+Modules only ever do `logger = logging.getLogger(__name__)` and emit events; nothing
+configures the root logger at import time. An entry point (a CLI main, a server
+start-up hook) calls configure_logging() once:
+
+    configure_logging(level="INFO", fmt="json", sample={"session.updated": 100})
+    ...
+    shutdown_logging()  # flushes what is still queued
+
+After that every record goes through a QueueHandler: the calling thread only
+appends the record to an in-memory queue (dropping it if the queue is full) and a
+single background thread formats and writes the queued records in batches. Request
+threads therefore never wait on stderr or a log shipper.
+
+Events are written with log_event(), which checks the level before building
+anything, so a disabled DEBUG event costs one method call:
+
+    log_event(logger, logging.INFO, "session.updated", session_id=session_id, writes=3)
+
+With fmt="json" each record is one JSON object per line:
+
+    {"ts": "2026-10-17T09:30:00.123Z", "level": "INFO", "logger": "agents.agent1.session_manager",
+     "event": "session.updated", "session_id": "...", "writes": 3}
+
+MARS_LOG_LEVEL and MARS_LOG_FORMAT provide the defaults for configure_logging().
+"""
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+import time
+
+LOG_LEVEL_ENV_VAR = "MARS_LOG_LEVEL"
+LOG_FORMAT_ENV_VAR = "MARS_LOG_FORMAT"
+FORMATS = ('json', 'text')
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# Attributes every LogRecord has; anything else on a record came from `extra` and is an event field.
+_RECORD_ATTRIBUTES = frozenset(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+
+def log_event(logger: logging.Logger, level: int, event: str, **fields):
+    """
+    Emits a structured event if the logger is enabled for the level.
+
+    Args:
+        logger: The module's logger.
+        level (int): A logging level, e.g. logging.INFO.
+        event (str): A stable, dotted event name such as 'session.updated'.
+        **fields: JSON-serializable event fields. Names must not clash with LogRecord attributes.
+    """
+    if logger.isEnabledFor(level):
+        logger.log(level, event, extra=fields, stacklevel=2)
+
+
+def event_fields(record: logging.LogRecord) -> dict:
+    """The fields passed to log_event (or `extra`) for a record."""
+    return {key: value for key, value in vars(record).items() if key not in _RECORD_ATTRIBUTES}
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats a record as a single-line JSON object: ts, level, logger, event and the event fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts': time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(record.created)) + f".{int(record.msecs):03d}Z",
+            'level': record.levelname,
+            'logger': record.name,
+            'event': record.getMessage(),
+        }
+        entry.update(event_fields(record))
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exception'] = record.exc_text
+        return json.dumps(entry, default=str, separators=(',', ':'))
+
+
+class TextFormatter(logging.Formatter):
+    """The repo's classic text format, with event fields appended as key=value pairs."""
+
+    def __init__(self):
+        super().__init__(TEXT_FORMAT)
+
+    def format(self, record: logging.LogRecord) -> str:
+        text = super().format(record)
+        fields = event_fields(record)
+        if fields:
+            text += " " + " ".join(f"{key}={value}" for key, value in fields.items())
+        return text
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keeps one record in every N for high-frequency events.
+
+    Sampling is deterministic (the 1st, N+1th, 2N+1th, ... record of an event pass),
+    keyed by event name, and never applies to WARNING and above.
+    """
+    def __init__(self, rates: dict):
+        """
+        Args:
+            rates (dict): Maps event names to N, e.g. {'session.updated': 100}.
+        """
+        super().__init__()
+        self.rates = dict(rates)
+        self._counts = dict.fromkeys(self.rates, 0)
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        rate = self.rates.get(record.msg)
+        if rate is None or rate <= 1 or record.levelno >= logging.WARNING:
+            return True
+        with self._lock:
+            count = self._counts[record.msg]
+            self._counts[record.msg] = count + 1
+        if count % rate:
+            return False
+        record.sample_rate = rate
+        return True
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that drops records when its bounded queue is full instead of blocking or erroring."""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+        self._exception_formatter = logging.Formatter()
+
+    def prepare(self, record):
+        # Like QueueHandler.prepare, but keeps the traceback out of the message so the
+        # listener's formatter can place it (JsonFormatter puts it in its own field).
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = self._exception_formatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class _BatchStreamHandler(logging.StreamHandler):
+    """StreamHandler that leaves flushing to the listener, once per drained batch."""
+
+    def flush(self):
+        pass
+
+    def flush_batch(self):
+        super().flush()
+
+
+class BatchingQueueListener(logging.handlers.QueueListener):
+    """
+    QueueListener that wakes every flush_interval seconds and writes everything queued.
+
+    The stock listener blocks in queue.get(), so every record wakes its thread and,
+    on a busy interpreter, takes the GIL from the thread that logged it. Draining in
+    batches keeps the logging thread to a short put_nowait() and the writer to one
+    flush per batch.
+    """
+    def __init__(self, log_queue, *handlers, respect_handler_level=False, flush_interval: float = 0.05):
+        super().__init__(log_queue, *handlers, respect_handler_level=respect_handler_level)
+        self.flush_interval = flush_interval
+
+    def enqueue_sentinel(self):
+        # Blocking put: the queue may be full, and the listener is still draining it.
+        self.queue.put(self._sentinel)
+
+    def _monitor(self):
+        log_queue = self.queue
+        has_task_done = hasattr(log_queue, 'task_done')
+        while True:
+            time.sleep(self.flush_interval)
+            stopped = False
+            while not stopped:
+                try:
+                    record = log_queue.get_nowait()
+                except queue.Empty:
+                    break
+                if record is self._sentinel:
+                    stopped = True
+                else:
+                    self.handle(record)
+                if has_task_done:
+                    log_queue.task_done()
+            for handler in self.handlers:
+                getattr(handler, 'flush_batch', handler.flush)()
+            if stopped:
+                return
+
+
+_listener = None
+_handler = None
+_lock = threading.Lock()
+
+
+def configure_logging(level=None, fmt: str = None, stream=None, sample: dict = None, queue_size: int = 10000,
+                      flush_interval: float = 0.05):
+    """
+    Routes all logging through a bounded queue to a background writer thread.
+
+    Replaces a previous configure_logging() setup, so it can be called again (e.g. in
+    tests). Leaves handlers installed by others on the root logger alone.
+
+    Args:
+        level (str or int, optional): Root level. Defaults to $MARS_LOG_LEVEL, else INFO.
+        fmt (str, optional): 'json' or 'text'. Defaults to $MARS_LOG_FORMAT, else 'json'.
+        stream (file, optional): Where records are written. Defaults to sys.stderr.
+        sample (dict, optional): {event: N} to keep one in N records of high-frequency events.
+        queue_size (int): Records buffered before new ones are dropped.
+        flush_interval (float): Seconds between the writer thread's batches.
+
+    Returns:
+        BatchingQueueListener: The running listener; stop() flushes and ends it.
+    """
+    global _listener, _handler
+    level = level or os.getenv(LOG_LEVEL_ENV_VAR) or 'INFO'
+    fmt = (fmt or os.getenv(LOG_FORMAT_ENV_VAR) or 'json').lower()
+    if fmt not in FORMATS:
+        raise ValueError(f"fmt must be one of {FORMATS}, got '{fmt}'")
+
+    output = _BatchStreamHandler(stream if stream is not None else sys.stderr)
+    output.setFormatter(JsonFormatter() if fmt == 'json' else TextFormatter())
+    handler = DroppingQueueHandler(queue.Queue(maxsize=queue_size))
+    if sample:
+        handler.addFilter(SamplingFilter(sample))
+
+    with _lock:
+        root = logging.getLogger()
+        if _listener is not None:
+            _listener.stop()
+            root.removeHandler(_handler)
+        _listener = BatchingQueueListener(handler.queue, output, respect_handler_level=True,
+                                          flush_interval=flush_interval)
+        _handler = handler
+        root.addHandler(handler)
+        root.setLevel(level.upper() if isinstance(level, str) else level)
+        _listener.start()
+    return _listener
+
+
+def shutdown_logging():
+    """Flushes queued records and removes the handler installed by configure_logging()."""
+    global _listener, _handler
+    with _lock:
+        if _listener is None:
+            return
+        _listener.stop()
+        logging.getLogger().removeHandler(_handler)
+        _listener = None
+        _handler = None
+
+
+def dropped_records() -> int:
+    """Records dropped because the logging queue was full, since configure_logging()."""
+    return _handler.dropped if _handler is not None else 0
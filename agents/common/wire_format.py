@@ -0,0 +1,273 @@
+"""
+Wire format for payloads exchanged between the agents.
+
+Two encodings are supported:
+    application/json       Compact JSON (no indentation or spaces). The default.
+    application/msgpack    MessagePack. Uses the `msgpack` package when it is
+                           installed and a pure-Python implementation otherwise,
+                           so the binary format never becomes a hard dependency.
+
+FastAPI apps opt in with wire_format_routes.WireFormatRoute. This module itself
+does not import FastAPI, so clients that only encode payloads (the Agent 1 CLI,
+the handoff client) stay light.
+"""
+import json
+import struct
+
+from pydantic import BaseModel
+
+try:
+    import msgpack
+except ImportError:  # Optional: fall back to the pure-Python codec below.
+    msgpack = None
+
+JSON_MEDIA_TYPE = "application/json"
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+MSGPACK_MEDIA_TYPES = (MSGPACK_MEDIA_TYPE, "application/x-msgpack", "application/vnd.msgpack")
+MEDIA_TYPES = (JSON_MEDIA_TYPE, MSGPACK_MEDIA_TYPE)
+# Streams of JSON documents, one per line. Routes read these bodies themselves.
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+NDJSON_MEDIA_TYPES = (NDJSON_MEDIA_TYPE, "application/ndjson", "application/jsonl")
+
+
+class WireFormatError(ValueError):
+    """Raised when a payload cannot be decoded or the media type is not supported."""
+
+
+def normalize_media_type(content_type: str) -> str:
+    """Maps a Content-Type/Accept entry to one of MEDIA_TYPES (JSON if empty). Raises WireFormatError if unsupported."""
+    media_type = (content_type or JSON_MEDIA_TYPE).split(';', 1)[0].strip().lower()
+    if media_type in MSGPACK_MEDIA_TYPES:
+        return MSGPACK_MEDIA_TYPE
+    if media_type == JSON_MEDIA_TYPE or media_type.endswith('+json'):
+        return JSON_MEDIA_TYPE
+    raise WireFormatError(f"Unsupported media type '{media_type}'")
+
+
+def is_ndjson(content_type: str) -> bool:
+    """True if a Content-Type/Accept entry names a newline-delimited JSON stream."""
+    return (content_type or "").split(';', 1)[0].strip().lower() in NDJSON_MEDIA_TYPES
+
+
+def negotiate(accept: str) -> str:
+    """
+    Picks the response media type from an Accept header.
+
+    MessagePack is only chosen when the client explicitly prefers it; anything else
+    (missing header, */*, equal quality) gets JSON.
+    """
+    best_media_type, best_quality = JSON_MEDIA_TYPE, -1.0
+    for entry in (accept or "").split(','):
+        parts = [part.strip() for part in entry.split(';')]
+        quality = 1.0
+        for param in parts[1:]:
+            if param.startswith('q='):
+                try:
+                    quality = float(param[2:])
+                except ValueError:
+                    quality = 0.0
+        try:
+            media_type = normalize_media_type(parts[0])
+        except WireFormatError:
+            continue
+        if quality > best_quality or (quality == best_quality and media_type == JSON_MEDIA_TYPE):
+            best_media_type, best_quality = media_type, quality
+    return best_media_type if best_quality > 0 else JSON_MEDIA_TYPE
+
+
+def to_primitive(payload):
+    """Converts pydantic models to plain dicts/lists; other values are returned unchanged."""
+    if isinstance(payload, BaseModel):
+        return payload.model_dump(mode='json')
+    if isinstance(payload, (list, tuple)) and payload and isinstance(payload[0], BaseModel):
+        return [item.model_dump(mode='json') for item in payload]
+    return payload
+
+
+def dumps_json(payload) -> str:
+    """Compact JSON text for a payload (dict, list or pydantic model)."""
+    if isinstance(payload, BaseModel):
+        return payload.model_dump_json()
+    return json.dumps(payload, separators=(',', ':'), ensure_ascii=False)
+
+
+def encode(payload, media_type: str = JSON_MEDIA_TYPE) -> bytes:
+    """Encodes a payload (dict, list or pydantic model) as JSON or MessagePack bytes."""
+    media_type = normalize_media_type(media_type)
+    if media_type == MSGPACK_MEDIA_TYPE:
+        return packb(to_primitive(payload))
+    return dumps_json(payload).encode('utf-8')
+
+
+def decode(data: bytes, media_type: str = JSON_MEDIA_TYPE):
+    """Decodes JSON or MessagePack bytes into plain Python values."""
+    media_type = normalize_media_type(media_type)
+    try:
+        if media_type == MSGPACK_MEDIA_TYPE:
+            return unpackb(data)
+        return json.loads(data)
+    except (ValueError, TypeError, struct.error, IndexError) as e:
+        raise WireFormatError(f"Could not decode {media_type} payload: {e}") from e
+
+
+def decode_model(data: bytes, model_class, media_type: str = JSON_MEDIA_TYPE):
+    """Decodes a payload straight into a pydantic model, using pydantic's own JSON parser for JSON."""
+    if normalize_media_type(media_type) == JSON_MEDIA_TYPE:
+        return model_class.model_validate_json(data)
+    return model_class.model_validate(decode(data, media_type))
+
+
+# --- MessagePack -----------------------------------------------------------------
+
+def packb(value) -> bytes:
+    """Serializes nil/bool/int/float/str/bytes/list/dict values to MessagePack."""
+    if msgpack is not None:
+        return msgpack.packb(value, use_bin_type=True)
+    buffer = bytearray()
+    _pack(value, buffer)
+    return bytes(buffer)
+
+
+def unpackb(data: bytes):
+    """Deserializes a single MessagePack value."""
+    if msgpack is not None:
+        return msgpack.unpackb(data, raw=False, strict_map_key=False)
+    value, position = _unpack(memoryview(data), 0)
+    if position != len(data):
+        raise ValueError(f"{len(data) - position} trailing bytes after MessagePack value")
+    return value
+
+
+def _pack_length(buffer, length, fix_base, fix_limit, formats):
+    if length < fix_limit:
+        buffer.append(fix_base | length)
+        return
+    for limit, header, fmt in formats:
+        if length < limit:
+            buffer.append(header)
+            buffer += struct.pack(fmt, length)
+            return
+    raise ValueError("object too large for MessagePack")
+
+
+_STR_FORMATS = ((1 << 8, 0xd9, '>B'), (1 << 16, 0xda, '>H'), (1 << 32, 0xdb, '>I'))
+_BIN_FORMATS = ((1 << 8, 0xc4, '>B'), (1 << 16, 0xc5, '>H'), (1 << 32, 0xc6, '>I'))
+_ARRAY_FORMATS = ((1 << 16, 0xdc, '>H'), (1 << 32, 0xdd, '>I'))
+_MAP_FORMATS = ((1 << 16, 0xde, '>H'), (1 << 32, 0xdf, '>I'))
+
+
+def _pack(value, buffer):
+    if value is None:
+        buffer.append(0xc0)
+    elif value is True:
+        buffer.append(0xc3)
+    elif value is False:
+        buffer.append(0xc2)
+    elif isinstance(value, int):
+        if 0 <= value < 0x80:
+            buffer.append(value)
+        elif -32 <= value < 0:
+            buffer.append(value & 0xff)
+        elif 0 <= value < (1 << 64):
+            if value < (1 << 8):
+                buffer.append(0xcc)
+                buffer.append(value)
+            elif value < (1 << 16):
+                buffer += b'\xcd' + struct.pack('>H', value)
+            elif value < (1 << 32):
+                buffer += b'\xce' + struct.pack('>I', value)
+            else:
+                buffer += b'\xcf' + struct.pack('>Q', value)
+        elif -(1 << 63) <= value < 0:
+            if value >= -(1 << 7):
+                buffer += b'\xd0' + struct.pack('>b', value)
+            elif value >= -(1 << 15):
+                buffer += b'\xd1' + struct.pack('>h', value)
+            elif value >= -(1 << 31):
+                buffer += b'\xd2' + struct.pack('>i', value)
+            else:
+                buffer += b'\xd3' + struct.pack('>q', value)
+        else:
+            raise ValueError("integer out of MessagePack range")
+    elif isinstance(value, float):
+        buffer += b'\xcb' + struct.pack('>d', value)
+    elif isinstance(value, str):
+        encoded = value.encode('utf-8')
+        _pack_length(buffer, len(encoded), 0xa0, 32, _STR_FORMATS)
+        buffer += encoded
+    elif isinstance(value, (bytes, bytearray, memoryview)):
+        _pack_length(buffer, len(value), 0, 0, _BIN_FORMATS)
+        buffer += value
+    elif isinstance(value, (list, tuple)):
+        _pack_length(buffer, len(value), 0x90, 16, _ARRAY_FORMATS)
+        for item in value:
+            _pack(item, buffer)
+    elif isinstance(value, dict):
+        _pack_length(buffer, len(value), 0x80, 16, _MAP_FORMATS)
+        for key, item in value.items():
+            _pack(key, buffer)
+            _pack(item, buffer)
+    else:
+        raise TypeError(f"Cannot serialize {type(value).__name__} to MessagePack")
+
+
+_FIXED_WIDTH = {
+    0xca: ('>f', 4), 0xcb: ('>d', 8),
+    0xcc: ('>B', 1), 0xcd: ('>H', 2), 0xce: ('>I', 4), 0xcf: ('>Q', 8),
+    0xd0: ('>b', 1), 0xd1: ('>h', 2), 0xd2: ('>i', 4), 0xd3: ('>q', 8),
+}
+_LENGTH_PREFIXED = {
+    # header: (kind, length format, length size)
+    0xd9: ('str', '>B', 1), 0xda: ('str', '>H', 2), 0xdb: ('str', '>I', 4),
+    0xc4: ('bin', '>B', 1), 0xc5: ('bin', '>H', 2), 0xc6: ('bin', '>I', 4),
+    0xdc: ('array', '>H', 2), 0xdd: ('array', '>I', 4),
+    0xde: ('map', '>H', 2), 0xdf: ('map', '>I', 4),
+}
+
+
+def _unpack(data, position):
+    header = data[position]
+    position += 1
+    if header <= 0x7f:
+        return header, position
+    if header >= 0xe0:
+        return header - 0x100, position
+    if 0xa0 <= header <= 0xbf:
+        kind, length = 'str', header & 0x1f
+    elif 0x90 <= header <= 0x9f:
+        kind, length = 'array', header & 0x0f
+    elif 0x80 <= header <= 0x8f:
+        kind, length = 'map', header & 0x0f
+    elif header == 0xc0:
+        return None, position
+    elif header == 0xc2:
+        return False, position
+    elif header == 0xc3:
+        return True, position
+    elif header in _FIXED_WIDTH:
+        fmt, size = _FIXED_WIDTH[header]
+        return struct.unpack_from(fmt, data, position)[0], position + size
+    elif header in _LENGTH_PREFIXED:
+        kind, fmt, size = _LENGTH_PREFIXED[header]
+        length = struct.unpack_from(fmt, data, position)[0]
+        position += size
+    else:
+        raise ValueError(f"Unsupported MessagePack type 0x{header:02x}")
+
+    if kind == 'str' or kind == 'bin':
+        end = position + length
+        if end > len(data):
+            raise ValueError("truncated MessagePack payload")
+        chunk = data[position:end]
+        return (str(chunk, 'utf-8') if kind == 'str' else bytes(chunk)), end
+    if kind == 'array':
+        items = []
+        for _ in range(length):
+            item, position = _unpack(data, position)
+            items.append(item)
+        return items, position
+    mapping = {}
+    for _ in range(length):
+        key, position = _unpack(data, position)
+        mapping[key], position = _unpack(data, position)
+    return mapping, position
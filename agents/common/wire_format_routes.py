@@ -0,0 +1,112 @@
+"""
+FastAPI integration for the agents' wire format (see wire_format.py).
+
+Apps opt in with WireFormatRoute: request bodies are decoded according to their
+Content-Type and responses are encoded according to the Accept header, so existing
+JSON clients are unaffected. NDJSON request bodies are passed through untouched for
+streaming endpoints to read line by line.
+"""
+from fastapi import HTTPException, Request, Response
+from fastapi.datastructures import DefaultPlaceholder
+from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.routing import APIRoute
+from starlette.requests import ClientDisconnect
+
+from .wire_format import (JSON_MEDIA_TYPE, MSGPACK_MEDIA_TYPE, NDJSON_MEDIA_TYPE, WireFormatError, decode, is_ndjson,
+                          negotiate, normalize_media_type, packb)
+
+
+class MessagePackResponse(Response):
+    """Response that packs the endpoint's (JSON-compatible) return value as MessagePack."""
+    media_type = MSGPACK_MEDIA_TYPE
+
+    def render(self, content) -> bytes:
+        return packb(content)
+
+
+class _WireFormatRequest(Request):
+    """Request whose JSON body may arrive MessagePack-encoded."""
+
+    async def json(self):
+        if not hasattr(self, '_json'):
+            media_type = self.scope.get('mars.request_media_type', JSON_MEDIA_TYPE)
+            self._json = decode(await self.body(), media_type)
+        return self._json
+
+
+def _json_content_type_scope(scope):
+    # FastAPI only hands bodies declared as JSON to request.json(); present a
+    # MessagePack body as JSON so it is decoded (by _WireFormatRequest) and validated
+    # exactly like a JSON one.
+    headers = [(name, value) for name, value in scope['headers'] if name != b'content-type']
+    headers.append((b'content-type', JSON_MEDIA_TYPE.encode('latin-1')))
+    return dict(scope, headers=headers, **{'mars.request_media_type': MSGPACK_MEDIA_TYPE})
+
+
+class NDJSONStreamingResponse(StreamingResponse):
+    """
+    Streams NDJSON lines, possibly while the endpoint is still reading the request body.
+
+    StreamingResponse watches for client disconnects by reading receive() alongside the
+    stream, which swallows any request body the endpoint has not consumed yet. This
+    response leaves receive() to the endpoint; a disconnect then surfaces there (as
+    ClientDisconnect) or as a failed send.
+    """
+    media_type = NDJSON_MEDIA_TYPE
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await self.stream_response(send)
+        except OSError:
+            raise ClientDisconnect()
+        if self.background is not None:
+            await self.background()
+
+
+class WireFormatRoute(APIRoute):
+    """
+    APIRoute that accepts JSON or MessagePack request bodies (by Content-Type) and
+    answers in the format preferred by the Accept header.
+
+    MessagePack responses are packed straight from the endpoint's return value; there
+    is no JSON round trip. Endpoints that return a Response themselves, or declare
+    their own response_class, answer as they chose.
+
+    Enable it for a whole app with `app.router.route_class = WireFormatRoute`
+    before declaring the routes.
+    """
+    def _msgpack_route_handler(self):
+        response_class = self.response_class
+        if not isinstance(response_class, DefaultPlaceholder) and response_class is not JSONResponse:
+            return None
+        # FastAPI's request handler takes its response class from the route, so build
+        # a second handler with MessagePackResponse in place of the JSON default.
+        self.response_class = MessagePackResponse
+        try:
+            return super().get_route_handler()
+        finally:
+            self.response_class = response_class
+
+    def get_route_handler(self):
+        json_route_handler = super().get_route_handler()
+        msgpack_route_handler = self._msgpack_route_handler()
+
+        async def wire_format_route_handler(request: Request) -> Response:
+            if is_ndjson(request.headers.get('content-type')):
+                return await json_route_handler(request)
+            try:
+                request_media_type = normalize_media_type(request.headers.get('content-type'))
+            except WireFormatError as e:
+                raise HTTPException(status_code=415, detail=str(e))
+            scope = request.scope
+            if request_media_type == MSGPACK_MEDIA_TYPE:
+                scope = _json_content_type_scope(scope)
+            route_handler = json_route_handler
+            if msgpack_route_handler is not None and negotiate(request.headers.get('accept')) == MSGPACK_MEDIA_TYPE:
+                route_handler = msgpack_route_handler
+            try:
+                return await route_handler(_WireFormatRequest(scope, request.receive))
+            except WireFormatError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+
+        return wire_format_route_handler
@@ -0,0 +1,57 @@
+"""
+Benchmark: batch hypothesis structuring throughput in records/sec.
+
+Generates a synthetic JSONL file of survey records and runs it through
+agents.agent1.batch.run_batch with different worker counts, writing the output to
+a discarding stream.
+
+Run with:
+    python -m benchmarks.bench_batch_structuring [--records 100000] [--workers 1 2 4]
+"""
+import argparse
+import io
+import json
+import os
+import tempfile
+
+from agents.agent1 import batch
+
+
+class _NullWriter(io.TextIOBase):
+    def write(self, text):
+        return len(text)
+
+
+def write_records(path: str, count: int):
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(count):
+            f.write(json.dumps({
+                "topic": f"Topic {i}",
+                "independent_variable": f"Fertilizer dose {i}; Irrigation",
+                "dependent_variable": "Crop yield; Soil moisture",
+                "mechanism": "Nutrient uptake increases; Water stress decreases",
+            }) + "\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--records", type=int, default=100000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--chunk-size", type=int, default=batch.DEFAULT_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "records.jsonl")
+        write_records(path, args.records)
+
+        print(f"{'workers':>8} | {'seconds':>8} | {'records/sec':>12}")
+        print("-" * 34)
+        for workers in args.workers:
+            with open(path, encoding="utf-8") as input_stream:
+                stats = batch.run_batch(input_stream, _NullWriter(), workers=workers, chunk_size=args.chunk_size,
+                                        error_stream=_NullWriter())
+            print(f"{workers:>8} | {stats['seconds']:>8.2f} | {stats['records_per_second']:>12,.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""
+Benchmark: memory and bytes written by long Agent 1 sessions, with and without compaction.
+
+Drives Agent1 through a few very long conversations in 'full' persistence mode,
+where every turn rewrites the session document, and reports the bytes written per
+turn at the end of the run, the final session document size and the peak memory
+traced while the conversations ran.
+
+Run with:
+    python -m benchmarks.bench_compaction [--sessions 5] [--turns 1000] [--keep-turns 20]
+"""
+import argparse
+import contextlib
+import io
+import json
+import tracemalloc
+
+from agents.agent1.agent import Agent1
+from agents.agent1.compaction import ConversationCompactor
+from agents.agent1.local_firestore import LocalFirestoreClient
+from agents.agent1.session_manager import SessionManager
+
+
+class MeasuringClient(LocalFirestoreClient):
+    """LocalFirestoreClient that adds up the JSON size of every document write."""
+
+    def __init__(self):
+        super().__init__()
+        self.bytes_written = 0
+
+    def _write(self, path, data, merge=False, create=False):
+        self.bytes_written += len(json.dumps(data, separators=(',', ':'), default=str))
+        super()._write(path, data, merge=merge, create=create)
+
+
+def run(sessions: int, turns: int, compactor: ConversationCompactor):
+    client = MeasuringClient()
+    manager = SessionManager(firestore_client=client, cache_size=0)
+
+    tracemalloc.start()
+    last_turn_bytes = 0
+    with contextlib.redirect_stdout(io.StringIO()):
+        agents = [Agent1(session_manager=manager, compactor=compactor) for _ in range(sessions)]
+        for turn in range(turns):
+            before = client.bytes_written
+            for agent in agents:
+                agent.handle_message(f"Observation {turn}: " + "x" * 120)
+            last_turn_bytes = (client.bytes_written - before) / sessions
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    document = client.collection(u'hypothesis_sessions').document(agents[0].session_id).get().to_dict()
+    document_bytes = len(json.dumps(document, separators=(',', ':'), default=str))
+    return last_turn_bytes, document_bytes, client.bytes_written, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=5)
+    parser.add_argument("--turns", type=int, default=1000)
+    parser.add_argument("--keep-turns", type=int, default=20)
+    args = parser.parse_args()
+
+    configurations = [
+        ("no compaction", ConversationCompactor(keep_turns=0, max_final_summary_chars=0)),
+        (f"keep last {args.keep_turns} turns", ConversationCompactor(keep_turns=args.keep_turns)),
+    ]
+    print(f"{args.sessions} sessions x {args.turns} turns, full persistence mode")
+    print(f"{'configuration':<22} | {'bytes/turn (last)':>17} | {'session doc':>11} | {'total written':>13} | {'peak memory':>11}")
+    print("-" * 88)
+    for name, compactor in configurations:
+        turn_bytes, document_bytes, total_bytes, peak = run(args.sessions, args.turns, compactor)
+        print(f"{name:<22} | {turn_bytes:>17,.0f} | {document_bytes:>11,} | {total_bytes / 1e6:>10.1f} MB | {peak / 1e6:>8.1f} MB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+"""
+Benchmark: near-duplicate lookups against growing NearDuplicateIndex sizes.
+
+Fills an index with synthetic hypotheses (statements assembled from random topic
+words), then times lookups of rephrased copies of stored hypotheses, which must be
+found, and of unseen hypotheses, which must not. A linear scan comparing the query
+signature with every stored signature is timed as the baseline.
+
+Signatures of the bulk of the index are computed once per run, so building the
+largest index takes a while; --sizes controls how far it goes.
+
+Run with:
+    python -m benchmarks.bench_dedup_index [--sizes 1000 10000 100000] [--queries 200]
+"""
+import argparse
+import random
+import time
+
+from agents.agent1.dedup_index import NearDuplicateIndex
+
+WORDS = ("soil moisture crop yield nitrogen root depth leaf area light exposure temperature rainfall pest "
+         "density canopy cover irrigation frequency seed spacing photosynthesis rate pollinator visits "
+         "fungal load salinity biomass drought tolerance microbial diversity harvest index").split()
+
+
+def make_hypothesis(generator: random.Random) -> dict:
+    independent = " ".join(generator.sample(WORDS, 2))
+    dependent = " ".join(generator.sample(WORDS, 2))
+    mechanism = " ".join(generator.sample(WORDS, 6))
+    return {
+        "statement": f"If we change the {independent}, then we will observe a change in the {dependent}, "
+                     f"because {mechanism}.",
+        "key_variables": {"independent": [independent], "dependent": [dependent]},
+    }
+
+
+def rephrase(hypothesis: dict) -> dict:
+    statement = hypothesis["statement"].replace("If we change the", "If we vary the").rstrip(".") + "!"
+    return dict(hypothesis, statement=statement)
+
+
+def linear_scan(index: NearDuplicateIndex, stored: dict, signature):
+    best = max(stored.items(), key=lambda item: index.similarity(signature, item[1]))
+    return best if index.similarity(signature, best[1]) >= index.threshold else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    generator = random.Random(7)
+    index = NearDuplicateIndex()
+    stored, hypotheses = {}, {}
+    started = time.perf_counter()
+    signature_seconds = 0.0
+
+    print(f"{'hypotheses':>10} | {'LSH us/query':>12} | {'scan us/query':>13} | {'candidates/query':>16} | "
+          f"{'dup recall':>10} | {'false dups':>10}")
+    print("-" * 87)
+    for size in sorted(args.sizes):
+        while len(stored) < size:
+            doc_id = f"h{len(stored)}"
+            hypothesis = make_hypothesis(generator)
+            signature_started = time.perf_counter()
+            signature = index.signature(hypothesis)
+            signature_seconds += time.perf_counter() - signature_started
+            index.add(doc_id, signature)
+            stored[doc_id] = signature
+            hypotheses[doc_id] = hypothesis
+
+        duplicates = [index.signature(rephrase(hypotheses[doc_id])) for doc_id in generator.sample(list(stored), args.queries)]
+        unseen = [index.signature(make_hypothesis(generator)) for _ in range(args.queries)]
+        queries = duplicates + unseen
+
+        checked_before = index.candidates_checked
+        lsh_started = time.perf_counter()
+        results = [index.query(signature) for signature in queries]
+        lsh_us = (time.perf_counter() - lsh_started) / len(queries) * 1e6
+        candidates = (index.candidates_checked - checked_before) / len(queries)
+
+        scan_queries = queries[:20]
+        scan_started = time.perf_counter()
+        for signature in scan_queries:
+            linear_scan(index, stored, signature)
+        scan_us = (time.perf_counter() - scan_started) / len(scan_queries) * 1e6
+
+        recall = sum(1 for matches in results[:args.queries] if matches) / args.queries
+        false_duplicates = sum(1 for matches in results[args.queries:] if matches) / args.queries
+        print(f"{size:>10,} | {lsh_us:>12.1f} | {scan_us:>13.1f} | {candidates:>16.1f} | "
+              f"{recall:>10.1%} | {false_duplicates:>10.1%}")
+
+    print(f"\nSignature: {signature_seconds / len(stored) * 1e3:.2f} ms per hypothesis; "
+          f"total run {time.perf_counter() - started:.0f}s.")
+    print("Unseen hypotheses reuse the same vocabulary, so some of them are genuine near-duplicates.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+"""
+Benchmark: designing many hypotheses one request at a time versus one batch request.
+
+Drives Agent 2's app in-process (fastapi TestClient) with --hypotheses hypotheses
+drawn from --topics shared premises, against a simulated search API that takes
+--delay milliseconds per query (search cache off). Compares one POST
+/design_experiment/ per hypothesis with a single POST /design_experiments/batch,
+sent as a JSON list and as an NDJSON stream, and reports wall time and the number
+of searches issued. TestClient buffers streamed responses, so the time to the first
+protocol is measured on agents.agent2.batch.design_batch directly.
+
+Run with:
+    python -m benchmarks.bench_design_batch [--hypotheses 200] [--delay 20] [--concurrency 8]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import time
+
+from fastapi.testclient import TestClient
+
+from agents.agent2 import batch, search_cache, search_fetcher
+from agents.agent2.main import app
+from agents.common.wire_format import NDJSON_MEDIA_TYPE
+
+
+def make_hypotheses(count: int, topics: int, seed: int = 11) -> list:
+    rng = random.Random(seed)
+    return [{"hypothesis_id": f"h{n}",
+             "statement": f"Premise {n} holds. Topic {rng.randrange(topics)} is measurable.",
+             "core_assumptions": [f"Topic {rng.randrange(topics)} data exists."],
+             "description": "Benchmark hypothesis."} for n in range(count)]
+
+
+def one_by_one(client: TestClient, hypotheses: list):
+    started = time.perf_counter()
+    first = None
+    for hypothesis in hypotheses:
+        client.post("/design_experiment/", json=hypothesis).raise_for_status()
+        first = first or time.perf_counter() - started
+    return time.perf_counter() - started, first
+
+
+def in_process(hypotheses: list, concurrency: int):
+    async def run():
+        started = time.perf_counter()
+        first = None
+        async for _ in batch.design_batch(batch.iter_list(hypotheses), max_concurrency=concurrency):
+            first = first or time.perf_counter() - started
+        return time.perf_counter() - started, first
+    return asyncio.run(run())
+
+
+def batched(client: TestClient, hypotheses: list, concurrency: int, ndjson: bool):
+    started = time.perf_counter()
+    if ndjson:
+        body = "\n".join(json.dumps(hypothesis) for hypothesis in hypotheses)
+        request = dict(content=body, headers={"Content-Type": NDJSON_MEDIA_TYPE})
+    else:
+        request = dict(json=hypotheses)
+    with client.stream("POST", f"/design_experiments/batch?max_concurrency={concurrency}", **request) as response:
+        lines = sum(1 for line in response.iter_lines() if line)
+    assert lines == len(hypotheses), lines
+    return time.perf_counter() - started, None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--hypotheses", type=int, default=200)
+    parser.add_argument("--topics", type=int, default=20)
+    parser.add_argument("--delay", type=float, default=20.0, help="Milliseconds the search API takes per query.")
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args()
+    logging.getLogger("agents").setLevel(logging.ERROR)
+
+    searches = []
+
+    async def search(query):
+        searches.append(query)
+        await asyncio.sleep(args.delay / 1e3)
+        return f"mocked_result for {query}"
+
+    os.environ[search_cache.TTL_ENV_VAR] = "0"
+    search_fetcher.set_search_fetcher(search_fetcher.SearchFetcher(search=search, rate=0))
+    hypotheses = make_hypotheses(args.hypotheses, args.topics)
+    client = TestClient(app)
+
+    print(f"{'mode':<22} | {'total ms':>9} | {'ms / hyp':>8} | {'first ms':>8} | {'searches':>8}")
+    print("-" * 68)
+    runs = [("one request each", lambda: one_by_one(client, hypotheses)),
+            ("batch, JSON list", lambda: batched(client, hypotheses, args.concurrency, ndjson=False)),
+            ("batch, NDJSON", lambda: batched(client, hypotheses, args.concurrency, ndjson=True)),
+            ("design_batch", lambda: in_process(hypotheses, args.concurrency))]
+    for name, run in runs:
+        before = len(searches)
+        elapsed, first = run()
+        first = f"{first * 1e3:>8.1f}" if first is not None else f"{'-':>8}"
+        print(f"{name:<22} | {elapsed * 1e3:>9.0f} | {elapsed / len(hypotheses) * 1e3:>8.2f} | "
+              f"{first} | {len(searches) - before:>8}")
+    search_fetcher.set_search_fetcher(None)
+    del os.environ[search_cache.TTL_ENV_VAR]
+
+
+if __name__ == '__main__':
+    main()
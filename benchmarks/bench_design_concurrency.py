@@ -0,0 +1,79 @@
+"""
+Benchmark: design_experiment latency under concurrent load, stages on the event
+loop versus on the stage executor.
+
+Sends --requests concurrent POST /design_experiment/ requests to Agent 2's app
+in-process (httpx over ASGITransport, one event loop, as under uvicorn). Each
+feasibility check searches a simulated API that takes --delay milliseconds per
+batch of queries (search cache off). With the inline executor the stages run on
+the event loop, as the endpoint originally did, so requests queue behind each
+other's searches; with the thread executor they run on the pool.
+
+Run with:
+    python -m benchmarks.bench_design_concurrency [--requests 100] [--delay 50] [--workers 32 100]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import time
+
+import httpx
+
+from agents.agent2 import search_cache, search_fetcher, stage_executor
+from agents.agent2.main import app
+
+
+async def fire(requests: int) -> tuple:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://agent2", timeout=None) as client:
+        async def one(n):
+            response = await client.post("/design_experiment/", json={
+                "hypothesis_id": f"h{n}", "statement": f"Light speeds growth {n}. Growth {n} is measurable.",
+                "core_assumptions": [], "description": "Concurrency benchmark."})
+            response.raise_for_status()
+            # From when all requests were issued: a blocked loop delays sending as well as answering.
+            return time.perf_counter() - started
+
+        started = time.perf_counter()
+        latencies = await asyncio.gather(*(one(n) for n in range(requests)))
+        return sorted(latencies), time.perf_counter() - started
+
+
+def report(name: str, latencies: list, wall: float):
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(f"{name:<18} | {statistics.median(latencies) * 1e3:>8.0f} | {p99 * 1e3:>8.0f} | "
+          f"{latencies[-1] * 1e3:>8.0f} | {wall * 1e3:>8.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--delay", type=float, default=50.0, help="Milliseconds the search API takes per query.")
+    parser.add_argument("--workers", type=int, nargs="+", default=[32, 100], help="Thread pool sizes to try.")
+    args = parser.parse_args()
+    logging.getLogger("agents").setLevel(logging.ERROR)
+
+    async def search(query):
+        await asyncio.sleep(args.delay / 1e3)
+        return f"mocked_result for {query}"
+
+    os.environ[search_cache.TTL_ENV_VAR] = "0"
+    search_fetcher.set_search_fetcher(search_fetcher.SearchFetcher(search=search, rate=0))
+    print(f"{'executor':<18} | {'p50 ms':>8} | {'p99 ms':>8} | {'max ms':>8} | {'wall ms':>8}")
+    print("-" * 62)
+    try:
+        stage_executor.set_design_executor(None)
+        report("inline (before)", *asyncio.run(fire(args.requests)))
+        for workers in args.workers:
+            stage_executor.set_design_executor(stage_executor.create_executor('thread', workers))
+            report(f"thread x{workers}", *asyncio.run(fire(args.requests)))
+            stage_executor.shutdown_design_executor()
+    finally:
+        search_fetcher.set_search_fetcher(None)
+        del os.environ[search_cache.TTL_ENV_VAR]
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""
+Benchmark: when a client first sees design output, streamed versus one response.
+
+Designs --requests hypotheses of --premises premises each against a simulated search
+API that takes --delay milliseconds per query, with the search cache off
+and the stages on a thread executor. For POST /design_experiment/ the client sees
+nothing until the whole protocol is ready; agents.agent2.streaming.DesignStream
+(what POST /design_experiment/stream sends) delivers the premises, the validation
+steps and each step's feasibility as they are ready. Every --slow-every'th step
+searches --slow-factor times slower, so the full response waits on the slowest
+step while the other steps' results stream out first. Measured in-process.
+
+Run with:
+    python -m benchmarks.bench_design_stream [--requests 20] [--premises 5] [--delay 50]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import time
+
+from agents.agent2 import search_cache, search_fetcher, stage_executor
+from agents.agent2.experiment_designer import design_protocol_async
+from agents.agent2.models import Hypothesis
+from agents.agent2.streaming import DesignStream
+
+
+def make_hypothesis(n: int, premises: int) -> Hypothesis:
+    statement = " ".join(f"Premise {n}-{p} holds." for p in range(premises))
+    return Hypothesis(hypothesis_id=f"h{n}", statement=statement, core_assumptions=[],
+                      description="Streaming benchmark.")
+
+
+async def full_response(hypotheses: list, executor) -> list:
+    async def one(hypothesis):
+        started = time.perf_counter()
+        await design_protocol_async(hypothesis, executor=executor)
+        elapsed = time.perf_counter() - started
+        return {"premises": elapsed, "first step": elapsed, "first feasibility": elapsed, "complete": elapsed}
+    return await asyncio.gather(*(one(hypothesis) for hypothesis in hypotheses))
+
+
+async def streamed(hypotheses: list, executor) -> list:
+    async def one(hypothesis):
+        started = time.perf_counter()
+        seen = {}
+        async for event in DesignStream(hypothesis, executor=executor).events():
+            name = {"premises": "premises", "step": "first step", "feasibility": "first feasibility",
+                    "summary": "complete"}.get(event["event"])
+            if name is not None:
+                seen.setdefault(name, time.perf_counter() - started)
+        return seen
+    return await asyncio.gather(*(one(hypothesis) for hypothesis in hypotheses))
+
+
+def report(name: str, timings: list):
+    columns = ("premises", "first step", "first feasibility", "complete")
+    cells = " | ".join(f"{statistics.median(t[column] for t in timings) * 1e3:>17.0f}" for column in columns)
+    print(f"{name:<14} | {cells}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--premises", type=int, default=5)
+    parser.add_argument("--delay", type=float, default=50.0, help="Milliseconds the search API takes per query.")
+    parser.add_argument("--slow-every", type=int, default=5, help="Every n-th premise searches slowly.")
+    parser.add_argument("--slow-factor", type=float, default=4.0)
+    args = parser.parse_args()
+    logging.getLogger("agents").setLevel(logging.ERROR)
+
+    async def search(query):
+        slow = any(f"-{p} " in query for p in range(0, args.premises, args.slow_every))
+        await asyncio.sleep(args.delay / 1e3 * (args.slow_factor if slow else 1.0))
+        return f"mocked_result for {query}"
+
+    os.environ[search_cache.TTL_ENV_VAR] = "0"
+    search_fetcher.set_search_fetcher(search_fetcher.SearchFetcher(search=search, rate=0))
+    executor = stage_executor.create_executor('thread', 64)
+    hypotheses = [make_hypothesis(n, args.premises) for n in range(args.requests)]
+    print(f"median ms over {args.requests} concurrent designs")
+    print(f"{'mode':<14} | {'premises':>17} | {'first step':>17} | {'first feasibility':>17} | {'complete':>17}")
+    print("-" * 95)
+    try:
+        report("full response", asyncio.run(full_response(hypotheses, executor)))
+        report("streamed", asyncio.run(streamed(hypotheses, executor)))
+    finally:
+        executor.shutdown()
+        search_fetcher.set_search_fetcher(None)
+        del os.environ[search_cache.TTL_ENV_VAR]
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+"""
+Benchmark: latency of the external searches behind a build-feasibility check.
+
+Starts a local fake search server that answers every query after --delay
+milliseconds, then fetches the queries check_build_feasibility generates for
+protocols of 10, 100 and 1000 validation steps: once serially (one request at a
+time, as fetch_external_data did) and once with SearchFetcher under a
+concurrency cap and rate limit. --distinct is the fraction of steps with a
+distinct description; repeated steps produce duplicate queries that the fetcher
+searches once. The serial run is skipped above --serial-max-steps.
+
+Run with:
+    python -m benchmarks.bench_feasibility_fetch [--delay 20] [--concurrency 32] [--rate 1000]
+"""
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import httpx
+
+from agents.agent2.search_fetcher import SearchFetcher
+
+
+class SearchServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128  # the default of 5 drops concurrent connects
+
+
+def start_server(delay: float):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive, like a real search API
+        disable_nagle_algorithm = True
+
+        def do_GET(self):
+            query = parse_qs(urlparse(self.path).query).get("q", [""])[0]
+            time.sleep(delay)
+            body = json.dumps({"items": [{"title": query, "snippet": f"About {query}"}]}).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = SearchServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/search"
+
+
+def step_queries(steps: int, distinct: float) -> list:
+    descriptions = max(1, int(steps * distinct))
+    queries = []
+    for i in range(steps):
+        description = f"Measure variable {i % descriptions}"
+        queries += [f"Public datasets for {description}", f"Python libraries for {description}",
+                    f"Availability of computational model for {description}"]
+    return queries
+
+
+def timed_serial_fetch(url: str, queries: list) -> float:
+    started = time.perf_counter()
+    with httpx.Client() as client:
+        for query in queries:
+            client.get(url, params={"q": query}).raise_for_status()
+    return time.perf_counter() - started
+
+
+def timed_fetch(fetcher: SearchFetcher, queries: list):
+    started = time.perf_counter()
+    results = fetcher.fetch(queries)
+    return time.perf_counter() - started, len(results.failed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--steps", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--delay", type=float, default=20.0, help="Milliseconds the server takes per query.")
+    parser.add_argument("--distinct", type=float, default=0.5)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--rate", type=float, default=1000.0, help="Requests per second; 0 for unlimited.")
+    parser.add_argument("--timeout", type=float, default=10.0)
+    parser.add_argument("--serial-max-steps", type=int, default=100)
+    args = parser.parse_args()
+
+    server, url = start_server(args.delay / 1e3)
+    print(f"{'steps':>5} | {'queries':>7} | {'distinct':>8} | {'serial ms':>10} | {'concurrent ms':>13} | "
+          f"{'speedup':>7} | {'failed':>6}")
+    print("-" * 75)
+    try:
+        for steps in args.steps:
+            queries = step_queries(steps, args.distinct)
+            distinct = len(set(queries))
+            serial = None
+            if steps <= args.serial_max_steps:
+                # One request at a time over every query, duplicates included.
+                serial = timed_serial_fetch(url, queries)
+            fetcher = SearchFetcher(url, max_concurrency=args.concurrency, rate=args.rate, timeout=args.timeout)
+            concurrent, failed = timed_fetch(fetcher, queries)
+            serial_ms = f"{serial * 1e3:>10.0f}" if serial is not None else f"{'skipped':>10}"
+            speedup = f"{serial / concurrent:>6.1f}x" if serial is not None else f"{'-':>7}"
+            print(f"{steps:>5} | {len(queries):>7} | {distinct:>8} | {serial_ms} | {concurrent * 1e3:>13.0f} | "
+                  f"{speedup} | {failed:>6}")
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
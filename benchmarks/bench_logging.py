@@ -0,0 +1,139 @@
+"""
+Benchmark: Agent 2 request latency with the former print() output vs structured logging.
+
+Calls the design_experiment endpoint coroutine directly (no HTTP) and reports
+mean, p50 and p99 latency for:
+
+- print (previous): the endpoint's former print() statements, written to a file;
+- logging, INFO/json: configure_logging() at INFO, records queued and written to
+  the same kind of file by the background listener;
+- logging, DEBUG/json: every event enabled, including the feasibility summary;
+- logging, WARNING: events gated out before a record is built.
+
+Output goes to a temporary file, or with --sink pipe to a `cat` child process
+reading from a pipe, as when stdout is collected by a container runtime.
+
+Run with:
+    python -m benchmarks.bench_logging [--requests 2000] [--steps 5] [--sink file]
+"""
+import argparse
+import asyncio
+import contextlib
+import statistics
+import subprocess
+import tempfile
+import time
+
+from agents.agent2 import main as agent2_main
+from agents.agent2.collaboration import check_build_feasibility, confirm_protocol_with_hypothesizer
+from agents.agent2.experiment_designer import decompose_hypothesis, generate_protocol
+from agents.agent2.models import Hypothesis
+from agents.common.structured_logging import configure_logging, dropped_records, shutdown_logging
+
+
+async def printing_endpoint(hypothesis: Hypothesis):
+    """The endpoint's body before structured logging, kept here as the baseline."""
+    print(f"Received hypothesis: {hypothesis.hypothesis_id}")
+    key_premises = decompose_hypothesis(hypothesis)
+    print(f"Key premises: {key_premises}")
+    protocol = generate_protocol(hypothesis.hypothesis_id, key_premises)
+    print(f"Generated protocol: {protocol.protocol_id}")
+    print(f"CONFIRMING PROTOCOL WITH HYPOTHESIZER (Agent 1): {protocol.protocol_id}")
+    confirmation_status = confirm_protocol_with_hypothesizer(protocol)
+    print(f"Protocol confirmed with Agent 1: {confirmation_status}")
+    print(f"CHECKING BUILD FEASIBILITY for Hypothesis ID: {protocol.linked_hypothesis_id} "
+          f"with {len(protocol.validation_steps)} steps.")
+    protocol.feasibility_assessment = check_build_feasibility(
+        validation_steps=protocol.validation_steps,
+        linked_hypothesis_id=protocol.linked_hypothesis_id
+    )
+    print(f"Feasibility assessment for Hypothesis {protocol.linked_hypothesis_id}:")
+    print(f"  Data Obtainability: {protocol.feasibility_assessment.data_obtainability}")
+    print(f"  Tools Availability: {protocol.feasibility_assessment.tools_availability}")
+    print(f"  Confidence Score: {protocol.feasibility_assessment.confidence_score}")
+    print(f"  Summary: {protocol.feasibility_assessment.summary}")
+    return protocol
+
+
+def make_hypothesis(i: int, steps: int) -> Hypothesis:
+    return Hypothesis(
+        hypothesis_id=f"h{i}",
+        statement=f"Soil moisture {i} affects crop yield",
+        core_assumptions=[f"Assumption {j} about irrigation and yield" for j in range(steps - 1)],
+        description="Benchmark hypothesis",
+    )
+
+
+def measure(endpoint, hypotheses) -> list:
+    loop = asyncio.new_event_loop()
+    latencies = []
+    try:
+        for hypothesis in hypotheses:
+            started = time.perf_counter()
+            loop.run_until_complete(endpoint(hypothesis))
+            latencies.append(time.perf_counter() - started)
+    finally:
+        loop.close()
+    return latencies
+
+
+@contextlib.contextmanager
+def open_sink(sink: str):
+    if sink == "file":
+        with tempfile.TemporaryFile("w") as output:
+            yield output
+        return
+    reader = subprocess.Popen(["cat"], stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, text=True)
+    try:
+        yield reader.stdin
+    finally:
+        reader.stdin.close()
+        reader.wait()
+
+
+def run_print(hypotheses, sink: str) -> list:
+    with open_sink(sink) as output, contextlib.redirect_stdout(output):
+        return measure(printing_endpoint, hypotheses)
+
+
+def run_logging(hypotheses, level: str, sink: str) -> list:
+    with open_sink(sink) as output:
+        configure_logging(level=level, fmt="json", stream=output)
+        try:
+            return measure(agent2_main.design_experiment_endpoint, hypotheses)
+        finally:
+            shutdown_logging()
+
+
+def report(name: str, latencies: list):
+    ordered = sorted(latencies)
+    p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+    print(f"{name:<22} | {statistics.mean(ordered) * 1e6:>9.1f} | {statistics.median(ordered) * 1e6:>9.1f} | "
+          f"{p99 * 1e6:>9.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--steps", type=int, default=5, help="Validation steps per hypothesis.")
+    parser.add_argument("--sink", choices=("file", "pipe"), default="file")
+    args = parser.parse_args()
+
+    hypotheses = [make_hypothesis(i, args.steps) for i in range(args.requests)]
+    measure(agent2_main.design_experiment_endpoint, hypotheses[:50])  # warm-up, logging unconfigured
+
+    runs = [
+        ("print (previous)", lambda: run_print(hypotheses, args.sink)),
+        ("logging, INFO/json", lambda: run_logging(hypotheses, "INFO", args.sink)),
+        ("logging, DEBUG/json", lambda: run_logging(hypotheses, "DEBUG", args.sink)),
+        ("logging, WARNING", lambda: run_logging(hypotheses, "WARNING", args.sink)),
+    ]
+    print(f"{'output':<22} | {'mean us':>9} | {'p50 us':>9} | {'p99 us':>9}")
+    print("-" * 58)
+    for name, run in runs:
+        report(name, run())
+    print(f"\nRecords dropped by the logging queue: {dropped_records()}")
+
+
+if __name__ == '__main__':
+    main()
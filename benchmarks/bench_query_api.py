@@ -0,0 +1,83 @@
+"""
+Benchmark: first page of sessions in one state, indexed versus scanned.
+
+Fills two SQLite databases with the same sessions spread over a few states, one
+opened with SECONDARY_INDEXES and one without, and times
+SessionManager.list_sessions_by_state on both, for the first page and for a page
+further down reached through its cursor. Without the index the backend has to
+read and decode the whole collection for every page.
+
+Run with:
+    python -m benchmarks.bench_query_api [--sessions 1000 10000 50000] [--page-size 50]
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+from agents.agent1.session_manager import SECONDARY_INDEXES, SESSIONS_COLLECTION, SessionManager
+from agents.agent1.sqlite_store import SQLiteFirestoreClient
+
+STATES = ("INITIAL", "CLARIFYING", "DRAFTING", "FINALIZED")
+
+
+def fill(client: SQLiteFirestoreClient, sessions: int, generator: random.Random):
+    start = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    collection = client.collection(SESSIONS_COLLECTION)
+    for chunk in range(0, sessions, 500):
+        batch = client.batch()
+        for n in range(chunk, min(chunk + 500, sessions)):
+            batch.set(collection.document(f"session-{n:06d}"), {
+                u'session_id': f"session-{n:06d}",
+                u'current_state': generator.choice(STATES),
+                u'last_updated': start + timedelta(seconds=n),
+                u'conversation_history': [{"role": "user", "content": "x" * 200}],
+            })
+        batch.commit()
+
+
+def time_pages(manager: SessionManager, page_size: int, pages: int, repeat: int):
+    """Seconds per page for the first page and for page `pages`, following cursors."""
+    started = time.perf_counter()
+    for _ in range(repeat):
+        manager.list_sessions_by_state("CLARIFYING", page_size=page_size)
+    first = (time.perf_counter() - started) / repeat
+
+    cursor = None
+    for _ in range(pages - 1):
+        cursor = manager.list_sessions_by_state("CLARIFYING", page_size=page_size, cursor=cursor).next_cursor
+    started = time.perf_counter()
+    for _ in range(repeat):
+        manager.list_sessions_by_state("CLARIFYING", page_size=page_size, cursor=cursor)
+    return first, (time.perf_counter() - started) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--page-size", type=int, default=50)
+    parser.add_argument("--pages", type=int, default=5, help="Page reached through cursors for the second column.")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'sessions':>8} | {'indexed p1 ms':>13} | {f'indexed p{args.pages} ms':>13} | "
+          f"{'scan p1 ms':>10} | {f'scan p{args.pages} ms':>10}")
+    print("-" * 67)
+    with tempfile.TemporaryDirectory() as directory:
+        for sessions in args.sessions:
+            results = []
+            for indexes in (SECONDARY_INDEXES, ()):
+                path = os.path.join(directory, f"{sessions}-{len(indexes)}.db")
+                client = SQLiteFirestoreClient(path, indexes=indexes)
+                fill(client, sessions, random.Random(sessions))
+                results += time_pages(SessionManager(firestore_client=client), args.page_size, args.pages,
+                                      args.repeat)
+                client.close()
+            print(f"{sessions:>8,} | {results[0] * 1e3:>13.2f} | {results[1] * 1e3:>13.2f} | "
+                  f"{results[2] * 1e3:>10.2f} | {results[3] * 1e3:>10.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""
+Benchmark: feasibility-check latency and searches issued with the search cache.
+
+Runs --checks feasibility checks of --steps steps each, drawn from --topics step
+descriptions, against a simulated search API that takes --delay milliseconds per
+query. Compares no cache, a cold cache filling up, a warm cache, and a restarted
+process that only has the on-disk tier.
+
+Run with:
+    python -m benchmarks.bench_search_cache [--checks 200] [--topics 50] [--delay 20]
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+
+from agents.agent2 import search_cache, search_fetcher
+from agents.agent2.collaboration import check_build_feasibility
+
+
+def run_checks(checks: int, steps: int, topics: int, seed: int = 7) -> float:
+    rng = random.Random(seed)
+    started = time.perf_counter()
+    for n in range(checks):
+        validation_steps = [{"description": f"Topic {rng.randrange(topics)}"} for _ in range(steps)]
+        check_build_feasibility(validation_steps, f"H{n}")
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--checks", type=int, default=200)
+    parser.add_argument("--steps", type=int, default=5)
+    parser.add_argument("--topics", type=int, default=50)
+    parser.add_argument("--delay", type=float, default=20.0, help="Milliseconds the search API takes per query.")
+    args = parser.parse_args()
+
+    searches = []
+
+    async def search(query):
+        searches.append(query)
+        await asyncio.sleep(args.delay / 1e3)
+        return f"mocked_result for {query}"
+
+    def measure(name, cache):
+        search_cache.set_search_cache(cache)
+        before, stats_before = len(searches), cache.stats() if cache else None
+        elapsed = run_checks(args.checks, args.steps, args.topics)
+        ratio = f"{'-':>9}"
+        if cache is not None:
+            stats = cache.stats()
+            delta = {k: stats[k] - stats_before[k] for k in ("memory_hits", "disk_hits", "stale_hits", "misses")}
+            ratio = f"{1 - delta['misses'] / sum(delta.values()):>9.1%}"
+        print(f"{name:<10} | {elapsed / args.checks * 1e3:>10.2f} | {len(searches) - before:>8} | {ratio}")
+
+    search_fetcher.set_search_fetcher(search_fetcher.SearchFetcher(search=search, rate=0))
+    print(f"{'cache':<10} | {'ms / check':>10} | {'searches':>8} | {'hit ratio':>9}")
+    print("-" * 46)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "search.db")
+        os.environ[search_cache.TTL_ENV_VAR] = "0"
+        measure("none", None)
+        del os.environ[search_cache.TTL_ENV_VAR]
+        cache = search_cache.SearchCache(path)
+        measure("cold", cache)
+        measure("warm", cache)
+        cache.close()
+        cache = search_cache.SearchCache(path)  # a new process: only the disk tier is warm
+        measure("disk only", cache)
+        cache.close()
+    search_cache.set_search_cache(None)
+    search_fetcher.set_search_fetcher(None)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""
+Benchmark: per-session memory of conversation state, dicts versus compact records.
+
+Builds --sessions live sessions the way Agent1 does, each with --turns user turns
+(a user and an assistant message per turn) and a draft elaborated on every turn,
+once with the original {"role", "content"} / {"id", "text"} dicts and once with
+records.Message / records.Draft, and measures the allocated memory with tracemalloc.
+Message contents are the same strings in both layouts, so the difference is the
+per-record overhead.
+
+Run with:
+    python -m benchmarks.bench_session_memory [--sessions 10000] [--turns 10]
+"""
+import argparse
+import gc
+import tracemalloc
+
+from agents.agent1.records import Draft, Message
+
+
+def dict_session(session: int, turns: int) -> dict:
+    history, drafts = [], []
+    for turn in range(turns):
+        history.append({"role": "user", "content": f"Session {session} message {turn} about soil moisture"})
+        history.append({"role": "assistant", "content": "Message processed."})
+        if not drafts:
+            drafts.append({"id": f"draft_{turn + 1}", "text": "Draft based on 'soil moisture...'"})
+        else:
+            drafts[-1]["text"] += " - further elaborated."
+    return {"current_state": "DRAFTING", "conversation_history": history, "hypothesis_drafts": drafts}
+
+
+def record_session(session: int, turns: int) -> dict:
+    history, drafts = [], []
+    for turn in range(turns):
+        history.append(Message("user", f"Session {session} message {turn} about soil moisture"))
+        history.append(Message("assistant", "Message processed."))
+        if not drafts:
+            drafts.append(Draft(f"draft_{turn + 1}", "Draft based on 'soil moisture...'"))
+        else:
+            drafts[-1].append_text(" - further elaborated.")
+    for draft in drafts:
+        draft.text  # Read once, as persisting the session would.
+    return {"current_state": "DRAFTING", "conversation_history": history, "hypothesis_drafts": drafts}
+
+
+def measure(build, sessions: int, turns: int) -> float:
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    states = [build(session, turns) for session in range(sessions)]
+    allocated = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del states
+    return allocated / sessions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=10000)
+    parser.add_argument("--turns", type=int, nargs="+", default=[5, 10, 20])
+    args = parser.parse_args()
+
+    print(f"{'turns':>5} | {'dict bytes/session':>18} | {'record bytes/session':>20} | {'saved':>6} | "
+          f"{f'dict MB @ {args.sessions:,}':>16} | {f'record MB @ {args.sessions:,}':>18}")
+    print("-" * 100)
+    for turns in args.turns:
+        dicts = measure(dict_session, args.sessions, turns)
+        records = measure(record_session, args.sessions, turns)
+        print(f"{turns:>5} | {dicts:>18,.0f} | {records:>20,.0f} | {1 - records / dicts:>6.1%} | "
+              f"{dicts * args.sessions / 2**20:>16.1f} | {records * args.sessions / 2**20:>18.1f}")
+
+
+if __name__ == '__main__':
+    main()
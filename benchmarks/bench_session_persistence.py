@@ -0,0 +1,114 @@
+"""
+Benchmark: bytes written to Firestore per conversation turn, 'full' vs 'append' persistence.
+
+Drives SessionManager with a synthetic conversation against a recording client that
+measures the JSON-encoded size of every document write. In 'full' mode the bytes per
+turn grow with the length of the conversation; in 'append' mode they stay flat.
+
+Run with:
+    python -m benchmarks.bench_session_persistence [--turns 500]
+"""
+import argparse
+import contextlib
+import io
+import json
+
+from agents.agent1.session_manager import SessionManager
+
+
+class _RecordingDocument:
+    def __init__(self, client, path):
+        self._client = client
+        self.path = path
+        self.id = path.rsplit('/', 1)[-1]
+
+    def collection(self, name):
+        return _RecordingCollection(self._client, f"{self.path}/{name}")
+
+    def set(self, data, merge=False):
+        self._client.record(data)
+
+
+class _RecordingCollection:
+    def __init__(self, client, path):
+        self._client = client
+        self.path = path
+
+    def document(self, doc_id):
+        return _RecordingDocument(self._client, f"{self.path}/{doc_id}")
+
+
+class _RecordingBatch:
+    def __init__(self, client):
+        self._client = client
+        self._writes = []
+
+    def set(self, doc_ref, data, merge=False):
+        self._writes.append(data)
+
+    def commit(self):
+        for data in self._writes:
+            self._client.record(data)
+        self._writes = []
+
+
+class RecordingClient:
+    """Minimal stand-in for firestore.Client that only counts the bytes it is asked to write."""
+
+    def __init__(self):
+        self.bytes_written = 0
+        self.documents_written = 0
+
+    def collection(self, name):
+        return _RecordingCollection(self, name)
+
+    def batch(self):
+        return _RecordingBatch(self)
+
+    def record(self, data):
+        self.bytes_written += len(json.dumps(data, default=str).encode('utf-8'))
+        self.documents_written += 1
+
+
+def run(mode: str, turns: int, report_every: int):
+    client = RecordingClient()
+    manager = SessionManager(firestore_client=client, persistence_mode=mode)
+    history = []
+    drafts = []
+    samples = []
+
+    for turn in range(1, turns + 1):
+        history.append({"role": "user", "content": f"User message {turn}: " + "x" * 120})
+        history.append({"role": "assistant", "content": f"Assistant reply {turn}: " + "y" * 120})
+        if turn % 10 == 1:
+            drafts.append({"id": f"draft_{turn}", "text": f"Draft written on turn {turn}."})
+        else:
+            drafts[-1] = dict(drafts[-1], text=drafts[-1]["text"] + " - further elaborated.")
+
+        before = client.bytes_written
+        with contextlib.redirect_stdout(io.StringIO()):
+            manager.update_session("bench-session", history, "PROCESSING_USER_INPUT", drafts)
+        if turn % report_every == 0 or turn == 1:
+            samples.append((turn, client.bytes_written - before))
+
+    return samples, client.bytes_written
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=500)
+    parser.add_argument("--report-every", type=int, default=100)
+    args = parser.parse_args()
+
+    results = {mode: run(mode, args.turns, args.report_every) for mode in ('full', 'append')}
+
+    print(f"{'turn':>6} | {'full bytes/turn':>16} | {'append bytes/turn':>18}")
+    print("-" * 46)
+    for (turn, full_bytes), (_, append_bytes) in zip(results['full'][0], results['append'][0]):
+        print(f"{turn:>6} | {full_bytes:>16,} | {append_bytes:>18,}")
+    print("-" * 46)
+    print(f"{'total':>6} | {results['full'][1]:>16,} | {results['append'][1]:>18,}")
+
+
+if __name__ == '__main__':
+    main()
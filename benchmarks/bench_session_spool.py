@@ -0,0 +1,108 @@
+"""
+Benchmark: turn latency of session updates through a store brownout.
+
+Runs the same sequence of conversation turns against a LocalFirestoreClient that
+adds --delay milliseconds to every write (a brownout) and optionally fails them
+outright (an outage), once with durability='sync' and once with durability='spool'.
+Reports per-turn update_session latency and, for the spool, how large the log grew
+and how long the replayer needed to catch up once the store was healthy again.
+With --persistence append the spool holds only each turn's changes.
+
+Run with:
+    python -m benchmarks.bench_session_spool [--turns 200] [--delay 20] [--persistence append]
+"""
+import argparse
+import logging
+import os
+import statistics
+import tempfile
+import time
+
+from agents.agent1.local_firestore import LocalFirestoreClient
+from agents.agent1.session_manager import PERSISTENCE_MODES, SESSIONS_COLLECTION, SessionManager
+
+
+class BrownoutClient(LocalFirestoreClient):
+    """Adds one round trip of `delay` seconds to every write or batch commit."""
+
+    def __init__(self, delay: float):
+        super().__init__()
+        self.delay = delay
+        self.down = False
+
+    def _round_trip(self):
+        time.sleep(self.delay)
+        if self.down:
+            raise ConnectionError("store unavailable")
+
+    def _store(self, path, data, merge=False, create=False):
+        return LocalFirestoreClient._write(self, path, data, merge=merge, create=create)
+
+    def _write(self, path, data, merge=False, create=False):
+        self._round_trip()
+        return self._store(path, data, merge=merge, create=create)
+
+    def _commit(self, writes):
+        self._round_trip()
+        with self._lock:
+            for path, data, merge in writes:
+                self._store(path, data, merge=merge)
+
+
+def run_turns(manager: SessionManager, turns: int, sessions: int) -> list:
+    latencies = []
+    histories = {f"s{n}": [] for n in range(sessions)}
+    for turn in range(turns):
+        session_id = f"s{turn % sessions}"
+        histories[session_id].append({"role": "user", "content": f"turn {turn}"})
+        started = time.perf_counter()
+        stored = manager.update_session(session_id, histories[session_id], "CLARIFYING", [])
+        latencies.append((time.perf_counter() - started, stored))
+    return latencies
+
+
+def summarize(name: str, latencies: list):
+    seconds = sorted(latency for latency, _ in latencies)
+    lost = sum(1 for _, stored in latencies if not stored)
+    p99 = seconds[min(len(seconds) - 1, int(len(seconds) * 0.99))]
+    print(f"{name:<22} | {statistics.median(seconds) * 1e3:>8.2f} | {p99 * 1e3:>8.2f} | {lost:>13}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=200)
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument("--delay", type=float, default=20.0, help="Milliseconds added to every store write.")
+    parser.add_argument("--persistence", choices=PERSISTENCE_MODES, default="full")
+    args = parser.parse_args()
+    logging.getLogger("agents").setLevel(logging.CRITICAL)  # sync mode logs every failed turn
+
+    print(f"{'mode / store':<22} | {'p50 ms':>8} | {'p99 ms':>8} | {'failed turns':>13}")
+    print("-" * 60)
+    with tempfile.TemporaryDirectory() as directory:
+        for outage in (False, True):
+            condition = "outage" if outage else "brownout"
+            client = BrownoutClient(args.delay / 1e3)
+            client.down = outage
+            manager = SessionManager(firestore_client=client, persistence_mode=args.persistence)
+            summarize(f"sync / {condition}", run_turns(manager, args.turns, args.sessions))
+
+            client = BrownoutClient(args.delay / 1e3)
+            client.down = outage
+            manager = SessionManager(firestore_client=client, persistence_mode=args.persistence, durability='spool',
+                                     flush_interval=0.5, spool_path=os.path.join(directory, f"{condition}.spool"))
+            summarize(f"spool / {condition}", run_turns(manager, args.turns, args.sessions))
+            if outage:
+                print(f"  spool held {manager.write_behind_stats()['pending_bytes'] / 1024:.1f} KiB during the outage")
+
+            client.down = False
+            started = time.perf_counter()
+            manager.flush()
+            stored = sum(1 for _ in client.collection(SESSIONS_COLLECTION).stream())
+            print(f"  spool caught up in {(time.perf_counter() - started) * 1e3:.0f} ms after recovery; "
+                  f"{stored}/{args.sessions} sessions stored")
+            manager.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""
+Benchmark: StateMachine transitions per second.
+
+Cycles a machine through the conversation states (CLARIFYING -> REFINING ->
+AWAITING_CONFIRMATION -> CLARIFYING -> ...) and reports transitions per second for
+the compiled table in permissive and strict mode, with hooks installed, and for
+the previous implementation that rebuilt the transition dict and printed on
+every call (stdout discarded).
+
+Run with:
+    python -m benchmarks.bench_state_machine [--transitions 1000000]
+"""
+import argparse
+import contextlib
+import io
+import itertools
+import time
+
+from agents.agent1.state_machine import ConversationState, StateMachine
+
+CYCLE = (ConversationState.REFINING, ConversationState.AWAITING_CONFIRMATION, ConversationState.REFINING,
+         ConversationState.CLARIFYING)
+
+
+class RebuildingStateMachine:
+    """The former StateMachine.transition_to, kept here as the baseline."""
+
+    def __init__(self, initial_state):
+        self._current_state = initial_state
+
+    def transition_to(self, new_state):
+        if not isinstance(new_state, ConversationState):
+            raise TypeError("new_state must be an instance of ConversationState")
+        print(f"Attempting transition from {self._current_state.value} to {new_state.value}")
+        allowed_transitions = {
+            ConversationState.AWAITING_INPUT: [ConversationState.CLARIFYING],
+            ConversationState.CLARIFYING: [ConversationState.REFINING, ConversationState.AWAITING_INPUT],
+            ConversationState.REFINING: [ConversationState.AWAITING_CONFIRMATION, ConversationState.CLARIFYING],
+            ConversationState.AWAITING_CONFIRMATION: [ConversationState.FINALIZED, ConversationState.REFINING],
+            ConversationState.FINALIZED: []
+        }
+        if new_state in allowed_transitions.get(self._current_state, []):
+            self._current_state = new_state
+            print(f"Transition successful. New state: {self._current_state.value}")
+        return self._current_state
+
+
+def run(machine, transitions: int) -> float:
+    targets = list(itertools.islice(itertools.cycle(CYCLE), transitions))
+    transition_to = machine.transition_to
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for state in targets:
+            transition_to(state)
+    return transitions / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--transitions", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    hooked = StateMachine(ConversationState.CLARIFYING)
+    hooked.add_pre_hook(lambda machine, old, new: None)
+    hooked.add_post_hook(lambda machine, old, new: None)
+    machines = [
+        ("rebuild + print (previous)", RebuildingStateMachine(ConversationState.CLARIFYING), args.transitions // 10),
+        ("compiled, permissive", StateMachine(ConversationState.CLARIFYING), args.transitions),
+        ("compiled, strict", StateMachine(ConversationState.CLARIFYING, mode='strict'), args.transitions),
+        ("compiled, 2 hooks", hooked, args.transitions),
+    ]
+    print(f"{'machine':<28} | {'transitions/sec':>15}")
+    print("-" * 46)
+    for name, machine, transitions in machines:
+        print(f"{name:<28} | {run(machine, transitions):>15,.0f}")
+
+
+if __name__ == '__main__':
+    main()
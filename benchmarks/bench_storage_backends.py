@@ -0,0 +1,66 @@
+"""
+Benchmark: Agent 1 session persistence throughput per storage backend.
+
+Drives SessionManager (append mode, synchronous durability) through many
+conversations against the in-memory and SQLite backends and reports session
+updates per second and the time to reload every session from storage.
+
+Run with:
+    python -m benchmarks.bench_storage_backends [--sessions 200] [--turns 25]
+"""
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+
+from agents.agent1.local_firestore import LocalFirestoreClient
+from agents.agent1.session_manager import SessionManager
+from agents.agent1.sqlite_store import SQLiteFirestoreClient
+
+
+def run(client, sessions: int, turns: int):
+    manager = SessionManager(firestore_client=client, persistence_mode='append', cache_size=0)
+    histories = {f"session-{i}": [] for i in range(sessions)}
+
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for turn in range(turns):
+            for session_id, history in histories.items():
+                history.append({"role": "user", "content": f"User message {turn}: " + "x" * 120})
+                history.append({"role": "assistant", "content": f"Assistant reply {turn}: " + "y" * 120})
+                manager.update_session(session_id, history, "PROCESSING_USER_INPUT", [])
+    write_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for session_id in histories:
+        assert len(manager.load_conversation_history(session_id)) == 2 * turns
+    read_seconds = time.perf_counter() - started
+    return sessions * turns / write_seconds, read_seconds * 1000 / sessions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=200)
+    parser.add_argument("--turns", type=int, default=25)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        backends = [
+            ("memory", LocalFirestoreClient()),
+            ("sqlite (WAL, synchronous=NORMAL)", SQLiteFirestoreClient(os.path.join(tmp, "normal.db"))),
+            ("sqlite (WAL, synchronous=FULL)", SQLiteFirestoreClient(os.path.join(tmp, "full.db"), synchronous='FULL')),
+        ]
+        print(f"{args.sessions} sessions x {args.turns} turns, append mode")
+        print(f"{'backend':<34} | {'updates/sec':>12} | {'reload ms/session':>17}")
+        print("-" * 70)
+        for name, client in backends:
+            updates_per_second, reload_ms = run(client, args.sessions, args.turns)
+            print(f"{name:<34} | {updates_per_second:>12,.0f} | {reload_ms:>17.2f}")
+            if hasattr(client, 'close'):
+                client.close()
+
+
+if __name__ == '__main__':
+    main()
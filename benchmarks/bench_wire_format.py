@@ -0,0 +1,87 @@
+"""
+Benchmark: encode/decode cost and payload size of inter-agent payloads.
+
+Builds an agent2 Protocol with many validation steps and compares the previous
+pretty-printed JSON, compact JSON and MessagePack (the `msgpack` package when
+installed, otherwise the pure-Python codec in agents.common.wire_format), both
+for plain dicts and for full pydantic model round trips.
+
+Run with:
+    python -m benchmarks.bench_wire_format [--steps 2000] [--repeat 20]
+"""
+import argparse
+import json
+import time
+
+from agents.agent2.models import FeasibilityAssessment, Protocol
+from agents.common import wire_format
+from agents.common.wire_format import JSON_MEDIA_TYPE, MSGPACK_MEDIA_TYPE
+
+
+def make_protocol(steps: int) -> Protocol:
+    return Protocol(
+        protocol_id="bench-protocol",
+        linked_hypothesis_id="bench-hypothesis",
+        validation_steps=[
+            {
+                "step_id": f"step_{i + 1}",
+                "description": f"Test premise: increasing factor {i} changes the measured outcome",
+                "metrics": [{"name": "effect_size", "threshold": 0.2}, {"name": "p_value", "threshold": 0.05}],
+                "data_requirements": [f"dataset_{i % 17}", "weather_daily"],
+                "tool_requirements": ["pandas", "statsmodels"],
+                "sample_size": 100 + i,
+                "estimated_hours": 1.5,
+                "requires_review": i % 3 == 0,
+            }
+            for i in range(steps)
+        ],
+        feasibility_assessment=FeasibilityAssessment(
+            data_obtainability="PUBLIC", tools_availability="OPEN_SOURCE", confidence_score=0.8, summary="ok"
+        ),
+    )
+
+
+def timed(function, repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        function()
+    return (time.perf_counter() - started) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--steps", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    protocol = make_protocol(args.steps)
+    data = protocol.model_dump(mode="json")
+    pretty = json.dumps(data, indent=4).encode("utf-8")
+    compact = wire_format.encode(data, JSON_MEDIA_TYPE)
+    packed = wire_format.encode(data, MSGPACK_MEDIA_TYPE)
+
+    codec = "msgpack (C extension)" if wire_format.msgpack is not None else "msgpack (pure Python)"
+    rows = [
+        ("pretty JSON (indent=4)", len(pretty),
+         timed(lambda: json.dumps(data, indent=4).encode("utf-8"), args.repeat),
+         timed(lambda: json.loads(pretty), args.repeat),
+         timed(lambda: Protocol.model_validate_json(pretty), args.repeat)),
+        ("compact JSON", len(compact),
+         timed(lambda: wire_format.encode(data, JSON_MEDIA_TYPE), args.repeat),
+         timed(lambda: wire_format.decode(compact, JSON_MEDIA_TYPE), args.repeat),
+         timed(lambda: wire_format.decode_model(compact, Protocol, JSON_MEDIA_TYPE), args.repeat)),
+        (codec, len(packed),
+         timed(lambda: wire_format.encode(data, MSGPACK_MEDIA_TYPE), args.repeat),
+         timed(lambda: wire_format.decode(packed, MSGPACK_MEDIA_TYPE), args.repeat),
+         timed(lambda: wire_format.decode_model(packed, Protocol, MSGPACK_MEDIA_TYPE), args.repeat)),
+    ]
+
+    print(f"Protocol with {args.steps} validation steps")
+    print(f"{'format':<24} | {'bytes':>10} | {'encode ms':>9} | {'decode ms':>9} | {'-> model ms':>11}")
+    print("-" * 76)
+    for name, size, encode_ms, decode_ms, model_ms in rows:
+        print(f"{name:<24} | {size:>10,} | {encode_ms:>9.2f} | {decode_ms:>9.2f} | {model_ms:>11.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,9 +1,17 @@
+import asyncio
 import pytest
 import json
-from unittest.mock import patch, call
+from unittest.mock import MagicMock, patch, call
 import uuid
 
+from google.cloud.firestore_v1 import Client as FirestoreClient
+
+from agents.agent1.agent import Agent1
+from agents.agent1.async_session_manager import AsyncSessionManager
 from agents.agent1.hypothesis_builder import HypothesisBuilder
+from agents.agent1.local_firestore import AsyncLocalFirestoreClient, LocalFirestoreClient
+from agents.agent1.records import Draft
+from agents.agent1.session_manager import FINALIZED_HYPOTHESES_COLLECTION, SessionManager
 from agents.agent1.state_machine import ConversationState, StateMachine
 
 
@@ -261,3 +269,85 @@ def test_initiate_experiment_design_called_at_end_of_loop(mock_initiate_experime
     assert payload_data["core_assumptions"] == ["Mechanism for loop"]
     assert payload_data["status"] == "unverified"
     assert "hypothesis_id" in payload_data
+
+
+@pytest.fixture
+def firestore_client():
+    """A mock Firestore client for the Agent1 resume tests."""
+    return MagicMock(spec=FirestoreClient)
+
+@pytest.fixture
+def session_manager(firestore_client):
+    return SessionManager(firestore_client=firestore_client)
+
+def test_agent1_new_session_does_not_load(session_manager):
+    agent = Agent1(session_manager=session_manager)
+    assert agent.current_state == "START"
+    assert session_manager.cache_stats()["misses"] == 0
+
+def test_agent1_resume_from_cache_restores_state_without_read(session_manager, firestore_client):
+    agent = Agent1(session_manager=session_manager)
+    agent.handle_message("Tell me about soil health.")
+    agent.handle_message("What about nitrogen?")
+
+    resumed = Agent1(session_id=agent.session_id, session_manager=session_manager)
+
+    assert resumed.current_state == agent.current_state
+    assert resumed.conversation_history == agent.conversation_history
+    assert resumed.hypothesis_drafts == agent.hypothesis_drafts
+    assert resumed.message_count == 2
+    assert session_manager.cache_stats()["hits"] == 1
+    firestore_client.collection.return_value.document.return_value.get.assert_not_called()
+
+def test_agent1_resume_unknown_session_starts_fresh(session_manager, firestore_client):
+    snapshot = MagicMock()
+    snapshot.exists = False
+    firestore_client.collection.return_value.document.return_value.get.return_value = snapshot
+
+    agent = Agent1(session_id="unknown-session", session_manager=session_manager)
+
+    assert agent.session_id == "unknown-session"
+    assert agent.current_state == "START"
+    assert agent.conversation_history == []
+
+def test_agent1_draft_reply_formats_the_draft_like_a_dict(session_manager):
+    agent = Agent1(session_manager=session_manager)
+    agent.current_state = "GENERATING_HYPOTHESIS"
+    agent.hypothesis_drafts = [Draft("d1", "txt")]
+
+    reply = agent.handle_message("Go on.")
+
+    assert reply == "Here is a draft: {'id': 'd1', 'text': 'txt'}. What are your thoughts?"
+
+def finalized_hypothesis_ids(store):
+    return [snapshot.id for snapshot in store.collection(FINALIZED_HYPOTHESES_COLLECTION).stream()]
+
+def test_agent1_resumed_finalized_session_keeps_its_final_hypothesis():
+    store = LocalFirestoreClient()
+    agent = Agent1(session_manager=SessionManager(firestore_client=store))
+    for message in ("Soil", "Moisture", "Yield"):
+        agent.handle_message(message)
+    assert agent.current_state == "FINALIZED"
+
+    resumed = Agent1(session_id=agent.session_id, session_manager=SessionManager(firestore_client=store))
+    assert resumed.final_hypothesis_id == agent.final_hypothesis_id
+    resumed.handle_message("One more thing")
+
+    assert resumed.final_hypothesis_id == agent.final_hypothesis_id
+    assert finalized_hypothesis_ids(store) == [agent.final_hypothesis_id]
+
+def test_agent1_resume_async_keeps_the_final_hypothesis():
+    store = LocalFirestoreClient()
+    agent = Agent1(session_manager=SessionManager(firestore_client=store))
+    for message in ("Soil", "Moisture", "Yield"):
+        agent.handle_message(message)
+
+    async def scenario():
+        manager = AsyncSessionManager(firestore_client=AsyncLocalFirestoreClient(sync_client=store))
+        resumed = await Agent1.resume_async(agent.session_id, manager, SessionManager(firestore_client=store))
+        await resumed.handle_message_async("One more thing")
+        return resumed
+
+    resumed = asyncio.run(scenario())
+    assert resumed.final_hypothesis_id == agent.final_hypothesis_id
+    assert finalized_hypothesis_ids(store) == [agent.final_hypothesis_id]
@@ -0,0 +1,179 @@
+import asyncio
+import time
+import unittest
+
+import httpx
+from fastapi.testclient import TestClient
+
+from agents.agent1.api import SessionRegistry, app, get_registry
+from agents.agent1.async_session_manager import AsyncSessionManager
+from agents.agent1.dedup_index import NearDuplicateIndex
+from agents.agent1.local_firestore import AsyncLocalFirestoreClient, LocalFirestoreClient
+from agents.agent1.session_manager import SessionManager
+
+
+def make_registry(latency=0.0, max_active=100, session_manager=None, dedup_index=None):
+    # As in a deployment, both managers share one store.
+    store = LocalFirestoreClient()
+    client = AsyncLocalFirestoreClient(sync_client=store, latency=latency)
+    session_manager = session_manager if session_manager is not None else SessionManager(firestore_client=store)
+    return SessionRegistry(AsyncSessionManager(firestore_client=client, dedup_index=dedup_index),
+                           session_manager=session_manager, max_active=max_active)
+
+
+class TestAgent1Api(unittest.TestCase):
+
+    def setUp(self):
+        self.registry = make_registry()
+        app.dependency_overrides[get_registry] = lambda: self.registry
+        self.client = TestClient(app)
+
+    def tearDown(self):
+        app.dependency_overrides.clear()
+
+    def test_session_lifecycle(self):
+        response = self.client.post("/sessions")
+        self.assertEqual(response.status_code, 201)
+        session_id = response.json()["session_id"]
+        self.assertEqual(response.json()["current_state"], "START")
+
+        response = self.client.post(f"/sessions/{session_id}/messages", json={"content": "Tell me about soil health."})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["current_state"], "PROCESSING_USER_INPUT")
+
+        state = self.client.get(f"/sessions/{session_id}").json()
+        self.assertEqual(state["message_count"], 1)
+        self.assertEqual(len(state["conversation_history"]), 2)
+
+        response = self.client.post(f"/sessions/{session_id}/finalize")
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual(body["current_state"], "FINALIZED")
+        self.assertIsNotNone(body["final_hypothesis_id"])
+
+        # Finalizing twice returns the same hypothesis; further messages are rejected.
+        again = self.client.post(f"/sessions/{session_id}/finalize").json()
+        self.assertEqual(again["final_hypothesis_id"], body["final_hypothesis_id"])
+        response = self.client.post(f"/sessions/{session_id}/messages", json={"content": "One more thing"})
+        self.assertEqual(response.status_code, 409)
+
+    def test_finalize_reports_near_duplicate(self):
+        self.registry = make_registry(dedup_index=NearDuplicateIndex())
+
+        def finalize(content):
+            session_id = self.client.post("/sessions").json()["session_id"]
+            self.client.post(f"/sessions/{session_id}/messages", json={"content": content})
+            return session_id, self.client.post(f"/sessions/{session_id}/finalize").json()
+
+        _, original = finalize("Soil moisture increases crop yield because roots absorb more water.")
+        session_id, duplicate = finalize("Soil moisture increases crop yield because roots absorb more water.")
+        _, other = finalize("Light exposure grows leaf area through photosynthesis.")
+
+        self.assertIsNone(original["duplicate_of"])
+        self.assertNotEqual(duplicate["final_hypothesis_id"], original["final_hypothesis_id"])
+        self.assertEqual(duplicate["duplicate_of"], original["final_hypothesis_id"])
+        self.assertEqual(self.client.get(f"/sessions/{session_id}").json()["duplicate_of"],
+                         original["final_hypothesis_id"])
+        self.assertIsNone(other["duplicate_of"])
+
+    def test_unknown_session_returns_404(self):
+        self.assertEqual(self.client.get("/sessions/missing").status_code, 404)
+        self.assertEqual(self.client.post("/sessions/missing/messages", json={"content": "hi"}).status_code, 404)
+        self.assertEqual(self.client.post("/sessions/missing/finalize").status_code, 404)
+
+    def test_empty_message_rejected(self):
+        session_id = self.client.post("/sessions").json()["session_id"]
+        response = self.client.post(f"/sessions/{session_id}/messages", json={"content": ""})
+        self.assertEqual(response.status_code, 422)
+
+    def test_evicted_session_is_resumed_from_storage(self):
+        self.registry.max_active = 1
+        first = self.client.post("/sessions").json()["session_id"]
+        self.client.post(f"/sessions/{first}/messages", json={"content": "Tell me about soil health."})
+        self.client.post("/sessions")
+        self.assertEqual(len(self.registry), 1)
+
+        state = self.client.get(f"/sessions/{first}").json()
+        self.assertEqual(state["current_state"], "PROCESSING_USER_INPUT")
+        self.assertEqual(state["message_count"], 1)
+
+    def test_evicted_session_is_forgotten_by_both_managers(self):
+        self.registry.max_active = 1
+        forgotten = []
+        self.registry.async_session_manager.forget = lambda session_id: forgotten.append(("async", session_id))
+        self.registry.session_manager.forget = lambda session_id: forgotten.append(("sync", session_id))
+        first = self.client.post("/sessions").json()["session_id"]
+        self.client.post("/sessions")
+
+        self.assertEqual(forgotten, [("async", first), ("sync", first)])
+
+    def test_session_evicted_before_its_first_message_is_resumed(self):
+        self.registry.max_active = 1
+        first = self.client.post("/sessions").json()["session_id"]
+        self.client.post("/sessions")
+        self.assertEqual(len(self.registry), 1)
+
+        response = self.client.post(f"/sessions/{first}/messages", json={"content": "Tell me about soil health."})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.client.get(f"/sessions/{first}").json()["message_count"], 1)
+
+    def test_unstorable_session_is_not_evicted(self):
+        self.registry.max_active = 1
+        self.registry.async_session_manager.db = None
+        first = self.client.post("/sessions").json()["session_id"]
+        self.client.post("/sessions")
+
+        self.assertEqual(len(self.registry), 2)
+        self.assertEqual(self.client.get(f"/sessions/{first}").status_code, 200)
+
+    def test_session_only_known_to_blocking_manager_is_resumed(self):
+        # E.g. an update still in the blocking manager's write-behind buffer.
+        session_manager = SessionManager(firestore_client=LocalFirestoreClient(), durability='batch')
+        self.addCleanup(session_manager.close)
+        self.registry = make_registry(session_manager=session_manager)
+        session_manager.update_session("s1", [{"role": "user", "content": "Hi"}], "PROCESSING_USER_INPUT", [])
+
+        state = self.client.get("/sessions/s1").json()
+        self.assertEqual(state["current_state"], "PROCESSING_USER_INPUT")
+        self.assertEqual(state["message_count"], 1)
+
+
+class TestAgent1ApiConcurrency(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.registry = make_registry(latency=0.05, max_active=1000)
+        app.dependency_overrides[get_registry] = lambda: self.registry
+        self.http = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://agent1")
+
+    async def asyncTearDown(self):
+        await self.http.aclose()
+        app.dependency_overrides.clear()
+
+    async def test_different_sessions_do_not_serialize(self):
+        session_ids = [(await self.http.post("/sessions")).json()["session_id"] for _ in range(50)]
+        started = time.perf_counter()
+        responses = await asyncio.gather(*(
+            self.http.post(f"/sessions/{session_id}/messages", json={"content": "hello"}) for session_id in session_ids
+        ))
+        elapsed = time.perf_counter() - started
+
+        self.assertTrue(all(response.status_code == 200 for response in responses))
+        # Serialized, 50 requests with a 50 ms write each would take 2.5 seconds.
+        self.assertLess(elapsed, 1.0)
+
+    async def test_same_session_requests_are_applied_in_turn(self):
+        session_id = (await self.http.post("/sessions")).json()["session_id"]
+        await asyncio.gather(*(
+            self.http.post(f"/sessions/{session_id}/messages", json={"content": f"message {i}"}) for i in range(2)
+        ))
+
+        state = (await self.http.get(f"/sessions/{session_id}")).json()
+        self.assertEqual(state["message_count"], 2)
+        roles = [message["role"] for message in state["conversation_history"]]
+        self.assertEqual(roles, ["user", "assistant", "user", "assistant"])
+        stored = await self.registry.async_session_manager.load_session(session_id)
+        self.assertEqual(stored["conversation_history"], state["conversation_history"])
+
+
+if __name__ == '__main__':
+    unittest.main()
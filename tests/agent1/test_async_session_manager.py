@@ -0,0 +1,148 @@
+import asyncio
+import time
+import unittest
+
+from agents.agent1.agent import Agent1
+from agents.agent1.async_session_manager import AsyncSessionManager
+from agents.agent1.local_firestore import AsyncLocalFirestoreClient, LocalFirestoreClient
+from agents.agent1.session_manager import SessionManager
+
+
+def make_history(turns):
+    history = []
+    for i in range(turns):
+        history.append({"role": "user", "content": f"question {i}"})
+        history.append({"role": "assistant", "content": f"answer {i}"})
+    return history
+
+
+class TestAsyncSessionManager(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.client = AsyncLocalFirestoreClient()
+        self.manager = AsyncSessionManager(firestore_client=self.client, cache_size=0)
+
+    async def test_update_and_load_full_mode(self):
+        drafts = [{"id": "d1", "text": "Draft"}]
+        self.assertTrue(await self.manager.update_session("s1", make_history(2), "PROCESSING", drafts))
+
+        state = await self.manager.load_session("s1")
+        self.assertEqual(state["current_state"], "PROCESSING")
+        self.assertEqual(state["conversation_history"], make_history(2))
+        self.assertEqual(state["hypothesis_drafts"], drafts)
+
+    async def test_append_mode_writes_only_new_messages(self):
+        manager = AsyncSessionManager(firestore_client=self.client, persistence_mode='append', cache_size=0)
+        await manager.update_session("s1", make_history(1), "START", [])
+        writes_before = self.client.write_count
+        await manager.update_session("s1", make_history(2), "PROCESSING", [])
+
+        # Two new messages plus the session document.
+        self.assertEqual(self.client.write_count - writes_before, 3)
+        self.assertEqual(await manager.load_conversation_history("s1"), make_history(2))
+
+    async def test_load_missing_session_returns_none(self):
+        self.assertIsNone(await self.manager.load_session("missing"))
+
+    async def test_save_final_hypothesis(self):
+        doc_id = await self.manager.save_final_hypothesis("s1", {"title": "T"})
+        self.assertIsNotNone(doc_id)
+        snapshot = await self.client.collection("finalized_hypotheses").document(doc_id).get()
+        self.assertEqual(snapshot.get("session_id"), "s1")
+        self.assertEqual(snapshot.get("hypothesis_content"), {"title": "T"})
+
+    async def test_repeated_save_is_a_noop(self):
+        first_id = await self.manager.save_final_hypothesis("s1", {"title": "T"})
+        writes_before = self.client.write_count
+
+        second_id = await self.manager.save_final_hypothesis("s1", {"title": "T"})
+        # A fresh manager does not know the ID yet; the store rejects the duplicate create.
+        third_id = await AsyncSessionManager(firestore_client=self.client).save_final_hypothesis("s1", {"title": "T"})
+
+        self.assertEqual({first_id, second_id, third_id}, {first_id})
+        self.assertEqual(self.client.write_count, writes_before)
+        self.assertEqual(len(await self.client.collection("finalized_hypotheses").get()), 1)
+
+    async def test_invalid_arguments(self):
+        self.assertFalse(await self.manager.update_session("", [], "START", []))
+        self.assertIsNone(await self.manager.save_final_hypothesis("s1", {}))
+        self.assertIsNone(await self.manager.save_final_hypothesis("", {"title": "T"}))
+
+    async def test_no_client_returns_false(self):
+        manager = AsyncSessionManager()
+        manager.db = None
+        self.assertFalse(await manager.update_session("s1", [], "START", []))
+        self.assertIsNone(await manager.save_final_hypothesis("s1", {"title": "T"}))
+
+    async def test_shares_documents_with_blocking_manager(self):
+        sync_client = LocalFirestoreClient()
+        async_manager = AsyncSessionManager(firestore_client=AsyncLocalFirestoreClient(sync_client=sync_client))
+        await async_manager.update_session("s1", make_history(1), "START", [])
+
+        state = SessionManager(firestore_client=sync_client).load_session("s1")
+        self.assertEqual(state["conversation_history"], make_history(1))
+
+    async def test_concurrent_updates_overlap_io(self):
+        client = AsyncLocalFirestoreClient(latency=0.02)
+        manager = AsyncSessionManager(firestore_client=client)
+        started = time.perf_counter()
+        results = await asyncio.gather(*(
+            manager.update_session(f"s{i}", make_history(1), "START", []) for i in range(500)
+        ))
+        elapsed = time.perf_counter() - started
+
+        self.assertTrue(all(results))
+        # 500 sequential round trips would take 10 seconds.
+        self.assertLess(elapsed, 2.0)
+
+
+class TestAgent1Async(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.client = AsyncLocalFirestoreClient()
+        self.async_manager = AsyncSessionManager(firestore_client=self.client)
+        self.agent = Agent1(session_manager=SessionManager(firestore_client=LocalFirestoreClient()),
+                            async_session_manager=self.async_manager)
+
+    async def test_handle_message_async_persists_and_finalizes(self):
+        await self.agent.handle_message_async("Tell me about soil health.")
+        await self.agent.handle_message_async("What about nitrogen?")
+        response = await self.agent.handle_message_async("And phosphorus?")
+
+        self.assertEqual(self.agent.current_state, "FINALIZED")
+        self.assertIn("Hypothesis saved with ID", response)
+        self.async_manager.cache.clear()
+        state = await self.async_manager.load_session(self.agent.session_id)
+        self.assertEqual(state["conversation_history"], self.agent.conversation_history)
+
+    async def test_messages_after_finalization_keep_one_hypothesis(self):
+        for message in ("Tell me about soil health.", "What about nitrogen?", "And phosphorus?", "Anything else?"):
+            response = await self.agent.handle_message_async(message)
+        finalized_id = await self.agent.finalize_async()
+
+        self.assertIn(f"Hypothesis saved with ID: {finalized_id}.", response)
+        finalized = await self.client.collection("finalized_hypotheses").get()
+        self.assertEqual([snapshot.id for snapshot in finalized], [finalized_id])
+
+    async def test_resume_async(self):
+        await self.agent.handle_message_async("Tell me about soil health.")
+        self.async_manager.cache.clear()
+
+        resumed = await Agent1.resume_async(self.agent.session_id, self.async_manager)
+
+        self.assertEqual(resumed.current_state, "PROCESSING_USER_INPUT")
+        self.assertEqual(resumed.conversation_history, self.agent.conversation_history)
+        self.assertEqual(resumed.message_count, 1)
+
+    async def test_many_concurrent_conversations(self):
+        agents = [Agent1(session_manager=self.agent.session_manager, async_session_manager=self.async_manager)
+                  for _ in range(200)]
+        await asyncio.gather(*(agent.handle_message_async("finalize please") for agent in agents))
+
+        self.assertTrue(all(agent.current_state == "FINALIZED" for agent in agents))
+        finalized = await self.client.collection("finalized_hypotheses").get()
+        self.assertEqual(len(finalized), 200)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+import io
+import json
+import os
+import tempfile
+import unittest
+
+from agents.agent1 import batch
+from agents.agent1.main import main
+from agents.common import wire_format
+
+JSONL_INPUT = (
+    '{"topic": "Soil", "independent_variable": "Nitrogen; Phosphorus", "dependent_variable": "Yield", "mechanism": "Nutrients"}\n'
+    '\n'
+    '{"topic": "Sleep", "iv": "Screen time", "dv": "Sleep quality", "mechanism": "Blue light"}\n'
+    'not json\n'
+    '{"topic": "Missing", "independent_variable": "Light"}\n'
+)
+
+CSV_INPUT = (
+    "topic,independent_variable,dependent_variable,mechanism\n"
+    "Soil,Nitrogen,Yield,Nutrients\n"
+    "Sleep,Screen time,Sleep quality,Blue light\n"
+)
+
+
+class TestStructureRecord(unittest.TestCase):
+
+    def test_matches_interactive_structure(self):
+        hypothesis = batch.structure_record({"iv": "IV1 ; IV2", "dv": "DV1", "mechanism": "Reason1;Reason2"})
+        self.assertEqual(hypothesis["statement"],
+                         "If we change the IV1 ; IV2, then we will observe a change in the DV1, because Reason1;Reason2.")
+        self.assertEqual(hypothesis["key_variables"], {"independent": ["IV1", "IV2"], "dependent": ["DV1"]})
+        self.assertEqual(hypothesis["core_assumptions"], ["Reason1", "Reason2"])
+        self.assertEqual(hypothesis["status"], "unverified")
+
+    def test_missing_components_rejected(self):
+        with self.assertRaisesRegex(ValueError, "dependent_variable, mechanism"):
+            batch.structure_record({"iv": "IV1", "dv": ""})
+
+
+class TestRunBatch(unittest.TestCase):
+
+    def run_batch(self, text, fmt, **kwargs):
+        output, errors = io.StringIO(), io.StringIO()
+        stats = batch.run_batch(io.StringIO(text), output, fmt=fmt, error_stream=errors, **kwargs)
+        return stats, [json.loads(line) for line in output.getvalue().splitlines()], errors.getvalue()
+
+    def test_jsonl_skips_invalid_records(self):
+        stats, hypotheses, errors = self.run_batch(JSONL_INPUT, 'jsonl')
+
+        self.assertEqual((stats["records"], stats["structured"], stats["errors"]), (4, 2, 2))
+        self.assertEqual([h["key_variables"]["independent"] for h in hypotheses], [["Nitrogen", "Phosphorus"], ["Screen time"]])
+        self.assertIn("line 4: skipped (invalid JSON)", errors)
+        self.assertIn("line 5: skipped (missing dependent_variable, mechanism)", errors)
+
+    def test_output_is_the_compact_wire_format(self):
+        output = io.StringIO()
+        batch.run_batch(io.StringIO(CSV_INPUT), output, fmt='csv', error_stream=io.StringIO())
+        for line in output.getvalue().splitlines():
+            self.assertEqual(line, wire_format.dumps_json(json.loads(line)))
+
+    def test_csv(self):
+        stats, hypotheses, _ = self.run_batch(CSV_INPUT, 'csv')
+        self.assertEqual(stats["structured"], 2)
+        self.assertEqual(hypotheses[1]["core_assumptions"], ["Blue light"])
+
+    def test_parallel_chunks_preserve_order(self):
+        records = "".join(
+            json.dumps({"iv": f"IV{i}", "dv": "DV", "mechanism": "M"}) + "\n" for i in range(250)
+        )
+        stats, hypotheses, _ = self.run_batch(records, 'jsonl', workers=2, chunk_size=20)
+
+        self.assertEqual(stats["structured"], 250)
+        self.assertEqual([h["key_variables"]["independent"][0] for h in hypotheses], [f"IV{i}" for i in range(250)])
+        self.assertEqual(len({h["hypothesis_id"] for h in hypotheses}), 250)
+
+    def test_invalid_settings_rejected(self):
+        with self.assertRaises(ValueError):
+            list(batch.structure_stream([], workers=0))
+
+
+class TestBatchCommand(unittest.TestCase):
+
+    def test_batch_subcommand_writes_output_file(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            input_path = os.path.join(tmp, "surveys.csv")
+            output_path = os.path.join(tmp, "hypotheses.jsonl")
+            with open(input_path, "w") as f:
+                f.write(CSV_INPUT)
+
+            exit_code = main(["batch", input_path, "-o", output_path])
+
+            self.assertEqual(exit_code, 0)
+            with open(output_path) as f:
+                self.assertEqual(len(f.readlines()), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
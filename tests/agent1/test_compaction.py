@@ -0,0 +1,133 @@
+import unittest
+
+from agents.agent1.agent import Agent1
+from agents.agent1.compaction import ConversationCompactor, history_bytes, is_summary, user_turn_count
+from agents.agent1.local_firestore import LocalFirestoreClient
+from agents.agent1.session_manager import SessionManager
+
+
+def make_turns(count, start=0):
+    history = []
+    for i in range(start, start + count):
+        history.append({"role": "user", "content": f"question {i}"})
+        history.append({"role": "assistant", "content": f"answer {i}"})
+    return history
+
+
+class TestConversationCompactor(unittest.TestCase):
+
+    def test_short_history_is_untouched(self):
+        compactor = ConversationCompactor(keep_turns=3)
+        history = make_turns(3)
+        self.assertIs(compactor.compact(history), history)
+        self.assertEqual(compactor.stats()["compactions"], 0)
+
+    def test_old_turns_are_folded_into_summary(self):
+        compactor = ConversationCompactor(keep_turns=2)
+        compacted = compactor.compact(make_turns(5))
+
+        self.assertTrue(is_summary(compacted[0]))
+        self.assertEqual(compacted[1:], make_turns(2, start=3))
+        self.assertEqual(compacted[0]["folded_messages"], 6)
+        self.assertEqual(compacted[0]["folded_turns"], 3)
+        self.assertEqual(compacted[0]["content"], "question 0\nquestion 1\nquestion 2")
+        self.assertEqual(user_turn_count(compacted), 5)
+
+    def test_compaction_accumulates(self):
+        compactor = ConversationCompactor(keep_turns=2)
+        history = []
+        for i in range(50):
+            history = compactor.compact(history + make_turns(1, start=i))
+
+        self.assertEqual(len(history), 5)
+        self.assertEqual(history[0]["folded_messages"], 96)
+        self.assertEqual(user_turn_count(history), 50)
+        stats = compactor.stats()
+        self.assertEqual(stats["messages_folded"], 96)
+        self.assertGreater(stats["bytes_saved"], 0)
+
+    def test_summary_content_is_capped(self):
+        compactor = ConversationCompactor(keep_turns=1, snippet_chars=10, max_summary_chars=50)
+        history = []
+        for i in range(100):
+            history = compactor.compact(history + [{"role": "user", "content": f"a long question number {i}"}])
+
+        content = history[0]["content"]
+        self.assertLessEqual(len(content), 50)
+        self.assertTrue(content.endswith("a long que..."))
+
+    def test_final_summary_is_capped(self):
+        compactor = ConversationCompactor(keep_turns=0, max_final_summary_chars=40)
+        history = make_turns(10)
+
+        summary = compactor.final_summary(history)
+
+        self.assertEqual(summary[0], "[16 earlier entries omitted]")
+        self.assertEqual(summary[1:], ["question 8", "answer 8", "question 9", "answer 9"])
+        self.assertEqual(compactor.stats()["final_summaries_capped"], 1)
+
+    def test_final_summary_includes_folded_turns(self):
+        compactor = ConversationCompactor(keep_turns=1)
+        history = compactor.compact(make_turns(2))
+        self.assertEqual(compactor.final_summary(history), ["question 0", "question 1", "answer 1"])
+
+    def test_negative_limits_rejected(self):
+        with self.assertRaises(ValueError):
+            ConversationCompactor(keep_turns=-1)
+
+
+class TestCompactedPersistence(unittest.TestCase):
+
+    def _round_trip(self, persistence_mode):
+        client = LocalFirestoreClient()
+        manager = SessionManager(firestore_client=client, persistence_mode=persistence_mode, cache_size=0)
+        compactor = ConversationCompactor(keep_turns=3)
+        history = []
+        for i in range(20):
+            history = compactor.compact(history + make_turns(1, start=i))
+            self.assertTrue(manager.update_session("s1", history, "PROCESSING_USER_INPUT", []))
+
+        fresh_manager = SessionManager(firestore_client=client, persistence_mode=persistence_mode, cache_size=0)
+        self.assertEqual(fresh_manager.load_conversation_history("s1"), history)
+        return client, fresh_manager, history
+
+    def test_full_mode_document_stays_bounded(self):
+        client, _, history = self._round_trip('full')
+        stored = client.collection(u'hypothesis_sessions').document("s1").get().to_dict()
+        self.assertEqual(len(stored[u'conversation_history']), len(history))
+
+    def test_append_mode_keeps_numbering(self):
+        client, manager, history = self._round_trip('append')
+        messages = client.collection(u'hypothesis_sessions').document("s1").collection(u'messages').get()
+        self.assertEqual(len(messages), 40)
+
+        writes_before = client.write_count
+        history = history + make_turns(1, start=20)
+        manager.update_session("s1", history, "PROCESSING_USER_INPUT", [])
+        # Two new messages and the session document; nothing is rewritten.
+        self.assertEqual(client.write_count - writes_before, 3)
+
+
+class TestAgent1Compaction(unittest.TestCase):
+
+    def test_long_session_stays_bounded(self):
+        client = LocalFirestoreClient()
+        compactor = ConversationCompactor(keep_turns=5, max_final_summary_chars=500)
+        agent = Agent1(session_manager=SessionManager(firestore_client=client), compactor=compactor)
+        for i in range(200):
+            agent.handle_message(f"Observation {i}: " + "x" * 40)
+
+        self.assertEqual(len(agent.conversation_history), 11)
+        self.assertEqual(agent.message_count, 200)
+        self.assertLess(history_bytes(agent.conversation_history), 3000)
+        final_summary = agent.final_hypothesis["conversation_summary"]
+        self.assertLessEqual(sum(len(entry) for entry in final_summary[1:]), 500)
+
+        resumed = Agent1(session_id=agent.session_id, session_manager=SessionManager(firestore_client=client),
+                         compactor=compactor)
+        self.assertEqual(resumed.message_count, 200)
+        self.assertEqual(resumed.conversation_history, agent.conversation_history)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,160 @@
+import json
+import unittest
+from unittest.mock import patch
+
+from agents.agent1.agent import AGENT1_ENGINE, Agent1
+from agents.agent1.conversation_engine import ConversationEngine, ConversationSpecError
+from agents.agent1.hypothesis_builder import HYPOTHESIS_BUILDER_ENGINE, HypothesisBuilder
+from agents.agent1.io_channels import ScriptedChannel
+from agents.agent1.local_firestore import LocalFirestoreClient
+from agents.agent1.session_manager import SessionManager
+from agents.agent1.state_machine import ConversationState
+
+ORDER_SPEC = {
+    "name": "order",
+    "initial_state": "ASKING",
+    "final_state": "DONE",
+    "default_reply": "Noted.",
+    "slots": {
+        "item": {"prompt": "What would you like?"},
+        "size": {"prompt": "What size of {item}?"},
+    },
+    "states": {
+        "ASKING": {"fill": ["item", "size"], "then": "CONFIRMING"},
+        "CONFIRMING": {"auto": True, "rules": [{"reply": "A {size} {item}.", "goto": "CHECKING"}]},
+        "CHECKING": {
+            "prompt": "Correct?",
+            "rules": [
+                {"if": {"answer": ["yes", "y"]}, "action": "place", "reply": "Order {order_id} placed.", "goto": "DONE"},
+                {"clear": ["item", "size"], "reply": "Starting over.", "goto": "ASKING"},
+            ],
+        },
+        "DONE": {},
+    },
+    "after_response": [{"if": {"turns_at_least": 10, "state_not": "DONE"}, "reply": "Too many turns.", "goto": "DONE"}],
+}
+
+
+class TestConversationEngine(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = ConversationEngine(ORDER_SPEC)
+        self.checkpoint = self.engine.initial_checkpoint()
+
+    def test_fills_slots_then_advances(self):
+        self.assertEqual(self.engine.prompt(self.checkpoint), "What would you like?")
+        self.engine.respond(self.checkpoint, "tea")
+        self.assertEqual(self.engine.prompt(self.checkpoint), "What size of tea?")
+        self.engine.respond(self.checkpoint, "large")
+
+        self.assertTrue(self.engine.is_auto(self.checkpoint))
+        self.engine.advance(self.checkpoint)
+        turn = self.engine.advance(self.checkpoint)
+
+        self.assertEqual(turn.replies, ["A large tea."])
+        self.assertEqual((turn.from_state, turn.to_state), ("CONFIRMING", "CHECKING"))
+        self.assertEqual(self.engine.prompt(self.checkpoint), "Correct?")
+
+    def test_rules_actions_and_context(self):
+        self.checkpoint.update(state="CHECKING", slots={"item": "tea", "size": "large"})
+        placed = []
+
+        def place(checkpoint, message):
+            placed.append(dict(checkpoint["slots"]))
+            return {"order_id": 7}
+
+        turn = self.engine.respond(self.checkpoint, "Y", actions={"place": place})
+
+        self.assertEqual(turn.replies, ["Order 7 placed."])
+        self.assertTrue(self.engine.is_final(self.checkpoint))
+        self.assertEqual(placed, [{"item": "tea", "size": "large"}])
+
+    def test_fallback_rule_clears_slots(self):
+        self.checkpoint.update(state="CHECKING", slots={"item": "tea", "size": "large"})
+        self.engine.respond(self.checkpoint, "no")
+        self.assertEqual(self.checkpoint["state"], "ASKING")
+        self.assertEqual(self.checkpoint["slots"], {"item": None, "size": None})
+
+    def test_after_response_rules(self):
+        self.checkpoint.update(state="CHECKING", slots={"item": "tea", "size": "large"}, turns=9)
+        turn = self.engine.respond(self.checkpoint, "no")
+        self.assertEqual(turn.replies, ["Starting over.", "Too many turns."])
+        self.assertEqual(self.checkpoint["state"], "DONE")
+
+    def test_checkpoint_is_json_serializable(self):
+        self.engine.respond(self.checkpoint, "tea")
+        restored = json.loads(json.dumps(self.checkpoint))
+        self.engine.respond(restored, "small")
+        self.assertEqual(restored["slots"], {"item": "tea", "size": "small"})
+        self.assertEqual(restored["turns"], 2)
+
+    def test_missing_action_handler(self):
+        self.checkpoint.update(state="CHECKING", slots={"item": "tea", "size": "large"})
+        with self.assertRaises(KeyError):
+            self.engine.respond(self.checkpoint, "yes")
+
+    def test_invalid_specs_rejected(self):
+        bad_goto = dict(ORDER_SPEC, states=dict(ORDER_SPEC["states"], DONE={"rules": [{"goto": "NOWHERE"}]}))
+        bad_slot = dict(ORDER_SPEC, states=dict(ORDER_SPEC["states"], ASKING={"fill": ["colour"]}))
+        bad_condition = dict(ORDER_SPEC, after_response=[{"if": {"answer_is": "yes"}}])
+        bad_initial = dict(ORDER_SPEC, initial_state="START")
+        for spec in (bad_goto, bad_slot, bad_condition, bad_initial):
+            with self.assertRaises(ConversationSpecError):
+                ConversationEngine(spec)
+
+    def test_unknown_checkpoint_state(self):
+        self.checkpoint["state"] = "LOST"
+        with self.assertRaises(ConversationSpecError):
+            self.engine.respond(self.checkpoint, "tea")
+
+
+@patch('agents.agent1.hypothesis_builder.logger')
+class TestBuilderCheckpoints(unittest.TestCase):
+
+    def test_resume_between_responses(self, mock_logger):
+        builder = HypothesisBuilder(channel=ScriptedChannel([]), handoff=None)
+        builder.start()
+        builder.submit("Topic")
+        builder.submit("IV")
+        saved = json.dumps(builder.checkpoint())
+        del builder
+
+        resumed = HypothesisBuilder.from_checkpoint(json.loads(saved), channel=ScriptedChannel([]), handoff=None)
+        self.assertEqual(resumed.state_machine.current_state, ConversationState.CLARIFYING)
+        self.assertIn("change 'IV'", resumed.pending_prompt())
+        resumed.submit("DV")
+        resumed.submit("Mech")
+        self.assertIsNone(resumed.submit("yes"))
+
+        self.assertTrue(resumed.is_finished)
+        self.assertEqual(json.loads(resumed.final_hypothesis_json)["key_variables"]["dependent"], ["DV"])
+
+    def test_rejects_foreign_checkpoint(self, mock_logger):
+        with self.assertRaises(ValueError):
+            HypothesisBuilder.from_checkpoint(AGENT1_ENGINE.initial_checkpoint())
+
+    def test_engines_are_shared(self, mock_logger):
+        self.assertIs(HypothesisBuilder(handoff=None).engine, HypothesisBuilder(handoff=None).engine)
+        self.assertIs(HypothesisBuilder(handoff=None).engine, HYPOTHESIS_BUILDER_ENGINE)
+
+
+class TestAgent1Engine(unittest.TestCase):
+
+    def test_agent_conversation_follows_spec(self):
+        agent = Agent1(session_manager=SessionManager(firestore_client=LocalFirestoreClient()))
+        self.assertIn("I'm processing it", agent.handle_message("Soil health"))
+        self.assertEqual(agent.handle_message("More detail"), "I'm now generating a hypothesis draft.")
+        self.assertEqual(agent.hypothesis_drafts[-1]["text"], "Draft based on 'Soil health...' - further elaborated.")
+        self.assertEqual(agent.checkpoint(), {"spec": "agent1_session", "state": "GENERATING_HYPOTHESIS",
+                                              "slots": {}, "turns": 2})
+
+    def test_finalize_keyword(self):
+        agent = Agent1(session_manager=SessionManager(firestore_client=LocalFirestoreClient()))
+        response = agent.handle_message("finalize please")
+        self.assertTrue(response.startswith("Finalizing the hypothesis based on our conversation."))
+        self.assertEqual(agent.current_state, "FINALIZED")
+        self.assertEqual(len(agent.hypothesis_drafts), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,143 @@
+import asyncio
+import unittest
+
+from agents.agent1.async_session_manager import AsyncSessionManager
+from agents.agent1.dedup_index import NearDuplicateIndex, hypothesis_text, shingles
+from agents.agent1.local_firestore import AsyncLocalFirestoreClient, LocalFirestoreClient
+from agents.agent1.session_manager import FINALIZED_HYPOTHESES_COLLECTION, SessionManager
+
+
+def structured(statement, independent, dependent):
+    return {"hypothesis_id": statement[:8], "statement": statement,
+            "key_variables": {"independent": [independent], "dependent": [dependent]}}
+
+
+SOIL = structured("If we change the soil moisture, then we will observe a change in the crop yield, "
+                  "because roots absorb more water.", "soil moisture", "crop yield")
+SOIL_REPHRASED = structured("If we change the Soil Moisture then we will observe a change in crop yield, "
+                            "because roots absorb more water!", "soil moisture", "crop yield")
+LIGHT = structured("If we change the light exposure, then we will observe a change in the leaf area, "
+                   "because photosynthesis increases.", "light exposure", "leaf area")
+
+
+class TestNearDuplicateIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.index = NearDuplicateIndex()
+
+    def test_hypothesis_text_ignores_ids_and_punctuation(self):
+        self.assertEqual(hypothesis_text({"hypothesis_id": "x", "statement": "Soil, WATER!",
+                                          "key_variables": {"independent": ["iv"], "dependent": "dv"}}),
+                         "soil water iv dv")
+        self.assertEqual(hypothesis_text({"statement": "If we change the IV, then we will observe a change in the DV."}),
+                         "iv dv")
+        self.assertEqual(hypothesis_text({"title": "Session 1", "details": {"id": "draft_1", "text": "Draft"}}),
+                         "draft")
+        self.assertEqual(hypothesis_text({"full_statement": "S", "independent_variable": "IV",
+                                          "dependent_variable": "DV"}), "s iv dv")
+        self.assertEqual(hypothesis_text({"title": "Only a title"}), "")
+
+    def test_shingles(self):
+        self.assertEqual(shingles("abcdef", 5), {"abcde", "bcdef"})
+        self.assertEqual(shingles("abc", 5), {"abc"})
+        self.assertEqual(shingles("", 5), set())
+
+    def test_signatures_are_deterministic(self):
+        self.assertEqual(self.index.signature(SOIL), NearDuplicateIndex().signature(SOIL))
+        self.assertEqual(len(self.index.signature(SOIL)), 128)
+        self.assertIsNone(self.index.signature({"title": "T"}))
+
+    def test_finds_near_duplicate_only(self):
+        self.index.add("soil", self.index.signature(SOIL))
+        self.index.add("light", self.index.signature(LIGHT))
+
+        doc_id, similarity = self.index.find_duplicate(SOIL_REPHRASED)
+        self.assertEqual(doc_id, "soil")
+        self.assertGreaterEqual(similarity, 0.8)
+        self.assertIsNone(self.index.find_duplicate(structured("Fertilizer changes root depth.", "fertilizer", "depth")))
+        self.assertIsNone(self.index.find_duplicate(SOIL, exclude="soil"))
+
+    def test_remove_and_readd(self):
+        signature = self.index.signature(SOIL)
+        self.index.add("soil", signature)
+        self.index.add("soil", signature)
+        self.assertEqual(len(self.index), 1)
+        self.index.remove("soil")
+        self.assertNotIn("soil", self.index)
+        self.assertEqual(self.index.query(signature), [])
+        self.assertEqual(self.index.stats()["buckets"], 0)
+
+    def test_invalid_configuration(self):
+        with self.assertRaises(ValueError):
+            NearDuplicateIndex(num_perm=128, bands=15)
+        with self.assertRaises(ValueError):
+            NearDuplicateIndex(threshold=0)
+        with self.assertRaises(ValueError):
+            self.index.add("x", (1, 2, 3))
+
+
+class TestSaveTimeDeduplication(unittest.TestCase):
+
+    def setUp(self):
+        self.client = LocalFirestoreClient()
+        self.index = NearDuplicateIndex()
+        self.manager = SessionManager(firestore_client=self.client, dedup_index=self.index)
+
+    def stored_ids(self):
+        return [snapshot.id for snapshot in self.client.collection(FINALIZED_HYPOTHESES_COLLECTION).stream()]
+
+    def document(self, doc_id):
+        return self.client.collection(FINALIZED_HYPOTHESES_COLLECTION).document(doc_id).get().to_dict()
+
+    def test_near_duplicate_is_stored_with_link(self):
+        first_id = self.manager.save_final_hypothesis("s1", SOIL)
+        duplicate_id = self.manager.save_final_hypothesis("s2", SOIL_REPHRASED)
+        other_id = self.manager.save_final_hypothesis("s3", LIGHT)
+
+        self.assertEqual(len({first_id, duplicate_id, other_id}), 3)
+        self.assertCountEqual(self.stored_ids(), [first_id, duplicate_id, other_id])
+        self.assertEqual(self.document(duplicate_id)["session_id"], "s2")
+        self.assertEqual(self.document(duplicate_id)["duplicate_of"], first_id)
+        self.assertNotIn("duplicate_of", self.document(other_id))
+        self.assertEqual(self.index.stats()["duplicates_found"], 1)
+        # Only originals are indexed, so later matches link to the original.
+        self.assertNotIn(duplicate_id, self.index)
+        # The caller can tell, also when saving it again.
+        self.assertEqual(self.manager.duplicate_of(duplicate_id), first_id)
+        self.assertEqual(self.manager.save_final_hypothesis("s2", SOIL_REPHRASED), duplicate_id)
+        self.assertEqual(self.manager.duplicate_of(duplicate_id), first_id)
+        self.assertIsNone(self.manager.duplicate_of(first_id))
+        self.assertIsNone(self.manager.duplicate_of(other_id))
+
+    def test_signature_is_stored_and_index_rebuilt(self):
+        first_id = self.manager.save_final_hypothesis("s1", SOIL)
+        self.assertEqual(len(self.document(first_id)["minhash"]), 128)
+
+        restarted = SessionManager(firestore_client=self.client, dedup_index=NearDuplicateIndex())
+        duplicate_id = restarted.save_final_hypothesis("s2", SOIL_REPHRASED)
+        self.assertEqual(self.document(duplicate_id)["duplicate_of"], first_id)
+        self.assertEqual(restarted.load_dedup_index(), 1)
+
+        rebuilt = SessionManager(firestore_client=self.client, dedup_index=NearDuplicateIndex())
+        self.assertEqual(rebuilt.load_dedup_index(), 1)  # the duplicate is not indexed
+
+    def test_index_loads_documents_saved_without_signature(self):
+        first_id = SessionManager(firestore_client=self.client).save_final_hypothesis("s1", SOIL)
+        duplicate_id = self.manager.save_final_hypothesis("s2", SOIL_REPHRASED)
+        self.assertEqual(self.document(duplicate_id)["duplicate_of"], first_id)
+
+    def test_async_manager(self):
+        async def scenario():
+            manager = AsyncSessionManager(firestore_client=AsyncLocalFirestoreClient(sync_client=self.client),
+                                          dedup_index=NearDuplicateIndex())
+            first_id = await manager.save_final_hypothesis("s1", SOIL)
+            return first_id, await manager.save_final_hypothesis("s2", SOIL_REPHRASED)
+
+        first_id, second_id = asyncio.run(scenario())
+        self.assertNotEqual(first_id, second_id)
+        self.assertCountEqual(self.stored_ids(), [first_id, second_id])
+        self.assertEqual(self.document(second_id)["duplicate_of"], first_id)
+
+
+if __name__ == '__main__':
+    unittest.main()
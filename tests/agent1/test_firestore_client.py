@@ -0,0 +1,124 @@
+import os
+import subprocess
+import sys
+import unittest
+from unittest.mock import patch, MagicMock
+
+from agents.agent1 import firestore_client
+from agents.agent1.local_firestore import LocalFirestoreClient, SERVER_TIMESTAMP as LOCAL_SERVER_TIMESTAMP
+from agents.agent1.session_manager import SessionManager
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+
+class TestFirestoreClientProvider(unittest.TestCase):
+
+    def setUp(self):
+        firestore_client.reset_client()
+        self.addCleanup(firestore_client.reset_client)
+        env_patcher = patch.dict(os.environ, {}, clear=False)
+        env_patcher.start()
+        self.addCleanup(env_patcher.stop)
+        for var in (firestore_client.BACKEND_ENV_VAR, firestore_client.EMULATOR_HOST_ENV_VAR):
+            os.environ.pop(var, None)
+
+    def test_backend_selection(self):
+        self.assertEqual(firestore_client.get_backend(), 'firestore')
+        os.environ[firestore_client.EMULATOR_HOST_ENV_VAR] = "localhost:8080"
+        self.assertEqual(firestore_client.get_backend(), 'emulator')
+        os.environ[firestore_client.BACKEND_ENV_VAR] = "LOCAL"
+        self.assertEqual(firestore_client.get_backend(), 'local')
+        os.environ[firestore_client.BACKEND_ENV_VAR] = "cassandra"
+        with self.assertRaises(ValueError):
+            firestore_client.get_backend()
+
+    def test_local_backend_is_created_once_and_shared(self):
+        os.environ[firestore_client.BACKEND_ENV_VAR] = "local"
+        first = firestore_client.get_client()
+        self.assertIsInstance(first, LocalFirestoreClient)
+        self.assertIs(firestore_client.get_client(), first)
+        self.assertIs(SessionManager().db, first)
+        self.assertIs(firestore_client.server_timestamp(first), LOCAL_SERVER_TIMESTAMP)
+
+    def test_failed_creation_is_remembered_until_reset(self):
+        with patch('agents.agent1.firestore_client._create_client', side_effect=Exception("no credentials")) as create:
+            self.assertIsNone(firestore_client.get_client())
+            self.assertIsNone(firestore_client.get_client())
+            self.assertEqual(create.call_count, 1)
+            firestore_client.reset_client()
+            firestore_client.get_client()
+            self.assertEqual(create.call_count, 2)
+
+    def test_emulator_requires_host(self):
+        os.environ[firestore_client.BACKEND_ENV_VAR] = "emulator"
+        self.assertIsNone(firestore_client.get_client())
+
+    def test_set_client_overrides_backend(self):
+        fake = MagicMock()
+        firestore_client.set_client(fake)
+        self.assertIs(firestore_client.get_client(), fake)
+        self.assertIs(firestore_client.db, fake)
+        firestore_client.set_client(None)
+        os.environ[firestore_client.BACKEND_ENV_VAR] = "local"
+        self.assertIsInstance(firestore_client.get_client(), LocalFirestoreClient)
+
+    def test_cold_start_does_not_import_firestore_or_grpc(self):
+        code = (
+            "import sys\n"
+            "import agents.agent1.main, agents.agent1.agent, agents.agent1.session_manager\n"
+            "print(any(name.startswith(('google.cloud.firestore', 'grpc')) for name in sys.modules))\n"
+        )
+        result = subprocess.run([sys.executable, "-c", code], cwd=PROJECT_ROOT,
+                                capture_output=True, text=True, check=True)
+        self.assertEqual(result.stdout.strip().splitlines()[-1], "False")
+
+
+class TestLocalFirestoreClient(unittest.TestCase):
+
+    def setUp(self):
+        self.client = LocalFirestoreClient()
+
+    def test_set_get_and_merge(self):
+        doc = self.client.collection("c").document("d")
+        self.assertFalse(doc.get().exists)
+        doc.set({"a": 1, "nested": {"x": 1}, "ts": LOCAL_SERVER_TIMESTAMP})
+        doc.set({"b": 2, "nested": {"y": 2}}, merge=True)
+        data = doc.get().to_dict()
+        self.assertEqual((data["a"], data["b"], data["nested"]), (1, 2, {"x": 1, "y": 2}))
+        self.assertIsNot(data["ts"], LOCAL_SERVER_TIMESTAMP)
+        doc.set({"c": 3})
+        self.assertEqual(doc.get().to_dict(), {"c": 3})
+
+    def test_batch_subcollection_and_ordering(self):
+        session = self.client.collection("sessions").document("s1")
+        batch = self.client.batch()
+        for seq in (2, 0, 1):
+            batch.set(session.collection("messages").document(str(seq)), {"seq": seq})
+        batch.set(session, {"state": "START"}, merge=True)
+        self.assertEqual(self.client.write_count, 0)
+        batch.commit()
+
+        seqs = [snap.to_dict()["seq"] for snap in session.collection("messages").order_by("seq").stream()]
+        self.assertEqual(seqs, [0, 1, 2])
+        self.assertEqual(len(self.client.collection("sessions").get()), 1)
+
+    def test_add_and_create(self):
+        _, doc_ref = self.client.collection("hyps").add({"title": "H"})
+        self.assertEqual(doc_ref.get().to_dict(), {"title": "H"})
+        from agents.agent1.local_firestore import AlreadyExists
+        with self.assertRaises(AlreadyExists):
+            doc_ref.create({"title": "again"})
+
+    def test_session_manager_round_trip(self):
+        manager = SessionManager(firestore_client=self.client, persistence_mode='append', cache_size=0)
+        history = [{"role": "user", "content": "Hi"}, {"role": "assistant", "content": "Hello"}]
+        self.assertTrue(manager.update_session("s1", history, "PROCESSING", [{"id": "d1", "text": "Draft"}]))
+        self.assertIsNotNone(manager.save_final_hypothesis("s1", {"title": "Final"}))
+
+        reloaded = SessionManager(firestore_client=self.client, cache_size=0).load_session("s1")
+        self.assertEqual(reloaded["conversation_history"], history)
+        self.assertEqual(reloaded["hypothesis_drafts"], [{"id": "d1", "text": "Draft"}])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,212 @@
+import json
+import threading
+import unittest
+from unittest.mock import patch
+
+import httpx
+from fastapi.testclient import TestClient
+
+from agents.agent1.handoff import HandoffClient, HandoffError, HandoffQueue, to_agent2_hypothesis
+from agents.agent1.hypothesis_builder import HypothesisBuilder
+from agents.agent1.io_channels import ScriptedChannel
+from agents.agent2.main import app as agent2_app
+from agents.common import wire_format
+
+STRUCTURED = {
+    "hypothesis_id": "hyp-1",
+    "statement": "If we change the light, then we will observe a change in the growth, because photosynthesis.",
+    "key_variables": {"independent": ["light"], "dependent": ["growth"]},
+    "core_assumptions": ["photosynthesis"],
+    "status": "unverified",
+}
+
+
+def no_sleep(seconds):
+    pass
+
+
+def flaky_transport(failures, status_code=503):
+    """MockTransport that fails `failures` times (HTTP status or connection error) and then echoes a protocol."""
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        if len(calls) <= failures:
+            if status_code is None:
+                raise httpx.ConnectError("connection refused", request=request)
+            return httpx.Response(status_code, text="unavailable")
+        body = json.loads(request.content)
+        return httpx.Response(200, json={"protocol_id": "p-1", "linked_hypothesis_id": body["hypothesis_id"]})
+
+    return httpx.MockTransport(handler), calls
+
+
+class TestHandoffClient(unittest.TestCase):
+
+    def test_to_agent2_hypothesis_accepts_json_string(self):
+        body = to_agent2_hypothesis(json.dumps(STRUCTURED))
+        self.assertEqual(body["description"], STRUCTURED["statement"])
+        self.assertEqual(body["metadata"]["key_variables"], STRUCTURED["key_variables"])
+
+    def test_delivers_to_agent2_app(self):
+        client = HandoffClient(client=TestClient(agent2_app))
+        protocol = client.send(STRUCTURED)
+        self.assertEqual(protocol["linked_hypothesis_id"], "hyp-1")
+        self.assertEqual(len(protocol["validation_steps"]), 2)
+        self.assertEqual(client.metrics.snapshot()["delivered"], 1)
+
+    def test_delivers_msgpack_to_agent2_app(self):
+        client = HandoffClient(client=TestClient(agent2_app), media_type=wire_format.MSGPACK_MEDIA_TYPE)
+        self.assertEqual(client.send(STRUCTURED)["linked_hypothesis_id"], "hyp-1")
+
+    def test_retries_transient_status_then_succeeds(self):
+        transport, calls = flaky_transport(failures=2)
+        delays = []
+        client = HandoffClient(client=httpx.Client(transport=transport, base_url="http://agent2"),
+                               backoff=0.1, sleep=delays.append)
+
+        self.assertEqual(client.send(STRUCTURED)["protocol_id"], "p-1")
+        self.assertEqual(len(calls), 3)
+        self.assertEqual(len(delays), 2)
+        self.assertTrue(0 <= delays[0] <= 0.1 and 0 <= delays[1] <= 0.2)  # full jitter
+        self.assertEqual(client.metrics.snapshot()["retries"], 2)
+
+    def test_gives_up_after_max_retries_on_connection_errors(self):
+        transport, calls = flaky_transport(failures=10, status_code=None)
+        client = HandoffClient(client=httpx.Client(transport=transport, base_url="http://agent2"),
+                               max_retries=2, sleep=no_sleep)
+        with self.assertRaises(HandoffError):
+            client.send(STRUCTURED)
+        self.assertEqual(len(calls), 3)
+        self.assertEqual(client.metrics.snapshot()["failed"], 1)
+
+    def test_client_errors_are_not_retried(self):
+        transport, calls = flaky_transport(failures=1, status_code=422)
+        client = HandoffClient(client=httpx.Client(transport=transport, base_url="http://agent2"), sleep=no_sleep)
+        with self.assertRaises(HandoffError) as context:
+            client.send(STRUCTURED)
+        self.assertEqual(context.exception.status_code, 422)
+        self.assertEqual(len(calls), 1)
+
+    def test_undecodable_response_raises_handoff_error(self):
+        transport = httpx.MockTransport(lambda request: httpx.Response(
+            200, content=b'{"protocol_id": ', headers={"content-type": "application/json"}))
+        client = HandoffClient(client=httpx.Client(transport=transport, base_url="http://agent2"), sleep=no_sleep)
+        with self.assertRaises(HandoffError) as context:
+            client.send(STRUCTURED)
+        self.assertEqual(context.exception.status_code, 200)
+        self.assertEqual(client.metrics.snapshot()["failed"], 1)
+
+    def test_requires_url(self):
+        with patch.dict("os.environ", {}, clear=True):
+            with self.assertRaises(ValueError):
+                HandoffClient()
+
+
+class TestHandoffClientAsync(unittest.IsolatedAsyncioTestCase):
+
+    async def test_send_async_over_asgi_transport(self):
+        async_client = httpx.AsyncClient(transport=httpx.ASGITransport(app=agent2_app), base_url="http://agent2")
+        client = HandoffClient(async_client=async_client)
+        protocol = await client.send_async(STRUCTURED)
+        await client.aclose()
+        self.assertEqual(protocol["linked_hypothesis_id"], "hyp-1")
+
+    async def test_send_async_retries_like_send(self):
+        failures = [httpx.ConnectError("connection refused"), httpx.Response(503, text="unavailable")]
+
+        def handler(request):
+            if failures:
+                failure = failures.pop(0)
+                if isinstance(failure, Exception):
+                    raise failure
+                return failure
+            return httpx.Response(200, json={"protocol_id": "p-1"})
+
+        client = HandoffClient(async_client=httpx.AsyncClient(transport=httpx.MockTransport(handler),
+                                                              base_url="http://agent2"), backoff=0)
+        self.assertEqual((await client.send_async(STRUCTURED))["protocol_id"], "p-1")
+        await client.aclose()
+        metrics = client.metrics.snapshot()
+        self.assertEqual((metrics["attempts"], metrics["retries"], metrics["delivered"]), (3, 2, 1))
+
+
+class TestHandoffQueue(unittest.TestCase):
+
+    def test_burst_is_delivered_and_measured(self):
+        results = []
+        handoff_queue = HandoffQueue(HandoffClient(client=TestClient(agent2_app)), workers=4,
+                                     on_result=lambda hypothesis, protocol, error: results.append(error))
+        for i in range(50):
+            self.assertTrue(handoff_queue.submit(dict(STRUCTURED, hypothesis_id=f"hyp-{i}")))
+        handoff_queue.close(wait=True)
+
+        metrics = handoff_queue.metrics()
+        self.assertEqual(results, [None] * 50)
+        self.assertEqual((metrics["submitted"], metrics["delivered"], metrics["queue_depth"]), (50, 50, 0))
+        self.assertGreaterEqual(metrics["max_queue_depth"], 1)
+        self.assertEqual(metrics["latency_ms"]["count"], 50)
+        self.assertEqual(metrics["end_to_end_ms"]["count"], 50)
+
+    def test_full_queue_rejects_without_blocking(self):
+        release = threading.Event()
+        transport = httpx.MockTransport(lambda request: release.wait(5) and httpx.Response(200, json={}))
+        handoff_queue = HandoffQueue(HandoffClient(client=httpx.Client(transport=transport, base_url="http://agent2")),
+                                     workers=1, max_queue=2)
+        accepted = [handoff_queue.submit(STRUCTURED) for _ in range(5)]
+        release.set()
+        handoff_queue.close(wait=True)
+
+        self.assertEqual(accepted.count(False), handoff_queue.metrics()["rejected"])
+        self.assertGreaterEqual(accepted.count(False), 2)
+        self.assertFalse(handoff_queue.submit(STRUCTURED))  # closed
+
+    def test_close_without_wait_returns_while_queue_is_full(self):
+        release = threading.Event()
+        transport = httpx.MockTransport(lambda request: release.wait(5) and httpx.Response(200, json={}))
+        handoff_queue = HandoffQueue(HandoffClient(client=httpx.Client(transport=transport, base_url="http://agent2")),
+                                     workers=2, max_queue=1)
+        handoff_queue.poll_interval = 0.01
+        while handoff_queue.submit(STRUCTURED):
+            pass
+        closer = threading.Thread(target=handoff_queue.close, kwargs={"wait": False})
+        closer.start()
+        closer.join(1)
+        self.assertFalse(closer.is_alive())
+
+        release.set()
+        handoff_queue.join()
+        for thread in handoff_queue._threads:
+            thread.join(1)
+            self.assertFalse(thread.is_alive())
+        self.assertEqual(handoff_queue.metrics()["queue_depth"], 0)
+
+
+@patch('agents.agent1.hypothesis_builder.logger')
+class TestBuilderHandoff(unittest.TestCase):
+
+    def test_builder_posts_final_hypothesis_to_agent2(self, mock_logger):
+        client = HandoffClient(client=TestClient(agent2_app))
+        channel = ScriptedChannel(["Plants", "Light", "Growth", "Photosynthesis", "yes"])
+        builder = HypothesisBuilder(channel=channel, handoff=client)
+
+        builder.run_interaction_loop()
+
+        self.assertEqual(client.metrics.snapshot()["delivered"], 1)
+        self.assertTrue(any("Agent 2 drafted experiment protocol" in text for _, text in channel.transcript))
+
+    def test_builder_queues_handoff(self, mock_logger):
+        handoff_queue = HandoffQueue(HandoffClient(client=TestClient(agent2_app)), workers=1)
+        builder = HypothesisBuilder(channel=ScriptedChannel([]), handoff=handoff_queue)
+        builder.initiate_experiment_design(json.dumps(STRUCTURED))
+        handoff_queue.close(wait=True)
+        self.assertEqual(handoff_queue.metrics()["delivered"], 1)
+
+    def test_without_url_handoff_is_simulated(self, mock_logger):
+        with patch.dict("os.environ", {}, clear=True):
+            builder = HypothesisBuilder(channel=ScriptedChannel([]))
+        self.assertIsNone(builder.handoff)
+
+
+if __name__ == '__main__':
+    unittest.main()
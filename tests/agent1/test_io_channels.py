@@ -0,0 +1,136 @@
+import asyncio
+import io
+import json
+import logging
+import unittest
+from unittest.mock import patch
+
+from agents.agent1.builder_multiplexer import BuilderMultiplexer
+from agents.agent1.hypothesis_builder import CONFIRMATION_PROMPT, HypothesisBuilder
+from agents.agent1.io_channels import AsyncQueueChannel, ConsoleChannel, ScriptedChannel
+from agents.agent1.state_machine import ConversationState
+
+FULL_SCRIPT = ["Topic", "IV", "DV", "Mech", "yes"]
+
+
+@patch('agents.agent1.hypothesis_builder.logger')
+class TestScriptedChannel(unittest.TestCase):
+
+    def test_blocking_loop_runs_on_scripted_channel(self, mock_logger):
+        channel = ScriptedChannel(FULL_SCRIPT)
+        builder = HypothesisBuilder(channel=channel)
+
+        builder.run_interaction_loop()
+
+        self.assertTrue(builder.user_confirmed_hypothesis)
+        self.assertEqual(json.loads(builder.final_hypothesis_json)["key_variables"]["independent"], ["IV"])
+        self.assertEqual(channel.remaining, 0)
+        self.assertIn(('prompt', CONFIRMATION_PROMPT), channel.transcript)
+        # Questions are shown by the channel alone, never through the logger.
+        self.assertFalse([c for c in mock_logger.mock_calls if CONFIRMATION_PROMPT in str(c.args)])
+        self.assertIn(('agent', "'If we change the IV, then we will observe a change in the DV, because Mech.'"), channel.transcript)
+
+    def test_exhausted_script_raises_eof(self, mock_logger):
+        builder = HypothesisBuilder(channel=ScriptedChannel(["Topic"]))
+        with self.assertRaises(EOFError):
+            builder.run_interaction_loop()
+        self.assertEqual(builder.hypothesis_components["general_topic"], "Topic")
+
+
+@patch('agents.agent1.hypothesis_builder.logger')
+class TestEventDrivenBuilder(unittest.TestCase):
+
+    def setUp(self):
+        self.channel = ScriptedChannel([])
+        self.builder = HypothesisBuilder(channel=self.channel)
+
+    def test_start_asks_first_question_without_reading(self, mock_logger):
+        prompt = self.builder.start()
+        self.assertEqual(prompt, "What is the general research area or topic you are interested in exploring?")
+        self.assertEqual(self.builder.pending_prompt(), prompt)
+        self.assertEqual(self.channel.transcript[-1], ('prompt', prompt))
+
+    def test_submit_drives_conversation_to_completion(self, mock_logger):
+        self.builder.start()
+        prompts = [self.builder.submit(response) for response in FULL_SCRIPT]
+
+        self.assertEqual(prompts[3], CONFIRMATION_PROMPT)  # refining ran without input
+        self.assertIsNone(prompts[-1])
+        self.assertTrue(self.builder.is_finished)
+        self.assertIsNotNone(self.builder.final_hypothesis_json)
+        self.assertIsNone(self.builder.submit("late"))
+
+    def test_empty_response_repeats_question(self, mock_logger):
+        first = self.builder.start()
+        self.assertEqual(self.builder.submit("   "), first)
+        self.assertIn(('agent', "Agent: It looks like you didn't enter anything. Could you please provide a response?"), self.channel.transcript)
+        self.assertIsNone(self.builder.hypothesis_components["general_topic"])
+
+    def test_rejection_returns_to_clarifying(self, mock_logger):
+        self.builder.start()
+        for response in ["Topic", "IV", "DV", "Mech"]:
+            self.builder.submit(response)
+        prompt = self.builder.submit("no")
+
+        self.assertEqual(self.builder.state_machine.current_state, ConversationState.CLARIFYING)
+        self.assertIn("what specific factor or variable", prompt)
+
+
+@patch('agents.agent1.hypothesis_builder.logger')
+class TestAsyncDrivers(unittest.IsolatedAsyncioTestCase):
+
+    async def test_run_async_on_queue_channel(self, mock_logger):
+        channel = AsyncQueueChannel()
+        builder = HypothesisBuilder(channel=channel)
+        task = asyncio.create_task(builder.run_async())
+        for response in FULL_SCRIPT:
+            channel.feed(response)
+
+        final_json = await asyncio.wait_for(task, timeout=1)
+
+        self.assertEqual(json.loads(final_json)["core_assumptions"], ["Mech"])
+        self.assertIn(CONFIRMATION_PROMPT, channel.drain())
+
+    async def test_multiplexer_serves_many_builders_with_one_worker(self, mock_logger):
+        multiplexer = BuilderMultiplexer()
+        ids = [multiplexer.open() for _ in range(200)]
+        worker = asyncio.create_task(multiplexer.run())
+
+        # Interleave the conversations: every one gets its n-th answer before any gets its (n+1)-th.
+        for response in FULL_SCRIPT:
+            for conversation_id in ids:
+                answer = response if response == "yes" else f"{response} {conversation_id[:4]}"
+                multiplexer.post(conversation_id, answer)
+        multiplexer.stop()
+        await asyncio.wait_for(worker, timeout=5)
+
+        self.assertEqual(multiplexer.events_processed, len(ids) * len(FULL_SCRIPT))
+        for conversation_id in ids:
+            builder = multiplexer.builder(conversation_id)
+            self.assertTrue(builder.is_finished)
+            self.assertIn(conversation_id[:4], builder.hypothesis_components["full_statement"])
+
+    async def test_unknown_conversation_is_dropped(self, mock_logger):
+        multiplexer = BuilderMultiplexer()
+        self.assertIsNone(multiplexer.dispatch("missing", "hello"))
+        conversation_id = multiplexer.open("c1")
+        with self.assertRaises(ValueError):
+            multiplexer.open(conversation_id)
+
+
+class TestConsoleChannel(unittest.TestCase):
+
+    def test_question_is_printed_without_logging(self):
+        output = io.StringIO()
+        logging.disable(logging.CRITICAL)
+        self.addCleanup(logging.disable, logging.NOTSET)
+        with patch('sys.stdout', output), \
+                patch('builtins.input', side_effect=lambda text: output.write(text) and "Topic"):
+            response = HypothesisBuilder(channel=ConsoleChannel())._get_user_input("What is the topic?")
+
+        self.assertEqual(response, "Topic")
+        self.assertEqual(output.getvalue(), "What is the topic?\nUser: ")
+
+
+if __name__ == '__main__':
+    unittest.main()
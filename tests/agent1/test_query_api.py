@@ -0,0 +1,187 @@
+import asyncio
+import json
+import os
+import tempfile
+import unittest
+from pathlib import Path
+
+from agents.agent1.async_session_manager import AsyncSessionManager
+from agents.agent1.local_firestore import AsyncLocalFirestoreClient, LocalFirestoreClient
+from agents.agent1.query_indexes import IndexSpec, decode_cursor, encode_cursor, firestore_index_config
+from agents.agent1.session_manager import SECONDARY_INDEXES, SessionManager, independent_variables
+from agents.agent1.sqlite_store import SQLiteFirestoreClient
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+
+
+def hypothesis(n, independent):
+    return {"statement": f"Hypothesis {n}", "key_variables": {"independent": independent, "dependent": ["yield"]}}
+
+
+class TestLocalQuery(unittest.TestCase):
+
+    def setUp(self):
+        self.client = LocalFirestoreClient()
+        for n, colour in enumerate(["red", "blue", "red", "red", "green"]):
+            self.client.collection("items").document(f"i{n}").set({"colour": colour, "rank": n % 3, "tags": [colour]})
+        self.client.collection("items").document("unranked").set({"colour": "red"})
+
+    def ids(self, query):
+        return [snapshot.id for snapshot in query.stream()]
+
+    def test_where_order_and_limit(self):
+        items = self.client.collection("items")
+        self.assertEqual(self.ids(items.where("colour", "==", "red").order_by("rank")), ["i0", "i3", "i2"])
+        self.assertEqual(self.ids(items.where("tags", "array_contains", "blue")), ["i1"])
+        self.assertEqual(self.ids(items.where("rank", ">=", 2)), ["i2"])
+        self.assertEqual(self.ids(items.order_by("rank", direction="DESCENDING").order_by("__name__").limit(2)),
+                         ["i2", "i1"])
+        with self.assertRaises(ValueError):
+            items.where("colour", "in", ["red"])
+
+    def test_start_after(self):
+        query = self.client.collection("items").order_by("rank").order_by("__name__")
+        self.assertEqual(self.ids(query.start_after([0, "i0"])), ["i3", "i1", "i4", "i2"])
+        snapshot = self.client.collection("items").document("i1").get()
+        self.assertEqual(self.ids(query.start_after(snapshot)), ["i4", "i2"])
+
+
+class TestSQLiteIndexes(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "mars.db")
+        self.spec = IndexSpec("items", "colour", "rank")
+        self.client = SQLiteFirestoreClient(self.path, indexes=[self.spec])
+
+    def tearDown(self):
+        self.client.close()
+        self.tmp.cleanup()
+
+    def page_ids(self, client, value, cursor=None, limit=10):
+        return [snapshot.id for snapshot in self.spec.query(client, value, cursor=cursor, limit=limit).stream()]
+
+    def test_indexed_query_matches_scan(self):
+        scan = LocalFirestoreClient()
+        for n in range(30):
+            data = {"colour": ["red", "blue"][n % 2], "rank": n % 4}
+            for client in (self.client, scan):
+                client.collection("items").document(f"i{n:02d}").set(data)
+
+        self.assertEqual(self.page_ids(self.client, "red", limit=None), self.page_ids(scan, "red", limit=None))
+        self.assertEqual(self.page_ids(self.client, "red", cursor=(2, "i10")), self.page_ids(scan, "red", cursor=(2, "i10")))
+        self.assertEqual(self.client.index_scans, 2)
+
+    def test_updates_and_deletes_keep_index_current(self):
+        items = self.client.collection("items")
+        items.document("a").set({"colour": "red", "rank": 1})
+        items.document("b").set({"colour": "red", "rank": 2})
+        items.document("a").set({"colour": "blue"}, merge=True)
+        items.document("b").delete()
+        self.assertEqual(self.page_ids(self.client, "red"), [])
+        self.assertEqual(self.page_ids(self.client, "blue"), ["a"])
+
+    def test_index_built_for_existing_database(self):
+        path = os.path.join(self.tmp.name, "existing.db")
+        plain = SQLiteFirestoreClient(path)
+        plain.collection("items").document("a").set({"colour": "red", "rank": 1})
+        plain.close()
+
+        self.client.close()
+        self.client = SQLiteFirestoreClient(path, indexes=[self.spec])
+        self.assertEqual(self.page_ids(self.client, "red"), ["a"])
+        self.assertEqual(self.client.index_scans, 1)
+
+
+class QueryApiTests:
+    """Runs against every backend; subclasses provide make_client()."""
+
+    def setUp(self):
+        self.client = self.make_client()
+        self.manager = SessionManager(firestore_client=self.client)
+
+    def test_hypotheses_for_session_paginate(self):
+        saved = [self.manager.save_final_hypothesis("s1", hypothesis(n, ["Water"])) for n in range(5)]
+        self.manager.save_final_hypothesis("s2", hypothesis(9, ["Water"]))
+
+        first = self.manager.list_hypotheses_for_session("s1", page_size=2)
+        second = self.manager.list_hypotheses_for_session("s1", page_size=2, cursor=first.next_cursor)
+        third = self.manager.list_hypotheses_for_session("s1", page_size=2, cursor=second.next_cursor)
+
+        ids = [item["id"] for page in (first, second, third) for item in page]
+        self.assertEqual(ids, list(reversed(saved)))
+        self.assertIsNone(third.next_cursor)
+        self.assertEqual(first.items[0]["session_id"], "s1")
+
+    def test_sessions_by_state(self):
+        for n in range(3):
+            self.manager.update_session(f"s{n}", [], "CLARIFYING", [])
+        self.manager.update_session("s0", [], "FINALIZED", [])
+
+        page = self.manager.list_sessions_by_state("CLARIFYING")
+        self.assertEqual([item["id"] for item in page], ["s2", "s1"])
+        self.assertEqual([item["id"] for item in self.manager.list_sessions_by_state("FINALIZED")], ["s0"])
+
+    def test_hypotheses_by_variable(self):
+        soil = self.manager.save_final_hypothesis("s1", hypothesis(1, ["Soil  Moisture", "light"]))
+        self.manager.save_final_hypothesis("s2", hypothesis(2, ["light"]))
+        page = self.manager.list_hypotheses_by_variable("soil moisture")
+        self.assertEqual([item["id"] for item in page], [soil])
+        self.assertEqual(len(self.manager.list_hypotheses_by_variable("LIGHT")), 2)
+
+    def test_invalid_arguments(self):
+        with self.assertRaises(ValueError):
+            self.manager.list_sessions_by_state("CLARIFYING", page_size=0)
+        with self.assertRaises(ValueError):
+            self.manager.list_sessions_by_state("CLARIFYING", cursor="not-a-cursor")
+
+
+class TestQueryApiLocal(QueryApiTests, unittest.TestCase):
+
+    def make_client(self):
+        return LocalFirestoreClient()
+
+
+class TestQueryApiSQLite(QueryApiTests, unittest.TestCase):
+
+    def make_client(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        client = SQLiteFirestoreClient(os.path.join(self.tmp.name, "mars.db"), indexes=SECONDARY_INDEXES)
+        self.addCleanup(client.close)
+        return client
+
+    def test_queries_use_indexes(self):
+        self.manager.update_session("s1", [], "CLARIFYING", [])
+        self.manager.list_sessions_by_state("CLARIFYING")
+        self.manager.list_hypotheses_for_session("s1")
+        self.manager.list_hypotheses_by_variable("water")
+        self.assertEqual(self.client.index_scans, 3)
+
+
+class TestQueryHelpers(unittest.TestCase):
+
+    def test_cursor_round_trip(self):
+        from datetime import datetime, timezone
+        moment = datetime(2026, 1, 2, 3, 4, 5, 6, tzinfo=timezone.utc)
+        self.assertEqual(decode_cursor(encode_cursor(moment, "doc")), (moment, "doc"))
+        self.assertIsNone(decode_cursor(None))
+
+    def test_independent_variables(self):
+        self.assertEqual(independent_variables({"independent_variable": "A; b ;a"}), ["a", "b"])
+        self.assertEqual(independent_variables({"title": "T"}), [])
+
+    def test_firestore_index_file_is_current(self):
+        with open(PROJECT_ROOT / "firestore.indexes.json") as f:
+            self.assertEqual(json.load(f), firestore_index_config(SECONDARY_INDEXES))
+
+    def test_async_manager(self):
+        client = LocalFirestoreClient()
+        SessionManager(firestore_client=client).save_final_hypothesis("s1", hypothesis(1, ["Water"]))
+        manager = AsyncSessionManager(firestore_client=AsyncLocalFirestoreClient(sync_client=client))
+        page = asyncio.run(manager.list_hypotheses_by_variable("water"))
+        self.assertEqual([item["session_id"] for item in page], ["s1"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+import json
+import pickle
+import unittest
+
+from agents.agent1.agent import Agent1
+from agents.agent1.local_firestore import LocalFirestoreClient
+from agents.agent1.records import Draft, Message, copy_drafts, draft_records, history_records, to_primitive
+from agents.agent1.session_manager import SESSIONS_COLLECTION, SessionManager
+
+
+class TestMessage(unittest.TestCase):
+
+    def test_behaves_like_the_dict_it_replaces(self):
+        message = Message("user", "Hi")
+        self.assertEqual(message, {"role": "user", "content": "Hi"})
+        self.assertEqual({"role": "user", "content": "Hi"}, message)
+        self.assertEqual(message["role"], "user")
+        self.assertEqual(message.get("missing", 1), 1)
+        self.assertEqual(dict(message, seq=3), {"role": "user", "content": "Hi", "seq": 3})
+        self.assertFalse(hasattr(message, "__dict__"))
+
+    def test_is_immutable_and_shares_roles(self):
+        message = Message("".join(["assis", "tant"]), "x")
+        self.assertIs(message.role, Message("assistant", "y").role)
+        with self.assertRaises(AttributeError):
+            message.content = "changed"
+        with self.assertRaises(TypeError):
+            message["content"] = "changed"
+        self.assertEqual(pickle.loads(pickle.dumps(message)), message)
+
+
+class TestDraft(unittest.TestCase):
+
+    def test_append_text_and_extra_keys(self):
+        draft = Draft("d1", "Draft")
+        draft.append_text(" - more")
+        draft.append_text(" - more")
+        self.assertEqual(draft["text"], "Draft - more - more")
+        draft["score"] = 0.5
+        self.assertEqual(draft, {"id": "d1", "text": "Draft - more - more", "score": 0.5})
+        draft["text"] += "!"
+        self.assertEqual(draft.text, "Draft - more - more!")
+        with self.assertRaises(KeyError):
+            del draft["id"]
+
+    def test_copies_are_independent(self):
+        draft = Draft("d1", "Draft")
+        copy = copy_drafts([draft])[0]
+        draft.append_text(" - more")
+        self.assertEqual(copy["text"], "Draft")
+
+
+class TestConversions(unittest.TestCase):
+
+    def test_round_trip_to_stored_shape(self):
+        history = [{"role": "summary", "content": "s", "folded_messages": 2}, {"role": "user", "content": "Hi"}]
+        drafts = [{"id": "d1", "text": "Draft", "score": 1}]
+        records = history_records(history)
+        self.assertIsInstance(records[0], dict)
+        self.assertIsInstance(records[1], Message)
+        self.assertIsInstance(draft_records(drafts)[0], Draft)
+        primitive = to_primitive({"history": records, "drafts": draft_records(drafts)})
+        self.assertEqual(primitive, {"history": history, "drafts": drafts})
+        self.assertIs(type(primitive["history"][1]), dict)
+        json.dumps(primitive)
+
+    def test_agent_state_is_stored_as_plain_documents(self):
+        client = LocalFirestoreClient()
+        manager = SessionManager(firestore_client=client)
+        agent = Agent1(session_id="s1", session_manager=manager)
+        agent.handle_message("Soil health and yield")
+        agent.handle_message("More detail")
+        self.assertIsInstance(agent.conversation_history[0], Message)
+        self.assertIsInstance(agent.hypothesis_drafts[0], Draft)
+
+        stored = client.collection(SESSIONS_COLLECTION).document("s1").get().to_dict()
+        self.assertIs(type(stored["conversation_history"][0]), dict)
+        self.assertEqual(stored["hypothesis_drafts"], [{"id": "draft_1", "text": "Draft based on 'Soil health and yiel...' - further elaborated."}])
+
+        resumed = Agent1(session_id="s1", session_manager=SessionManager(firestore_client=client))
+        self.assertIsInstance(resumed.conversation_history[0], Message)
+        self.assertEqual(resumed.hypothesis_drafts, agent.hypothesis_drafts)
+
+
+if __name__ == '__main__':
+    unittest.main()
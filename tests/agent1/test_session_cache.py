@@ -0,0 +1,88 @@
+import unittest
+
+from agents.agent1.session_cache import SessionCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_state(state="START", messages=1):
+    return {
+        "current_state": state,
+        "conversation_history": [{"role": "user", "content": f"m{i}"} for i in range(messages)],
+        "hypothesis_drafts": [{"id": "d1", "text": "Draft"}],
+    }
+
+
+class TestSessionCache(unittest.TestCase):
+
+    def test_get_miss_and_hit(self):
+        cache = SessionCache(max_size=2)
+        self.assertIsNone(cache.get("s1"))
+        cache.put("s1", make_state())
+        self.assertEqual(cache.get("s1"), make_state())
+        stats = cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (1, 1))
+        self.assertEqual(stats["hit_ratio"], 0.5)
+
+    def test_values_are_copied(self):
+        cache = SessionCache()
+        state = make_state()
+        cache.put("s1", state)
+        state["conversation_history"].append({"role": "user", "content": "later"})
+        state["hypothesis_drafts"][0]["text"] += " - further elaborated."
+
+        cached = cache.get("s1")
+        self.assertEqual(len(cached["conversation_history"]), 1)
+        self.assertEqual(cached["hypothesis_drafts"][0]["text"], "Draft")
+
+        cached["conversation_history"].clear()
+        self.assertEqual(len(cache.get("s1")["conversation_history"]), 1)
+
+    def test_lru_eviction(self):
+        cache = SessionCache(max_size=2)
+        cache.put("s1", make_state())
+        cache.put("s2", make_state())
+        cache.get("s1")  # s2 is now least recently used
+        cache.put("s3", make_state())
+
+        self.assertIn("s1", cache)
+        self.assertNotIn("s2", cache)
+        self.assertIn("s3", cache)
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+    def test_ttl_expiration(self):
+        clock = FakeClock()
+        cache = SessionCache(max_size=2, ttl=10, clock=clock)
+        cache.put("s1", make_state())
+        clock.now = 9.9
+        self.assertIsNotNone(cache.get("s1"))
+        clock.now = 10.0
+        self.assertIsNone(cache.get("s1"))
+        self.assertEqual(cache.stats()["expirations"], 1)
+        self.assertEqual(len(cache), 0)
+
+    def test_zero_size_disables_cache(self):
+        cache = SessionCache(max_size=0)
+        cache.put("s1", make_state())
+        self.assertIsNone(cache.get("s1"))
+        self.assertEqual(cache.stats()["evictions"], 0)
+
+    def test_invalidate(self):
+        cache = SessionCache()
+        cache.put("s1", make_state())
+        cache.invalidate("s1")
+        self.assertIsNone(cache.get("s1"))
+
+    def test_negative_size_rejected(self):
+        with self.assertRaises(ValueError):
+            SessionCache(max_size=-1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,12 +1,15 @@
+import threading
 import unittest
-from unittest.mock import MagicMock, patch, ANY
+from unittest.mock import MagicMock, patch, ANY, call
 
 from google.cloud.firestore_v1 import Client as FirestoreClient
 from google.cloud.firestore_v1.collection import CollectionReference
 from google.cloud.firestore_v1.document import DocumentReference
-from google.cloud import firestore as google_firestore
+from google.cloud.firestore_v1.batch import WriteBatch
 
-from agents.agent1.session_manager import SessionManager
+from agents.agent1.local_firestore import AlreadyExists, LocalFirestoreClient
+from agents.agent1.records import Draft
+from agents.agent1.session_manager import SessionManager, final_hypothesis_doc_id
 
 class TestSessionManager(unittest.TestCase):
 
@@ -18,7 +21,6 @@ class TestSessionManager(unittest.TestCase):
 
         self.mock_finalized_collection_ref = MagicMock(spec=CollectionReference)
         self.mock_final_hypothesis_doc_ref = MagicMock(spec=DocumentReference)
-        self.mock_final_hypothesis_doc_ref.id = "mock_final_hypothesis_id_123"
 
         def collection_side_effect(collection_name):
             if collection_name == u'hypothesis_sessions':
@@ -30,19 +32,12 @@ class TestSessionManager(unittest.TestCase):
         self.mock_firestore_client_instance.collection.side_effect = collection_side_effect
 
         self.mock_sessions_collection_ref.document.return_value = self.mock_session_doc_ref
-        self.mock_finalized_collection_ref.add.return_value = (MagicMock(spec=google_firestore.SERVER_TIMESTAMP), self.mock_final_hypothesis_doc_ref)
+        self.mock_finalized_collection_ref.document.return_value = self.mock_final_hypothesis_doc_ref
 
-        # Patch firestore.Client constructor used in SessionManager.__init__ fallback
-        patcher_client_constructor = patch('agents.agent1.session_manager.firestore.Client')
-        self.mock_client_constructor = patcher_client_constructor.start()
-        self.mock_client_constructor.return_value = self.mock_firestore_client_instance
-        self.addCleanup(patcher_client_constructor.stop)
-
-        # Patch the global 'db' object imported at module level in session_manager.py
-        # 'create=True' makes sure the patch works even if 'db' isn't there initially (e.g. import error)
-        patcher_db_module_level = patch('agents.agent1.session_manager.db', self.mock_firestore_client_instance, create=True)
-        self.mock_db_module_level = patcher_db_module_level.start()
-        self.addCleanup(patcher_db_module_level.stop)
+        # Patch the shared client provider that SessionManager draws from on first use
+        patcher_get_client = patch('agents.agent1.firestore_client.get_client', return_value=self.mock_firestore_client_instance)
+        self.mock_get_client = patcher_get_client.start()
+        self.addCleanup(patcher_get_client.stop)
 
         # Standard SessionManager instance for most tests, should use the mocks above
         self.session_manager = SessionManager()
@@ -50,6 +45,13 @@ class TestSessionManager(unittest.TestCase):
         self.session_manager.db = self.mock_firestore_client_instance
 
 
+    def test_client_is_drawn_from_provider_on_first_use(self):
+        manager = SessionManager()
+        self.mock_get_client.assert_not_called()
+        self.assertIs(manager.db, self.mock_firestore_client_instance)
+        self.assertIs(manager.db, self.mock_firestore_client_instance)
+        self.mock_get_client.assert_called_once_with(None)
+
     def test_update_session_creates_or_updates_document(self):
         session_id = "test_session_001"
         conversation_history = [{"role": "user", "content": "Hello"}]
@@ -76,11 +78,7 @@ class TestSessionManager(unittest.TestCase):
         self.assertFalse(result)
 
     def test_update_session_no_client(self):
-        with patch('agents.agent1.session_manager.db', None), \
-             patch('agents.agent1.session_manager.firestore.Client') as mock_constructor_fails:
-
-            mock_constructor_fails.side_effect = Exception("No client available")
-
+        with patch('agents.agent1.firestore_client.get_client', return_value=None):
             manager_no_client = SessionManager(firestore_client=None)
             self.assertIsNone(manager_no_client.db, "SessionManager's db attribute should be None if all init paths fail.")
 
@@ -98,34 +96,47 @@ class TestSessionManager(unittest.TestCase):
         final_hypothesis = {"title": "Final Hypo", "details": "It's good."}
         returned_id = self.session_manager.save_final_hypothesis(session_id, final_hypothesis)
 
-        self.assertEqual(returned_id, "mock_final_hypothesis_id_123")
+        expected_id = final_hypothesis_doc_id(session_id, final_hypothesis)
+        self.assertEqual(returned_id, expected_id)
         self.mock_firestore_client_instance.collection.assert_any_call(u'finalized_hypotheses')
+        self.mock_finalized_collection_ref.document.assert_called_once_with(expected_id)
         expected_data = {
             u'session_id': session_id,
             u'hypothesis_content': final_hypothesis,
             u'saved_at': ANY
         }
-        self.mock_finalized_collection_ref.add.assert_called_once_with(expected_data)
+        self.mock_final_hypothesis_doc_ref.create.assert_called_once_with(expected_data)
+        self.mock_finalized_collection_ref.add.assert_not_called()
 
     def test_save_final_hypothesis_returns_id(self):
         session_id = "test_session_005"
         final_hypothesis = {"title": "Another Hypo"}
         returned_id = self.session_manager.save_final_hypothesis(session_id, final_hypothesis)
-        self.assertEqual(returned_id, "mock_final_hypothesis_id_123")
+        self.assertEqual(returned_id, final_hypothesis_doc_id(session_id, final_hypothesis))
+
+    def test_save_final_hypothesis_repeat_is_noop(self):
+        final_hypothesis = {"title": "Final Hypo"}
+        first_id = self.session_manager.save_final_hypothesis("test_session_008", final_hypothesis)
+        second_id = self.session_manager.save_final_hypothesis("test_session_008", dict(final_hypothesis))
+
+        self.assertEqual(first_id, second_id)
+        self.mock_final_hypothesis_doc_ref.create.assert_called_once()
+
+    def test_save_final_hypothesis_existing_document_returns_id(self):
+        self.mock_final_hypothesis_doc_ref.create.side_effect = AlreadyExists("exists")
+        final_hypothesis = {"title": "Saved elsewhere"}
+        returned_id = self.session_manager.save_final_hypothesis("test_session_009", final_hypothesis)
+        self.assertEqual(returned_id, final_hypothesis_doc_id("test_session_009", final_hypothesis))
 
     def test_save_final_hypothesis_handles_firestore_errors(self):
-        self.mock_finalized_collection_ref.add.side_effect = Exception("Firestore network error on add")
+        self.mock_final_hypothesis_doc_ref.create.side_effect = Exception("Firestore network error on create")
         session_id = "test_session_006"
         final_hypothesis = {"title": "Error Hypo"}
         returned_id = self.session_manager.save_final_hypothesis(session_id, final_hypothesis)
         self.assertIsNone(returned_id)
 
     def test_save_final_hypothesis_no_client(self):
-        with patch('agents.agent1.session_manager.db', None), \
-             patch('agents.agent1.session_manager.firestore.Client') as mock_constructor_fails:
-
-            mock_constructor_fails.side_effect = Exception("No client available")
-
+        with patch('agents.agent1.firestore_client.get_client', return_value=None):
             manager_no_client = SessionManager(firestore_client=None)
             self.assertIsNone(manager_no_client.db, "SessionManager's db attribute should be None if all init paths fail.")
 
@@ -146,5 +157,439 @@ class TestSessionManager(unittest.TestCase):
         result_wrong_type_hypo = self.session_manager.save_final_hypothesis("sid", "not a dict")
         self.assertIsNone(result_wrong_type_hypo)
 
+
+class TestSessionManagerAppendMode(unittest.TestCase):
+
+    def setUp(self):
+        self.mock_client = MagicMock(spec=FirestoreClient)
+        self.mock_sessions_collection_ref = MagicMock(spec=CollectionReference)
+        self.mock_session_doc_ref = MagicMock(spec=DocumentReference)
+        self.mock_messages_collection_ref = MagicMock(spec=CollectionReference)
+        self.mock_batch = MagicMock(spec=WriteBatch)
+
+        self.mock_client.collection.return_value = self.mock_sessions_collection_ref
+        self.mock_client.batch.return_value = self.mock_batch
+        self.mock_sessions_collection_ref.document.return_value = self.mock_session_doc_ref
+        self.mock_session_doc_ref.collection.return_value = self.mock_messages_collection_ref
+        self.mock_messages_collection_ref.document.side_effect = lambda doc_id: f"messages/{doc_id}"
+
+        self.session_manager = SessionManager(firestore_client=self.mock_client, persistence_mode='append')
+
+    def _message_writes(self):
+        return [c for c in self.mock_batch.set.call_args_list if isinstance(c.args[0], str)]
+
+    def _session_write(self):
+        session_writes = [c for c in self.mock_batch.set.call_args_list if c.args[0] is self.mock_session_doc_ref]
+        self.assertEqual(len(session_writes), 1)
+        return session_writes[0]
+
+    def test_invalid_persistence_mode(self):
+        with self.assertRaises(ValueError):
+            SessionManager(firestore_client=self.mock_client, persistence_mode='rewrite')
+
+    def test_first_update_writes_all_messages_and_drafts(self):
+        history = [{"role": "user", "content": "Hi"}, {"role": "assistant", "content": "Hello"}]
+        drafts = [{"id": "d1", "text": "Draft 1"}]
+
+        result = self.session_manager.update_session("s1", history, "PROCESSING", drafts)
+
+        self.assertTrue(result)
+        self.mock_session_doc_ref.collection.assert_called_with(u'messages')
+        self.assertEqual(self._message_writes(), [
+            call("messages/0000000000", {"role": "user", "content": "Hi", "seq": 0}),
+            call("messages/0000000001", {"role": "assistant", "content": "Hello", "seq": 1}),
+        ])
+        session_write = self._session_write()
+        self.assertEqual(session_write.kwargs, {"merge": True})
+        self.assertEqual(session_write.args[1], {
+            u'current_state': "PROCESSING",
+            u'message_count': 2,
+            u'draft_count': 1,
+            u'persistence_mode': u'append',
+            u'last_updated': ANY,
+            u'hypothesis_drafts': {"0": {"id": "d1", "text": "Draft 1"}},
+        })
+        self.mock_batch.commit.assert_called_once()
+        self.mock_session_doc_ref.set.assert_not_called()
+
+    def test_subsequent_update_writes_only_the_delta(self):
+        history = [{"role": "user", "content": "Hi"}, {"role": "assistant", "content": "Hello"}]
+        drafts = [{"id": "d1", "text": "Draft 1"}]
+        self.session_manager.update_session("s1", history, "PROCESSING", drafts)
+        self.mock_batch.reset_mock()
+
+        history += [{"role": "user", "content": "More"}, {"role": "assistant", "content": "Sure"}]
+        drafts.append({"id": "d2", "text": "Draft 2"})
+        self.assertTrue(self.session_manager.update_session("s1", history, "GENERATING", drafts))
+
+        self.assertEqual(self._message_writes(), [
+            call("messages/0000000002", {"role": "user", "content": "More", "seq": 2}),
+            call("messages/0000000003", {"role": "assistant", "content": "Sure", "seq": 3}),
+        ])
+        session_data = self._session_write().args[1]
+        self.assertEqual(session_data[u'message_count'], 4)
+        self.assertEqual(session_data[u'hypothesis_drafts'], {"1": {"id": "d2", "text": "Draft 2"}})
+
+    def test_unchanged_drafts_are_not_rewritten(self):
+        history = [{"role": "user", "content": "Hi"}]
+        drafts = [{"id": "d1", "text": "Draft 1"}]
+        self.session_manager.update_session("s1", history, "PROCESSING", drafts)
+        self.mock_batch.reset_mock()
+
+        history.append({"role": "assistant", "content": "Hello"})
+        self.session_manager.update_session("s1", history, "PROCESSING", drafts)
+
+        self.assertNotIn(u'hypothesis_drafts', self._session_write().args[1])
+
+    def test_failed_commit_is_retried_in_full_on_next_update(self):
+        history = [{"role": "user", "content": "Hi"}]
+        self.mock_batch.commit.side_effect = Exception("Firestore unavailable")
+        self.assertFalse(self.session_manager.update_session("s1", history, "PROCESSING", []))
+
+        self.mock_batch.reset_mock()
+        self.mock_batch.commit.side_effect = None
+        history.append({"role": "assistant", "content": "Hello"})
+        self.assertTrue(self.session_manager.update_session("s1", history, "PROCESSING", []))
+        self.assertEqual(len(self._message_writes()), 2)
+
+    def test_bookkeeping_is_bounded_and_evicted_sessions_are_rewritten(self):
+        self.session_manager._planner.max_sessions = 2
+        history = [{"role": "user", "content": "Hi"}]
+        for session_id in ("s1", "s2", "s3"):
+            self.session_manager.update_session(session_id, history, "PROCESSING", [{"id": "d1"}])
+        self.assertEqual(len(self.session_manager._planner._persisted), 2)
+        self.mock_batch.reset_mock()
+
+        # s1 was evicted: its next update rewrites it from the first message, drafts included.
+        self.session_manager.update_session("s1", history + [{"role": "assistant", "content": "Hello"}],
+                                            "PROCESSING", [{"id": "d1"}])
+        self.assertEqual(len(self._message_writes()), 2)
+        self.assertEqual(self._session_write().args[1][u'hypothesis_drafts'], {"0": {"id": "d1"}})
+
+    def test_forget_drops_bookkeeping(self):
+        history = [{"role": "user", "content": "Hi"}]
+        self.session_manager.update_session("s1", history, "PROCESSING", [])
+        self.session_manager.forget("s1")
+        self.mock_batch.reset_mock()
+
+        self.session_manager.update_session("s1", history, "PROCESSING", [])
+        self.assertEqual(len(self._message_writes()), 1)
+
+    def test_load_conversation_history_from_messages(self):
+        snapshot = MagicMock()
+        snapshot.exists = True
+        snapshot.to_dict.return_value = {u'persistence_mode': u'append', u'message_count': 2}
+        self.mock_session_doc_ref.get.return_value = snapshot
+        message_docs = []
+        for seq, (role, content) in enumerate([("user", "Hi"), ("assistant", "Hello")]):
+            message_doc = MagicMock()
+            message_doc.to_dict.return_value = {"role": role, "content": content, "seq": seq}
+            message_docs.append(message_doc)
+        self.mock_messages_collection_ref.order_by.return_value.stream.return_value = iter(message_docs)
+
+        history = self.session_manager.load_conversation_history("s1")
+
+        self.assertEqual(history, [{"role": "user", "content": "Hi"}, {"role": "assistant", "content": "Hello"}])
+        self.mock_messages_collection_ref.order_by.assert_called_once_with(u'seq')
+
+    def test_load_conversation_history_ignores_messages_beyond_message_count(self):
+        snapshot = MagicMock()
+        snapshot.exists = True
+        snapshot.to_dict.return_value = {u'persistence_mode': u'append', u'message_count': 1}
+        self.mock_session_doc_ref.get.return_value = snapshot
+        message_docs = []
+        for seq, content in enumerate(["Restarted", "Stale reply", "Stale question"]):
+            message_doc = MagicMock()
+            message_doc.to_dict.return_value = {"role": "user", "content": content, "seq": seq}
+            message_docs.append(message_doc)
+        self.mock_messages_collection_ref.order_by.return_value.stream.return_value = iter(message_docs)
+
+        history = self.session_manager.load_conversation_history("s1")
+
+        self.assertEqual(history, [{"role": "user", "content": "Restarted"}])
+        # The next update continues after the stored count, overwriting the leftovers.
+        self.session_manager.update_session("s1", history + [{"role": "assistant", "content": "Hello"}], "START", [])
+        self.assertEqual(self._message_writes(), [
+            call("messages/0000000001", {"role": "assistant", "content": "Hello", "seq": 1}),
+        ])
+
+    def test_load_conversation_history_full_mode_document(self):
+        snapshot = MagicMock()
+        snapshot.exists = True
+        snapshot.to_dict.return_value = {u'conversation_history': [{"role": "user", "content": "Hi"}]}
+        self.mock_session_doc_ref.get.return_value = snapshot
+
+        self.assertEqual(self.session_manager.load_conversation_history("s1"), [{"role": "user", "content": "Hi"}])
+        self.mock_messages_collection_ref.order_by.assert_not_called()
+
+    def test_load_conversation_history_missing_session(self):
+        snapshot = MagicMock()
+        snapshot.exists = False
+        self.mock_session_doc_ref.get.return_value = snapshot
+        self.assertIsNone(self.session_manager.load_conversation_history("unknown"))
+
+    def test_load_session_rebuilds_drafts_and_seeds_append_bookkeeping(self):
+        snapshot = MagicMock()
+        snapshot.exists = True
+        snapshot.to_dict.return_value = {
+            u'persistence_mode': u'append',
+            u'current_state': "GENERATING_HYPOTHESIS",
+            u'draft_count': 2,
+            u'hypothesis_drafts': {"1": {"id": "d2", "text": "Second"}, "0": {"id": "d1", "text": "First"}},
+        }
+        self.mock_session_doc_ref.get.return_value = snapshot
+        message_doc = MagicMock()
+        message_doc.to_dict.return_value = {"role": "user", "content": "Hi", "seq": 0}
+        self.mock_messages_collection_ref.order_by.return_value.stream.return_value = iter([message_doc])
+
+        state = self.session_manager.load_session("s1")
+
+        self.assertEqual(state["current_state"], "GENERATING_HYPOTHESIS")
+        self.assertEqual([d["id"] for d in state["hypothesis_drafts"]], ["d1", "d2"])
+
+        # Next update only appends the new message and writes no unchanged drafts.
+        history = state["conversation_history"] + [{"role": "assistant", "content": "Hello"}]
+        self.session_manager.update_session("s1", history, "AWAITING_FEEDBACK", state["hypothesis_drafts"])
+        self.assertEqual(self._message_writes(), [
+            call("messages/0000000001", {"role": "assistant", "content": "Hello", "seq": 1}),
+        ])
+        self.assertNotIn(u'hypothesis_drafts', self._session_write().args[1])
+
+
+class TestSessionManagerCache(unittest.TestCase):
+
+    def setUp(self):
+        self.mock_client = MagicMock(spec=FirestoreClient)
+        self.mock_sessions_collection_ref = MagicMock(spec=CollectionReference)
+        self.mock_session_doc_ref = MagicMock(spec=DocumentReference)
+        self.mock_client.collection.return_value = self.mock_sessions_collection_ref
+        self.mock_sessions_collection_ref.document.return_value = self.mock_session_doc_ref
+
+        snapshot = MagicMock()
+        snapshot.exists = True
+        snapshot.to_dict.return_value = {
+            u'current_state': "PROCESSING_USER_INPUT",
+            u'conversation_history': [{"role": "user", "content": "Stored"}],
+            u'hypothesis_drafts': [],
+        }
+        self.mock_session_doc_ref.get.return_value = snapshot
+
+    def test_cache_miss_reads_firestore_once(self):
+        manager = SessionManager(firestore_client=self.mock_client)
+
+        first = manager.load_session("s1")
+        second = manager.load_session("s1")
+
+        self.assertEqual(first, second)
+        self.assertEqual(first["current_state"], "PROCESSING_USER_INPUT")
+        self.mock_session_doc_ref.get.assert_called_once()
+        stats = manager.cache_stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (1, 1))
+
+    def test_updated_session_resumes_without_read(self):
+        manager = SessionManager(firestore_client=self.mock_client)
+        history = [{"role": "user", "content": "Hi"}]
+        manager.update_session("s1", history, "PROCESSING_USER_INPUT", [{"id": "d1", "text": "Draft"}])
+
+        state = manager.load_session("s1")
+
+        self.assertEqual(state["conversation_history"], history)
+        self.assertEqual(state["hypothesis_drafts"], [{"id": "d1", "text": "Draft"}])
+        self.mock_session_doc_ref.get.assert_not_called()
+
+    def test_evicted_session_is_read_again(self):
+        manager = SessionManager(firestore_client=self.mock_client, cache_size=1)
+        manager.update_session("s1", [], "START", [])
+        manager.update_session("s2", [], "START", [])
+
+        manager.load_session("s1")
+
+        self.mock_session_doc_ref.get.assert_called_once()
+        self.assertEqual(manager.cache_stats()["evictions"], 2)
+
+    def test_buffered_write_behind_update_is_served_without_read(self):
+        manager = SessionManager(firestore_client=self.mock_client, durability='batch', cache_size=0)
+        self.addCleanup(manager.close)
+        manager.update_session("s1", [{"role": "user", "content": "Buffered"}], "START", [])
+
+        state = manager.load_session("s1")
+
+        self.assertEqual(state["conversation_history"], [{"role": "user", "content": "Buffered"}])
+        self.mock_session_doc_ref.get.assert_not_called()
+
+    def test_load_session_read_error(self):
+        self.mock_session_doc_ref.get.side_effect = Exception("Firestore unavailable")
+        manager = SessionManager(firestore_client=self.mock_client)
+        self.assertIsNone(manager.load_session("s1"))
+        self.assertIsNone(manager.load_session(""))
+
+
+class TestSessionManagerWriteBehind(unittest.TestCase):
+
+    def setUp(self):
+        self.mock_client = MagicMock(spec=FirestoreClient)
+        self.mock_sessions_collection_ref = MagicMock(spec=CollectionReference)
+        self.mock_batch = MagicMock(spec=WriteBatch)
+        self.mock_client.collection.return_value = self.mock_sessions_collection_ref
+        self.mock_client.batch.return_value = self.mock_batch
+        self.mock_sessions_collection_ref.document.side_effect = lambda session_id: f"sessions/{session_id}"
+
+    def _manager(self, **kwargs):
+        manager = SessionManager(firestore_client=self.mock_client, **kwargs)
+        self.addCleanup(manager.close)
+        return manager
+
+    def _written_sessions(self):
+        return [c.args[0] for c in self.mock_batch.set.call_args_list]
+
+    def test_invalid_durability(self):
+        with self.assertRaises(ValueError):
+            SessionManager(firestore_client=self.mock_client, durability='eventually')
+
+    def test_sync_durability_has_no_buffer(self):
+        manager = self._manager()
+        self.assertTrue(manager.flush())
+        self.assertEqual(manager.write_behind_stats(), {})
+
+    def test_update_returns_without_writing(self):
+        manager = self._manager(durability='batch')
+        self.assertTrue(manager.update_session("s1", [{"role": "user", "content": "Hi"}], "START", []))
+        self.mock_client.batch.assert_not_called()
+        self.assertEqual(manager.write_behind_stats()["pending"], 1)
+
+    def test_flush_coalesces_updates_into_one_batch(self):
+        manager = self._manager(durability='batch')
+        history = []
+        for turn in range(3):
+            history.append({"role": "user", "content": f"Message {turn}"})
+            manager.update_session("s1", history, f"STATE_{turn}", [])
+        manager.update_session("s2", [{"role": "user", "content": "Other"}], "START", [])
+
+        self.assertTrue(manager.flush())
+
+        self.mock_batch.commit.assert_called_once()
+        self.assertEqual(self._written_sessions(), ["sessions/s1", "sessions/s2"])
+        s1_data = self.mock_batch.set.call_args_list[0].args[1]
+        self.assertEqual(s1_data[u'current_state'], "STATE_2")
+        self.assertEqual(len(s1_data[u'conversation_history']), 3)
+        stats = manager.write_behind_stats()
+        self.assertEqual(stats["coalesced"], 2)
+        self.assertEqual(stats["sessions_flushed"], 2)
+        self.assertEqual(stats["pending"], 0)
+
+    def test_buffered_snapshot_is_isolated_from_later_mutation(self):
+        manager = self._manager(durability='batch')
+        drafts = [{"id": "d1", "text": "Draft"}]
+        manager.update_session("s1", [], "START", drafts)
+        drafts[0]["text"] += " - further elaborated."
+
+        manager.flush()
+
+        self.assertEqual(self.mock_batch.set.call_args.args[1][u'hypothesis_drafts'], [{"id": "d1", "text": "Draft"}])
+
+    def test_buffered_draft_records_are_copied_like_the_spool(self):
+        manager = self._manager(durability='batch', cache_size=0)
+        drafts = [Draft("d1", "Draft")]
+        manager.update_session("s1", [], "START", drafts)
+        drafts[0].append_text(" - further elaborated.")
+
+        buffered = manager.load_session("s1")["hypothesis_drafts"]
+
+        self.assertIsInstance(buffered[0], Draft)
+        self.assertEqual(buffered, [{"id": "d1", "text": "Draft"}])
+
+    def test_failed_flush_requeues_sessions(self):
+        manager = self._manager(durability='batch')
+        manager.update_session("s1", [], "START", [])
+        self.mock_batch.commit.side_effect = Exception("Firestore unavailable")
+
+        self.assertFalse(manager.flush())
+        self.assertEqual(manager.write_behind_stats()["pending"], 1)
+
+        self.mock_batch.commit.side_effect = None
+        self.assertTrue(manager.flush())
+        self.assertEqual(manager.write_behind_stats()["pending"], 0)
+
+    def test_max_pending_triggers_background_flush(self):
+        manager = self._manager(durability='batch', max_pending=2)
+        flushed = threading.Event()
+        self.mock_batch.commit.side_effect = lambda: flushed.set()
+
+        manager.update_session("s1", [], "START", [])
+        manager.update_session("s2", [], "START", [])
+
+        self.assertTrue(flushed.wait(timeout=5))
+
+    def test_interval_durability_flushes_in_background(self):
+        manager = self._manager(durability='interval', flush_interval=0.01)
+        flushed = threading.Event()
+        self.mock_batch.commit.side_effect = lambda: flushed.set()
+
+        manager.update_session("s1", [], "START", [])
+
+        self.assertTrue(flushed.wait(timeout=5))
+
+    def test_save_final_hypothesis_flushes_session_first(self):
+        manager = self._manager(durability='batch')
+        manager.update_session("s1", [], "FINALIZED", [])
+        manager.update_session("s2", [], "START", [])
+        finalized_collection = MagicMock(spec=CollectionReference)
+        self.mock_client.collection.side_effect = lambda name: (
+            finalized_collection if name == u'finalized_hypotheses' else self.mock_sessions_collection_ref
+        )
+
+        self.assertEqual(manager.save_final_hypothesis("s1", {"title": "Hypo"}),
+                         final_hypothesis_doc_id("s1", {"title": "Hypo"}))
+        finalized_collection.document.return_value.create.assert_called_once()
+
+        self.assertEqual(self._written_sessions(), ["sessions/s1"])
+        self.assertEqual(manager.write_behind_stats()["pending"], 1)
+
+    def test_close_flushes_remaining_updates(self):
+        manager = SessionManager(firestore_client=self.mock_client, durability='batch')
+        manager.update_session("s1", [], "START", [])
+        manager.close()
+        self.mock_batch.commit.assert_called_once()
+        self.assertFalse(manager.update_session("s1", [], "START", []))
+
+
+class TestFinalHypothesisIdempotence(unittest.TestCase):
+
+    def setUp(self):
+        self.client = LocalFirestoreClient()
+        self.manager = SessionManager(firestore_client=self.client)
+
+    def test_doc_id_is_deterministic(self):
+        self.assertEqual(final_hypothesis_doc_id("s1", {"a": 1, "b": 2}), final_hypothesis_doc_id("s1", {"b": 2, "a": 1}))
+        self.assertNotEqual(final_hypothesis_doc_id("s1", {"a": 1}), final_hypothesis_doc_id("s2", {"a": 1}))
+        self.assertNotEqual(final_hypothesis_doc_id("s1", {"a": 1}), final_hypothesis_doc_id("s1", {"a": 2}))
+
+    def test_repeated_saves_store_one_document(self):
+        first_id = self.manager.save_final_hypothesis("s1", {"title": "Hypo"})
+        writes_before = self.client.write_count
+        reads_before = self.client.read_count
+
+        for _ in range(5):
+            self.assertEqual(self.manager.save_final_hypothesis("s1", {"title": "Hypo"}), first_id)
+
+        self.assertEqual(self.client.write_count, writes_before)
+        self.assertEqual(self.client.read_count, reads_before)
+        self.assertEqual([snap.id for snap in self.client.collection(u'finalized_hypotheses').stream()], [first_id])
+
+    def test_other_manager_gets_existing_id(self):
+        first_id = self.manager.save_final_hypothesis("s1", {"title": "Hypo"})
+        second_id = SessionManager(firestore_client=self.client).save_final_hypothesis("s1", {"title": "Hypo"})
+
+        self.assertEqual(second_id, first_id)
+        self.assertEqual(len(self.client.collection(u'finalized_hypotheses').get()), 1)
+
+    def test_changed_content_is_saved_separately(self):
+        first_id = self.manager.save_final_hypothesis("s1", {"title": "Hypo"})
+        second_id = self.manager.save_final_hypothesis("s1", {"title": "Revised"})
+
+        self.assertNotEqual(first_id, second_id)
+        self.assertEqual(len(self.client.collection(u'finalized_hypotheses').get()), 2)
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,244 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+from agents.agent1.agent import Agent1
+from agents.agent1.local_firestore import LocalFirestoreClient
+from agents.agent1.session_manager import FINALIZED_HYPOTHESES_COLLECTION, SESSIONS_COLLECTION, SessionManager
+from agents.agent1.session_spool import SessionSpool, SpoolReplayer
+
+
+class UnavailableError(Exception):
+    pass
+
+
+class FlakyClient(LocalFirestoreClient):
+    """LocalFirestoreClient whose writes fail while `down` is set."""
+
+    def __init__(self):
+        super().__init__()
+        self.down = False
+
+    def _write(self, path, data, merge=False, create=False):
+        if self.down:
+            raise UnavailableError("store unavailable")
+        return super()._write(path, data, merge=merge, create=create)
+
+    def _commit(self, writes):
+        if self.down:
+            raise UnavailableError("store unavailable")
+        return super()._commit(writes)
+
+
+class TestSessionSpool(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.path = os.path.join(self.tmp.name, "sessions.spool")
+
+    def open(self, **kwargs):
+        spool = SessionSpool(self.path, **kwargs)
+        self.addCleanup(spool.close)
+        return spool
+
+    def test_unacknowledged_records_survive_reopen(self):
+        spool = self.open()
+        for n in range(3):
+            spool.append({"op": "update", "session_id": "s1", "n": n})
+        records = spool.read(2)
+        spool.acknowledge(records[-1][0])
+        spool.close()
+
+        reopened = self.open()
+        self.assertEqual([record["n"] for _, record in reopened.read(10)], [2])
+        self.assertEqual(reopened.peek("s1")["n"], 2)
+
+    def test_drained_spool_is_truncated(self):
+        spool = self.open()
+        spool.append({"op": "update", "session_id": "s1"})
+        spool.acknowledge(spool.read(10)[-1][0])
+        self.assertEqual(os.path.getsize(self.path), 0)
+        self.assertIsNone(spool.peek("s1"))
+        spool.append({"op": "update", "session_id": "s2"})
+        self.assertEqual([record["session_id"] for _, record in spool.read(10)], ["s2"])
+
+    def test_compaction_keeps_unreplayed_records(self):
+        spool = self.open(compact_bytes=1)
+        for n in range(3):
+            spool.append({"op": "update", "session_id": f"s{n}"})
+        spool.acknowledge(spool.read(1)[-1][0])
+        self.assertEqual(spool.stats()["compactions"], 1)
+        self.assertEqual([record["session_id"] for _, record in spool.read(10)], ["s1", "s2"])
+        spool.close()
+        self.assertEqual([record["session_id"] for _, record in self.open().read(10)], ["s1", "s2"])
+
+    def test_torn_tail_is_discarded(self):
+        spool = self.open()
+        spool.append({"op": "update", "session_id": "s1"})
+        spool.close()
+        with open(self.path, "ab") as f:
+            f.write(b'0badc0de {"op":"upd')
+
+        reopened = self.open()
+        self.assertEqual(len(reopened.read(10)), 1)
+        reopened.append({"op": "update", "session_id": "s2"})
+        self.assertEqual([record["session_id"] for _, record in reopened.read(10)], ["s1", "s2"])
+
+    def test_concurrent_appends_share_fsyncs(self):
+        spool = self.open()
+        threads = [threading.Thread(target=lambda n=n: [spool.append({"op": "final", "session_id": f"s{n}"})
+                                                        for _ in range(25)]) for n in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        stats = spool.stats()
+        self.assertEqual(stats["appends"], 200)
+        self.assertLessEqual(stats["fsyncs"], 200)
+        self.assertEqual(len(spool.read(1000)), 200)
+
+    def test_replayer_retries_failed_batches(self):
+        spool = self.open(fsync=False)
+        applied, attempts = [], []
+
+        def apply(records):
+            attempts.append(len(records))
+            if len(attempts) == 1:
+                return False
+            applied.extend(records)
+            return True
+
+        for n in range(3):
+            spool.append({"op": "update", "session_id": "s1", "n": n})
+        replayer = SpoolReplayer(spool, apply, batch_size=2, min_backoff=0.001, max_backoff=0.001)
+        self.addCleanup(replayer.close, drain=False)
+        deadline = time.monotonic() + 5
+        while spool.pending_bytes() and time.monotonic() < deadline:
+            time.sleep(0.001)
+
+        self.assertEqual(spool.pending_bytes(), 0)
+        self.assertEqual(attempts[:2], [2, 2])
+        self.assertEqual([record["n"] for record in applied], [0, 1, 2])
+        self.assertEqual(replayer.stats()["failures"], 1)
+
+
+class TestSpooledSessionManager(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.path = os.path.join(self.tmp.name, "sessions.spool")
+        self.client = FlakyClient()
+
+    def manager(self, **kwargs):
+        manager = SessionManager(firestore_client=self.client, durability='spool', spool_path=self.path,
+                                 flush_interval=0.01, **kwargs)
+        self.addCleanup(manager.close)
+        return manager
+
+    def stored_session(self, session_id):
+        return self.client.collection(SESSIONS_COLLECTION).document(session_id).get()
+
+    def test_writes_are_accepted_during_an_outage(self):
+        self.client.down = True
+        manager = self.manager(cache_size=0)
+        history = [{"role": "user", "content": "hi"}]
+        self.assertTrue(manager.update_session("s1", history, "CLARIFYING", []))
+        doc_id = manager.save_final_hypothesis("s1", {"statement": "X raises Y"})
+        self.assertIsNotNone(doc_id)
+
+        self.assertFalse(manager.flush())
+        self.assertFalse(self.stored_session("s1").exists)
+        self.assertEqual(manager.load_session("s1")["conversation_history"], history)
+
+        self.client.down = False
+        self.assertTrue(manager.flush())
+        self.assertEqual(self.stored_session("s1").to_dict()["current_state"], "CLARIFYING")
+        self.assertTrue(self.client.collection(FINALIZED_HYPOTHESES_COLLECTION).document(doc_id).get().exists)
+        self.assertEqual(manager.write_behind_stats()["pending_bytes"], 0)
+
+    def test_spool_is_replayed_after_restart(self):
+        self.client.down = True
+        manager = self.manager()
+        for turn in range(3):
+            manager.update_session("s1", [{"role": "user", "content": str(turn)}], "CLARIFYING", [])
+        manager.close()
+
+        self.client.down = False
+        restarted = self.manager()
+        self.assertTrue(restarted.flush())
+        self.assertEqual(self.stored_session("s1").to_dict()["conversation_history"][0]["content"], "2")
+
+    def test_append_mode_spools_only_new_messages(self):
+        self.client.down = True
+        manager = self.manager(persistence_mode='append', cache_size=0)
+        history, drafts = [], []
+        for turn in range(5):
+            history.append({"role": "user", "content": str(turn)})
+            if turn == 2:
+                drafts.append({"id": "d1", "text": "draft"})
+            manager.update_session("s1", history, "CLARIFYING", drafts)
+
+        records = [record for _, record in manager._spool.read(100)]
+        self.assertEqual([len(record["messages"]) for record in records], [1] * 5)
+        self.assertEqual([sorted(record["session"].get("hypothesis_drafts", {})) for record in records],
+                         [[], [], ["0"], [], []])
+        self.assertEqual(manager.load_session("s1")["conversation_history"], history)
+
+        self.client.down = False
+        self.assertTrue(manager.flush())
+        stored = SessionManager(firestore_client=self.client, persistence_mode='append', cache_size=0)
+        self.assertEqual(stored.load_session("s1")["conversation_history"], history)
+        self.assertEqual(stored.load_session("s1")["hypothesis_drafts"], drafts)
+
+    def test_unreplayed_records_are_mirrored_once_per_session(self):
+        self.client.down = True
+        manager = self.manager(persistence_mode='append', cache_size=0)
+        histories = {"s1": [], "s2": []}
+        for turn in range(200):
+            for session_id, history in histories.items():
+                history.append({"role": "user", "content": f"{session_id}-{turn}"})
+                manager.update_session(session_id, history, "CLARIFYING", [{"id": "d1", "text": str(turn)}])
+
+        self.assertEqual(len(manager._spool.read(1000)), 400)
+        self.assertEqual(manager.write_behind_stats()["pending_sessions"], 2)
+        merged = manager._spool.peek("s1")
+        self.assertEqual(len(merged["messages"]), 200)
+        self.assertEqual(merged["session"]["hypothesis_drafts"], {"0": {"id": "d1", "text": "199"}})
+        self.assertEqual(manager.load_session("s1")["conversation_history"], histories["s1"])
+
+        self.client.down = False
+        self.assertTrue(manager.flush())
+        self.assertIsNone(manager._spool.peek("s1"))
+
+    def test_spooled_deltas_apply_on_top_of_the_stored_session(self):
+        manager = self.manager(persistence_mode='append', cache_size=0)
+        history = [{"role": "user", "content": "0"}, {"role": "user", "content": "1"}]
+        manager.update_session("s1", history, "CLARIFYING", [])
+        self.assertTrue(manager.flush())
+
+        self.client.down = True
+        history.append({"role": "user", "content": "2"})
+        manager.update_session("s1", history, "REFINING", [])
+        self.assertEqual(manager._spool.peek("s1")["session"]["message_count"], 3)
+        state = manager.load_session("s1")
+        self.assertEqual((state["conversation_history"], state["current_state"]), (history, "REFINING"))
+
+    def test_agent_persists_through_spool_without_client(self):
+        manager = SessionManager(firestore_client=None, durability='spool', spool_path=self.path)
+        manager.db = None
+        self.addCleanup(manager.close)
+        agent = Agent1(session_id="s1", session_manager=manager)
+        agent.handle_message("I want to study plant growth")
+        self.assertIsNotNone(manager.load_session("s1"))
+
+        manager.db = self.client
+        self.assertTrue(manager.flush())
+        self.assertTrue(self.stored_session("s1").exists)
+
+
+if __name__ == '__main__':
+    unittest.main()
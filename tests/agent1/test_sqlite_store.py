@@ -0,0 +1,146 @@
+import os
+import sqlite3
+import tempfile
+import threading
+import unittest
+from datetime import datetime
+from unittest.mock import patch
+
+from agents.agent1 import firestore_client
+from agents.agent1.local_firestore import AsyncLocalFirestoreClient, SERVER_TIMESTAMP
+from agents.agent1.session_manager import HYPOTHESES_BY_SESSION, SessionManager
+from agents.agent1.async_session_manager import AsyncSessionManager
+from agents.agent1 import sqlite_store
+from agents.agent1.sqlite_store import SQLiteFirestoreClient
+from tests.agent1 import test_firestore_client
+
+
+class TestSQLiteFirestoreClient(test_firestore_client.TestLocalFirestoreClient):
+    """Runs the in-memory client's contract tests against the SQLite backend."""
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, "sessions.db")
+        self.client = SQLiteFirestoreClient(self.path)
+        self.addCleanup(self.client.close)
+
+    def test_wal_mode(self):
+        self.assertEqual(self.client.journal_mode, "wal")
+
+    def test_documents_survive_reopen(self):
+        manager = SessionManager(firestore_client=self.client, persistence_mode='append', cache_size=0)
+        history = [{"role": "user", "content": "Hi"}, {"role": "assistant", "content": "Hello"}]
+        manager.update_session("s1", history, "PROCESSING", [])
+        self.client.close()
+
+        reopened = SQLiteFirestoreClient(self.path)
+        self.addCleanup(reopened.close)
+        state = SessionManager(firestore_client=reopened, cache_size=0).load_session("s1")
+        self.assertEqual(state["conversation_history"], history)
+        saved = reopened.collection("hypothesis_sessions").document("s1").get().get("last_updated")
+        self.assertIsInstance(saved, datetime)
+
+    def test_batch_merges_within_and_across_commits(self):
+        doc = self.client.collection("c").document("d")
+        doc.set({"a": 1})
+        batch = self.client.batch()
+        batch.set(doc, {"b": 2}, merge=True)
+        batch.set(doc, {"c": {"x": SERVER_TIMESTAMP}}, merge=True)
+        batch.commit()
+
+        data = doc.get().to_dict()
+        self.assertEqual((data["a"], data["b"]), (1, 2))
+        self.assertIsInstance(data["c"]["x"], datetime)
+        self.assertEqual(self.client.write_count, 3)
+
+    def test_indexed_delete_is_atomic(self):
+        client = SQLiteFirestoreClient(os.path.join(os.path.dirname(self.path), "indexed.db"),
+                                       indexes=[HYPOTHESES_BY_SESSION])
+        self.addCleanup(client.close)
+        doc = client.collection("finalized_hypotheses").document("h1")
+        doc.set({"session_id": "s1", "saved_at": SERVER_TIMESTAMP})
+        connection = client._connection
+
+        class FailingEntryDelete:
+            def execute(self, sql, *args):
+                if sql == sqlite_store._DELETE_ENTRIES:
+                    raise sqlite3.OperationalError("disk I/O error")
+                return connection.execute(sql, *args)
+
+        client._connection = FailingEntryDelete()
+        with self.assertRaises(sqlite3.OperationalError):
+            doc.delete()
+        client._connection = connection
+
+        self.assertTrue(doc.get().exists)
+        self.assertEqual([snapshot.id for snapshot in HYPOTHESES_BY_SESSION.query(client, "s1").stream()], ["h1"])
+        doc.delete()
+        self.assertEqual(list(HYPOTHESES_BY_SESSION.query(client, "s1").stream()), [])
+
+    def test_concurrent_writers(self):
+        manager = SessionManager(firestore_client=self.client, persistence_mode='append', cache_size=0)
+
+        def converse(session_id):
+            history = []
+            for turn in range(20):
+                history += [{"role": "user", "content": f"q{turn}"}, {"role": "assistant", "content": f"a{turn}"}]
+                manager.update_session(session_id, list(history), "PROCESSING", [])
+
+        threads = [threading.Thread(target=converse, args=(f"s{i}",)) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        for i in range(4):
+            self.assertEqual(len(manager.load_conversation_history(f"s{i}")), 40)
+
+
+class TestSQLiteBackendSelection(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        firestore_client.reset_client()
+        self.addCleanup(firestore_client.reset_client)
+        env_patcher = patch.dict(os.environ, {
+            firestore_client.BACKEND_ENV_VAR: "sqlite",
+            "MARS_SQLITE_PATH": os.path.join(tmp.name, "mars.db"),
+        })
+        env_patcher.start()
+        self.addCleanup(env_patcher.stop)
+
+    async def test_sync_and_async_clients_share_the_database(self):
+        client = firestore_client.get_client()
+        self.addCleanup(client.close)
+        self.assertIsInstance(client, SQLiteFirestoreClient)
+        async_client = firestore_client.get_async_client()
+        self.assertIsInstance(async_client, AsyncLocalFirestoreClient)
+
+        await AsyncSessionManager().update_session("s1", [{"role": "user", "content": "Hi"}], "START", [])
+        state = SessionManager(cache_size=0).load_session("s1")
+        self.assertEqual(state["conversation_history"], [{"role": "user", "content": "Hi"}])
+
+    async def test_async_client_runs_sqlite_off_the_event_loop(self):
+        client = firestore_client.get_client()
+        self.addCleanup(client.close)
+        threads = set()
+        original_write = client._write
+
+        def recording_write(*args, **kwargs):
+            threads.add(threading.current_thread())
+            return original_write(*args, **kwargs)
+
+        with patch.object(client, '_write', side_effect=recording_write):
+            manager = AsyncSessionManager()
+            await manager.update_session("s1", [{"role": "user", "content": "Hi"}], "START", [])
+            self.assertIsNotNone(await manager.save_final_hypothesis("s1", {"title": "T"}))
+
+        self.assertTrue(threads)
+        self.assertNotIn(threading.current_thread(), threads)
+        self.assertEqual((await manager.load_session("s1"))["current_state"], "START")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -8,7 +8,12 @@ import os
 project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
 sys.path.insert(0, project_root)
 
-from agents.agent1.state_machine import StateMachine, ConversationState
+import contextlib
+import io
+
+from agents.agent1.state_machine import (
+    StateMachine, ConversationState, TransitionError, TransitionTable, DEFAULT_TABLE
+)
 
 class TestStateMachine(unittest.TestCase):
 
@@ -75,6 +80,98 @@ class TestStateMachine(unittest.TestCase):
             sm.transition_to("INVALID_STATE_TYPE")
         print("TestStateMachine: test_transition_to_invalid_type PASSED")
 
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestCompiledStateMachine(unittest.TestCase):
+
+    def test_strict_mode_rejects_undefined_transition(self):
+        sm = StateMachine(ConversationState.AWAITING_INPUT, mode='strict')
+        with self.assertRaises(TransitionError):
+            sm.transition_to(ConversationState.FINALIZED)
+        self.assertEqual(sm.current_state, ConversationState.AWAITING_INPUT)
+        self.assertEqual(sm.rejected_transitions, 1)
+
+    def test_permissive_mode_counts_undefined_transitions(self):
+        sm = StateMachine(ConversationState.FINALIZED)
+        sm.transition_to(ConversationState.AWAITING_INPUT)
+        sm.transition_to(ConversationState.CLARIFYING)
+        self.assertEqual((sm.transitions, sm.undefined_transitions), (2, 1))
+
+    def test_invalid_mode(self):
+        with self.assertRaises(ValueError):
+            StateMachine(mode='lenient')
+
+    def test_can_transition(self):
+        sm = StateMachine()
+        self.assertTrue(sm.can_transition(ConversationState.CLARIFYING))
+        self.assertFalse(sm.can_transition(ConversationState.FINALIZED))
+        self.assertIn((ConversationState.REFINING, ConversationState.CLARIFYING), DEFAULT_TABLE)
+
+    def test_custom_table(self):
+        table = TransitionTable({ConversationState.AWAITING_INPUT: [ConversationState.FINALIZED]})
+        sm = StateMachine(table=table, mode='strict')
+        sm.transition_to(ConversationState.FINALIZED)
+        self.assertEqual(sm.current_state, ConversationState.FINALIZED)
+        with self.assertRaises(TypeError):
+            TransitionTable({ConversationState.AWAITING_INPUT: ["FINALIZED"]})
+
+    def test_hooks_are_called_in_order(self):
+        calls = []
+        sm = StateMachine()
+        sm.add_pre_hook(lambda machine, old, new: calls.append(("pre", old, new, machine.current_state)))
+        sm.add_post_hook(lambda machine, old, new: calls.append(("post", old, new, machine.current_state)))
+
+        sm.transition_to(ConversationState.CLARIFYING)
+        sm.transition_to(ConversationState.CLARIFYING)  # no-op, no hooks
+
+        self.assertEqual(calls, [
+            ("pre", ConversationState.AWAITING_INPUT, ConversationState.CLARIFYING, ConversationState.AWAITING_INPUT),
+            ("post", ConversationState.AWAITING_INPUT, ConversationState.CLARIFYING, ConversationState.CLARIFYING),
+        ])
+        self.assertEqual(sm.self_transitions, 1)
+
+    def test_pre_hook_can_veto(self):
+        sm = StateMachine()
+
+        def veto(machine, old, new):
+            raise PermissionError("not now")
+
+        sm.add_pre_hook(veto)
+        with self.assertRaises(PermissionError):
+            sm.transition_to(ConversationState.CLARIFYING)
+        self.assertEqual(sm.current_state, ConversationState.AWAITING_INPUT)
+        self.assertEqual(sm.transitions, 0)
+
+    def test_time_spent_per_state(self):
+        clock = FakeClock()
+        sm = StateMachine(clock=clock)
+        clock.now = 2.0
+        sm.transition_to(ConversationState.CLARIFYING)
+        clock.now = 2.5
+        sm.transition_to(ConversationState.AWAITING_INPUT)
+        clock.now = 3.0
+
+        states = sm.stats()["states"]
+        self.assertEqual(states["AWAITING_INPUT"], {"entries": 2, "seconds": 2.5})
+        self.assertEqual(states["CLARIFYING"], {"entries": 1, "seconds": 0.5})
+        self.assertEqual(states["FINALIZED"], {"entries": 0, "seconds": 0.0})
+
+    def test_transitions_write_nothing_to_stdout(self):
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            sm = StateMachine()
+            sm.transition_to(ConversationState.CLARIFYING)
+            sm.transition_to(ConversationState.FINALIZED)
+        self.assertEqual(output.getvalue(), "")
+
+
 if __name__ == '__main__':
     # This allows running the tests directly from this file
     unittest.main()
@@ -0,0 +1,146 @@
+import asyncio
+import json
+import threading
+import time
+import unittest
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from unittest.mock import patch
+
+from fastapi.testclient import TestClient
+
+from agents.agent2 import batch, stage_executor
+from agents.agent2.collaboration import fetch_external_data
+from agents.agent2.main import app
+from agents.common.wire_format import NDJSON_MEDIA_TYPE
+
+
+def hypothesis(n, statement=None):
+    if statement is None:
+        statement = f"Premise {n}. Shared premise."
+    return {"hypothesis_id": f"h{n}", "statement": statement, "core_assumptions": [], "description": "Batch test."}
+
+
+def read_lines(response):
+    return [json.loads(line) for line in response.text.splitlines() if line]
+
+
+class TestBatchEndpoint(unittest.TestCase):
+
+    def setUp(self):
+        self.client = TestClient(app)
+
+    def test_list_body_reports_per_item_errors(self):
+        body = [hypothesis(0), {"hypothesis_id": "bad"}, hypothesis(2, statement=""), hypothesis(3)]
+        response = self.client.post("/design_experiments/batch", json=body)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.headers["content-type"].startswith(NDJSON_MEDIA_TYPE))
+        records = {record["index"]: record for record in read_lines(response)}
+        self.assertEqual(sorted(records), [0, 1, 2, 3])
+        self.assertEqual(records[0]["status"], "ok")
+        self.assertEqual(records[0]["protocol"]["linked_hypothesis_id"], "h0")
+        self.assertEqual((records[1]["status"], records[1]["status_code"], records[1]["hypothesis_id"]),
+                         ("error", 422, "bad"))
+        self.assertEqual(records[2]["status_code"], 400)
+        self.assertIn("key premises", records[2]["detail"])
+        self.assertEqual(records[3]["status"], "ok")
+
+    def test_ndjson_body(self):
+        lines = [json.dumps(hypothesis(0)), "", "{not json", json.dumps(hypothesis(1))]
+        response = self.client.post("/design_experiments/batch?max_concurrency=2", content="\n".join(lines),
+                                    headers={"Content-Type": NDJSON_MEDIA_TYPE})
+
+        self.assertEqual(response.status_code, 200)
+        records = {record["index"]: record for record in read_lines(response)}
+        self.assertEqual([records[i]["status"] for i in range(3)], ["ok", "error", "ok"])
+        self.assertEqual(records[1]["status_code"], 400)
+
+    def test_rejects_non_list_json(self):
+        response = self.client.post("/design_experiments/batch", json=hypothesis(0))
+        self.assertEqual(response.status_code, 422)
+
+    def test_search_work_is_shared_across_the_batch(self):
+        with patch('agents.agent2.collaboration.fetch_external_data', side_effect=fetch_external_data) as fetch:
+            response = self.client.post("/design_experiments/batch", json=[hypothesis(n) for n in range(4)])
+        self.assertEqual(len(read_lines(response)), 4)
+        searched = [query for call in fetch.call_args_list for query in call.args[0]]
+        # 4 distinct premises plus the shared one, three queries each.
+        self.assertEqual(len(searched), 15)
+        self.assertEqual(len(set(searched)), 15)
+
+
+class TestDesignBatch(unittest.TestCase):
+
+    def test_concurrency_is_bounded(self):
+        in_flight = [0, 0]  # current, peak
+
+        async def slow_design(hypothesis, executor=None, timeouts=None, fetch=None):
+            in_flight[0] += 1
+            in_flight[1] = max(in_flight[1], in_flight[0])
+            await asyncio.sleep(0.02)
+            in_flight[0] -= 1
+            raise batch.DesignError("nope", status_code=503)
+
+        async def collect():
+            return [record async for record in batch.design_batch(
+                batch.iter_list([hypothesis(n) for n in range(8)]), max_concurrency=2)]
+
+        with patch('agents.agent2.batch.design_protocol_async', side_effect=slow_design):
+            records = asyncio.run(collect())
+        self.assertEqual(sorted(record["index"] for record in records), list(range(8)))
+        self.assertTrue(all(record["status_code"] == 503 for record in records))
+        self.assertEqual(in_flight[1], 2)
+
+    def test_stage_timeouts_apply_per_item(self):
+        def slow_for_premise_0(queries):
+            if any("Premise 0" in query for query in queries):
+                time.sleep(0.3)
+            return fetch_external_data(queries)
+
+        async def collect(executor):
+            return [record async for record in batch.design_batch(
+                batch.iter_list([hypothesis(0, "Premise 0."), hypothesis(1, "Premise 1.")]), executor=executor,
+                timeouts=dict(stage_executor.DEFAULT_STAGE_TIMEOUTS, feasibility=0.1))]
+
+        with ThreadPoolExecutor(max_workers=4) as executor, \
+                patch('agents.agent2.collaboration.fetch_external_data', side_effect=slow_for_premise_0):
+            records = {record["index"]: record for record in asyncio.run(collect(executor))}
+        self.assertEqual(records[0]["status_code"], 504)
+        self.assertIn("feasibility", records[0]["detail"])
+        self.assertEqual(records[1]["status"], "ok")
+
+    def test_process_executor_shares_the_search(self):
+        async def collect(executor):
+            return [record async for record in batch.design_batch(
+                batch.iter_list([hypothesis(n) for n in range(3)]), search=search, executor=executor)]
+
+        search = batch.SharedSearch()
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            records = asyncio.run(collect(executor))
+        self.assertEqual([record["status"] for record in records], ["ok"] * 3)
+        # 3 distinct premises plus the shared one, three queries each.
+        self.assertEqual(search.stats(), {"requested": 18, "fetched": 12})
+
+    def test_shared_search_fetches_each_query_once(self):
+        calls = []
+
+        def slow_fetch(queries):
+            calls.append(list(queries))
+            time.sleep(0.05)
+            return {query: f"result {query}" for query in queries}
+
+        search = batch.SharedSearch()
+        outputs = []
+        with patch('agents.agent2.collaboration.fetch_external_data', side_effect=slow_fetch):
+            threads = [threading.Thread(target=lambda: outputs.append(search.fetch(["a", "b"]))) for _ in range(4)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(sorted(query for call in calls for query in call), ["a", "b"])
+        self.assertTrue(all(output == {"a": "result a", "b": "result b"} for output in outputs))
+        self.assertEqual(search.stats(), {"requested": 8, "fetched": 2})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -52,9 +52,11 @@ def test_design_experiment_endpoint_success():
 
 
     assert "feasibility_assessment" in protocol_data
-    # Default feasibility from placeholder:
-    assert protocol_data["feasibility_assessment"]["feasible"] == True
-    assert "details" in protocol_data["feasibility_assessment"]
+    feasibility = protocol_data["feasibility_assessment"]
+    assert feasibility["data_obtainability"] in ("PUBLIC", "PRIVATE", "UNAVAILABLE")
+    assert feasibility["tools_availability"] in ("OPEN_SOURCE", "COMMERCIAL", "REQUIRES_DEVELOPMENT")
+    assert 0.0 <= feasibility["confidence_score"] <= 1.0
+    assert isinstance(feasibility["summary"], str)
 
 def test_design_experiment_endpoint_empty_hypothesis():
     # Test with a hypothesis that might result in no key premises
@@ -0,0 +1,143 @@
+import os
+import tempfile
+import threading
+import unittest
+
+from agents.agent2.collaboration import check_build_feasibility
+from agents.agent2.search_cache import SearchCache, normalize_query, set_search_cache
+from agents.agent2.search_fetcher import NO_RESULTS, SearchFetcher, SearchResults, set_search_fetcher
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class CountingFetch:
+    """Stands in for SearchFetcher.fetch; queries containing 'broken' fail."""
+
+    def __init__(self):
+        self.calls = []
+        self.version = 1
+        self._lock = threading.Lock()
+
+    def __call__(self, queries):
+        with self._lock:
+            self.calls.append(list(queries))
+        results = SearchResults()
+        for query in queries:
+            if "broken" in query:
+                results.failed[query] = "HTTPStatusError()"
+            elif "nothing" in query:
+                results[query] = NO_RESULTS
+            else:
+                results[query] = f"v{self.version} {query}"
+        return results
+
+
+class TestSearchCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.path = os.path.join(self.tmp.name, "search.db")
+        self.clock = FakeClock()
+        self.fetch = CountingFetch()
+
+    def open(self, **kwargs):
+        cache = SearchCache(self.path, clock=self.clock, **kwargs)
+        self.addCleanup(cache.close)
+        return cache
+
+    def test_normalize_query(self):
+        self.assertEqual(normalize_query("  Python  Libraries for\tSoil "), "python libraries for soil")
+        self.assertEqual(normalize_query("Ｐｙｔｈｏｎ"), "python")
+
+    def test_repeated_queries_are_served_from_memory_then_disk(self):
+        cache = self.open()
+        first = cache.fetch(["Python libraries for Soil", "python libraries for  soil"], self.fetch)
+        self.assertEqual(self.fetch.calls, [["Python libraries for Soil"]])
+        self.assertEqual(first["python libraries for  soil"], "v1 Python libraries for Soil")
+
+        self.assertEqual(cache.fetch(["PYTHON libraries for soil"], self.fetch),
+                         {"PYTHON libraries for soil": "v1 Python libraries for Soil"})
+        self.assertEqual(len(self.fetch.calls), 1)
+        self.assertEqual(cache.stats()["memory_hits"], 1)
+        cache.close()
+
+        reopened = self.open()
+        reopened.fetch(["Python libraries for Soil"], self.fetch)
+        self.assertEqual(len(self.fetch.calls), 1)
+        stats = reopened.stats()
+        self.assertEqual((stats["disk_hits"], stats["misses"], stats["hit_ratio"]), (1, 0, 1.0))
+
+    def test_stale_entries_are_served_while_revalidating(self):
+        cache = self.open(ttl=10, stale_ttl=100)
+        cache.fetch(["q"], self.fetch)
+        self.fetch.version = 2
+        self.clock.now += 50
+
+        self.assertEqual(cache.fetch(["q"], self.fetch), {"q": "v1 q"})
+        cache.wait_for_revalidation()
+        self.assertEqual(cache.get("q"), ("v2 q", True))
+        self.assertEqual(cache.stats()["revalidations"], 1)
+
+        self.clock.now += 200  # past the stale window: searched again before answering
+        self.fetch.version = 3
+        self.assertEqual(cache.fetch(["q"], self.fetch), {"q": "v3 q"})
+
+    def test_per_entry_ttls(self):
+        cache = self.open(ttl=100, negative_ttl=10, stale_ttl=0)
+        cache.fetch(["found", "nothing here"], self.fetch)
+        cache.put("pinned", "kept", ttl=1000)
+        self.clock.now += 50
+        self.assertEqual(cache.get("found"), ("v1 found", True))
+        self.assertEqual(cache.get("nothing here"), (None, False))
+        self.clock.now += 500
+        self.assertEqual(cache.get("pinned"), ("kept", True))
+
+    def test_failures_are_not_cached(self):
+        cache = self.open()
+        results = cache.fetch(["ok", "broken", "Broken"], self.fetch)
+        self.assertEqual(results, {"ok": "v1 ok"})
+        self.assertEqual(set(results.failed), {"broken", "Broken"})
+        cache.fetch(["ok", "broken"], self.fetch)
+        self.assertEqual(self.fetch.calls[-1], ["broken"])
+
+    def test_memory_tier_is_bounded(self):
+        cache = self.open(max_size=2)
+        cache.fetch(["a", "b", "c"], self.fetch)
+        self.assertEqual(cache.stats()["memory_size"], 2)
+        cache.fetch(["a"], self.fetch)
+        self.assertEqual(cache.stats()["disk_hits"], 1)
+
+
+class TestCachedFeasibility(unittest.TestCase):
+
+    def test_repeated_topic_needs_no_searches(self):
+        searched = []
+
+        async def search(query):
+            searched.append(query)
+            return f"mocked_result for {query}"
+
+        set_search_fetcher(SearchFetcher(search=search, rate=0))
+        self.addCleanup(set_search_fetcher, None)
+        cache = SearchCache(":memory:")
+        set_search_cache(cache)
+        self.addCleanup(set_search_cache, None)
+
+        steps = [{"description": "Soil sampling"}, {"description": "Yield model"}]
+        first = check_build_feasibility(steps, "H001")
+        self.assertEqual(len(searched), 6)
+        second = check_build_feasibility(steps, "H002")
+        self.assertEqual(len(searched), 6)
+        self.assertEqual(second.data_obtainability, first.data_obtainability)
+        self.assertEqual(cache.stats()["memory_hits"], 6)
+
+
+if __name__ == '__main__':
+    unittest.main()
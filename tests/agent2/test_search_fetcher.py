@@ -0,0 +1,158 @@
+import asyncio
+import json
+import os
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+from urllib.parse import parse_qs, urlparse
+
+from agents.agent2.collaboration import check_build_feasibility, fetch_external_data
+from agents.agent2.search_cache import TTL_ENV_VAR
+from agents.agent2.search_fetcher import NO_RESULTS, SearchFetcher, TokenBucket, set_search_fetcher
+
+
+class SearchServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128  # the default of 5 drops concurrent connects
+
+
+class FakeSearchServer:
+    """Local Custom Search style server: answers after `delay` seconds, slower or failing for marked queries."""
+
+    def __init__(self, delay=0.0, slow_delay=1.0):
+        self.delay = delay
+        self.slow_delay = slow_delay
+        self.requests = []
+        self.in_flight = self.peak_in_flight = 0
+        self._lock = threading.Lock()
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                query = parse_qs(urlparse(self.path).query).get("q", [""])[0]
+                with fake._lock:
+                    fake.requests.append(query)
+                    fake.in_flight += 1
+                    fake.peak_in_flight = max(fake.peak_in_flight, fake.in_flight)
+                try:
+                    time.sleep(fake.slow_delay if "slow" in query else fake.delay)
+                    status = 500 if "broken" in query else 200
+                    items = [] if "nothing" in query else [{"title": f"Result for {query}", "snippet": f"About {query}"}]
+                    body = json.dumps({"items": items}).encode()
+                    self.send_response(status)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                finally:
+                    with fake._lock:
+                        fake.in_flight -= 1
+
+            def log_message(self, *args):
+                pass
+
+        self.server = SearchServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/search"
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class TestSearchFetcher(unittest.TestCase):
+
+    def serve(self, **kwargs):
+        server = FakeSearchServer(**kwargs)
+        self.addCleanup(server.close)
+        return server
+
+    def test_duplicate_queries_are_searched_once_and_concurrently(self):
+        server = self.serve(delay=0.1)
+        fetcher = SearchFetcher(server.url, max_concurrency=10, rate=0)
+        queries = [f"Python libraries for step {n % 5}" for n in range(20)]
+
+        started = time.perf_counter()
+        results = fetcher.fetch(queries)
+        elapsed = time.perf_counter() - started
+
+        self.assertEqual(list(results), list(dict.fromkeys(queries)))
+        self.assertEqual(results["Python libraries for step 0"], "About Python libraries for step 0")
+        self.assertEqual(sorted(server.requests), sorted(set(queries)))
+        self.assertLess(elapsed, 0.4)  # serially this takes 0.5s
+        self.assertEqual(fetcher.stats()["deduplicated"], 15)
+
+    def test_concurrency_cap_is_respected(self):
+        server = self.serve(delay=0.05)
+        fetcher = SearchFetcher(server.url, max_concurrency=2, rate=0)
+        results = fetcher.fetch([f"q{n}" for n in range(8)])
+        self.assertEqual(len(results), 8)
+        self.assertLessEqual(server.peak_in_flight, 2)
+
+    def test_failures_and_timeouts_give_partial_results(self):
+        server = self.serve(slow_delay=1.0)
+        fetcher = SearchFetcher(server.url, timeout=0.2, rate=0)
+        results = fetcher.fetch(["good", "slow one", "broken one", "nothing here"])
+
+        self.assertEqual(results, {"good": "About good", "nothing here": NO_RESULTS})
+        self.assertEqual(set(results.failed), {"slow one", "broken one"})
+        self.assertIn("timed out", results.failed["slow one"])
+        stats = fetcher.stats()
+        self.assertEqual((stats["succeeded"], stats["failed"], stats["timed_out"]), (2, 1, 1))
+
+    def test_rate_limit_spaces_requests(self):
+        calls = []
+
+        async def search(query):
+            calls.append(time.perf_counter())
+            return query
+
+        fetcher = SearchFetcher(search=search, max_concurrency=10, rate=50, burst=1)
+        fetcher.fetch([f"q{n}" for n in range(6)])
+        self.assertGreaterEqual(calls[-1] - calls[0], 5 / 50 * 0.9)
+
+
+class TestTokenBucket(unittest.TestCase):
+
+    def test_reserve_allows_burst_then_paces(self):
+        bucket = TokenBucket(rate=10, burst=2)
+        self.assertEqual([bucket.reserve(now=0.0) for _ in range(3)], [0.0, 0.0, 0.1])
+        self.assertAlmostEqual(bucket.reserve(now=0.1), 0.1)
+        self.assertEqual(bucket.reserve(now=1.0), 0.0)
+
+
+class TestFeasibilityWithSearch(unittest.TestCase):
+
+    def setUp(self):
+        server = FakeSearchServer(slow_delay=1.0)
+        self.addCleanup(server.close)
+        self.fetcher = SearchFetcher(server.url, timeout=0.2)
+        set_search_fetcher(self.fetcher)
+        self.addCleanup(set_search_fetcher, None)
+        patcher = patch.dict(os.environ, {TTL_ENV_VAR: "0"})  # searches only; caching is tested separately
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_fetch_external_data_uses_configured_fetcher(self):
+        self.assertEqual(fetch_external_data(["a", "a"]), {"a": "About a"})
+
+    def test_assessment_reports_unavailable_queries(self):
+        steps = [{"description": "slow step"}, {"description": "Soil sampling"}, {"description": "Soil sampling"}]
+        assessment = check_build_feasibility(steps, "H001")
+        self.assertIn("- Query 'Python libraries for Soil sampling': About Python libraries for Soil sampling",
+                      assessment.summary)
+        self.assertIn("- Query 'Public datasets for slow step': unavailable (timed out", assessment.summary)
+        self.assertEqual(self.fetcher.stats()["queries"], 6)
+
+    def test_works_from_a_running_event_loop(self):
+        async def endpoint():
+            return fetch_external_data(["from the loop"])
+
+        self.assertEqual(asyncio.run(endpoint()), {"from the loop": "About from the loop"})
+
+
+if __name__ == '__main__':
+    unittest.main()
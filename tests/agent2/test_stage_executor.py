@@ -0,0 +1,84 @@
+import asyncio
+import time
+import unittest
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from unittest.mock import patch
+
+import httpx
+
+from agents.agent2 import stage_executor
+from agents.agent2.collaboration import check_build_feasibility
+from agents.agent2.experiment_designer import decompose_hypothesis
+from agents.agent2.main import app
+from agents.agent2.models import Hypothesis
+from agents.agent2.stage_executor import StageTimeoutError, parse_stage_timeouts, run_stage
+
+HYPOTHESIS = {"hypothesis_id": "h1", "statement": "Light speeds growth. Growth is measurable.",
+              "core_assumptions": [], "description": "Executor test."}
+
+
+def slow_feasibility(*args, **kwargs):
+    time.sleep(0.2)
+    return check_build_feasibility(*args, **kwargs)
+
+
+class TestStageTimeouts(unittest.TestCase):
+
+    def test_parse_stage_timeouts(self):
+        timeouts = parse_stage_timeouts("feasibility=2.5, decompose=0")
+        self.assertEqual(timeouts["feasibility"], 2.5)
+        self.assertIsNone(timeouts["decompose"])
+        self.assertEqual(timeouts["confirm"], stage_executor.DEFAULT_STAGE_TIMEOUTS["confirm"])
+        with self.assertRaises(ValueError):
+            parse_stage_timeouts("render=1")
+
+    def test_run_stage(self):
+        async def run(executor, timeout):
+            return await run_stage('feasibility', time.sleep, 0.2, executor=executor, timeout=timeout)
+
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            with self.assertRaises(StageTimeoutError) as raised:
+                asyncio.run(run(executor, 0.01))
+            self.assertEqual(raised.exception.stage, 'feasibility')
+        self.assertIsNone(asyncio.run(run(None, 0.01)))  # inline: runs to completion
+
+    def test_process_executor(self):
+        hypothesis = Hypothesis(**HYPOTHESIS)
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            premises = asyncio.run(run_stage('decompose', decompose_hypothesis, hypothesis, executor=executor))
+        self.assertEqual(sorted(premises), ["Growth is measurable", "Light speeds growth"])
+
+
+class TestDesignEndpointExecutor(unittest.TestCase):
+
+    def setUp(self):
+        self.executor = ThreadPoolExecutor(max_workers=8)
+        stage_executor.set_design_executor(self.executor)
+        self.addCleanup(stage_executor.shutdown_design_executor)
+        self.addCleanup(stage_executor.set_stage_timeouts, None)
+
+    async def post_concurrently(self, count):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://agent2") as client:
+            requests = [client.post("/design_experiment/", json=dict(HYPOTHESIS, hypothesis_id=f"h{n}"))
+                        for n in range(count)]
+            return await asyncio.gather(*requests)
+
+    def test_slow_stages_do_not_block_other_requests(self):
+        with patch('agents.agent2.experiment_designer.check_build_feasibility', side_effect=slow_feasibility):
+            started = time.perf_counter()
+            responses = asyncio.run(self.post_concurrently(4))
+            elapsed = time.perf_counter() - started
+        self.assertEqual([response.status_code for response in responses], [200] * 4)
+        self.assertLess(elapsed, 0.6)  # 0.8s if the requests ran one after another
+
+    def test_stage_timeout_is_a_504(self):
+        stage_executor.set_stage_timeouts({'feasibility': 0.05})
+        with patch('agents.agent2.experiment_designer.check_build_feasibility', side_effect=slow_feasibility):
+            response, = asyncio.run(self.post_concurrently(1))
+        self.assertEqual(response.status_code, 504)
+        self.assertIn("'feasibility' timed out", response.json()["detail"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,119 @@
+import asyncio
+import json
+import time
+import unittest
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from unittest.mock import patch
+
+from fastapi.testclient import TestClient
+
+from agents.agent2 import collaboration, stage_executor
+from agents.agent2.experiment_designer import DesignError, design_protocol
+from agents.agent2.main import app
+from agents.agent2.models import Hypothesis
+from agents.agent2.streaming import DesignStream, wants_sse
+
+HYPOTHESIS = {"hypothesis_id": "h1", "statement": "Light speeds growth. Growth is measurable.",
+              "core_assumptions": [], "description": "Streaming test."}
+
+
+def collect(stream: DesignStream) -> list:
+    async def run():
+        return [event async for event in stream.events()]
+    return asyncio.run(run())
+
+
+def slow_for_light(queries):
+    if any("Light" in query for query in queries):
+        time.sleep(0.3)
+    return collaboration.fetch_external_data(queries)
+
+
+class TestDesignStream(unittest.TestCase):
+
+    def test_event_order_and_summary(self):
+        events = collect(DesignStream(Hypothesis(**HYPOTHESIS)))
+        kinds = [event["event"] for event in events]
+        self.assertEqual(kinds, ["premises", "step", "step", "feasibility", "feasibility", "summary"])
+        self.assertEqual([event["sequence"] for event in events], list(range(6)))
+        self.assertEqual(sorted(events[0]["premises"]), ["Growth is measurable", "Light speeds growth"])
+
+        # The summary carries the same assessment as the non-streaming endpoint.
+        expected = design_protocol(Hypothesis(**HYPOTHESIS)).feasibility_assessment
+        summary = events[-1]
+        self.assertEqual(summary["protocol"]["feasibility_assessment"], expected.model_dump(mode='json'))
+        self.assertEqual((summary["steps"], summary["failed_queries"]), (2, 0))
+
+    def test_missing_premises_raise_before_streaming(self):
+        with self.assertRaises(DesignError) as raised:
+            asyncio.run(DesignStream(Hypothesis(**dict(HYPOTHESIS, statement=""))).start())
+        self.assertEqual(raised.exception.status_code, 400)
+
+    def test_slow_step_times_out_alone(self):
+        with ThreadPoolExecutor(max_workers=4) as executor, \
+                patch('agents.agent2.streaming.SharedSearch.fetch', side_effect=slow_for_light, autospec=False):
+            events = collect(DesignStream(Hypothesis(**HYPOTHESIS), executor=executor,
+                                          timeouts=dict(stage_executor.DEFAULT_STAGE_TIMEOUTS, feasibility=0.1)))
+        descriptions = {event["step"]["step_id"]: event["step"]["description"]
+                        for event in events if event["event"] == "step"}
+        feasibility = [event for event in events if event["event"] == "feasibility"]
+        # The step that finished first is reported first, whatever its position.
+        self.assertEqual([descriptions[event["step_id"]] for event in feasibility],
+                         ["Test premise: Growth is measurable", "Test premise: Light speeds growth"])
+        self.assertEqual(feasibility[0]["failed"], {})
+        self.assertEqual(len(feasibility[1]["failed"]), 3)
+        self.assertIn("timed out", feasibility[1]["assessment"]["summary"])
+        self.assertEqual(events[-1]["event"], "summary")
+        self.assertEqual(events[-1]["failed_queries"], 3)
+
+    def test_process_executor(self):
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            events = collect(DesignStream(Hypothesis(**HYPOTHESIS), executor=executor))
+        kinds = [event["event"] for event in events]
+        self.assertEqual(kinds, ["premises", "step", "step", "feasibility", "feasibility", "summary"])
+        self.assertEqual(events[-1]["failed_queries"], 0)
+
+    def test_failed_confirmation_is_an_error_event(self):
+        with patch('agents.agent2.streaming.confirm_protocol_with_hypothesizer', return_value=False):
+            events = collect(DesignStream(Hypothesis(**HYPOTHESIS)))
+        self.assertEqual([event["event"] for event in events], ["premises", "error"])
+        self.assertEqual(events[-1]["status_code"], 503)
+
+
+class TestStreamEndpoint(unittest.TestCase):
+
+    def setUp(self):
+        self.client = TestClient(app)
+
+    def test_ndjson(self):
+        response = self.client.post("/design_experiment/stream", json=HYPOTHESIS)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.headers["content-type"].startswith("application/x-ndjson"))
+        events = [json.loads(line) for line in response.text.splitlines() if line]
+        self.assertEqual(events[0]["event"], "premises")
+        self.assertEqual(events[-1]["event"], "summary")
+        self.assertEqual(events[-1]["protocol"]["linked_hypothesis_id"], "h1")
+
+    def test_sse(self):
+        response = self.client.post("/design_experiment/stream", json=HYPOTHESIS,
+                                    headers={"Accept": "text/event-stream"})
+        self.assertTrue(response.headers["content-type"].startswith("text/event-stream"))
+        messages = [message for message in response.text.split("\n\n") if message]
+        first = dict(line.split(": ", 1) for line in messages[0].splitlines())
+        self.assertEqual((first["event"], first["id"]), ("premises", "0"))
+        self.assertEqual(len(json.loads(first["data"])["premises"]), 2)
+        self.assertTrue(messages[-1].startswith("event: summary\n"))
+
+    def test_empty_hypothesis_is_a_400(self):
+        response = self.client.post("/design_experiment/stream", json=dict(HYPOTHESIS, statement=""))
+        self.assertEqual(response.status_code, 400)
+
+    def test_wants_sse(self):
+        self.assertTrue(wants_sse("text/event-stream"))
+        self.assertTrue(wants_sse("application/json;q=0.5, text/event-stream"))
+        self.assertFalse(wants_sse("application/x-ndjson"))
+        self.assertFalse(wants_sse(None))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,126 @@
+import io
+import json
+import logging
+import queue
+import subprocess
+import sys
+import unittest
+from pathlib import Path
+
+from agents.common.structured_logging import (
+    DroppingQueueHandler, SamplingFilter, configure_logging, dropped_records, log_event, shutdown_logging,
+)
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+
+
+class TestConfigureLogging(unittest.TestCase):
+
+    def setUp(self):
+        self.root = logging.getLogger()
+        self.saved_level = self.root.level
+        self.stream = io.StringIO()
+        self.logger = logging.getLogger("tests.structured")
+
+    def tearDown(self):
+        shutdown_logging()
+        self.root.setLevel(self.saved_level)
+
+    def records(self):
+        shutdown_logging()
+        return [json.loads(line) for line in self.stream.getvalue().splitlines()]
+
+    def test_json_event_with_fields(self):
+        configure_logging(level="INFO", fmt="json", stream=self.stream)
+        log_event(self.logger, logging.INFO, "session.updated", session_id="s1", writes=3)
+
+        [record] = self.records()
+        self.assertEqual(record["event"], "session.updated")
+        self.assertEqual(record["level"], "INFO")
+        self.assertEqual(record["logger"], "tests.structured")
+        self.assertEqual((record["session_id"], record["writes"]), ("s1", 3))
+        self.assertTrue(record["ts"].endswith("Z"))
+
+    def test_level_gating(self):
+        configure_logging(level="INFO", fmt="json", stream=self.stream)
+        log_event(self.logger, logging.DEBUG, "session.updated", session_id="s1")
+        self.logger.warning("kept")
+        self.assertEqual([record["event"] for record in self.records()], ["kept"])
+
+    def test_exception_in_own_field(self):
+        configure_logging(level="INFO", fmt="json", stream=self.stream)
+        try:
+            raise RuntimeError("boom")
+        except RuntimeError:
+            self.logger.error("failed", exc_info=True)
+
+        [record] = self.records()
+        self.assertEqual(record["event"], "failed")
+        self.assertIn("RuntimeError: boom", record["exception"])
+
+    def test_sampling_keeps_one_in_n(self):
+        configure_logging(level="DEBUG", fmt="json", stream=self.stream, sample={"session.updated": 3})
+        for i in range(7):
+            log_event(self.logger, logging.DEBUG, "session.updated", i=i)
+        log_event(self.logger, logging.DEBUG, "other", i=0)
+
+        records = self.records()
+        self.assertEqual([r["i"] for r in records if r["event"] == "session.updated"], [0, 3, 6])
+        self.assertEqual(records[0]["sample_rate"], 3)
+        self.assertEqual(records[-1]["event"], "other")
+
+    def test_text_format(self):
+        configure_logging(level="INFO", fmt="text", stream=self.stream)
+        log_event(self.logger, logging.INFO, "hypothesis.saved", doc_id="abc")
+        shutdown_logging()
+        self.assertIn("INFO - hypothesis.saved doc_id=abc", self.stream.getvalue())
+
+    def test_reconfigure_replaces_handler(self):
+        configure_logging(fmt="json", stream=io.StringIO())
+        configure_logging(fmt="json", stream=self.stream)
+        handlers = [h for h in self.root.handlers if isinstance(h, DroppingQueueHandler)]
+        self.assertEqual(len(handlers), 1)
+
+    def test_invalid_format(self):
+        with self.assertRaises(ValueError):
+            configure_logging(fmt="xml", stream=self.stream)
+
+
+class TestQueueAndFilters(unittest.TestCase):
+
+    def test_full_queue_drops_instead_of_blocking(self):
+        handler = DroppingQueueHandler(queue.Queue(maxsize=2))
+        logger = logging.getLogger("tests.structured.dropping")
+        logger.addHandler(handler)
+        logger.propagate = False
+        try:
+            for i in range(5):
+                logger.warning("event %d", i)
+        finally:
+            logger.removeHandler(handler)
+            logger.propagate = True
+        self.assertEqual(handler.queue.qsize(), 2)
+        self.assertEqual(handler.dropped, 3)
+
+    def test_sampling_never_drops_warnings(self):
+        sampling = SamplingFilter({"noisy": 100})
+        record = logging.LogRecord("x", logging.WARNING, __file__, 1, "noisy", None, None)
+        self.assertTrue(all(sampling.filter(record) for _ in range(5)))
+
+    def test_dropped_records_without_configuration(self):
+        shutdown_logging()
+        self.assertEqual(dropped_records(), 0)
+
+    def test_importing_agents_configures_nothing(self):
+        code = (
+            "import logging\n"
+            "import agents.agent1.main, agents.agent1.hypothesis_builder, agents.agent2.main\n"
+            "print(len(logging.getLogger().handlers))\n"
+        )
+        result = subprocess.run([sys.executable, "-c", code], cwd=PROJECT_ROOT,
+                                capture_output=True, text=True, check=True)
+        self.assertEqual(result.stdout.strip().splitlines()[-1], "0")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,165 @@
+import json
+import math
+import os
+import subprocess
+import sys
+import unittest
+from unittest.mock import patch
+
+from fastapi.testclient import TestClient
+
+from agents.agent2.models import Hypothesis, Protocol
+from agents.common import wire_format
+from agents.common.wire_format import JSON_MEDIA_TYPE, MSGPACK_MEDIA_TYPE, WireFormatError
+
+
+def make_protocol(steps=3):
+    return Protocol(
+        protocol_id="p1",
+        linked_hypothesis_id="h1",
+        validation_steps=[{"step_id": f"step_{i}", "description": f"Test premise {i}", "metrics": [i, i * 0.5]}
+                          for i in range(steps)],
+        feasibility_assessment={"status": "pending_check"},
+    )
+
+
+class TestMessagePackCodec(unittest.TestCase):
+
+    def round_trip(self, value):
+        return wire_format.unpackb(wire_format.packb(value))
+
+    @patch.object(wire_format, 'msgpack', None)
+    def test_pure_python_round_trip(self):
+        values = [
+            None, True, False, 0, 127, 128, 255, 256, 65536, 2 ** 32, 2 ** 63,
+            -1, -32, -33, -129, -32769, -2 ** 31 - 1, -2 ** 63, 1.5, -0.0,
+            "", "é" * 10, "x" * 31, "x" * 32, "x" * 300, "x" * 70000,
+            b"\x00\x01", [], list(range(20)), {}, {str(i): i for i in range(20)},
+            {"nested": [{"a": [1, {"b": None}]}]},
+        ]
+        for value in values:
+            self.assertEqual(self.round_trip(value), value)
+
+    @patch.object(wire_format, 'msgpack', None)
+    def test_pure_python_matches_spec_bytes(self):
+        self.assertEqual(wire_format.packb({"a": [1, -1, None]}), b"\x81\xa1a\x93\x01\xff\xc0")
+        self.assertEqual(wire_format.packb(1.0), b"\xcb?\xf0\x00\x00\x00\x00\x00\x00")
+
+    @patch.object(wire_format, 'msgpack', None)
+    def test_pure_python_rejects_bad_input(self):
+        with self.assertRaises(TypeError):
+            wire_format.packb({1, 2})
+        with self.assertRaises(WireFormatError):
+            wire_format.decode(b"\x92\x01", MSGPACK_MEDIA_TYPE)  # truncated array
+        with self.assertRaises(WireFormatError):
+            wire_format.decode(b"\x01\x02", MSGPACK_MEDIA_TYPE)  # trailing bytes
+
+    def test_nan_survives(self):
+        self.assertTrue(math.isnan(self.round_trip(float("nan"))))
+
+
+class TestEncodeDecode(unittest.TestCase):
+
+    def test_compact_json(self):
+        encoded = wire_format.encode({"a": [1, 2], "b": "é"})
+        self.assertEqual(encoded, '{"a":[1,2],"b":"é"}'.encode("utf-8"))
+
+    def test_models_round_trip_in_both_formats(self):
+        protocol = make_protocol()
+        for media_type in (JSON_MEDIA_TYPE, MSGPACK_MEDIA_TYPE):
+            data = wire_format.encode(protocol, media_type)
+            self.assertEqual(wire_format.decode_model(data, Protocol, media_type), protocol)
+
+    def test_msgpack_is_smaller_than_json(self):
+        protocol = make_protocol(steps=200)
+        self.assertLess(len(wire_format.encode(protocol, MSGPACK_MEDIA_TYPE)), len(wire_format.encode(protocol)))
+
+    def test_unsupported_media_type(self):
+        with self.assertRaises(WireFormatError):
+            wire_format.encode({}, "text/xml")
+
+    def test_negotiate(self):
+        self.assertEqual(wire_format.negotiate(None), JSON_MEDIA_TYPE)
+        self.assertEqual(wire_format.negotiate("*/*"), JSON_MEDIA_TYPE)
+        self.assertEqual(wire_format.negotiate("application/msgpack"), MSGPACK_MEDIA_TYPE)
+        self.assertEqual(wire_format.negotiate("application/json, application/x-msgpack"), JSON_MEDIA_TYPE)
+        self.assertEqual(wire_format.negotiate("application/json;q=0.5, application/msgpack"), MSGPACK_MEDIA_TYPE)
+        self.assertEqual(wire_format.negotiate("application/msgpack;q=0"), JSON_MEDIA_TYPE)
+
+
+class TestWireFormatRoute(unittest.TestCase):
+
+    def setUp(self):
+        from agents.agent2.main import app
+        self.client = TestClient(app)
+        self.hypothesis = Hypothesis(
+            hypothesis_id="hyp_wire_001",
+            statement="If sunlight exposure increases, plant growth will accelerate.",
+            core_assumptions=["Sunlight provides energy for photosynthesis."],
+            description="Wire format test.",
+        )
+
+    def test_msgpack_request_and_response(self):
+        response = self.client.post(
+            "/design_experiment/",
+            content=wire_format.encode(self.hypothesis, MSGPACK_MEDIA_TYPE),
+            headers={"Content-Type": MSGPACK_MEDIA_TYPE, "Accept": MSGPACK_MEDIA_TYPE},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["content-type"], MSGPACK_MEDIA_TYPE)
+        protocol = wire_format.decode_model(response.content, Protocol, MSGPACK_MEDIA_TYPE)
+        self.assertEqual(protocol.linked_hypothesis_id, "hyp_wire_001")
+
+    def test_msgpack_response_is_packed_from_the_return_value(self):
+        with patch('json.loads', side_effect=AssertionError("JSON round trip")):
+            response = self.client.post(
+                "/design_experiment/",
+                content=wire_format.encode(self.hypothesis, MSGPACK_MEDIA_TYPE),
+                headers={"Content-Type": MSGPACK_MEDIA_TYPE, "Accept": MSGPACK_MEDIA_TYPE},
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(wire_format.unpackb(response.content)["linked_hypothesis_id"], "hyp_wire_001")
+
+    def test_codec_does_not_import_fastapi(self):
+        check = "import sys, agents.common.wire_format; sys.exit('fastapi' in sys.modules)"
+        root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        self.assertEqual(subprocess.run([sys.executable, "-c", check], cwd=root).returncode, 0)
+
+    def test_json_clients_unaffected(self):
+        response = self.client.post("/design_experiment/", json=self.hypothesis.model_dump())
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.headers["content-type"].startswith(JSON_MEDIA_TYPE))
+        self.assertEqual(response.json()["linked_hypothesis_id"], "hyp_wire_001")
+
+    def test_msgpack_body_is_validated(self):
+        response = self.client.post(
+            "/design_experiment/",
+            content=wire_format.encode({"hypothesis_id": "h"}, MSGPACK_MEDIA_TYPE),
+            headers={"Content-Type": MSGPACK_MEDIA_TYPE},
+        )
+        self.assertEqual(response.status_code, 422)
+
+    def test_malformed_and_unsupported_bodies(self):
+        response = self.client.post("/design_experiment/", content=b"\x92\x01",
+                                    headers={"Content-Type": MSGPACK_MEDIA_TYPE})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post("/design_experiment/", content=b"<xml/>", headers={"Content-Type": "text/xml"})
+        self.assertEqual(response.status_code, 415)
+
+
+class TestHypothesisPayload(unittest.TestCase):
+
+    def test_structure_hypothesis_emits_compact_json(self):
+        from agents.agent1.hypothesis_builder import HypothesisBuilder
+        builder = HypothesisBuilder()
+        builder.user_confirmed_hypothesis = True
+        builder.hypothesis_components.update(
+            independent_variable="IV", dependent_variable="DV", mechanism="M", full_statement="S"
+        )
+        payload = builder.structure_hypothesis()
+        self.assertNotIn("\n", payload)
+        self.assertEqual(json.loads(payload)["statement"], "S")
+
+
+if __name__ == '__main__':
+    unittest.main()